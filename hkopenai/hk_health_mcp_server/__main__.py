@@ -3,8 +3,20 @@ Module serving as the entry point for the HK OpenAI Health MCP Server.
 This script initiates the main server functionality.
 """
 
+import argparse
+
 from hkopenai_common.cli_utils import cli_main
-from .server import server
+from .workers import MultiWorkerServer, workers_from_env
+
+
+def main(argv=None):
+    """Run the server, with several HTTP worker processes when --workers is above one."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    known, rest = parser.parse_known_args(argv)
+    workers = known.workers if known.workers is not None else workers_from_env()
+    cli_main(lambda: MultiWorkerServer(workers), "HK Health MCP Server", rest)
+
 
 if __name__ == "__main__":
-    cli_main(server, "HK Health MCP Server")
+    main()
@@ -0,0 +1,438 @@
+"""
+Module providing the shared in-process cache for Hospital Authority feed responses.
+Entries are keyed by feed URL and language, expire according to the feed TTL and
+are evicted in least-recently-used order once the entry or memory cap is reached.
+Expired entries are kept as a fallback and served as stale when a refresh fails.
+When a snapshot store is attached, fetched versions are persisted and a key with no
+entry is first restored from the store. When several server processes share the
+store, a refresh takes the feed's cross-process lock and uses a version another
+process has just stored instead of fetching the feed again.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from . import metrics
+from .columnar import FeedTable
+from .feeds import Feed
+from .singleflight import upstream_flight
+from .snapshot_store import SnapshotStore
+
+DEFAULT_MAX_ENTRIES = 64
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+class CacheEntry:
+    """A cached feed payload together with its fetch time and approximate size.
+
+    Structures derived from the payload, such as lookup indexes, are kept in
+    'derived' so they are built once per snapshot.
+    """
+
+    __slots__ = ("data", "fetched_at", "expires_at", "size", "derived")
+
+    def __init__(self, data: Any, fetched_at: datetime, expires_at: float, size: int):
+        self.data = data
+        self.fetched_at = fetched_at
+        self.expires_at = expires_at
+        self.size = size
+        self.derived: Dict[str, Any] = {}
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """Return True if the entry has not yet reached its expiry time."""
+        return (time.monotonic() if now is None else now) < self.expires_at
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with per-entry TTL and a total memory cap."""
+
+    def __init__(
+        self, max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[CacheEntry]:
+        """Return the fresh entry stored under key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or not entry.is_fresh():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def peek(self, key: Tuple[str, str]) -> Optional[CacheEntry]:
+        """Return the entry stored under key even if expired, without counting a hit."""
+        with self._lock:
+            return self._entries.get(key)
+
+    def put(
+        self,
+        key: Tuple[str, str],
+        data: Any,
+        ttl: float,
+        fetched_at: Optional[datetime] = None,
+    ) -> CacheEntry:
+        """Store data under key for ttl seconds and evict entries over the caps.
+
+        Re-storing the very same payload object, as after a 304 revalidation, keeps
+        the structures already derived from it.
+        """
+        previous = self.peek(key)
+        reuse = previous is not None and previous.data is data
+        entry = CacheEntry(
+            data,
+            fetched_at or datetime.now(),
+            time.monotonic() + ttl,
+            previous.size if reuse else _estimate_size(data),
+        )
+        if reuse:
+            entry.derived = previous.derived
+        with self._lock:
+            replaced = self._entries.pop(key, None)
+            if replaced is not None:
+                self._bytes -= replaced.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the current size and hit/miss counters of the cache."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def _estimate_size(data: Any) -> int:
+    """Approximate the memory used by a payload.
+
+    Columnar snapshots report their own size; other payloads are measured by their
+    encoded JSON length.
+    """
+    if isinstance(data, FeedTable):
+        return data.nbytes()
+    return len(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+class FeedResult:
+    """A feed payload as served to a tool, with where and when it came from."""
+
+    __slots__ = ("data", "fetched_at", "cache_hit", "stale", "derived")
+
+    def __init__(
+        self,
+        data: Any,
+        fetched_at: datetime,
+        cache_hit: bool,
+        stale: bool = False,
+        derived: Optional[Dict[str, Any]] = None,
+    ):
+        self.data = data
+        self.fetched_at = fetched_at
+        self.cache_hit = cache_hit
+        self.stale = stale
+        self.derived = {} if derived is None else derived
+
+    @classmethod
+    def from_entry(cls, entry: CacheEntry, cache_hit: bool, stale: bool = False) -> "FeedResult":
+        """Return a result serving a cache entry and sharing its derived structures."""
+        return cls(entry.data, entry.fetched_at, cache_hit, stale, entry.derived)
+
+    def derive(self, name: str, build: Callable[[Any], Any]) -> Any:
+        """Return build(data), computing it only once per snapshot."""
+        value = self.derived.get(name)
+        if value is None:
+            value = self.derived[name] = build(self.data)
+        return value
+
+    @property
+    def is_error(self) -> bool:
+        """Return True if the payload is an error dictionary from the fetcher."""
+        return isinstance(self.data, dict) and "error" in self.data
+
+    def metadata(self) -> Dict[str, Any]:
+        """Return the response fields describing the freshness of the payload."""
+        return {
+            "last_updated": self.fetched_at.isoformat(),
+            "cache_hit": self.cache_hit,
+            "stale": self.stale,
+            "snapshot_age_seconds": round(
+                (datetime.now() - self.fetched_at).total_seconds(), 1
+            ),
+        }
+
+
+response_cache = ResponseCache()
+
+
+def _cache_samples():
+    """Provide the shared cache statistics to the metrics endpoint."""
+    stats = response_cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    return [
+        ("hk_health_cache_entries", "gauge", "Feed snapshots held in the cache.", stats["entries"]),
+        ("hk_health_cache_bytes", "gauge", "Approximate bytes held in the cache.", stats["bytes"]),
+        ("hk_health_cache_hits_total", "counter", "Fresh cache hits.", stats["hits"]),
+        ("hk_health_cache_misses_total", "counter", "Cache misses.", stats["misses"]),
+        ("hk_health_cache_evictions_total", "counter", "Cache evictions.", stats["evictions"]),
+        (
+            "hk_health_cache_hit_ratio",
+            "gauge",
+            "Fresh hits over all cache lookups.",
+            stats["hits"] / lookups if lookups else 0.0,
+        ),
+    ]
+
+
+metrics.add_collector(_cache_samples)
+
+# Keys kept warm by the background refresh scheduler. Requests for these keys never
+# wait on the upstream when an older copy exists; the scheduler retries instead.
+background_refresh_keys: Set[Tuple[str, str]] = set()
+
+# Callbacks notified with (feed, lang, entry) whenever a changed feed version is fetched.
+VersionListener = Callable[[Feed, str, CacheEntry], None]
+version_listeners: List[VersionListener] = []
+
+
+def add_version_listener(listener: VersionListener) -> None:
+    """Call listener for every newly fetched feed version, unless already registered."""
+    if listener not in version_listeners:
+        version_listeners.append(listener)
+
+
+def remove_version_listener(listener: VersionListener) -> None:
+    """Stop calling a listener registered with add_version_listener."""
+    if listener in version_listeners:
+        version_listeners.remove(listener)
+
+
+# Persistent store of fetched versions, attached by the server while it runs.
+snapshot_store: Optional[SnapshotStore] = None
+# Whether other server processes fetch into the same store.
+shared_snapshots = False
+
+# Seconds a refresh waits for another process fetching the same feed, and the polling step.
+SHARED_LOCK_WAIT = 15.0
+SHARED_LOCK_POLL = 0.05
+
+
+def set_snapshot_store(store: Optional[SnapshotStore], shared: bool = False) -> None:
+    """Attach the persistent snapshot store, or detach it with None.
+
+    Args:
+        store: The store, or None to detach it.
+        shared: Whether worker processes share the store, so refreshes coordinate
+            through it instead of each process fetching every feed.
+    """
+    global snapshot_store, shared_snapshots  # pylint: disable=global-statement
+    snapshot_store = store
+    shared_snapshots = shared and store is not None
+
+
+def _notify(feed: Feed, lang: str, entry: CacheEntry) -> None:
+    """Pass a new feed version to the version listeners."""
+    for listener in list(version_listeners):
+        listener(feed, lang, entry)
+
+
+async def _lock_shared(store: SnapshotStore, url: str) -> bool:
+    """Wait for the cross-process lock of a URL; return False if it was not taken in time."""
+    waited = 0.0
+    while True:
+        try:
+            if store.try_lock(url):
+                return True
+        except OSError:
+            return False
+        if waited >= SHARED_LOCK_WAIT:
+            return False
+        await asyncio.sleep(SHARED_LOCK_POLL)
+        waited += SHARED_LOCK_POLL
+
+
+async def _load_stored(
+    store: Optional[SnapshotStore],
+    feed: Feed,
+    key: Tuple[str, str],
+    ttl: float,
+    max_age: Optional[float] = None,
+) -> Optional[CacheEntry]:
+    """Load the latest stored version of a key into the cache, expiring by its real age.
+
+    Storage errors and versions failing validation load nothing.
+
+    Args:
+        store: The snapshot store, or None.
+        feed: The feed of the key.
+        key: The cache key (URL and language).
+        ttl: Seconds the version stays fresh from its fetch time.
+        max_age: If given, only load a version stored within max_age seconds that is
+            newer than the cached one, as when adopting another process's fetch.
+    """
+    if store is None:
+        return None
+    try:
+        if max_age is not None:
+            fetched_at = await asyncio.to_thread(store.latest_fetched_at, key[0])
+            current = response_cache.peek(key)
+            if fetched_at is None or (current is not None and current.fetched_at >= fetched_at):
+                return None
+            if (datetime.now() - fetched_at).total_seconds() >= max_age:
+                return None
+        stored = await asyncio.to_thread(store.latest, key[0])
+    except (sqlite3.Error, OSError):
+        return None
+    if stored is None:
+        return None
+    payload, fetched_at = stored
+    data = feed.ingest(payload)
+    if not isinstance(data, FeedTable):
+        return None
+    age = (datetime.now() - fetched_at).total_seconds()
+    return response_cache.put(key, data, ttl - age, fetched_at)
+
+
+async def _persist(url: str, entry: CacheEntry, unchanged: bool) -> None:
+    """Write a fetched version to the snapshot store without blocking the event loop.
+
+    Storage errors are ignored: persistence must never fail a request.
+    """
+    store = snapshot_store
+    if store is None:
+        return
+    try:
+        if unchanged:
+            await asyncio.to_thread(store.touch, url, entry.fetched_at)
+        else:
+            payload = entry.data.to_payload() if isinstance(entry.data, FeedTable) else entry.data
+            await asyncio.to_thread(store.save, url, payload, entry.fetched_at)
+    except (sqlite3.Error, OSError):
+        pass
+
+
+async def refresh_feed(
+    feed: Feed,
+    lang: str,
+    fetch: Callable[..., Awaitable[Any]],
+    ttl: Optional[float] = None,
+    max_age: Optional[float] = None,
+) -> FeedResult:
+    """Fetch a feed upstream and store its columnar snapshot in the shared cache.
+
+    Concurrent refreshes of the same URL share one upstream fetch. Error payloads
+    returned by the fetcher are passed through without replacing the cached copy.
+    With a shared snapshot store, refreshes of the same URL in other processes wait
+    for each other, and a version stored by another process is used when recent enough.
+
+    Args:
+        feed: The feed to fetch.
+        lang: Language code (en/tc/sc) of the feed variant.
+        fetch: Coroutine function called as fetch(url, parse) that fetches the JSON
+            payload of a URL and converts it with parse.
+        ttl: Seconds the fetched copy stays fresh, defaulting to the feed TTL.
+        max_age: Age in seconds under which a version another process stored in the
+            shared store is used instead of fetching, defaulting to the feed TTL.
+
+    Returns:
+        The freshly fetched payload, or the fetcher's error payload.
+    """
+    url = feed.url(lang)
+    ttl = feed.ttl if ttl is None else ttl
+
+    async def load() -> FeedResult:
+        store = snapshot_store if shared_snapshots else None
+        locked = store is not None and await _lock_shared(store, url)
+        try:
+            if store is not None:
+                age_limit = feed.ttl if max_age is None else max_age
+                entry = await _load_stored(store, feed, (url, lang), ttl, age_limit)
+                if entry is not None:
+                    _notify(feed, lang, entry)
+                    return FeedResult.from_entry(entry, True)
+            return await fetch_and_store()
+        finally:
+            if locked:
+                store.unlock(url)
+
+    async def fetch_and_store() -> FeedResult:
+        data = await fetch(url, feed.ingest)
+        if isinstance(data, dict) and "error" in data:
+            return FeedResult(data, datetime.now(), False)
+        previous = response_cache.peek((url, lang))
+        entry = response_cache.put((url, lang), data, ttl)
+        unchanged = previous is not None and previous.data is data
+        await _persist(url, entry, unchanged)
+        if not unchanged:
+            _notify(feed, lang, entry)
+        return FeedResult.from_entry(entry, False)
+
+    result, _ = await upstream_flight.do(url, load)
+    return result
+
+
+async def get_feed_data(
+    feed: Feed, lang: str, fetch: Callable[..., Awaitable[Any]]
+) -> FeedResult:
+    """Return a feed payload from the shared cache, fetching it on a miss.
+
+    When the cached copy has expired and a fresh one cannot be fetched, the last good
+    payload is served and marked stale. Keys kept warm by the background scheduler
+    serve their last good payload straight away instead of fetching on the request path.
+    A key with no cached entry is first restored from the snapshot store, if attached.
+
+    Args:
+        feed: The feed to read.
+        lang: Language code (en/tc/sc) of the feed variant.
+        fetch: Coroutine function called as fetch(url, parse), as for refresh_feed.
+
+    Returns:
+        The payload together with its fetch time, cache hit and staleness flags.
+    """
+    key = (feed.url(lang), lang)
+    entry = response_cache.get(key)
+    if entry is not None:
+        return FeedResult.from_entry(entry, True)
+    previous = response_cache.peek(key)
+    if previous is None:
+        previous = await _load_stored(snapshot_store, feed, key, feed.ttl)
+        if previous is not None and previous.is_fresh():
+            return FeedResult.from_entry(previous, True)
+    if previous is not None and key in background_refresh_keys:
+        return FeedResult.from_entry(previous, True, stale=True)
+    result = await refresh_feed(feed, lang, fetch)
+    if result.is_error and previous is not None:
+        return FeedResult.from_entry(previous, True, stale=True)
+    return result
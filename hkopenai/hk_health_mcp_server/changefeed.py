@@ -0,0 +1,403 @@
+"""
+Module tracking row-level changes between consecutive snapshots of each feed.
+Every new version of a feed is compared with the previous one by row key (the
+hospital of an AED row, the clinic of a GOPC row, the cluster, specialty and
+category of a specialist row). Each version is named by a digest of its content,
+which serves as the cursor tools return so that a later call gets only the rows
+changed since, and the changes are published as MCP resources whose subscribers
+are notified when a feed changes.
+"""
+
+import asyncio
+import hashlib
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from . import serialization
+from .cache import CacheEntry
+from .columnar import FeedTable
+from .feeds import FEEDS, LANGUAGES, Feed
+from .reference import canonical_category
+
+DEFAULT_HISTORY = 32
+RESOURCE_TEMPLATE = "hkhealth://changes/{feed}/{lang}"
+
+# Fields identifying a row of each feed across versions. The specialist feed has been
+# published with both 'Category' and 'category', so both are listed.
+KEY_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "aed": ("hospName",),
+    "specialist": ("cluster", "specialty", "Category", "category"),
+    "gopc": ("District", "Clinic"),
+}
+
+# Functions computing the key values of a row, for feeds whose key fields need
+# normalizing rather than comparing as published.
+KeyFunction = Callable[[Dict[str, Any]], Tuple[Any, ...]]
+KEY_FUNCTIONS: Dict[str, KeyFunction] = {
+    "specialist": lambda row: (
+        row.get("cluster"),
+        row.get("specialty"),
+        canonical_category(row.get("Category") or row.get("category")),
+    ),
+}
+
+# A row key: the key field values and the occurrence of that key within the snapshot.
+RowKey = Tuple[Tuple[Any, ...], int]
+
+
+def _row_keys(
+    rows: Iterable[Dict[str, Any]],
+    fields: Optional[Sequence[str]],
+    key: Optional[KeyFunction] = None,
+) -> List[RowKey]:
+    """Return the key of every row, numbering rows that share key field values."""
+    seen: Dict[Tuple[Any, ...], int] = {}
+    keys = []
+    for row in rows:
+        if key is not None:
+            values = key(row)
+        elif fields is None:
+            values = tuple(sorted(row.items(), key=lambda item: item[0]))
+        else:
+            values = tuple(row.get(field) for field in fields)
+        occurrence = seen.get(values, 0)
+        seen[values] = occurrence + 1
+        keys.append((values, occurrence))
+    return keys
+
+
+def snapshot_version(rows: Iterable[Dict[str, Any]], extras: Dict[str, Any]) -> str:
+    """Return the version of a snapshot: a digest of its rows, in any order, and extras.
+
+    The version depends only on the content, so every process serving the same
+    snapshot names it alike.
+    """
+    digest = hashlib.sha1(serialization.dumps(sorted(extras.items())).encode("utf-8"))
+    for encoded in sorted(serialization.dumps(row) for row in rows):
+        digest.update(b"\n" + encoded.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class Delta:
+    """Rows changed since a cursor: positions in the current table and removed rows."""
+
+    __slots__ = ("cursor", "positions", "removed", "reset")
+
+    def __init__(
+        self,
+        cursor: str,
+        positions: Sequence[int],
+        removed: List[Dict[str, Any]],
+        reset: bool = False,
+    ):
+        self.cursor = cursor
+        self.positions = positions
+        self.removed = removed
+        self.reset = reset
+
+
+class FeedChanges:
+    """The latest snapshot of one feed variant and a bounded log of its changes.
+
+    Each log entry records the version it replaced and the one it produced, the keys
+    of the rows added or changed and the rows removed by it, so changes since any
+    logged version can be merged without keeping older snapshots.
+    """
+
+    __slots__ = ("fields", "key", "table", "version", "_rows", "_positions", "_log")
+
+    def __init__(
+        self,
+        fields: Optional[Sequence[str]],
+        history: int = DEFAULT_HISTORY,
+        key: Optional[KeyFunction] = None,
+    ):
+        self.fields = fields
+        self.key = key
+        self.table: Optional[FeedTable] = None
+        self.version: Optional[str] = None
+        self._rows: Dict[RowKey, Dict[str, Any]] = {}
+        self._positions: Dict[RowKey, int] = {}
+        self._log: Deque[Tuple[str, str, Set[RowKey], Dict[RowKey, Dict[str, Any]]]] = deque(
+            maxlen=history
+        )
+
+    def update(self, table: FeedTable) -> bool:
+        """Record a snapshot and return whether its rows or extras differ from the last one."""
+        if table is self.table:
+            return False
+        rows = table.rows()
+        keys = _row_keys(rows, self.fields, self.key)
+        current = dict(zip(keys, rows))
+        previous, previous_version = self._rows, self.version
+        self.table = table
+        self._rows = current
+        self._positions = {key: position for position, key in enumerate(keys)}
+        self.version = snapshot_version(rows, table.extras)
+        if previous_version is None or self.version == previous_version:
+            return False
+        changed = {key for key, row in current.items() if previous.get(key) != row}
+        removed = {key: row for key, row in previous.items() if key not in current}
+        self._log.append((previous_version, self.version, changed, removed))
+        return True
+
+    @property
+    def previous(self) -> Optional[str]:
+        """The version replaced by the latest change, or None before any change."""
+        return self._log[-1][0] if self._log else None
+
+    def since(self, version: str) -> Optional[Tuple[List[int], List[Dict[str, Any]]]]:
+        """Return the positions of rows changed after a version and the rows removed since.
+
+        Returns None when the version is unknown or older than the log.
+        """
+        if version == self.version:
+            return [], []
+        changed: Set[RowKey] = set()
+        removed: Dict[RowKey, Dict[str, Any]] = {}
+        # Walk back from the latest change, so a version seen twice is diffed from its
+        # latest occurrence.
+        for replaced, _, keys, rows in reversed(self._log):
+            changed |= keys
+            for key, row in rows.items():
+                removed.setdefault(key, row)
+            if replaced == version:
+                positions = sorted(
+                    self._positions[key] for key in changed if key in self._positions
+                )
+                return positions, [row for key, row in removed.items() if key not in self._rows]
+        return None
+
+    def latest(self) -> Tuple[List[int], List[Dict[str, Any]]]:
+        """Return the rows changed and removed by the latest version."""
+        return self.since(self.previous) if self._log else ([], [])
+
+
+# Callbacks notified with (feed name, lang, cursor) whenever a feed variant changes.
+ChangeListener = Callable[[str, str, str], None]
+
+
+class ChangeFeed:
+    """Change tracking for every feed variant.
+
+    A cursor is the version of a snapshot (see snapshot_version), so worker processes
+    serving the same snapshot issue the same cursor and a cursor from one worker is
+    understood by the others. A cursor whose version is not in the log, such as one
+    issued before a restart, is answered with the full table.
+    """
+
+    def __init__(self, history: int = DEFAULT_HISTORY):
+        self.history = history
+        self._feeds: Dict[Tuple[str, str], FeedChanges] = {}
+        self._listeners: List[ChangeListener] = []
+
+    def clear(self) -> None:
+        """Forget every tracked snapshot."""
+        self._feeds.clear()
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Call listener whenever a tracked feed variant changes, unless already registered."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: ChangeListener) -> None:
+        """Stop calling a listener registered with add_listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def changes(self, feed: Feed, lang: str) -> FeedChanges:
+        """Return the change log of a feed variant, creating it when first seen."""
+        changes = self._feeds.get((feed.name, lang))
+        if changes is None:
+            changes = self._feeds[(feed.name, lang)] = FeedChanges(
+                KEY_FIELDS.get(feed.name), self.history, KEY_FUNCTIONS.get(feed.name)
+            )
+        return changes
+
+    def track(self, feed: Feed, lang: str, table: FeedTable) -> str:
+        """Record a served snapshot of a feed variant and return its cursor."""
+        changes = self.changes(feed, lang)
+        if changes.update(table):
+            for listener in list(self._listeners):
+                listener(feed.name, lang, changes.version)
+        return changes.version
+
+    def record_version(self, feed: Feed, lang: str, entry: CacheEntry) -> None:
+        """Track a newly fetched feed version; registered as a cache version listener."""
+        if isinstance(entry.data, FeedTable):
+            self.track(feed, lang, entry.data)
+
+    def since(self, feed: Feed, lang: str, table: FeedTable, cursor: str) -> Delta:
+        """Return the rows of a snapshot changed since a cursor from an earlier response.
+
+        An unknown, expired or malformed cursor yields every row with reset set.
+        """
+        current = self.track(feed, lang, table)
+        delta = self.changes(feed, lang).since(str(cursor)) if cursor else None
+        if delta is None:
+            return Delta(current, range(len(table)), [], reset=True)
+        return Delta(current, *delta)
+
+    def resource(self, feed_name: str, lang: str) -> Dict[str, Any]:
+        """Return the latest changes of a feed variant as published by its change resource."""
+        if feed_name not in FEEDS or lang not in LANGUAGES:
+            return {"type": "Error", "error": f"Unknown feed variant '{feed_name}/{lang}'"}
+        changes = self._feeds.get((feed_name, lang))
+        if changes is None or changes.table is None:
+            return {"feed": feed_name, "lang": lang, "cursor": None, "changed": [], "removed": []}
+        positions, removed = changes.latest()
+        fields = changes.fields
+        return {
+            "feed": feed_name,
+            "lang": lang,
+            "cursor": changes.version,
+            "previous_cursor": changes.previous,
+            **changes.table.extras,
+            "changed": changes.table.rows(positions),
+            "removed": [key_fields(row, fields) for row in removed],
+        }
+
+
+def key_fields(row: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Return the fields of a row that identify it, or the whole row for unkeyed feeds."""
+    if fields is None:
+        return dict(row)
+    return {field: row[field] for field in fields if field in row}
+
+
+change_feed = ChangeFeed()
+
+
+def select_changes(
+    feed: Feed,
+    lang: str,
+    table: FeedTable,
+    since: Optional[str],
+    positions: Optional[Sequence[int]],
+    keep_removed: Optional[Callable[[List[Dict[str, Any]]], Sequence[int]]] = None,
+) -> Tuple[Optional[Sequence[int]], Dict[str, Any]]:
+    """Narrow a tool's selected rows to those changed since a cursor.
+
+    Args:
+        feed: The feed the table belongs to.
+        lang: Language code (en/tc/sc) of the feed variant.
+        table: The snapshot being served.
+        since: Cursor from an earlier response, or empty for every selected row.
+        positions: Rows selected by the tool's filters, or None for all rows.
+        keep_removed: Optional function returning the positions of the removed rows
+            that match the tool's filters.
+
+    Returns:
+        The positions to return and the cursor fields to add to the response.
+    """
+    if not since:
+        return positions, {"cursor": change_feed.track(feed, lang, table)}
+    delta = change_feed.since(feed, lang, table, since)
+    if delta.reset:
+        return positions, {"cursor": delta.cursor, "since": since, "reset": True}
+    changed = set(delta.positions)
+    selected = [p for p in (range(len(table)) if positions is None else positions) if p in changed]
+    removed = delta.removed
+    if keep_removed is not None and removed:
+        removed = [removed[i] for i in keep_removed(removed)]
+    fields = change_feed.changes(feed, lang).fields
+    return selected, {
+        "cursor": delta.cursor,
+        "since": since,
+        "removed": [key_fields(row, fields) for row in removed],
+    }
+
+
+class SubscriptionHub:
+    """MCP sessions subscribed to change resources, notified when a feed changes."""
+
+    def __init__(self):
+        self._sessions: Dict[str, Set[Any]] = {}
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    def subscribe(self, uri: str, session: Any) -> None:
+        """Notify a session of updates to a resource URI."""
+        self._sessions.setdefault(uri, set()).add(session)
+
+    def unsubscribe(self, uri: str, session: Any) -> None:
+        """Stop notifying a session of updates to a resource URI."""
+        sessions = self._sessions.get(uri)
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self._sessions[uri]
+
+    def subscribers(self, uri: str) -> Set[Any]:
+        """Return the sessions subscribed to a resource URI."""
+        return set(self._sessions.get(uri, ()))
+
+    def on_change(self, feed_name: str, lang: str, _cursor: str) -> None:
+        """Send update notifications for a changed feed variant; a change listener."""
+        uri = RESOURCE_TEMPLATE.format(feed=feed_name, lang=lang)
+        if not self._sessions.get(uri):
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(self.notify(uri))
+        except RuntimeError:
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def notify(self, uri: str) -> None:
+        """Send a resource update notification to every subscriber, dropping closed sessions."""
+        for session in self.subscribers(uri):
+            try:
+                await session.send_resource_updated(uri)
+            except Exception:  # pylint: disable=broad-except
+                self.unsubscribe(uri, session)
+
+
+subscription_hub = SubscriptionHub()
+
+
+def _install_subscription_handlers(mcp) -> None:
+    """Serve resources/subscribe and resources/unsubscribe on the low-level MCP server.
+
+    Newer MCP SDKs take handlers through add_request_handler; older ones through
+    the subscribe_resource and unsubscribe_resource decorators.
+    """
+    from mcp import types  # pylint: disable=import-outside-toplevel
+
+    low = mcp._mcp_server  # pylint: disable=protected-access
+    if hasattr(low, "add_request_handler"):
+
+        async def on_subscribe(ctx, params):
+            subscription_hub.subscribe(str(params.uri), ctx.session)
+            return types.EmptyResult()
+
+        async def on_unsubscribe(ctx, params):
+            subscription_hub.unsubscribe(str(params.uri), ctx.session)
+            return types.EmptyResult()
+
+        low.add_request_handler("resources/subscribe", types.SubscribeRequestParams, on_subscribe)
+        low.add_request_handler(
+            "resources/unsubscribe", types.UnsubscribeRequestParams, on_unsubscribe
+        )
+        return
+
+    @low.subscribe_resource()
+    async def subscribe(uri):
+        subscription_hub.subscribe(str(uri), low.request_context.session)
+
+    @low.unsubscribe_resource()
+    async def unsubscribe(uri):
+        subscription_hub.unsubscribe(str(uri), low.request_context.session)
+
+
+def register(mcp):
+    """Registers the change resources and their subscription handlers with the FastMCP server."""
+
+    @mcp.resource(
+        RESOURCE_TEMPLATE,
+        description="Rows changed by the latest version of a Hospital Authority feed (aed, specialist or gopc) in a language (en, tc or sc), with the cursor to pass as 'since' to the feed's tool. Subscribe to be notified when the feed changes",
+        mime_type="application/json",
+    )
+    def get_feed_changes(feed: str, lang: str) -> Dict:
+        return change_feed.resource(feed, lang)
+
+    _install_subscription_handlers(mcp)
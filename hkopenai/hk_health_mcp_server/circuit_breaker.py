@@ -0,0 +1,115 @@
+"""
+Module providing the circuit breaker guarding requests to an upstream host.
+After a run of consecutive failures the circuit opens and requests fail fast instead
+of each waiting for a timeout. Once the open period has passed a single probe request
+is let through: success closes the circuit, failure opens it again for twice as long.
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+# Numeric value of each state as exported by the metrics endpoint.
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Tracks the health of one upstream host and decides whether to call it."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 300.0,
+        on_change: Optional[Callable[[str], None]] = None,
+    ):
+        """Create a closed circuit.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit.
+            reset_timeout: Seconds the circuit stays open before a probe is allowed.
+            max_reset_timeout: Upper bound of the open period as failed probes double it.
+            on_change: Optional callback called with the new state on every transition.
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max(reset_timeout, max_reset_timeout)
+        self.on_change = on_change
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_for = reset_timeout
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        """Switch to state and notify the listener."""
+        self.state = state
+        if self.on_change is not None:
+            self.on_change(state)
+
+    def _open(self, now: float) -> None:
+        """Open the circuit from now on."""
+        self.opened_at = now
+        self._probe_started = None
+        self._set_state(OPEN)
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent now.
+
+        While half-open only one probe is in flight at a time; a probe that never
+        reports back is given up after the reset timeout so the circuit cannot stick.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < self.open_for:
+                    return False
+                self._set_state(HALF_OPEN)
+            if (
+                self._probe_started is not None
+                and now - self._probe_started < self.reset_timeout
+            ):
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        """Report a request answered by the host, closing the circuit."""
+        with self._lock:
+            self.consecutive_failures = 0
+            self.open_for = self.reset_timeout
+            self._probe_started = None
+            if self.state != CLOSED:
+                self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        """Report a failed request, opening the circuit once the threshold is reached."""
+        now = time.monotonic()
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN:
+                self.open_for = min(self.open_for * 2, self.max_reset_timeout)
+                self._open(now)
+            elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                self._open(now)
+
+    def retry_after(self) -> float:
+        """Return the seconds until a probe is allowed, or 0 when not open."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.open_for - time.monotonic())
+
+    def as_dict(self) -> Dict:
+        """Return the breaker state as a JSON serialisable dictionary."""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 1),
+        }
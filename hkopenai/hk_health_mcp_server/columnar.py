@@ -0,0 +1,234 @@
+"""
+Module providing the compact columnar form in which parsed feed snapshots are held.
+Rows are stored column by column with interned strings, so repeated keys and values
+such as district names are kept once, and numeric columns are parsed once at ingest.
+Rows are materialized as dictionaries only when a tool returns them, optionally
+projected to the requested fields.
+"""
+
+import math
+import sys
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+if TYPE_CHECKING:
+    from .schemas import RowSchema, ValidationReport
+
+
+class _Missing:
+    """Marker for a field absent from a row."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def _intern(value: Any) -> Any:
+    """Intern string values so equal strings share one object."""
+    return sys.intern(value) if type(value) is str else value  # pylint: disable=unidiomatic-typecheck
+
+
+def _to_number(value: Any) -> Optional[float]:
+    """Parse a numeric feed value such as '150' or 12.5, or return None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            number = float(value.replace(",", ""))
+        except ValueError:
+            return None
+        return number if math.isfinite(number) else None
+    return None
+
+
+class FeedTable:
+    """A feed snapshot held as columns, plus the payload fields outside the rows.
+
+    The table behaves as a read-only sequence of row dictionaries, so it can be
+    indexed and iterated like the list it replaces.
+    """
+
+    __slots__ = ("names", "columns", "numeric", "extras", "rows_key", "length", "report")
+
+    def __init__(
+        self,
+        names: Sequence[str],
+        columns: Sequence[List[Any]],
+        extras: Optional[Dict[str, Any]] = None,
+        rows_key: Optional[str] = None,
+        numeric_fields: Optional[Sequence[str]] = None,
+    ):
+        """Hold the given columns.
+
+        Args:
+            names: Field name of each column.
+            columns: Column values, with MISSING where a row lacks the field.
+            extras: Payload fields outside the rows.
+            rows_key: Key of the row list when the payload is a JSON object.
+            numeric_fields: Fields to parse as numbers; by default every column whose
+                values all parse as numbers.
+        """
+        self.names = tuple(names)
+        self.columns = tuple(columns)
+        self.extras = extras or {}
+        self.rows_key = rows_key
+        self.length = len(self.columns[0]) if self.columns else 0
+        self.report: Optional["ValidationReport"] = None  # Set when built with a schema.
+        self.numeric: Dict[str, array] = {}
+        if numeric_fields is not None:
+            for name in numeric_fields:
+                if name in self.names:
+                    numbers = (_to_number(value) for value in self.column(name))
+                    self.numeric[name] = array(
+                        "d", (math.nan if n is None else n for n in numbers)
+                    )
+            return
+        for name, column in zip(self.names, self.columns):
+            parsed = [_to_number(value) for value in column if value is not MISSING]
+            if parsed and all(number is not None for number in parsed):
+                self.numeric[name] = array(
+                    "d",
+                    (math.nan if v is MISSING else _to_number(v) for v in column),
+                )
+
+    @classmethod
+    def from_rows(
+        cls,
+        rows: Iterable[Any],
+        extras: Optional[Dict[str, Any]] = None,
+        rows_key: Optional[str] = None,
+        schema: Optional["RowSchema"] = None,
+    ) -> "FeedTable":
+        """Build a table from row dictionaries; entries that are not dictionaries are skipped.
+
+        With a schema, rows are validated and converted by it, its numeric fields
+        are the ones parsed as numbers, and the validation report is kept as report.
+        """
+        report = None
+        if schema is not None:
+            rows, report = schema.inspect(rows)
+        else:
+            rows = [row for row in rows if isinstance(row, dict)]
+        names: Dict[str, None] = {}
+        for row in rows:
+            names.update(dict.fromkeys(row))
+        columns = [
+            [_intern(row[name]) if name in row else MISSING for row in rows]
+            for name in names
+        ]
+        table = cls(
+            [_intern(name) for name in names],
+            columns,
+            extras,
+            rows_key,
+            schema.numbers if schema is not None else None,
+        )
+        table.report = report
+        return table
+
+    @classmethod
+    def from_payload(
+        cls,
+        payload: Any,
+        rows_key: Optional[str] = None,
+        schema: Optional["RowSchema"] = None,
+    ) -> "FeedTable":
+        """Build a table from a decoded feed payload.
+
+        Args:
+            payload: A JSON list of rows, or an object holding the rows under rows_key.
+            rows_key: Key of the row list when the payload is a JSON object.
+            schema: Optional schema the rows are validated and converted by.
+        """
+        if isinstance(payload, list):
+            return cls.from_rows(payload, schema=schema)
+        if isinstance(payload, dict):
+            extras = {k: v for k, v in payload.items() if k != rows_key}
+            rows = payload.get(rows_key, []) if rows_key else []
+            return cls.from_rows(
+                rows if isinstance(rows, list) else [], extras, rows_key, schema
+            )
+        return cls.from_rows([], schema=schema)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, position: int) -> Dict[str, Any]:
+        return self.row(position)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.rows())
+
+    def row(self, position: int, fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Materialize one row, optionally keeping only the given fields."""
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError(position)
+        row = {}
+        for name, column in zip(self.names, self.columns):
+            if fields is not None and name not in fields:
+                continue
+            value = column[position]
+            if value is not MISSING:
+                row[name] = value
+        return row
+
+    def rows(
+        self,
+        positions: Optional[Iterable[int]] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Materialize rows at the given positions (all rows by default), projected to fields."""
+        selected = [
+            (name, column)
+            for name, column in zip(self.names, self.columns)
+            if fields is None or name in fields
+        ]
+        result = []
+        for position in range(self.length) if positions is None else positions:
+            row = {}
+            for name, column in selected:
+                value = column[position]
+                if value is not MISSING:
+                    row[name] = value
+            result.append(row)
+        return result
+
+    def to_payload(
+        self,
+        positions: Optional[Iterable[int]] = None,
+        fields: Optional[Sequence[str]] = None,
+    ) -> Any:
+        """Rebuild the feed payload in its published shape from the selected rows."""
+        rows = self.rows(positions, fields)
+        if self.rows_key is None and not self.extras:
+            return rows
+        payload = dict(self.extras)
+        if self.rows_key is not None:
+            payload[self.rows_key] = rows
+        return payload
+
+    def column(self, name: str) -> List[Any]:
+        """Return the values of one column, with MISSING for absent fields."""
+        return self.columns[self.names.index(name)]
+
+    def nbytes(self) -> int:
+        """Approximate the memory held by the table's containers and unique values."""
+        seen = set()
+        total = sys.getsizeof(self.columns)
+        for column in self.columns:
+            total += sys.getsizeof(column)
+            for value in column:
+                if id(value) not in seen:
+                    seen.add(id(value))
+                    total += sys.getsizeof(value)
+        for numbers in self.numeric.values():
+            total += numbers.buffer_info()[1] * numbers.itemsize
+        return total
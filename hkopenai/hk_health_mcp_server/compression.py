@@ -0,0 +1,393 @@
+"""
+Module compressing the responses of the HTTP transport.
+The encoding is negotiated from the client's Accept-Encoding header: zstd when the
+'zstandard' package is installed and the client accepts it, gzip otherwise. JSON
+bodies and server-sent event streams are compressed; each event of a stream is
+flushed on its own so it reaches the client without delay.
+
+The rows of a snapshot are the bulk of a response and stay the same while the
+snapshot does, so the compressed form of every large encoded payload is computed once
+and spliced into the compressed body of each response carrying it: only the request
+id, freshness fields and other small parts around it are compressed per call.
+"""
+
+import importlib
+import logging
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import serialization
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS = ("zstd", "gzip")
+DEFAULT_MIN_SIZE = 1024
+# Smaller payloads compress better along with the rest of the body than on their own.
+DEFAULT_SEGMENT_SIZE = 4096
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+MAX_SEGMENTS = 16
+
+_COMPRESSIBLE = (b"application/json", b"text/event-stream")
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+
+
+def _zstd() -> Any:
+    """Return the zstandard module, or None if it is not installed."""
+    try:
+        return importlib.import_module("zstandard")
+    except ImportError:
+        return None
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Return the encodings this server can produce, most preferred first."""
+    return tuple(name for name in ENCODINGS if name != "zstd" or _zstd() is not None)
+
+
+def encodings_from_env() -> Tuple[str, ...]:
+    """Return the encodings enabled by HK_HEALTH_COMPRESSION.
+
+    'auto' (the default) enables every available encoding, 'off' none, and a comma
+    separated list such as 'gzip' only the listed ones that are available.
+    """
+    value = os.environ.get("HK_HEALTH_COMPRESSION", "auto").strip().lower()
+    if value in ("off", "false", "0", "none", "identity"):
+        return ()
+    available = available_encodings()
+    if value in ("", "auto", "on", "true", "1"):
+        return available
+    wanted = [name.strip() for name in value.split(",")]
+    for name in wanted:
+        if name not in available:
+            logger.warning("Ignoring unavailable HK_HEALTH_COMPRESSION encoding %r", name)
+    return tuple(name for name in available if name in wanted)
+
+
+def negotiate(accept_encoding: str, encodings: Tuple[str, ...]) -> Optional[str]:
+    """Choose the encoding of a response from the Accept-Encoding header.
+
+    Returns:
+        The accepted encoding with the highest quality, preferring the order of
+        encodings among equal qualities, or None to send the body as it is.
+    """
+    qualities: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            qualities[name.strip()] = quality
+    best, best_quality = None, 0.0
+    for name in encodings:
+        quality = qualities.get(name, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+class Segment:
+    """A large piece of response text with its compressed forms, computed once each."""
+
+    __slots__ = ("data", "_compressed", "_lock")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._compressed: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def compressed(self, encoding: str, level: int) -> bytes:
+        """Return the segment compressed for splicing into a stream of encoding.
+
+        For gzip these are raw deflate blocks ending in a full flush, which neither
+        refer to earlier data nor end the stream; for zstd a complete frame.
+        """
+        value = self._compressed.get(encoding)
+        if value is None:
+            with self._lock:
+                value = self._compressed.get(encoding)
+                if value is None:
+                    if encoding == "gzip":
+                        deflate = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+                        value = deflate.compress(self.data) + deflate.flush(zlib.Z_FULL_FLUSH)
+                    else:
+                        value = _zstd().ZstdCompressor(level=level).compress(self.data)
+                    self._compressed[encoding] = value
+        return value
+
+
+class SegmentCache:
+    """The most recently encoded large payloads, as they appear in response bodies.
+
+    A payload appears twice in a tool response: as JSON in the structured content and
+    escaped inside the text content, so both forms are kept.
+    """
+
+    def __init__(self, min_size: int = DEFAULT_SEGMENT_SIZE, max_segments: int = MAX_SEGMENTS):
+        self.min_size = min_size
+        self.max_segments = max_segments
+        self._segments: "OrderedDict[bytes, Segment]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._segments)
+
+    def remember(self, text: str) -> None:
+        """Keep the forms of an encoded payload large enough to be worth splicing."""
+        if len(text) < self.min_size:
+            return
+        escaped = serialization.dumps(text)[1:-1]
+        with self._lock:
+            for form in (text, escaped):
+                data = form.encode("utf-8")
+                self._segments[data] = Segment(data)
+                self._segments.move_to_end(data)
+            while len(self._segments) > self.max_segments:
+                self._segments.popitem(last=False)
+
+    def find(self, body: bytes) -> List[Tuple[int, Segment]]:
+        """Return the positions of known segments in body, in order and not overlapping."""
+        if len(body) < self.min_size:
+            return []
+        with self._lock:
+            segments = list(self._segments.values())
+        found = []
+        for segment in segments:
+            start = body.find(segment.data)
+            while start >= 0:
+                found.append((start, segment))
+                start = body.find(segment.data, start + len(segment.data))
+        found.sort(key=lambda item: item[0])
+        chosen: List[Tuple[int, Segment]] = []
+        end = 0
+        for start, segment in found:
+            if start >= end:
+                chosen.append((start, segment))
+                end = start + len(segment.data)
+        return chosen
+
+
+class _GzipStream:
+    """Incremental gzip encoder into which precompressed segments can be spliced."""
+
+    def __init__(self, level: int):
+        self.level = level
+        self._deflate = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self._crc = 0
+        self._size = 0
+        self._started = False
+
+    def _header(self) -> bytes:
+        if self._started:
+            return b""
+        self._started = True
+        return _GZIP_HEADER
+
+    def write(self, data: bytes) -> bytes:
+        self._crc = zlib.crc32(data, self._crc)
+        self._size += len(data)
+        return self._header() + self._deflate.compress(data)
+
+    def splice(self, segment: Segment) -> bytes:
+        # A full flush ends the pending blocks and forgets the history, so no later
+        # block refers back across the spliced one.
+        out = self._header() + self._deflate.flush(zlib.Z_FULL_FLUSH)
+        self._crc = zlib.crc32(segment.data, self._crc)
+        self._size += len(segment.data)
+        return out + segment.compressed("gzip", self.level)
+
+    def flush(self) -> bytes:
+        return self._header() + self._deflate.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        tail = self._deflate.flush(zlib.Z_FINISH)
+        return self._header() + tail + struct.pack("<II", self._crc, self._size & 0xFFFFFFFF)
+
+
+class _ZstdStream:
+    """Incremental zstd encoder; spliced segments are frames of their own."""
+
+    def __init__(self, level: int):
+        self.level = level
+        self._module = _zstd()
+        self._compressor = self._module.ZstdCompressor(level=level)
+        self._frame = self._compressor.compressobj()
+
+    def write(self, data: bytes) -> bytes:
+        return self._frame.compress(data)
+
+    def splice(self, segment: Segment) -> bytes:
+        out = self._frame.flush(self._module.COMPRESSOBJ_FLUSH_FINISH)
+        self._frame = self._compressor.compressobj()
+        return out + segment.compressed("zstd", self.level)
+
+    def flush(self) -> bytes:
+        return self._frame.flush(self._module.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._frame.flush(self._module.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def _stream(encoding: str) -> Any:
+    """Return a new incremental encoder for encoding."""
+    if encoding == "gzip":
+        return _GzipStream(DEFAULT_GZIP_LEVEL)
+    return _ZstdStream(DEFAULT_ZSTD_LEVEL)
+
+
+def _compress_chunk(stream: Any, body: bytes, segments: Optional[SegmentCache]) -> bytes:
+    """Compress one chunk of a body, splicing in the known segments it contains."""
+    out = []
+    position = 0
+    for start, segment in segments.find(body) if segments is not None else ():
+        if start > position:
+            out.append(stream.write(body[position:start]))
+        out.append(stream.splice(segment))
+        position = start + len(segment.data)
+    if position < len(body):
+        out.append(stream.write(body[position:]))
+    return b"".join(out)
+
+
+def compress(body: bytes, encoding: str, segments: Optional[SegmentCache] = None) -> bytes:
+    """Return a complete body compressed with encoding, splicing in known segments."""
+    stream = _stream(encoding)
+    return _compress_chunk(stream, body, segments) + stream.finish()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    """Return the value of a header in an ASGI header list."""
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing JSON and event stream responses."""
+
+    def __init__(
+        self,
+        app: Any,
+        encodings: Tuple[str, ...] = ("gzip",),
+        segments: Optional[SegmentCache] = None,
+        min_size: int = DEFAULT_MIN_SIZE,
+    ):
+        self.app = app
+        self.encodings = encodings
+        self.segments = segments
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept = _header(scope.get("headers") or [], b"accept-encoding")
+        encoding = negotiate(accept.decode("latin-1"), self.encodings) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSender(self, encoding, send))
+
+
+class _CompressingSender:
+    """The send callable of one response, compressing its body when worthwhile."""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Any):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Dict[str, Any]] = None
+        self.stream: Any = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            headers = message.get("headers") or []
+            content_type = _header(headers, b"content-type") or b""
+            if _header(headers, b"content-encoding") is not None or not any(
+                content_type.startswith(t) for t in _COMPRESSIBLE
+            ):
+                self.passthrough = True
+                await self.send(message)
+            else:
+                self.start = message
+            return
+        if kind != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.stream is None:
+            if not more and len(body) < self.middleware.min_size:
+                self.passthrough = True
+                await self.send(self.start)
+                await self.send(message)
+                return
+            self.stream = _stream(self.encoding)
+            await self.send(self._compressed_start(streaming=more))
+        out = _compress_chunk(self.stream, body, self.middleware.segments)
+        out += self.stream.flush() if more else self.stream.finish()
+        await self.send({"type": "http.response.body", "body": out, "more_body": more})
+
+    def _compressed_start(self, streaming: bool) -> Dict[str, Any]:
+        """Return the response start with the encoding headers and no length."""
+        headers = [
+            (key, value)
+            for key, value in self.start.get("headers") or []
+            if key.lower() != b"content-length"
+        ]
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        vary = _header(headers, b"vary")
+        if vary is None:
+            headers.append((b"vary", b"Accept-Encoding"))
+        elif b"accept-encoding" not in vary.lower():
+            headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+            headers.append((b"vary", vary + b", Accept-Encoding"))
+        if streaming:
+            # Proxies must not hold back the flushed events of a compressed stream.
+            headers.append((b"x-accel-buffering", b"no"))
+        return {**self.start, "headers": headers}
+
+
+segment_cache = SegmentCache()
+
+
+def min_size_from_env() -> int:
+    """Return HK_HEALTH_COMPRESSION_MIN_BYTES, the smallest body worth compressing."""
+    try:
+        return max(0, int(os.environ.get("HK_HEALTH_COMPRESSION_MIN_BYTES", DEFAULT_MIN_SIZE)))
+    except ValueError:
+        return DEFAULT_MIN_SIZE
+
+
+def http_middleware() -> List[Any]:
+    """Return the Starlette middleware compressing HTTP responses, if enabled.
+
+    Large payloads are remembered as they are encoded, so their compressed forms can
+    be reused by every response carrying them.
+    """
+    encodings = encodings_from_env()
+    if not encodings:
+        return []
+    from starlette.middleware import Middleware  # pylint: disable=import-outside-toplevel
+
+    serialization.add_encoding_listener(segment_cache.remember)
+    return [
+        Middleware(
+            CompressionMiddleware,
+            encodings=encodings,
+            segments=segment_cache,
+            min_size=min_size_from_env(),
+        )
+    ]
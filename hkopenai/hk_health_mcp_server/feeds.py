@@ -0,0 +1,76 @@
+"""
+Module describing the Hospital Authority open data feeds used by the health tools,
+including their URLs and how often each feed changes upstream.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Union
+
+from .columnar import FeedTable
+from .schemas import AED_ROW, GOPC_ROW, SPECIALIST_ROW, RowSchema, schema_monitor
+
+LANGUAGES = ("en", "tc", "sc")
+
+
+@dataclass(frozen=True)
+class Feed:
+    """A Hospital Authority JSON feed published in several languages.
+
+    Attributes:
+        name: Short identifier of the feed (e.g. 'aed').
+        url_template: URL of the feed with a '{lang}' placeholder.
+        ttl: Number of seconds a fetched copy is considered fresh.
+        rows_key: Key of the row list when the feed is a JSON object rather than a list.
+        schema: Schema the rows are validated and converted by at ingest.
+    """
+
+    name: str
+    url_template: str
+    ttl: float
+    rows_key: Optional[str] = None
+    schema: Optional[RowSchema] = None
+
+    def url(self, lang: str) -> str:
+        """Return the feed URL for the given language code."""
+        return self.url_template.format(lang=lang)
+
+    def ingest(self, payload: Any) -> Union[FeedTable, Dict[str, str]]:
+        """Convert a decoded payload of this feed into its columnar snapshot.
+
+        The validation report is passed to the schema monitor. A payload with too many
+        rows failing validation returns an error instead, so the last good version of
+        the feed keeps being served.
+        """
+        table = FeedTable.from_payload(payload, self.rows_key, self.schema)
+        report = table.report
+        if report is not None and not schema_monitor.observe(self.name, report):
+            return {
+                "error": f"The {self.name} feed was rejected: {report.quarantined} of "
+                f"{report.rows} rows do not match its schema"
+            }
+        return table
+
+
+# A&E waiting times are republished roughly every 15 minutes, so a short TTL keeps
+# answers within one publishing cycle. The specialist and GOPC feeds change weekly.
+AED = Feed(
+    name="aed",
+    url_template="https://www.ha.org.hk/opendata/aed/aedwtdata-{lang}.json",
+    ttl=5 * 60,
+    rows_key="waitTime",
+    schema=AED_ROW,
+)
+SPECIALIST = Feed(
+    name="specialist",
+    url_template="https://www.ha.org.hk/opendata/sop/sop-waiting-time-{lang}.json",
+    ttl=6 * 60 * 60,
+    schema=SPECIALIST_ROW,
+)
+GOPC = Feed(
+    name="gopc",
+    url_template="https://www.ha.org.hk/pas_gopc/pas_gopc_avg_quota_pdf/g0_9uo7a_p-{lang}.json",
+    ttl=6 * 60 * 60,
+    schema=GOPC_ROW,
+)
+
+FEEDS: Dict[str, Feed] = {feed.name: feed for feed in (AED, SPECIALIST, GOPC)}
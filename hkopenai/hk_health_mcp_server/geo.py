@@ -0,0 +1,90 @@
+"""
+Module providing the spatial index used to find places near a location in Hong Kong.
+Latitude and longitude are projected onto a local plane in kilometres, which is
+accurate to well under one percent across the territory, and indexed in a 2-d tree
+that yields points nearest first so callers can stop as soon as farther points
+cannot matter.
+"""
+
+import heapq
+import itertools
+import math
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# Reference latitude of the projection and its scale, in kilometres per degree.
+_ORIGIN_LATITUDE = 22.35
+_KM_PER_DEGREE_LATITUDE = 110.574
+_KM_PER_DEGREE_LONGITUDE = 111.320 * math.cos(math.radians(_ORIGIN_LATITUDE))
+
+# Bounding box accepted as a location in Hong Kong: (south, west, north, east).
+HONG_KONG_BOUNDS = (22.13, 113.82, 22.58, 114.45)
+
+
+def project(latitude: float, longitude: float) -> Tuple[float, float]:
+    """Return the planar (x, y) position in kilometres of a latitude and longitude."""
+    return (longitude * _KM_PER_DEGREE_LONGITUDE, latitude * _KM_PER_DEGREE_LATITUDE)
+
+
+def in_hong_kong(latitude: float, longitude: float) -> bool:
+    """Return whether a latitude and longitude lie within the Hong Kong bounding box."""
+    south, west, north, east = HONG_KONG_BOUNDS
+    return south <= latitude <= north and west <= longitude <= east
+
+
+# A tree node: (index of the point, splitting axis, left subtree, right subtree).
+_Node = Tuple[int, int, Optional["_Node"], Optional["_Node"]]
+
+
+class KDTree:
+    """Static 2-d tree over planar points supporting nearest-first traversal."""
+
+    __slots__ = ("points", "_root")
+
+    def __init__(self, points: Sequence[Tuple[float, float]]):
+        self.points: List[Tuple[float, float]] = [tuple(p) for p in points]
+        self._root = self._build(list(range(len(self.points))), 0)
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _build(self, indices: List[int], depth: int) -> Optional[_Node]:
+        """Build the subtree over indices, splitting at the median of alternating axes."""
+        if not indices:
+            return None
+        axis = depth % 2
+        indices.sort(key=lambda i: self.points[i][axis])
+        mid = len(indices) // 2
+        return (
+            indices[mid],
+            axis,
+            self._build(indices[:mid], depth + 1),
+            self._build(indices[mid + 1 :], depth + 1),
+        )
+
+    def nearest(self, point: Tuple[float, float]) -> Iterator[Tuple[float, int]]:
+        """Yield (distance, index) for every point in order of increasing distance.
+
+        Subtrees are expanded best first by a lower bound of their distance, so
+        stopping after a few points costs only the nodes near the query point.
+        """
+        tie = itertools.count()
+        # Entries: (distance or lower bound, tie breaker, point index or None, node).
+        heap: List[Tuple[float, int, Optional[int], Optional[_Node]]] = []
+        if self._root is not None:
+            heap.append((0.0, next(tie), None, self._root))
+        while heap:
+            distance, _, index, node = heapq.heappop(heap)
+            if index is not None:
+                yield distance, index
+                continue
+            split, axis, left, right = node
+            x, y = self.points[split]
+            heapq.heappush(
+                heap, (math.hypot(x - point[0], y - point[1]), next(tie), split, None)
+            )
+            offset = point[axis] - self.points[split][axis]
+            near, far = (left, right) if offset < 0 else (right, left)
+            if near is not None:
+                heapq.heappush(heap, (distance, next(tie), None, near))
+            if far is not None:
+                heapq.heappush(heap, (max(distance, abs(offset)), next(tie), None, far))
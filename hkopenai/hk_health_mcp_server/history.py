@@ -0,0 +1,330 @@
+"""
+Module providing an append-only time series of A&E waiting times per hospital.
+Every new AED snapshot is recorded as one sample per hospital in a compact numpy
+record array, optionally appended to a binary file so history survives restarts,
+and windowed statistics are computed with vectorized numpy operations.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not coordinated.
+    fcntl = None
+
+from .columnar import FeedTable
+from .feeds import AED, Feed
+from .lazy import lazy_import
+from .reference import AED_HOSPITALS, canonical_hospital
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+HK_TIMEZONE = timezone(timedelta(hours=8))
+DEFAULT_PATH = os.path.join("~", ".cache", "hkopenai", "hk_health_aed_history.bin")
+DEFAULT_RETENTION_DAYS = 90.0
+
+# One sample: epoch seconds, hospital code and published top wait in minutes.
+_SAMPLE_FIELDS = [("ts", "<f8"), ("hosp", "S4"), ("wait", "<f4")]
+
+
+@functools.lru_cache(maxsize=None)
+def _sample_dtype() -> np.dtype:
+    """Return the numpy record type of one sample, importing numpy on first use."""
+    return np.dtype(_SAMPLE_FIELDS)
+
+
+def __getattr__(name: str) -> Any:
+    """Provide SAMPLE_DTYPE without importing numpy when the module is imported."""
+    if name == "SAMPLE_DTYPE":
+        return _sample_dtype()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_WAIT_PATTERN = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(hours?|hrs?|小時|小时|minutes?|mins?|分鐘|分钟)", re.IGNORECASE
+)
+_DAY_NAMES = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def parse_wait_minutes(text: Any) -> Optional[float]:
+    """Convert a published wait such as 'Over 2 hours' or '約1小時' into minutes."""
+    if not isinstance(text, str):
+        return None
+    match = _WAIT_PATTERN.search(text)
+    if match is None:
+        return None
+    value = float(match.group(1))
+    unit = match.group(2).lower()
+    return value * 60 if unit[0] in "h小" else value
+
+
+def parse_update_time(text: Any) -> Optional[float]:
+    """Convert an AED updateTime such as '10/6/2025 9:45pm' into epoch seconds."""
+    if not isinstance(text, str):
+        return None
+    for pattern in ("%d/%m/%Y %I:%M%p", "%d/%m/%Y %H:%M"):
+        try:
+            parsed = datetime.strptime(text.strip().upper(), pattern)
+        except ValueError:
+            continue
+        return parsed.replace(tzinfo=HK_TIMEZONE).timestamp()
+    return None
+
+
+def parse_days(days: Optional[Iterable[str]]) -> Optional[List[int]]:
+    """Convert day names such as 'Fri' or 'friday' into weekday numbers (Monday is 0)."""
+    if not days:
+        return None
+    numbers = []
+    for day in days:
+        key = str(day).strip().lower()[:3]
+        if key not in _DAY_NAMES:
+            raise ValueError(f"Unknown day '{day}'. Use Mon, Tue, Wed, Thu, Fri, Sat or Sun.")
+        numbers.append(_DAY_NAMES.index(key))
+    return numbers
+
+
+def parse_hours(hours: Optional[str]) -> Optional[List[int]]:
+    """Convert an hour range such as '18-23' or '22-2' (HK time) into hours of the day."""
+    if not hours:
+        return None
+    match = re.fullmatch(r"\s*(\d{1,2})\s*-\s*(\d{1,2})\s*", hours)
+    if match is None or int(match.group(1)) > 23 or int(match.group(2)) > 24:
+        raise ValueError(f"Invalid hour range '{hours}'. Use e.g. '18-23'.")
+    start, end = int(match.group(1)), int(match.group(2)) % 24
+    if start == end:
+        return list(range(24))
+    return [h % 24 for h in range(start, end if end > start else end + 24)]
+
+
+class AedHistory:
+    """Append-only per-hospital A&E wait samples with windowed aggregation.
+
+    Samples live in a numpy record array grown by doubling. When a file is attached,
+    each recorded snapshot is appended to it as raw records, and samples older than
+    the retention are dropped (and the file compacted) when it is loaded.
+    """
+
+    def __init__(self, retention_days: float = DEFAULT_RETENTION_DAYS):
+        self.retention_days = retention_days
+        self.path: Optional[str] = None
+        self._lock = threading.Lock()
+        self._samples: Optional[np.ndarray] = None  # Allocated by the first append.
+        self._size = 0
+        self._last_update = float("-inf")
+
+    def __len__(self) -> int:
+        return self._size
+
+    def samples(self) -> np.ndarray:
+        """Return a read-only view of the recorded samples."""
+        if self._samples is None:
+            return np.empty(0, dtype=_sample_dtype())
+        view = self._samples[: self._size]
+        view.flags.writeable = False
+        return view
+
+    def open(self, path: str) -> None:
+        """Load the samples stored in a file and append future samples to it.
+
+        The file is locked while it is read and compacted, so worker processes
+        appending to it at the same time do not lose records.
+        """
+        path = os.path.expanduser(path)
+        itemsize = _sample_dtype().itemsize
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            size = handle.seek(0, os.SEEK_END)
+            usable = size // itemsize
+            handle.seek(0)
+            records = np.frombuffer(handle.read(usable * itemsize), dtype=_sample_dtype()).copy()
+            if self.retention_days > 0 and len(records):
+                kept = records[records["ts"] >= time.time() - self.retention_days * 86400]
+                if len(kept) != len(records) or usable * itemsize != size:
+                    handle.truncate(0)
+                    handle.write(kept.tobytes())
+                records = kept
+        with self._lock:
+            self.path = path
+            self._size = 0
+            self._append(records)
+            self._last_update = float(records["ts"].max()) if len(records) else float("-inf")
+
+    def close(self) -> None:
+        """Stop appending samples to the attached file."""
+        with self._lock:
+            self.path = None
+
+    def clear(self) -> None:
+        """Drop all in-memory samples."""
+        with self._lock:
+            self._size = 0
+            self._last_update = float("-inf")
+
+    def _append(self, records: np.ndarray) -> None:
+        """Append records to the in-memory array, growing it as needed."""
+        needed = self._size + len(records)
+        capacity = 0 if self._samples is None else len(self._samples)
+        if self._samples is None or needed > capacity:
+            grown = np.empty(max(needed, 2 * capacity, 1024), dtype=_sample_dtype())
+            if self._size:
+                grown[: self._size] = self._samples[: self._size]
+            self._samples = grown
+        self._samples[self._size : needed] = records
+        self._size = needed
+
+    def record(self, rows: Iterable[Dict[str, Any]], timestamp: float) -> int:
+        """Record the waits of one snapshot taken at timestamp; return the samples added.
+
+        Snapshots not newer than the last recorded one are ignored, so the language
+        variants of one publication are recorded once.
+        """
+        samples = []
+        for row in rows:
+            code = canonical_hospital(row.get("hospName"))
+            wait = parse_wait_minutes(row.get("topWait"))
+            if code in AED_HOSPITALS and wait is not None:
+                samples.append((timestamp, code.encode("ascii"), wait))
+        records = np.array(samples, dtype=_sample_dtype())
+        with self._lock:
+            if timestamp <= self._last_update or not len(records):
+                return 0
+            self._last_update = timestamp
+            self._append(records)
+            if self.path is not None:
+                try:
+                    self._write(records, timestamp)
+                except OSError:
+                    pass
+        return len(records)
+
+    def _write(self, records: np.ndarray, timestamp: float) -> None:
+        """Append a snapshot's records to the attached file.
+
+        Worker processes sharing the file each record the same snapshots, so the
+        file is locked and a snapshot not newer than its last record is skipped.
+        """
+        itemsize = _sample_dtype().itemsize
+        with open(self.path, "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            size = handle.seek(0, os.SEEK_END)
+            if size >= itemsize:
+                handle.seek(size - size % itemsize - itemsize)
+                last = np.frombuffer(handle.read(itemsize), dtype=_sample_dtype())
+                if last["ts"][0] >= timestamp:
+                    return
+            records.tofile(handle)
+
+    def record_version(self, feed: Feed, _lang: str, entry: Any) -> None:
+        """Cache version listener recording every new AED snapshot."""
+        if feed.name != AED.name or not isinstance(entry.data, FeedTable):
+            return
+        timestamp = parse_update_time(entry.data.extras.get("updateTime"))
+        if timestamp is None:
+            timestamp = entry.fetched_at.timestamp()
+        self.record(entry.data, timestamp)
+
+    def aggregate(
+        self,
+        start: float,
+        end: float,
+        hospitals: Optional[Sequence[str]] = None,
+        days: Optional[Sequence[int]] = None,
+        hours: Optional[Sequence[int]] = None,
+        bucket_seconds: float = 0,
+        percentiles: Sequence[float] = (50, 90),
+    ) -> List[Dict[str, Any]]:
+        """Return min, max, mean and percentile waits per hospital (and time bucket).
+
+        Args:
+            start: Window start in epoch seconds (inclusive).
+            end: Window end in epoch seconds (exclusive).
+            hospitals: Hospital codes to include; all hospitals by default.
+            days: Weekdays (Monday is 0, HK time) to include; all days by default.
+            hours: Hours of the day (HK time) to include; all hours by default.
+            bucket_seconds: Width of the time buckets, or 0 for one bucket per hospital.
+            percentiles: Percentiles (0-100) to report.
+        """
+        samples = self.samples()
+        ts = samples["ts"]
+        mask = (ts >= start) & (ts < end)
+        if hospitals is not None:
+            mask &= np.isin(samples["hosp"], [code.encode("ascii") for code in hospitals])
+        local = ts + HK_TIMEZONE.utcoffset(None).total_seconds()
+        if days is not None:
+            # 1970-01-01 was a Thursday (weekday 3).
+            mask &= np.isin((local // 86400 + 3) % 7, days)
+        if hours is not None:
+            mask &= np.isin((local % 86400) // 3600, hours)
+        selected = samples[mask]
+        if not len(selected):
+            return []
+
+        codes, hospital_of = np.unique(selected["hosp"], return_inverse=True)
+        if bucket_seconds > 0:
+            bucket_of = ((selected["ts"] - start) // bucket_seconds).astype(np.int64)
+        else:
+            bucket_of = np.zeros(len(selected), dtype=np.int64)
+        group = hospital_of.astype(np.int64) * (int(bucket_of.max()) + 1) + bucket_of
+        order = np.lexsort((selected["wait"], group))
+        group, waits = group[order], selected["wait"][order].astype(np.float64)
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        counts = np.diff(np.r_[starts, len(group)])
+
+        stats = {
+            "min": waits[starts],
+            "max": waits[starts + counts - 1],
+            "mean": np.add.reduceat(waits, starts) / counts,
+        }
+        for q in percentiles:
+            # Linear interpolation between the order statistics of each sorted group.
+            rank = starts + (counts - 1) * (q / 100.0)
+            low = np.floor(rank).astype(np.int64)
+            high = np.minimum(low + 1, starts + counts - 1)
+            stats[f"p{q:g}"] = waits[low] + (waits[high] - waits[low]) * (rank - low)
+
+        results = []
+        buckets = int(bucket_of.max()) + 1
+        for i, first in enumerate(starts):
+            record = {"hospCode": codes[group[first] // buckets].decode("ascii")}
+            if bucket_seconds > 0:
+                bucket_start = start + (group[first] % buckets) * bucket_seconds
+                record["from"] = datetime.fromtimestamp(bucket_start, HK_TIMEZONE).isoformat()
+            record["samples"] = int(counts[i])
+            for name, values in stats.items():
+                record[name] = round(float(values[i]), 1)
+            results.append(record)
+        return results
+
+
+def path_from_env() -> Optional[str]:
+    """Return the history file path from HK_HEALTH_AED_HISTORY_PATH, or None if disabled."""
+    path = os.environ.get("HK_HEALTH_AED_HISTORY_PATH", DEFAULT_PATH).strip()
+    if path.lower() in ("", "0", "off", "false", "no"):
+        return None
+    return path
+
+
+def retention_from_env() -> float:
+    """Return the number of days of AED history kept, from HK_HEALTH_AED_HISTORY_DAYS."""
+    try:
+        return float(os.environ.get("HK_HEALTH_AED_HISTORY_DAYS", DEFAULT_RETENTION_DAYS))
+    except ValueError:
+        return DEFAULT_RETENTION_DAYS
+
+
+aed_history = AedHistory()
@@ -0,0 +1,433 @@
+"""
+Module providing the shared asynchronous HTTP client used to fetch Hospital Authority feeds.
+All tools share one keep-alive connection pool, HTTP/2 is used when the 'h2' package is
+installed, and the number of concurrent requests per upstream host is bounded.
+Responses carrying an ETag or Last-Modified header are revalidated with a conditional
+GET, and a 304 reply reuses the previously parsed payload without decoding it again.
+Transient failures (timeouts, connection errors, 429 and 5xx replies) are retried with
+jittered exponential backoff, and a per-host circuit breaker fails requests fast while
+the host keeps failing. Requests can be rate limited per host (see ratelimit).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import importlib.util
+import os
+import random
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+from . import metrics, ratelimit, serialization
+from .circuit_breaker import CLOSED, STATE_VALUES, CircuitBreaker
+from .lazy import lazy_import
+
+if TYPE_CHECKING:
+    import httpx
+else:
+    httpx = lazy_import("httpx")
+
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 15.0
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_RETRY_BASE_DELAY = 0.25
+DEFAULT_RETRY_MAX_DELAY = 4.0
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET = 30.0
+
+# Status codes worth retrying: the host is overloaded or briefly unavailable.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment, ignoring invalid values."""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+_settings: Dict[str, Any] = {
+    "connect_timeout": _env_float("HK_HEALTH_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+    "read_timeout": _env_float("HK_HEALTH_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+    "max_connections_per_host": int(
+        _env_float("HK_HEALTH_MAX_CONNECTIONS_PER_HOST", DEFAULT_MAX_CONNECTIONS_PER_HOST)
+    ),
+    "retry_attempts": int(_env_float("HK_HEALTH_RETRY_ATTEMPTS", DEFAULT_RETRY_ATTEMPTS)),
+    "retry_base_delay": _env_float("HK_HEALTH_RETRY_BASE_DELAY", DEFAULT_RETRY_BASE_DELAY),
+    "retry_max_delay": _env_float("HK_HEALTH_RETRY_MAX_DELAY", DEFAULT_RETRY_MAX_DELAY),
+    "breaker_failures": int(_env_float("HK_HEALTH_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)),
+    "breaker_reset": _env_float("HK_HEALTH_BREAKER_RESET", DEFAULT_BREAKER_RESET),
+    "transport": None,
+}
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+class _Validator:
+    """Cache validators and parsed payload of the last 200 response for a URL."""
+
+    __slots__ = ("etag", "last_modified", "data", "size")
+
+    def __init__(
+        self, etag: Optional[str], last_modified: Optional[str], data: Any, size: int
+    ):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.data = data
+        self.size = size
+
+    def headers(self) -> Dict[str, str]:
+        """Return the conditional request headers for this validator."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+_validators: Dict[str, _Validator] = {}
+_conditional_stats = {"responses_200": 0, "responses_304": 0, "bytes_saved": 0}
+
+
+def configure(
+    connect_timeout: Optional[float] = None,
+    read_timeout: Optional[float] = None,
+    max_connections_per_host: Optional[int] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    retry_attempts: Optional[int] = None,
+    retry_base_delay: Optional[float] = None,
+    retry_max_delay: Optional[float] = None,
+    breaker_failures: Optional[int] = None,
+    breaker_reset: Optional[float] = None,
+) -> None:
+    """Update the client settings; the pooled client is rebuilt on next use.
+
+    Circuit breakers start closed again after every call.
+
+    Args:
+        connect_timeout: Seconds allowed to establish a connection.
+        read_timeout: Seconds allowed between bytes received from the server.
+        max_connections_per_host: Maximum concurrent requests to one host.
+        transport: Optional transport replacing the network, e.g. a stub in tests.
+        retry_attempts: Attempts made per fetch when failures are transient.
+        retry_base_delay: Seconds of backoff before the first retry, doubling after.
+        retry_max_delay: Upper bound of the backoff before one retry.
+        breaker_failures: Consecutive failures that open a host's circuit.
+        breaker_reset: Seconds an open circuit waits before probing the host.
+    """
+    global _client  # pylint: disable=global-statement
+    for name, value in (
+        ("connect_timeout", connect_timeout),
+        ("read_timeout", read_timeout),
+        ("max_connections_per_host", max_connections_per_host),
+        ("retry_attempts", retry_attempts),
+        ("retry_base_delay", retry_base_delay),
+        ("retry_max_delay", retry_max_delay),
+        ("breaker_failures", breaker_failures),
+        ("breaker_reset", breaker_reset),
+    ):
+        if value is not None:
+            _settings[name] = value
+    _settings["transport"] = transport
+    _client = None
+    _host_limits.clear()
+    _breakers.clear()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled client bound to the running event loop, creating it if needed."""
+    global _client, _client_loop  # pylint: disable=global-statement
+    loop = asyncio.get_running_loop()
+    if _client is None or _client_loop is not loop or _client.is_closed:
+        per_host = _settings["max_connections_per_host"]
+        _client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(
+                _settings["read_timeout"], connect=_settings["connect_timeout"]
+            ),
+            limits=httpx.Limits(
+                max_connections=per_host * 4, max_keepalive_connections=per_host
+            ),
+            transport=_settings["transport"],
+        )
+        _client_loop = loop
+        _host_limits.clear()
+    return _client
+
+
+async def aclose() -> None:
+    """Close the pooled client and release its connections."""
+    global _client  # pylint: disable=global-statement
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _host_limit(host: str) -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent requests to host."""
+    limit = _host_limits.get(host)
+    if limit is None:
+        limit = _host_limits[host] = asyncio.Semaphore(
+            _settings["max_connections_per_host"]
+        )
+    return limit
+
+
+def circuit_breaker(host: str) -> CircuitBreaker:
+    """Return the circuit breaker of host, creating a closed one if needed."""
+    breaker = _breakers.get(host)
+    if breaker is None:
+
+        def on_change(state: str) -> None:
+            if metrics.ENABLED:
+                metrics.CIRCUIT_STATE.set(host, value=STATE_VALUES[state])
+
+        breaker = _breakers[host] = CircuitBreaker(
+            _settings["breaker_failures"],
+            _settings["breaker_reset"],
+            max_reset_timeout=_settings["breaker_reset"] * 10,
+            on_change=on_change,
+        )
+        if metrics.ENABLED:
+            metrics.CIRCUIT_STATE.set(host, value=STATE_VALUES[breaker.state])
+    return breaker
+
+
+def circuit_states() -> Dict[str, Dict]:
+    """Return the circuit breaker state of every upstream host contacted so far."""
+    return {host: breaker.as_dict() for host, breaker in _breakers.items()}
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Return the jittered backoff before retry number attempt + 1.
+
+    The delay is drawn uniformly up to an exponentially growing cap so that callers
+    failing together do not retry together; a Retry-After header raises it, within
+    the maximum delay.
+    """
+    cap = min(_settings["retry_max_delay"], _settings["retry_base_delay"] * 2**attempt)
+    delay = random.uniform(0, cap)
+    if response is not None:
+        try:
+            retry_after = float(response.headers.get("Retry-After", 0))
+        except ValueError:
+            retry_after = 0.0
+        delay = max(delay, min(retry_after, _settings["retry_max_delay"]))
+    return delay
+
+
+def conditional_get_stats() -> Dict[str, int]:
+    """Return counts of full and not-modified responses and the body bytes saved."""
+    return dict(_conditional_stats)
+
+
+def _conditional_get_samples():
+    """Provide the conditional GET counters to the metrics endpoint."""
+    return [
+        (
+            "hk_health_upstream_not_modified_total",
+            "counter",
+            "Upstream 304 Not Modified responses.",
+            _conditional_stats["responses_304"],
+        ),
+        (
+            "hk_health_upstream_bytes_saved_total",
+            "counter",
+            "Body bytes not downloaded thanks to 304 responses.",
+            _conditional_stats["bytes_saved"],
+        ),
+    ]
+
+
+metrics.add_collector(_conditional_get_samples)
+
+
+def reset_conditional_get() -> None:
+    """Forget all stored validators and reset the conditional GET counters."""
+    _validators.clear()
+    for key in _conditional_stats:
+        _conditional_stats[key] = 0
+
+
+def _unicode_error(encoding: str, decode_err: UnicodeDecodeError) -> Dict[str, str]:
+    """Return the error dictionary of a body that is not valid in its encoding."""
+    return {
+        "error": (
+            f"UnicodeDecodeError: Failed to decode content with encoding {encoding}: {decode_err}."
+        )
+    }
+
+
+def decode_json(content: bytes, encoding: str = "utf-8") -> Any:
+    """Decode a JSON response body, stripping a leading byte order mark.
+
+    UTF-8 bodies are handed to the JSON backend as bytes, without first being
+    decoded to a string.
+
+    Returns:
+        The decoded JSON value, or a dictionary with an 'error' key on failure.
+    """
+    try:
+        if encoding.lower() in ("utf-8", "utf8"):
+            if content.startswith(codecs.BOM_UTF8):
+                content = content[len(codecs.BOM_UTF8) :]
+            return serialization.loads(content)
+        return serialization.loads(content.decode(encoding).lstrip("\ufeff").encode("utf-8"))
+    except UnicodeDecodeError as decode_err:
+        return _unicode_error(encoding, decode_err)
+    except ValueError:
+        try:
+            content.decode(encoding)
+        except UnicodeDecodeError as decode_err:
+            return _unicode_error(encoding, decode_err)
+        return {
+            "error": (
+                "Failed to parse JSON response from API. "
+                "The API might have returned non-JSON data or an empty response."
+            )
+        }
+
+
+async def fetch_json(url: str, parse: Optional[Callable[[Any], Any]] = None) -> Any:
+    """Fetch and decode JSON data from a URL using the pooled client.
+
+    If the URL was fetched before with an ETag or Last-Modified header, the request is
+    made conditional and a 304 reply returns the previously parsed payload.
+
+    Args:
+        url: The URL to fetch data from.
+        parse: Optional conversion applied once to the decoded JSON; its result is what
+            is returned and reused on a 304 reply.
+
+    Returns:
+        The decoded JSON response, or a dictionary with an 'error' key describing the failure.
+    """
+    if not metrics.ENABLED:
+        return await _fetch_json(url, parse, None)
+    host = httpx.URL(url).host
+    metrics.IN_FLIGHT.inc("upstream")
+    try:
+        with metrics.span("ha.fetch", url=url):
+            return await _fetch_json(url, parse, metrics.UpstreamTrace(host))
+    finally:
+        metrics.IN_FLIGHT.dec("upstream")
+
+
+async def _request(
+    client: httpx.AsyncClient,
+    url: str,
+    host: str,
+    validator: Optional[_Validator],
+    trace: Optional["metrics.UpstreamTrace"],
+) -> Tuple[Optional[httpx.Response], Optional[Dict[str, str]]]:
+    """Send one GET for _fetch_json.
+
+    Returns:
+        The response, or None if none was received, and an error dictionary when the
+        request failed.
+    """
+    async with _host_limit(host):
+        try:
+            response = await client.get(
+                url,
+                headers=validator.headers() if validator else None,
+                extensions={"trace": trace} if trace else None,
+            )
+            if trace:
+                metrics.UPSTREAM_RESPONSES.inc(host, str(response.status_code))
+                metrics.UPSTREAM_BYTES.inc(host, amount=len(response.content))
+            if response.status_code == 304 and validator is not None:
+                return response, None
+            response.raise_for_status()
+        except httpx.HTTPStatusError as http_err:
+            return http_err.response, {
+                "error": (
+                    f"HTTP error occurred: {http_err}. "
+                    f"Status code: {http_err.response.status_code}."
+                )
+            }
+        except httpx.TimeoutException as timeout_err:
+            if trace:
+                metrics.UPSTREAM_RESPONSES.inc(host, "timeout")
+            return None, {
+                "error": f"The request timed out: {timeout_err!r}. Please try again later."
+            }
+        except httpx.RequestError as req_err:
+            if trace:
+                metrics.UPSTREAM_RESPONSES.inc(host, "connect_error")
+            return None, {
+                "error": f"Connection error occurred: {req_err!r}. Please check your network connection."
+            }
+    return response, None
+
+
+async def _fetch_json(
+    url: str,
+    parse: Optional[Callable[[Any], Any]],
+    trace: Optional["metrics.UpstreamTrace"],
+) -> Any:
+    """Fetch a URL for fetch_json, recording upstream metrics when trace is given."""
+    client = get_client()
+    host = httpx.URL(url).host
+    breaker = circuit_breaker(host)
+    attempts = max(1, _settings["retry_attempts"])
+    for attempt in range(attempts):
+        if not breaker.allow():
+            if trace:
+                metrics.UPSTREAM_RESPONSES.inc(host, "circuit_open")
+            return {
+                "error": (
+                    f"The upstream host {host} is failing repeatedly; requests are paused "
+                    f"for {breaker.retry_after():.0f} more seconds. Please try again later."
+                )
+            }
+        if attempt and trace:
+            metrics.UPSTREAM_RETRIES.inc(host)
+        if ratelimit.limiter.upstream_limit is not None:
+            try:
+                await ratelimit.limiter.upstream(host)
+            except ratelimit.RateLimited as err:
+                return {"error": f"Requests to {host} are rate limited: {err}"}
+        validator = _validators.get(url)
+        response, error = await _request(client, url, host, validator, trace)
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            # The host answered; a client error such as 404 says nothing about its health.
+            breaker.record_success()
+            break
+        breaker.record_failure()
+        if attempt + 1 == attempts or breaker.state != CLOSED:
+            return error
+        await asyncio.sleep(_retry_delay(attempt, response))
+    if error is not None:
+        return error
+    if response.status_code == 304:
+        _conditional_stats["responses_304"] += 1
+        _conditional_stats["bytes_saved"] += validator.size
+        return validator.data
+    source = url.rsplit("/", 1)[-1]
+    started = metrics.clock()
+    data = decode_json(response.content)
+    metrics.observe("decode", source, started)
+    _conditional_stats["responses_200"] += 1
+    if isinstance(data, dict) and "error" in data:
+        _validators.pop(url, None)
+        return data
+    if parse is not None:
+        started = metrics.clock()
+        data = parse(data)
+        metrics.observe("ingest", source, started)
+        if isinstance(data, dict) and "error" in data:
+            _validators.pop(url, None)
+            return data
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        _validators[url] = _Validator(etag, last_modified, data, len(response.content))
+    else:
+        _validators.pop(url, None)
+    return data
@@ -0,0 +1,48 @@
+"""
+Module providing lookup indexes over the rows of a parsed feed snapshot.
+An index is built once per snapshot and maps canonical field values (district,
+hospital, cluster, specialty) to row positions, so filtered queries avoid scanning rows.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+KeyFunction = Callable[[Mapping[str, Any]], Optional[str]]
+
+
+class FeedIndex:
+    """Row positions of a feed snapshot grouped by canonical field values."""
+
+    __slots__ = ("rows", "_positions")
+
+    def __init__(self, rows: Sequence[Mapping[str, Any]], fields: Dict[str, KeyFunction]):
+        self.rows = rows
+        self._positions: Dict[str, Dict[str, Tuple[int, ...]]] = {}
+        for field, key_of in fields.items():
+            groups: Dict[str, List[int]] = {}
+            for position, row in enumerate(rows):
+                key = key_of(row) if isinstance(row, Mapping) else None
+                if key is not None:
+                    groups.setdefault(key, []).append(position)
+            self._positions[field] = {key: tuple(value) for key, value in groups.items()}
+
+    def keys(self, field: str) -> Iterable[str]:
+        """Return the canonical values present for a field."""
+        return self._positions.get(field, {}).keys()
+
+    def positions(self, **criteria: Optional[str]) -> Sequence[int]:
+        """Return the positions of the rows matching every given canonical value, in feed order.
+
+        Pass only the filters a caller was given: a criterion whose value is None or
+        empty, as a blank name canonicalizes to, matches no row. With no criteria all
+        positions are returned.
+        """
+        matches = [self._positions.get(field, {}).get(key, ()) for field, key in criteria.items()]
+        if not matches:
+            return range(len(self.rows))
+        if len(matches) == 1:
+            return matches[0]
+        return sorted(set(matches[0]).intersection(*matches[1:]))
+
+    def lookup(self, **criteria: Optional[str]) -> List[Mapping[str, Any]]:
+        """Return the rows matching every given canonical value, in feed order."""
+        return [self.rows[i] for i in self.positions(**criteria)]
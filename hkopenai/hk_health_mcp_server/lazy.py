@@ -0,0 +1,28 @@
+"""
+Module deferring the import of heavy dependencies until they are first used.
+The server imports every tool module to declare the tool schemas, but numpy and the
+HTTP stack are only needed once a tool runs, so a process that starts per session
+can answer initialize without loading them.
+"""
+
+import importlib
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule(ModuleType):
+    """A stand-in for a module that imports it on first attribute access.
+
+    Once loaded, the module's attributes are copied onto the stand-in, so later
+    lookups cost the same as on the module itself.
+    """
+
+    def __getattr__(self, attr: str) -> Any:
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Return a module that is imported when one of its attributes is first read."""
+    return LazyModule(name)
@@ -0,0 +1,414 @@
+"""
+Module providing hot-path instrumentation for the health tools and upstream fetches.
+Per-phase timings, upstream status codes and bytes, cache statistics and in-flight
+counts are kept in a small in-process registry and exported in the Prometheus text
+format on the HTTP transport, with optional OpenTelemetry spans.
+
+Instrumentation is off unless HK_HEALTH_METRICS is set, and spans are only created
+when HK_HEALTH_OTEL is also set and opentelemetry-api is installed. When off, the tool wrappers
+and middleware are not installed at all and the remaining hooks return after one
+flag check, so the hot path pays close to nothing.
+"""
+
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+def _env_flag(name: str) -> bool:
+    """Return whether an on/off environment setting is switched on."""
+    return os.environ.get(name, "false").lower() in ("1", "true", "yes", "on")
+
+
+ENABLED = _env_flag("HK_HEALTH_METRICS")
+TRACER: Any = None
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set such as {phase="decode",source="aed"}."""
+    pairs = [
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{%s}" % ",".join(pairs) if pairs else ""
+
+
+class Counter:
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Add amount to the value of a label set."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Return the current value of a label set."""
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        """Return the exposition lines of the metric's samples."""
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, k)} {v:g}" for k, v in items]
+
+    def clear(self) -> None:
+        """Drop all recorded values."""
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    """A value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        """Subtract amount from the value of a label set."""
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        """Set the value of a label set."""
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observed values per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observed value for a label set."""
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One count per bucket, then the sum and the total count.
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *labels: str) -> int:
+        """Return the number of observations of a label set."""
+        series = self._series.get(labels)
+        return int(series[-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        """Return the exposition lines of the metric's buckets, sums and counts."""
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, hits in zip(self.buckets, series):
+                cumulative += hits
+                le = _format_labels(self.labels, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative:g}")
+            inf = _format_labels(self.labels, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {series[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]:.6g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]:g}")
+        return lines
+
+    def clear(self) -> None:
+        """Drop all recorded values."""
+        with self._lock:
+            self._series.clear()
+
+
+PHASE_SECONDS = Histogram(
+    "hk_health_phase_seconds",
+    "Time spent per phase: upstream connect, tls, wait, download, decode and ingest; "
+    "tool fetch, filter, handler, serialize and total.",
+    ("phase", "source"),
+)
+UPSTREAM_RESPONSES = Counter(
+    "hk_health_upstream_responses_total",
+    "Upstream responses by host and status code (or timeout/connect_error/circuit_open).",
+    ("host", "status"),
+)
+UPSTREAM_BYTES = Counter(
+    "hk_health_upstream_received_bytes_total", "Response body bytes received upstream.", ("host",)
+)
+IN_FLIGHT = Gauge(
+    "hk_health_in_flight_requests", "Requests currently in progress.", ("kind",)
+)
+TOOL_CALLS = Counter(
+    "hk_health_tool_calls_total", "MCP tool calls by tool and outcome.", ("tool", "outcome")
+)
+UPSTREAM_RETRIES = Counter(
+    "hk_health_upstream_retries_total", "Upstream requests retried after a transient failure.",
+    ("host",),
+)
+CIRCUIT_STATE = Gauge(
+    "hk_health_circuit_state",
+    "Upstream circuit breaker state per host: 0 closed, 1 half-open, 2 open.",
+    ("host",),
+)
+QUEUE_DEPTH = Gauge(
+    "hk_health_queue_depth", "Tool calls and upstream requests waiting for a rate limit token or a call slot."
+)
+QUEUE_WAIT = Histogram(
+    "hk_health_queue_wait_seconds",
+    "Time tool calls waited for rate limit tokens and a call slot before running.",
+    ("tool",),
+)
+RATE_LIMITED = Counter(
+    "hk_health_rate_limited_total",
+    "Tool calls and upstream requests rejected by a rate limit, by scope (client, tool, queue or upstream).",
+    ("scope", "tool"),
+)
+ROWS_QUARANTINED = Counter(
+    "hk_health_rows_quarantined_total",
+    "Feed rows set aside at ingest for not matching the feed schema, by reason.",
+    ("feed", "reason"),
+)
+SCHEMA_DRIFT = Counter(
+    "hk_health_schema_drift_total",
+    "Ingested feed versions whose field names or value types differ from the previous version.",
+    ("feed",),
+)
+SNAPSHOTS_REJECTED = Counter(
+    "hk_health_snapshots_rejected_total",
+    "Fetched feed versions rejected because too many rows failed validation.",
+    ("feed",),
+)
+QUARANTINE_RATIO = Gauge(
+    "hk_health_quarantine_ratio",
+    "Share of the rows of the last ingested version of a feed that failed validation.",
+    ("feed",),
+)
+
+METRICS: List[Any] = [
+    PHASE_SECONDS,
+    UPSTREAM_RESPONSES,
+    UPSTREAM_BYTES,
+    IN_FLIGHT,
+    TOOL_CALLS,
+    UPSTREAM_RETRIES,
+    CIRCUIT_STATE,
+    QUEUE_DEPTH,
+    QUEUE_WAIT,
+    RATE_LIMITED,
+    ROWS_QUARANTINED,
+    SCHEMA_DRIFT,
+    SNAPSHOTS_REJECTED,
+    QUARANTINE_RATIO,
+]
+
+# Callbacks returning (name, type, help, value) samples computed at scrape time.
+_collectors: List[Callable[[], Iterable[Tuple[str, str, str, float]]]] = []
+
+# Set by the tool middleware so the handler wrapper can report when the tool returned.
+_current_call: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "hk_health_current_call", default=None
+)
+
+
+def configure(enabled: Optional[bool] = None, tracing: Optional[bool] = None) -> None:
+    """Turn instrumentation and OpenTelemetry tracing on or off.
+
+    Tracing needs the opentelemetry-api package and is left off when it is missing.
+    """
+    global ENABLED, TRACER  # pylint: disable=global-statement
+    if enabled is not None:
+        ENABLED = enabled
+    if tracing is not None:
+        TRACER = None
+        if tracing:
+            try:
+                from opentelemetry import trace  # pylint: disable=import-outside-toplevel
+            except ImportError:
+                return
+            TRACER = trace.get_tracer("hkopenai.hk_health_mcp_server")
+
+
+def reset() -> None:
+    """Clear all recorded values."""
+    for metric in METRICS:
+        metric.clear()
+
+
+def clock() -> float:
+    """Return a start time for observe(), or 0.0 when instrumentation is off."""
+    return time.perf_counter() if ENABLED else 0.0
+
+
+def observe(phase: str, source: str, started: float) -> None:
+    """Record the time since started (from clock()) for a phase."""
+    if ENABLED and started:
+        PHASE_SECONDS.observe(time.perf_counter() - started, phase, source)
+
+
+def span(name: str, **attributes: Any):
+    """Return an OpenTelemetry span context manager, or a no-op one when tracing is off."""
+    if TRACER is None:
+        return _NULL_SPAN
+    return TRACER.start_as_current_span(name, attributes=attributes)
+
+
+def add_collector(collector: Callable[[], Iterable[Tuple[str, str, str, float]]]) -> None:
+    """Register a callback providing (name, type, help, value) samples at scrape time."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render() -> str:
+    """Return all metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    for collector in _collectors:
+        for name, kind, documentation, value in collector():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+class UpstreamTrace:
+    """httpx trace callback turning connection events into phase timings.
+
+    Passed as the 'trace' request extension, which the async transport awaits, it
+    receives httpcore events such as 'connection.connect_tcp.started' and records
+    connect (DNS and TCP), tls, wait (request sent to response headers) and download
+    phases for the host.
+    """
+
+    __slots__ = ("host", "_started")
+
+    _PHASES = {
+        "connect_tcp": "connect",
+        "start_tls": "tls",
+        "receive_response_body": "download",
+    }
+
+    def __init__(self, host: str):
+        self.host = host
+        self._started: Dict[str, float] = {}
+
+    async def __call__(self, event: str, _info: Dict[str, Any]) -> None:
+        step, _, stage = event.rpartition(".")
+        step = step.rpartition(".")[2]
+        now = time.perf_counter()
+        if step == "send_request_headers" and stage == "started":
+            self._started["wait"] = now
+        elif step == "receive_response_headers" and stage == "complete":
+            started = self._started.pop("wait", None)
+            if started is not None:
+                PHASE_SECONDS.observe(now - started, "wait", self.host)
+        elif step in self._PHASES:
+            if stage == "started":
+                self._started[step] = now
+            elif stage in ("complete", "failed") and step in self._started:
+                PHASE_SECONDS.observe(now - self._started.pop(step), self._PHASES[step], self.host)
+
+
+def instrument_tool(fn):
+    """Decorator timing a tool function as its 'handler' phase.
+
+    Returns the function unchanged when instrumentation is off at registration time.
+    """
+    if not ENABLED:
+        return fn
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            ended = time.perf_counter()
+            PHASE_SECONDS.observe(ended - started, "handler", name)
+            call = _current_call.get()
+            if call is not None:
+                call["handler_end"] = ended
+
+    return wrapper
+
+
+def _tool_middleware():
+    """Return FastMCP middleware recording tool totals, serialization and outcomes."""
+    from fastmcp.server.middleware import Middleware  # pylint: disable=import-outside-toplevel
+
+    class ToolMetricsMiddleware(Middleware):
+        """Time every tool call end to end and the serialization after its handler."""
+
+        async def on_call_tool(self, context, call_next):
+            tool = context.message.name
+            call: Dict[str, float] = {}
+            token = _current_call.set(call)
+            IN_FLIGHT.inc("tool")
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with span(f"mcp.tool/{tool}", tool=tool):
+                    result = await call_next(context)
+                outcome = "error" if getattr(result, "is_error", False) else "ok"
+                return result
+            finally:
+                ended = time.perf_counter()
+                IN_FLIGHT.dec("tool")
+                _current_call.reset(token)
+                PHASE_SECONDS.observe(ended - started, "total", tool)
+                if "handler_end" in call:
+                    PHASE_SECONDS.observe(ended - call["handler_end"], "serialize", tool)
+                TOOL_CALLS.inc(tool, outcome)
+
+    return ToolMetricsMiddleware()
+
+
+def register(mcp):
+    """Install the tool middleware and the /metrics route when instrumentation is on."""
+    if not ENABLED:
+        return
+    mcp.add_middleware(_tool_middleware())
+
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def prometheus_metrics(_request):
+        from starlette.responses import PlainTextResponse  # pylint: disable=import-outside-toplevel
+
+        return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+
+if _env_flag("HK_HEALTH_OTEL"):
+    configure(tracing=True)
@@ -0,0 +1,119 @@
+"""
+Module splitting large tool responses into pages sliced from one cached snapshot.
+A page holds at most 'max_items' rows and, with 'max_bytes', only as many rows as
+fit the byte budget once encoded; the encoded size of every row is computed once per
+snapshot. The 'next_page' token names the snapshot version, the offset and the query,
+so the following page continues the same selection. Paged responses carry a summary
+of the whole selection, which often answers the question without further pages.
+"""
+
+import hashlib
+from array import array
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from . import serialization
+from .cache import FeedResult
+from .columnar import FeedTable
+
+Summarize = Callable[[FeedTable, Sequence[int]], Dict[str, Any]]
+
+
+def query_digest(*arguments: Any) -> str:
+    """Return a short digest of the arguments selecting a response's rows."""
+    return hashlib.sha1(repr(arguments).encode("utf-8")).hexdigest()[:8]
+
+
+def page_token(version: str, offset: int, query: str) -> str:
+    """Return the token of the page starting at offset in a snapshot version."""
+    return f"{version}.{offset}.{query}"
+
+
+def parse_page_token(token: str) -> Tuple[str, int, str]:
+    """Split a page token into snapshot version, offset and query digest.
+
+    Raises:
+        ValueError: If the token was not returned by this server.
+    """
+    version, _, rest = token.rpartition(".")
+    version, _, offset = version.rpartition(".")
+    if not version or not offset.isdigit():
+        raise ValueError(f"Invalid page token {token!r}; use the 'next_page' of a previous response.")
+    return version, int(offset), rest
+
+
+def _row_sizes(table: FeedTable, fields: Optional[Sequence[str]]) -> array:
+    """Return the encoded size in bytes of every row projected to fields."""
+    return array(
+        "l", (len(serialization.dumps(row).encode("utf-8")) for row in table.rows(fields=fields))
+    )
+
+
+def paginate(
+    result: FeedResult,
+    version: str,
+    positions: Optional[Sequence[int]],
+    fields: Optional[Sequence[str]],
+    page: Optional[str],
+    max_items: Optional[int],
+    max_bytes: Optional[int],
+    query: str,
+    summarize: Summarize,
+) -> Tuple[Optional[Sequence[int]], Dict[str, Any]]:
+    """Narrow a tool's selected rows to one page.
+
+    Without a page token or budget, every selected row is returned and no page
+    fields are added.
+
+    Args:
+        result: The snapshot being served.
+        version: Cursor of the snapshot version, as returned by select_changes.
+        positions: Rows selected by the tool, or None for all rows.
+        fields: Fields the rows are projected to.
+        page: Token from the 'next_page' of a previous response, or empty for the first page.
+        max_items: Optional maximum number of rows in the page.
+        max_bytes: Optional budget of encoded bytes for the rows of the page; a page
+            holds at least one row.
+        query: Digest of the arguments selecting the rows (see query_digest).
+        summarize: Function summarizing the selected rows of the table.
+
+    Returns:
+        The positions of the page and the 'page' and 'summary' fields to add to the response.
+
+    Raises:
+        ValueError: If a budget is not positive or the token belongs to another query.
+    """
+    if not page and max_items is None and max_bytes is None:
+        return positions, {}
+    if (max_items is not None and max_items < 1) or (max_bytes is not None and max_bytes < 1):
+        raise ValueError("max_items and max_bytes must be positive.")
+    header: Dict[str, Any] = {}
+    offset = 0
+    if page:
+        page_version, offset, page_query = parse_page_token(page)
+        if page_query != query:
+            raise ValueError("The page token belongs to a request with different arguments.")
+        if page_version != version:
+            # The feed changed since the previous page: start over on the new version.
+            offset = 0
+            header["restarted"] = True
+    table = result.data
+    selected = range(len(table)) if positions is None else positions
+    end = min(offset + (max_items or len(selected)), len(selected))
+    if max_bytes is not None and offset < end:
+        sizes = result.derive(f"row_sizes:{fields}", lambda t: _row_sizes(t, fields))
+        used = sizes[selected[offset]]
+        stop = offset + 1
+        while stop < end and used + 1 + sizes[selected[stop]] <= max_bytes:
+            used += 1 + sizes[selected[stop]]
+            stop += 1
+        end = stop
+    summary = result.derive("summaries", lambda _: serialization.ResponseMemo()).get(
+        serialization.memo_key(positions, None), lambda: summarize(table, selected)
+    )
+    header.update(
+        total=len(selected),
+        offset=min(offset, len(selected)),
+        returned=max(end - offset, 0),
+        next_page=page_token(version, end, query) if end < len(selected) else None,
+    )
+    return selected[offset:end], {"page": header, "summary": summary}
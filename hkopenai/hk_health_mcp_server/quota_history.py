@@ -0,0 +1,420 @@
+"""
+Module keeping the weekly history of general outpatient clinic (GOPC) quotas.
+The GOPC feed only publishes the average quota of the preceding four weeks, so every
+new snapshot is recorded as the value of its week for each clinic. Values are held in
+a dense numpy array of weeks by clinics, optionally appended to a binary file so the
+history survives restarts (weeks beyond the retention are dropped from the file when it
+is loaded), and week-over-week changes, district totals and forecasts
+are computed with vectorized numpy operations over a window of weeks.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not coordinated.
+    fcntl = None
+
+from .columnar import FeedTable
+from .feeds import GOPC, Feed
+from .history import HK_TIMEZONE
+from .lazy import lazy_import
+from .reference import canonical_district
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+DEFAULT_PATH = os.path.join("~", ".cache", "hkopenai", "hk_health_gopc_history.bin")
+DEFAULT_RETENTION_WEEKS = 260
+METHODS = ("ewma", "linear")
+DEFAULT_ALPHA = 0.5
+
+# 1970-01-05 was the first Monday after the epoch; weeks are numbered from it.
+_EPOCH_MONDAY = date(1970, 1, 5)
+_WEEK_SECONDS = 7 * 86400
+_MONDAY_OFFSET = 4 * 86400
+
+# One record: week number, language, district, clinic, session and average quota.
+_RECORD_FIELDS = [
+    ("week", "<i4"),
+    ("lang", "S2"),
+    ("district", "S32"),
+    ("clinic", "S96"),
+    ("session", "S16"),
+    ("quota", "<f4"),
+]
+
+ClinicKey = Tuple[str, str, str, str]  # Language, district, clinic and session.
+
+
+@functools.lru_cache(maxsize=None)
+def _record_dtype() -> np.dtype:
+    """Return the numpy record type of one stored value, importing numpy on first use."""
+    return np.dtype(_RECORD_FIELDS)
+
+
+def __getattr__(name: str) -> Any:
+    """Provide RECORD_DTYPE without importing numpy when the module is imported."""
+    if name == "RECORD_DTYPE":
+        return _record_dtype()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def week_of(timestamp: float) -> int:
+    """Return the number of the week (Monday to Sunday, HK time) holding timestamp."""
+    local = timestamp + HK_TIMEZONE.utcoffset(None).total_seconds()
+    return int((local - _MONDAY_OFFSET) // _WEEK_SECONDS)
+
+
+def week_label(week: int) -> str:
+    """Return the ISO label of a week number, such as '2025-W41'."""
+    year, number, _ = (_EPOCH_MONDAY + timedelta(weeks=week)).isocalendar()
+    return f"{year}-W{number:02d}"
+
+
+def _number(value: Any) -> Optional[float]:
+    """Return a quota as a float, or None if it is not a number."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.replace(",", ""))
+        except ValueError:
+            return None
+    return None
+
+
+def _text(value: bytes) -> str:
+    """Decode a stored text field, dropping a character cut by the field width."""
+    return value.decode("utf-8", errors="ignore")
+
+
+def forecast(values: np.ndarray, method: str = "ewma", alpha: float = DEFAULT_ALPHA) -> np.ndarray:
+    """Forecast the next week of each column of a weeks-by-series array.
+
+    Missing weeks (NaN) are skipped. 'ewma' weighs the week k weeks before the last
+    by alpha * (1 - alpha) ** k; 'linear' extends the least-squares line through the
+    weeks, falling back to the mean of a series with a single week.
+
+    Returns:
+        The forecast of each series, NaN for a series without any value.
+    """
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    weeks = values.shape[0]
+    if method == "ewma":
+        weights = alpha * (1.0 - alpha) ** np.arange(weeks - 1, -1, -1, dtype=np.float64)
+        total = (weights[:, None] * present).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (weights[:, None] * filled).sum(axis=0) / total
+    x = np.arange(weeks, dtype=np.float64)[:, None]
+    count = present.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = (x * present).sum(axis=0) / count
+        mean_y = filled.sum(axis=0) / count
+        dx = np.where(present, x - mean_x, 0.0)
+        slope = (dx * (filled - mean_y)).sum(axis=0) / (dx * dx).sum(axis=0)
+    slope = np.where(count > 1, slope, 0.0)
+    return mean_y + slope * (weeks - mean_x)
+
+
+def changes(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return the last week, its change from the week before and the change in percent."""
+    latest = values[-1]
+    previous = values[-2] if values.shape[0] > 1 else np.full_like(latest, np.nan)
+    change = latest - previous
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percent = np.where(previous != 0, change / previous * 100.0, np.nan)
+    return latest, change, percent
+
+
+def rounded_columns(values: np.ndarray, digits: int = 1) -> List[List[Optional[float]]]:
+    """Return each column of a weeks-by-series array as a rounded list, None for NaN."""
+    rounded = np.round(np.atleast_2d(values).T, digits)
+    return np.where(np.isnan(rounded), None, rounded).tolist()
+
+
+class QuotaHistory:
+    """Weekly GOPC quotas per clinic in a dense weeks-by-clinics array.
+
+    Each clinic (per feed language and session) is a column and each week since the
+    first recorded one a row; weeks without a snapshot are NaN. Both dimensions grow
+    by doubling. When a file is attached, every recorded snapshot is appended to it,
+    and weeks older than the retention and values replaced by a later snapshot of
+    their week are dropped (and the file compacted) when it is loaded.
+    """
+
+    def __init__(self, retention_weeks: int = DEFAULT_RETENTION_WEEKS):
+        self.retention_weeks = retention_weeks
+        self.path: Optional[str] = None
+        self._lock = threading.Lock()
+        self._values: Optional[np.ndarray] = None  # Allocated by the first record.
+        self._first_week = 0
+        self._weeks = 0
+        self._keys: List[ClinicKey] = []
+        self._columns: Dict[ClinicKey, int] = {}
+        self._districts: List[str] = []
+        self._district_names: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        """Return the number of weeks from the first to the last recorded one."""
+        return self._weeks
+
+    @property
+    def last_week(self) -> Optional[int]:
+        """Return the number of the last recorded week, or None if nothing is recorded."""
+        return self._first_week + self._weeks - 1 if self._weeks else None
+
+    def clear(self) -> None:
+        """Drop all in-memory values."""
+        with self._lock:
+            self._values = None
+            self._weeks = 0
+            self._keys, self._columns = [], {}
+            self._districts, self._district_names = [], {}
+
+    def open(self, path: str) -> None:
+        """Load the values stored in a file and append future snapshots to it.
+
+        The file is locked while it is read and compacted, so worker processes
+        appending to it at the same time do not lose records.
+        """
+        path = os.path.expanduser(path)
+        itemsize = _record_dtype().itemsize
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            size = handle.seek(0, os.SEEK_END)
+            usable = size // itemsize
+            handle.seek(0)
+            records = np.frombuffer(handle.read(usable * itemsize), dtype=_record_dtype()).copy()
+            kept = self._compact(records)
+            if len(kept) != len(records) or usable * itemsize != size:
+                handle.truncate(0)
+                handle.write(kept.tobytes())
+            records = kept
+        with self._lock:
+            self.path = None
+            self._load(records)
+            self.path = path
+
+    def close(self) -> None:
+        """Stop appending snapshots to the attached file."""
+        with self._lock:
+            self.path = None
+
+    def _compact(self, records: np.ndarray) -> np.ndarray:
+        """Return the records within the retention, keeping the last of each clinic and week."""
+        if self.retention_weeks > 0 and len(records):
+            records = records[records["week"] > week_of(time.time()) - self.retention_weeks]
+        if not len(records):
+            return records
+        fields = ["week", "lang", "district", "clinic", "session"]
+        _, last = np.unique(records[fields][::-1], return_index=True)
+        return records[np.sort(len(records) - 1 - last)]
+
+    def _load(self, records: np.ndarray) -> None:
+        """Store records read from a file, later records of a week replacing earlier ones."""
+        if not len(records):
+            return
+        records = records[np.argsort(records["week"], kind="stable")]
+        fields = ["lang", "district", "clinic", "session"]
+        keys, column_of = np.unique(records[fields], return_inverse=True)
+        columns = np.array(
+            [self._column(tuple(_text(key[f]) for f in fields)) for key in keys], dtype=np.int64
+        )
+        for week in np.unique(records["week"]):
+            at = records["week"] == week
+            self._store(int(week), columns[column_of[at]], records["quota"][at])
+
+    def _column(self, key: ClinicKey) -> int:
+        """Return the column of a clinic, adding one for a new clinic."""
+        column = self._columns.get(key)
+        if column is None:
+            column = self._columns[key] = len(self._keys)
+            self._keys.append(key)
+            district = canonical_district(key[1]) or key[1]
+            self._districts.append(district)
+            self._district_names.setdefault(f"{key[0]}:{district}", key[1])
+        return column
+
+    def _store(self, week: int, columns: np.ndarray, quotas: np.ndarray) -> bool:
+        """Write the quotas of a week, growing the array; return False for a week too old."""
+        if self._weeks == 0:
+            self._first_week = week
+        row = week - self._first_week
+        if row < 0:
+            return False
+        rows, clinics = max(row + 1, self._weeks), len(self._keys)
+        shape = (0, 0) if self._values is None else self._values.shape
+        if rows > shape[0] or clinics > shape[1]:
+            grown = np.full(
+                (max(rows, 2 * shape[0], 64), max(clinics, 2 * shape[1], 256)),
+                np.nan,
+                dtype=np.float32,
+            )
+            if self._values is not None:
+                grown[: shape[0], : shape[1]] = self._values
+            self._values = grown
+        self._values[row, columns] = quotas
+        self._weeks = rows
+        return True
+
+    def record(self, lang: str, rows: Iterable[Dict[str, Any]], timestamp: float) -> int:
+        """Record the quotas of one snapshot taken at timestamp; return the values stored.
+
+        A later snapshot of the same week replaces the week's values.
+        """
+        week = week_of(timestamp)
+        records = []
+        for row in rows:
+            district, clinic = row.get("District"), row.get("Clinic")
+            quota = _number(row.get("AvgQuota"))
+            if not isinstance(district, str) or not isinstance(clinic, str) or quota is None:
+                continue
+            session = row.get("Session")
+            session = session if isinstance(session, str) else ""
+            records.append(
+                (week, lang.encode(), district.encode(), clinic.encode(), session.encode(), quota)
+            )
+        records = np.array(records, dtype=_record_dtype())
+        if not len(records):
+            return 0
+        with self._lock:
+            columns = np.array(
+                [
+                    self._column((lang, _text(r["district"]), _text(r["clinic"]), _text(r["session"])))
+                    for r in records
+                ],
+                dtype=np.int64,
+            )
+            if not self._store(week, columns, records["quota"]):
+                return 0
+            if self.path is not None:
+                try:
+                    self._write(records)
+                except OSError:
+                    pass
+        return len(records)
+
+    def _write(self, records: np.ndarray) -> None:
+        """Append a snapshot's records to the attached file.
+
+        Worker processes sharing the file each record the same snapshots, so the file
+        is locked and a snapshot whose last record is already the file's last is skipped.
+        """
+        itemsize = _record_dtype().itemsize
+        with open(self.path, "a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            size = handle.seek(0, os.SEEK_END)
+            if size >= itemsize:
+                handle.seek(size - size % itemsize - itemsize)
+                if handle.read(itemsize) == records[-1:].tobytes():
+                    return
+            records.tofile(handle)
+
+    def record_version(self, feed: Feed, lang: str, entry: Any) -> None:
+        """Cache version listener recording every new GOPC snapshot."""
+        if feed.name != GOPC.name or not isinstance(entry.data, FeedTable):
+            return
+        self.record(lang, entry.data, entry.fetched_at.timestamp())
+
+    def window(
+        self,
+        weeks: int,
+        lang: str,
+        district: Optional[str] = None,
+        clinic: Optional[str] = None,
+    ) -> Tuple[List[int], List[int], np.ndarray]:
+        """Return the last weeks of the clinics matching the filters.
+
+        Args:
+            weeks: Number of weeks, ending with the last recorded one.
+            lang: Feed language of the clinics.
+            district: Optional canonical district key.
+            clinic: Optional case-insensitive part of the clinic name.
+
+        Returns:
+            The week numbers, the clinic columns and a weeks-by-clinics copy of the values.
+        """
+        with self._lock:
+            if not self._weeks:
+                return [], [], np.empty((0, 0), dtype=np.float32)
+            count = min(max(weeks, 1), self._weeks)
+            needle = (clinic or "").casefold()
+            columns = [
+                i
+                for i, key in enumerate(self._keys)
+                if key[0] == lang
+                and (district is None or self._districts[i] == district)
+                and needle in key[2].casefold()
+            ]
+            values = self._values[self._weeks - count : self._weeks, columns].astype(np.float64)
+            first = self._first_week + self._weeks - count
+        return list(range(first, first + count)), columns, values
+
+    def rollup(
+        self, columns: List[int], values: np.ndarray
+    ) -> Tuple[List[int], List[int], np.ndarray]:
+        """Total the values of a window by district.
+
+        The clinics are summed with a clinics-by-districts indicator matrix; weeks in
+        which none of a district's clinics has a value stay NaN.
+
+        Args:
+            columns: Clinic columns of the window, as returned by window().
+            values: Weeks-by-clinics values of the window.
+
+        Returns:
+            One representative column per district, in order of first appearance, the
+            number of clinics of each district and the weeks-by-districts totals.
+        """
+        districts = [self._districts[column] for column in columns]
+        order = list(dict.fromkeys(districts))
+        index = {name: i for i, name in enumerate(order)}
+        indicator = np.zeros((len(columns), len(order)))
+        indicator[np.arange(len(columns)), [index[name] for name in districts]] = 1.0
+        present = ~np.isnan(values)
+        totals = np.where(present, values, 0.0) @ indicator
+        totals[(present @ indicator) == 0] = np.nan
+        first = [columns[districts.index(name)] for name in order]
+        return first, indicator.sum(axis=0).astype(int).tolist(), totals
+
+    def key(self, column: int) -> ClinicKey:
+        """Return the language, district, clinic and session of a column."""
+        return self._keys[column]
+
+    def district(self, column: int) -> Tuple[str, str]:
+        """Return the canonical district key of a column and its name in the feed."""
+        key = self._districts[column]
+        return key, self._district_names[f"{self._keys[column][0]}:{key}"]
+
+
+def path_from_env() -> Optional[str]:
+    """Return the history file path from HK_HEALTH_GOPC_HISTORY_PATH, or None if disabled."""
+    path = os.environ.get("HK_HEALTH_GOPC_HISTORY_PATH", DEFAULT_PATH).strip()
+    if path.lower() in ("", "0", "off", "false", "no"):
+        return None
+    return path
+
+
+def retention_from_env() -> int:
+    """Return the number of weeks of GOPC quota history kept, from HK_HEALTH_GOPC_HISTORY_WEEKS."""
+    try:
+        return int(os.environ.get("HK_HEALTH_GOPC_HISTORY_WEEKS", DEFAULT_RETENTION_WEEKS))
+    except ValueError:
+        return DEFAULT_RETENTION_WEEKS
+
+
+quota_history = QuotaHistory()
@@ -0,0 +1,472 @@
+"""
+Module limiting how fast clients may call the health tools and how fast the server
+fetches from the Hospital Authority host.
+Token buckets limit the calls of each client, each tool and the requests to each
+upstream host; a call that would exceed a bucket waits for its token, or is rejected
+if the wait would be longer than HK_HEALTH_RATE_MAX_WAIT seconds. With
+HK_HEALTH_MAX_CONCURRENT_CALLS set, calls beyond that number wait in a weighted fair
+queue, so a client calling in a tight loop cannot delay the calls of other clients
+by more than its share.
+
+Limits are off unless configured, in which case the tool middleware is not installed
+and upstream requests pay one attribute check. A call that finds tokens and a free
+slot does not yield to the event loop.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+
+DEFAULT_MAX_WAIT = 5.0
+MAX_CLIENTS = 4096
+
+
+def _parse_limit(text: str) -> Optional[Tuple[float, float]]:
+    """Parse 'rate' or 'rate/burst' (calls per second and bucket size)."""
+    rate, _, burst = text.partition("/")
+    try:
+        rate_value = float(rate)
+        burst_value = float(burst) if burst else max(1.0, rate_value)
+    except ValueError:
+        return None
+    if rate_value <= 0 or burst_value < 1:
+        return None
+    return rate_value, burst_value
+
+
+def _parse_pairs(text: str) -> Dict[str, str]:
+    """Split 'name=value,name=value' into a dictionary."""
+    pairs = {}
+    for item in text.split(","):
+        name, _, value = item.partition("=")
+        if name.strip() and value.strip():
+            pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def limits_from_env() -> Dict[str, Tuple[float, float]]:
+    """Read the token bucket limits from HK_HEALTH_RATE_LIMITS.
+
+    The setting lists 'name=rate/burst' pairs, where name is 'client' (each client),
+    'tool' (each tool), a tool name (that tool, instead of the 'tool' limit) or
+    'upstream' (requests to each upstream host), e.g.
+    'client=5/10,get_pas_gopc_avg_quota=2/4,upstream=2/5'. Invalid pairs are ignored.
+    """
+    limits = {}
+    for name, value in _parse_pairs(os.environ.get("HK_HEALTH_RATE_LIMITS", "")).items():
+        limit = _parse_limit(value)
+        if limit is not None:
+            limits[name] = limit
+    return limits
+
+
+def weights_from_env() -> Dict[str, float]:
+    """Read the fair queue weights of clients from HK_HEALTH_CLIENT_WEIGHTS.
+
+    Clients are named by their key (see client_key), e.g. 'principal:reporting=2' or
+    'address:10.0.0.7=3'.
+    """
+    weights = {}
+    for name, value in _parse_pairs(os.environ.get("HK_HEALTH_CLIENT_WEIGHTS", "")).items():
+        try:
+            weight = float(value)
+        except ValueError:
+            continue
+        if weight > 0:
+            weights[name] = weight
+    return weights
+
+
+def _env_number(name: str, default: float) -> float:
+    """Read a non-negative number from the environment, ignoring invalid values."""
+    try:
+        return max(0.0, float(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+class RateLimited(Exception):
+    """Raised when a call would wait longer than allowed for a token."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(
+            f"Rate limit exceeded ({scope}); please retry in {retry_after:.1f} seconds."
+        )
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """A bucket of up to burst tokens refilled at rate tokens per second.
+
+    Tokens are reserved ahead: a reservation may take the bucket below zero, and the
+    caller waits until its token would have been refilled.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, max_wait: float, now: float, cost: float = 1.0) -> Optional[float]:
+        """Take cost tokens, returning the seconds to wait for them.
+
+        Returns:
+            The wait, 0.0 if the tokens are available, or None (taking nothing) if the
+            wait would be longer than max_wait.
+        """
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        wait = (cost - self.tokens) / self.rate if self.tokens < cost else 0.0
+        if wait > max_wait:
+            return None
+        self.tokens -= cost
+        return wait
+
+    def refund(self, cost: float = 1.0) -> None:
+        """Return tokens taken by reserve()."""
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class FairQueue:
+    """Weighted fair queue in front of a fixed number of call slots.
+
+    Waiting calls are tagged with a virtual finish time that advances by 1/weight for
+    every queued call of the same client, and a freed slot goes to the smallest tag,
+    so each backlogged client gets slots in proportion to its weight.
+    """
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self.active = 0
+        self.depth = 0
+        self._heap: List[Tuple[float, int, float, asyncio.Future]] = []
+        self._finish: Dict[str, float] = {}
+        self._virtual = 0.0
+        self._order = itertools.count()
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free and no call is waiting for it."""
+        if self.active < self.slots and not self.depth:
+            self.active += 1
+            return True
+        return False
+
+    async def acquire(self, client: str, weight: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Wait in the queue for a slot; return False if none was given within timeout seconds."""
+        if self.try_acquire():
+            return True
+        start = max(self._virtual, self._finish.get(client, 0.0))
+        finish = self._finish[client] = start + 1.0 / weight
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (finish, next(self._order), start, future))
+        self.depth += 1
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.depth -= 1
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()  # The slot was handed over as the caller went away.
+            else:
+                self.depth -= 1
+            raise
+        return True
+
+    def release(self) -> None:
+        """Free a slot, handing it to the waiting call with the smallest tag."""
+        while self._heap:
+            _, _, start, future = heapq.heappop(self._heap)
+            if not future.done():
+                self._virtual = start
+                self.depth -= 1
+                future.set_result(None)
+                return
+        self._finish.clear()
+        self.active -= 1
+
+
+class RateLimiter:
+    """The token buckets and fair queue applied to tool calls and upstream requests."""
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        max_concurrent: int = 0,
+        weights: Optional[Dict[str, float]] = None,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ):
+        self.configure(limits, max_concurrent, weights, max_wait)
+
+    def configure(
+        self,
+        limits: Optional[Dict[str, Tuple[float, float]]] = None,
+        max_concurrent: int = 0,
+        weights: Optional[Dict[str, float]] = None,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ) -> None:
+        """Replace the limits, dropping all buckets and waiting state.
+
+        Args:
+            limits: Bucket limits by name, as read by limits_from_env().
+            max_concurrent: Number of tool calls run at once, or 0 for no limit.
+            weights: Fair queue weight by client key, 1.0 for other clients.
+            max_wait: Longest time in seconds a call may wait for a token or a slot.
+        """
+        self.limits = dict(limits or {})
+        self.weights = dict(weights or {})
+        self.max_wait = max_wait
+        self.queue = FairQueue(max_concurrent) if max_concurrent > 0 else None
+        self.upstream_limit = self.limits.get("upstream")
+        self._call_limits = any(name != "upstream" for name in self.limits)
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.waiting = 0
+        self.rejected: Dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Return whether tool calls are limited at all."""
+        return self._call_limits or self.queue is not None
+
+    def _bucket(self, scope: str, key: str) -> Optional[TokenBucket]:
+        """Return the bucket of a client, tool or host, or None if it is not limited."""
+        bucket = self._buckets.get((scope, key))
+        if bucket is None:
+            limit = self.limits.get(key) if scope == "tool" else None
+            limit = limit or self.limits.get(scope)
+            if limit is None:
+                return None
+            bucket = self._buckets[(scope, key)] = TokenBucket(*limit)
+            if len(self._buckets) > MAX_CLIENTS:
+                # Forget the oldest bucket; a client coming back starts with a full one.
+                self._buckets.popitem(last=False)
+        return bucket
+
+    def _reserve(
+        self, keys: List[Tuple[str, str, float]], tool: str
+    ) -> Tuple[float, List[Tuple[TokenBucket, float]]]:
+        """Take the given number of tokens from every bucket of (scope, key, cost) keys.
+
+        Returns:
+            The longest wait for the tokens and the buckets and costs taken.
+
+        Raises:
+            RateLimited: If a bucket has no tokens within max_wait; no tokens are taken.
+        """
+        now = time.monotonic()
+        taken: List[Tuple[TokenBucket, float]] = []
+        wait = 0.0
+        for scope, key, cost in keys:
+            bucket = self._bucket(scope, key)
+            if bucket is None:
+                continue
+            bucket_wait = bucket.reserve(self.max_wait, now, cost)
+            if bucket_wait is None:
+                for other, other_cost in taken:
+                    other.refund(other_cost)
+                self._reject(scope, tool)
+                raise RateLimited(scope, (cost - bucket.tokens) / bucket.rate)
+            taken.append((bucket, cost))
+            wait = max(wait, bucket_wait)
+        return wait, taken
+
+    def _reject(self, scope: str, tool: str) -> None:
+        """Count a rejected call or request."""
+        self.rejected[scope] = self.rejected.get(scope, 0) + 1
+        if metrics.ENABLED:
+            metrics.RATE_LIMITED.inc(scope, tool)
+
+    async def _wait(self, seconds: float) -> None:
+        """Sleep for a reserved token, counted in the queue depth."""
+        self.waiting += 1
+        if metrics.ENABLED:
+            metrics.QUEUE_DEPTH.inc()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.waiting -= 1
+            if metrics.ENABLED:
+                metrics.QUEUE_DEPTH.dec()
+
+    async def admit(
+        self,
+        client: str,
+        tool: str,
+        cost: float = 1.0,
+        tools: Optional[Dict[str, float]] = None,
+    ) -> float:
+        """Wait until a tool call of client may run and take a slot if slots are limited.
+
+        Args:
+            client: Key of the client's token bucket, fair queue share and weight.
+            tool: Name of the called tool.
+            cost: Tokens to take from the client's bucket.
+            tools: Tokens to take from each tool's bucket, one from tool's if not given.
+
+        Returns:
+            The seconds the call waited. The caller must call release() when the call
+            ends.
+
+        Raises:
+            RateLimited: If the call would wait longer than max_wait.
+        """
+        started = time.monotonic()
+        charges = tools or {tool: 1.0}
+        wait, taken = self._reserve(
+            [("client", client, cost)] + [("tool", name, n) for name, n in charges.items()],
+            tool,
+        )
+        try:
+            if wait:
+                await self._wait(wait)
+            if self.queue is not None and not self.queue.try_acquire():
+                remaining = max(0.0, self.max_wait - (time.monotonic() - started))
+                self.waiting += 1
+                if metrics.ENABLED:
+                    metrics.QUEUE_DEPTH.inc()
+                try:
+                    admitted = await self.queue.acquire(
+                        client, self.weights.get(client, 1.0), remaining
+                    )
+                finally:
+                    self.waiting -= 1
+                    if metrics.ENABLED:
+                        metrics.QUEUE_DEPTH.dec()
+                if not admitted:
+                    self._reject("queue", tool)
+                    raise RateLimited("queue", self.max_wait)
+        except (RateLimited, asyncio.CancelledError):
+            # A call that never ran does not use up its client's or tool's budget.
+            for bucket, taken_cost in taken:
+                bucket.refund(taken_cost)
+            raise
+        waited = time.monotonic() - started
+        if metrics.ENABLED:
+            metrics.QUEUE_WAIT.observe(waited, tool)
+        return waited
+
+    def release(self) -> None:
+        """Free the slot taken by admit()."""
+        if self.queue is not None:
+            self.queue.release()
+
+    async def upstream(self, host: str) -> None:
+        """Wait for the token of one request to an upstream host.
+
+        Raises:
+            RateLimited: If the request would wait longer than max_wait.
+        """
+        if self.upstream_limit is None:
+            return
+        wait, _ = self._reserve([("upstream", host, 1.0)], "upstream")
+        if wait:
+            await self._wait(wait)
+
+    def status(self) -> Dict[str, Any]:
+        """Return the limits and current queue state for monitoring."""
+        return {
+            "limits": {name: {"rate": rate, "burst": burst} for name, (rate, burst) in self.limits.items()},
+            "max_concurrent": self.queue.slots if self.queue is not None else 0,
+            "active": self.queue.active if self.queue is not None else None,
+            "waiting": self.waiting,
+            "rejected": dict(self.rejected),
+        }
+
+
+def limiter_from_env() -> RateLimiter:
+    """Create the rate limiter configured by the environment."""
+    return RateLimiter(
+        limits_from_env(),
+        int(_env_number("HK_HEALTH_MAX_CONCURRENT_CALLS", 0)),
+        weights_from_env(),
+        _env_number("HK_HEALTH_RATE_MAX_WAIT", DEFAULT_MAX_WAIT),
+    )
+
+
+limiter = limiter_from_env()
+
+
+def call_charges(tool: str, arguments: Any) -> Tuple[float, Dict[str, float]]:
+    """Return the client tokens and the tokens per tool bucket a tool call costs.
+
+    A batch query costs its client one token per sub-query, and each sub-query a token
+    of the tool it runs, as if the sub-queries were called one by one.
+    """
+    # pylint: disable=import-outside-toplevel
+    from .tools.batch_health_query import MAX_QUERIES, TOOLS
+
+    queries = arguments.get("queries") if isinstance(arguments, dict) else None
+    if tool != "batch_health_query" or not isinstance(queries, list) or not queries:
+        return 1.0, {tool: 1.0}
+    charges = {tool: 1.0}
+    for query in queries[:MAX_QUERIES]:
+        name = query.get("tool") if isinstance(query, dict) else None
+        if name in TOOLS:
+            charges[name] = charges.get(name, 0.0) + 1.0
+    return float(min(len(queries), MAX_QUERIES)), charges
+
+
+def client_key(context: Any) -> str:
+    """Return the key identifying the client of a call in the FastMCP context.
+
+    The key comes from what the client cannot choose per call: the authenticated
+    principal, else the remote address of the HTTP request, else the MCP session.
+    """
+    # pylint: disable=import-outside-toplevel
+    from fastmcp.server.dependencies import get_access_token, get_http_request
+
+    token = get_access_token()
+    if token is not None and token.client_id:
+        return f"principal:{token.client_id}"
+    try:
+        request = get_http_request()
+    except RuntimeError:
+        request = None
+    if request is not None and request.client is not None:
+        return f"address:{request.client.host}"
+    if context is None:
+        return "anonymous"
+    try:
+        return f"session:{context.session_id}" if context.session_id else "anonymous"
+    except RuntimeError:
+        return "anonymous"
+
+
+def _tool_middleware():
+    """Return FastMCP middleware applying the limiter to every tool call."""
+    from fastmcp.exceptions import ToolError  # pylint: disable=import-outside-toplevel
+    from fastmcp.server.middleware import Middleware  # pylint: disable=import-outside-toplevel
+
+    class RateLimitMiddleware(Middleware):
+        """Make every tool call wait for its tokens and a slot, or reject it."""
+
+        async def on_call_tool(self, context, call_next):
+            try:
+                client = client_key(context.fastmcp_context)
+                cost, tools = call_charges(context.message.name, context.message.arguments)
+                await limiter.admit(client, context.message.name, cost, tools)
+            except RateLimited as err:
+                raise ToolError(str(err)) from err
+            try:
+                return await call_next(context)
+            finally:
+                limiter.release()
+
+    return RateLimitMiddleware()
+
+
+def register(mcp):
+    """Install the rate limiting middleware when limits are configured."""
+    if limiter.enabled:
+        mcp.add_middleware(_tool_middleware())
@@ -0,0 +1,200 @@
+"""
+Module holding static reference data about Hong Kong districts, Hospital Authority clusters,
+A&E hospitals and specialties in English, Traditional Chinese and Simplified Chinese.
+Names in any of the three languages resolve to the same canonical key, so a filter
+written in one language matches feed rows published in another.
+"""
+
+import re
+from typing import Dict, Optional, Tuple
+
+# Canonical key -> (English, Traditional Chinese, Simplified Chinese)
+DISTRICTS: Dict[str, Tuple[str, str, str]] = {
+    "central & western": ("Central & Western", "中西區", "中西区"),
+    "wan chai": ("Wan Chai", "灣仔", "湾仔"),
+    "eastern": ("Eastern", "東區", "东区"),
+    "southern": ("Southern", "南區", "南区"),
+    "yau tsim mong": ("Yau Tsim Mong", "油尖旺", "油尖旺"),
+    "sham shui po": ("Sham Shui Po", "深水埗", "深水埗"),
+    "kowloon city": ("Kowloon City", "九龍城", "九龙城"),
+    "wong tai sin": ("Wong Tai Sin", "黃大仙", "黄大仙"),
+    "kwun tong": ("Kwun Tong", "觀塘", "观塘"),
+    "kwai tsing": ("Kwai Tsing", "葵青", "葵青"),
+    "tsuen wan": ("Tsuen Wan", "荃灣", "荃湾"),
+    "tuen mun": ("Tuen Mun", "屯門", "屯门"),
+    "yuen long": ("Yuen Long", "元朗", "元朗"),
+    "north": ("North", "北區", "北区"),
+    "tai po": ("Tai Po", "大埔", "大埔"),
+    "sha tin": ("Sha Tin", "沙田", "沙田"),
+    "sai kung": ("Sai Kung", "西貢", "西贡"),
+    "islands": ("Islands", "離島", "离岛"),
+}
+
+CLUSTERS: Dict[str, Tuple[str, str, str]] = {
+    "hkec": ("Hong Kong East Cluster", "港島東聯網", "港岛东联网"),
+    "hkwc": ("Hong Kong West Cluster", "港島西聯網", "港岛西联网"),
+    "kcc": ("Kowloon Central Cluster", "九龍中聯網", "九龙中联网"),
+    "kec": ("Kowloon East Cluster", "九龍東聯網", "九龙东联网"),
+    "kwc": ("Kowloon West Cluster", "九龍西聯網", "九龙西联网"),
+    "ntec": ("New Territories East Cluster", "新界東聯網", "新界东联网"),
+    "ntwc": ("New Territories West Cluster", "新界西聯網", "新界西联网"),
+}
+
+SPECIALTIES: Dict[str, Tuple[str, str, str]] = {
+    "ent": ("Ear, Nose & Throat", "耳鼻喉科", "耳鼻喉科"),
+    "gyn": ("Gynaecology", "婦科", "妇科"),
+    "med": ("Medicine", "內科", "内科"),
+    "obs": ("Obstetrics", "產科", "产科"),
+    "oph": ("Ophthalmology", "眼科", "眼科"),
+    "ort": ("Orthopaedics & Traumatology", "矯形及創傷外科", "矫形及创伤外科"),
+    "paed": ("Paediatrics", "兒科", "儿科"),
+    "psy": ("Psychiatry", "精神科", "精神科"),
+    "sur": ("Surgery", "外科", "外科"),
+}
+
+# Triage categories of specialist outpatient new cases, from most to least urgent.
+CATEGORIES: Dict[str, Tuple[str, str, str]] = {
+    "urgent": ("Urgent", "緊急", "紧急"),
+    "semi-urgent": ("Semi-urgent", "半緊急", "半紧急"),
+    "stable": ("Stable", "穩定", "稳定"),
+}
+
+# Hospital code -> (English, Traditional Chinese, Simplified Chinese, cluster, district)
+AED_HOSPITALS: Dict[str, Tuple[str, str, str, str, str]] = {
+    "AHN": ("Alice Ho Miu Ling Nethersole Hospital", "雅麗氏何妙齡那打素醫院", "雅丽氏何妙龄那打素医院", "ntec", "tai po"),
+    "CMC": ("Caritas Medical Centre", "明愛醫院", "明爱医院", "kwc", "sham shui po"),
+    "KWH": ("Kwong Wah Hospital", "廣華醫院", "广华医院", "kcc", "yau tsim mong"),
+    "NDH": ("North District Hospital", "北區醫院", "北区医院", "ntec", "north"),
+    "NLT": ("North Lantau Hospital", "北大嶼山醫院", "北大屿山医院", "kwc", "islands"),
+    "PYN": ("Pamela Youde Nethersole Eastern Hospital", "東區尤德夫人那打素醫院", "东区尤德夫人那打素医院", "hkec", "eastern"),
+    "POH": ("Pok Oi Hospital", "博愛醫院", "博爱医院", "ntwc", "yuen long"),
+    "PWH": ("Prince of Wales Hospital", "威爾斯親王醫院", "威尔斯亲王医院", "ntec", "sha tin"),
+    "PMH": ("Princess Margaret Hospital", "瑪嘉烈醫院", "玛嘉烈医院", "kwc", "kwai tsing"),
+    "QEH": ("Queen Elizabeth Hospital", "伊利沙伯醫院", "伊利沙伯医院", "kcc", "yau tsim mong"),
+    "QMH": ("Queen Mary Hospital", "瑪麗醫院", "玛丽医院", "hkwc", "southern"),
+    "RH": ("Ruttonjee Hospital", "律敦治醫院", "律敦治医院", "hkec", "wan chai"),
+    "SJH": ("St John Hospital", "長洲醫院", "长洲医院", "hkec", "islands"),
+    "TSH": ("Tin Shui Wai Hospital", "天水圍醫院", "天水围医院", "ntwc", "yuen long"),
+    "TKO": ("Tseung Kwan O Hospital", "將軍澳醫院", "将军澳医院", "kec", "sai kung"),
+    "TMH": ("Tuen Mun Hospital", "屯門醫院", "屯门医院", "ntwc", "tuen mun"),
+    "UCH": ("United Christian Hospital", "基督教聯合醫院", "基督教联合医院", "kec", "kwun tong"),
+    "YCH": ("Yan Chai Hospital", "仁濟醫院", "仁济医院", "kwc", "tsuen wan"),
+}
+
+# Hospital code -> (latitude, longitude) of the A&E department entrance, approximately.
+HOSPITAL_COORDINATES: Dict[str, Tuple[float, float]] = {
+    "AHN": (22.4587, 114.1746),
+    "CMC": (22.3406, 114.1532),
+    "KWH": (22.3151, 114.1724),
+    "NDH": (22.4968, 114.1246),
+    "NLT": (22.2824, 113.9388),
+    "PYN": (22.2697, 114.2366),
+    "POH": (22.4452, 114.0418),
+    "PWH": (22.3795, 114.2013),
+    "PMH": (22.3401, 114.1346),
+    "QEH": (22.3093, 114.1750),
+    "QMH": (22.2700, 114.1314),
+    "RH": (22.2759, 114.1750),
+    "SJH": (22.2090, 114.0290),
+    "TSH": (22.4584, 113.9957),
+    "TKO": (22.3184, 114.2700),
+    "TMH": (22.4071, 113.9763),
+    "UCH": (22.3224, 114.2281),
+    "YCH": (22.3697, 114.1196),
+}
+
+# District key -> (latitude, longitude) of its main population centre, approximately.
+DISTRICT_CENTRES: Dict[str, Tuple[float, float]] = {
+    "central & western": (22.2860, 114.1500),
+    "wan chai": (22.2790, 114.1830),
+    "eastern": (22.2840, 114.2240),
+    "southern": (22.2470, 114.1600),
+    "yau tsim mong": (22.3110, 114.1700),
+    "sham shui po": (22.3300, 114.1620),
+    "kowloon city": (22.3280, 114.1910),
+    "wong tai sin": (22.3420, 114.1950),
+    "kwun tong": (22.3130, 114.2250),
+    "kwai tsing": (22.3540, 114.1300),
+    "tsuen wan": (22.3710, 114.1140),
+    "tuen mun": (22.3910, 113.9770),
+    "yuen long": (22.4450, 114.0220),
+    "north": (22.5000, 114.1280),
+    "tai po": (22.4500, 114.1640),
+    "sha tin": (22.3830, 114.1880),
+    "sai kung": (22.3150, 114.2640),
+    "islands": (22.2870, 113.9420),
+}
+
+_SUFFIXES = re.compile(r"(\s+district|\s+cluster|區|区|聯網|联网)$")
+
+
+def normalize(name: str) -> str:
+    """Normalize a free-text name for comparison: case, spacing, '&'/'and' and suffixes."""
+    text = re.sub(r"\s+", " ", str(name).strip().lower())
+    text = text.replace(" and ", " & ").replace("st.", "st")
+    return _SUFFIXES.sub("", text).strip()
+
+
+def _alias_table(table: Dict[str, Tuple[str, ...]], columns: int = 3) -> Dict[str, str]:
+    """Map every normalized language variant and the key itself to the canonical key."""
+    aliases = {}
+    for key, names in table.items():
+        aliases[normalize(key)] = key
+        for name in names[:columns]:
+            aliases[normalize(name)] = key
+    return aliases
+
+
+_DISTRICT_ALIASES = _alias_table(DISTRICTS)
+_CLUSTER_ALIASES = _alias_table(CLUSTERS)
+_SPECIALTY_ALIASES = _alias_table(SPECIALTIES)
+_SPECIALTY_ALIASES.update({"ent": "ent", "ear, nose and throat": "ent", "o&t": "ort"})
+_CATEGORY_ALIASES = _alias_table(CATEGORIES)
+_CATEGORY_ALIASES.update({"semi urgent": "semi-urgent", "routine": "stable"})
+_HOSPITAL_ALIASES = _alias_table(AED_HOSPITALS)
+
+
+def _canonical(aliases: Dict[str, str], name: Optional[str]) -> Optional[str]:
+    """Return the canonical key for name, or its normalized form if unknown."""
+    if name is None or str(name).strip() == "":
+        return None
+    text = normalize(name)
+    return aliases.get(text, text)
+
+
+def canonical_district(name: Optional[str]) -> Optional[str]:
+    """Return the canonical key of a district name in any language."""
+    return _canonical(_DISTRICT_ALIASES, name)
+
+
+def canonical_cluster(name: Optional[str]) -> Optional[str]:
+    """Return the canonical key of a cluster name or code in any language."""
+    return _canonical(_CLUSTER_ALIASES, name)
+
+
+def canonical_specialty(name: Optional[str]) -> Optional[str]:
+    """Return the canonical key of a specialty name in any language."""
+    return _canonical(_SPECIALTY_ALIASES, name)
+
+
+def canonical_category(name: Optional[str]) -> Optional[str]:
+    """Return the canonical key of a specialist triage category in any language."""
+    return _canonical(_CATEGORY_ALIASES, name)
+
+
+def canonical_hospital(name: Optional[str]) -> Optional[str]:
+    """Return the hospital code of an A&E hospital name in any language."""
+    key = _canonical(_HOSPITAL_ALIASES, name)
+    return key.upper() if key is not None and key.upper() in AED_HOSPITALS else key
+
+
+def hospital_cluster(code: Optional[str]) -> Optional[str]:
+    """Return the canonical cluster key of an A&E hospital code."""
+    hospital = AED_HOSPITALS.get(code or "")
+    return hospital[3] if hospital else None
+
+
+def hospital_district(code: Optional[str]) -> Optional[str]:
+    """Return the canonical district key of an A&E hospital code."""
+    hospital = AED_HOSPITALS.get(code or "")
+    return hospital[4] if hospital else None
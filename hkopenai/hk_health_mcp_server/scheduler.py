@@ -0,0 +1,187 @@
+"""
+Module providing the background refresh scheduler that keeps Hospital Authority feeds warm.
+Each feed is prefetched in every language on its own interval so tool calls are served
+from the latest snapshot, and failed refreshes leave the last good snapshot in place.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from . import cache
+from .feeds import FEEDS, LANGUAGES, Feed
+from .http_client import circuit_states, fetch_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVALS = {"aed": 2 * 60, "specialist": 60 * 60, "gopc": 60 * 60}
+RETRY_INTERVAL = 30
+
+
+def intervals_from_env() -> Dict[str, float]:
+    """Return refresh intervals overridden by HK_HEALTH_REFRESH_INTERVALS.
+
+    The variable holds comma separated 'feed=seconds' pairs, e.g. 'aed=60,gopc=1800'.
+    An interval of 0 disables background refresh for that feed.
+    """
+    intervals = dict(DEFAULT_REFRESH_INTERVALS)
+    for item in os.environ.get("HK_HEALTH_REFRESH_INTERVALS", "").split(","):
+        name, _, seconds = item.partition("=")
+        name = name.strip()
+        if name in FEEDS:
+            try:
+                intervals[name] = float(seconds)
+            except ValueError:
+                logger.warning("Ignoring invalid refresh interval %r", item)
+    return intervals
+
+
+def background_refresh_enabled() -> bool:
+    """Return False if HK_HEALTH_BACKGROUND_REFRESH disables the scheduler."""
+    return os.environ.get("HK_HEALTH_BACKGROUND_REFRESH", "true").lower() not in (
+        "0",
+        "false",
+        "no",
+    )
+
+
+class RefreshState:
+    """Refresh bookkeeping for one feed language variant."""
+
+    __slots__ = (
+        "feed",
+        "lang",
+        "interval",
+        "last_attempt",
+        "last_success",
+        "last_error",
+        "consecutive_failures",
+        "refreshes",
+    )
+
+    def __init__(self, feed: Feed, lang: str, interval: float):
+        self.feed = feed
+        self.lang = lang
+        self.interval = interval
+        self.last_attempt: Optional[datetime] = None
+        self.last_success: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self.consecutive_failures = 0
+        self.refreshes = 0
+
+    def as_dict(self) -> Dict:
+        """Return the state as a JSON serialisable dictionary."""
+        return {
+            "feed": self.feed.name,
+            "lang": self.lang,
+            "interval_seconds": self.interval,
+            "last_attempt": self.last_attempt.isoformat() if self.last_attempt else None,
+            "last_success": self.last_success.isoformat() if self.last_success else None,
+            "last_error": self.last_error,
+            "consecutive_failures": self.consecutive_failures,
+            "refreshes": self.refreshes,
+        }
+
+
+class RefreshScheduler:
+    """Periodically refreshes every feed and language into the shared response cache."""
+
+    def __init__(
+        self,
+        intervals: Optional[Dict[str, float]] = None,
+        languages: tuple = LANGUAGES,
+    ):
+        self.intervals = intervals
+        self.languages = languages
+        self._states: Dict[tuple, RefreshState] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        """Return True while refresh tasks are active."""
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start one refresh task per feed and language on the running event loop."""
+        if self.running:
+            return
+        intervals = self.intervals if self.intervals is not None else intervals_from_env()
+        self._states.clear()
+        for name, feed in FEEDS.items():
+            interval = intervals.get(name, 0)
+            if interval <= 0:
+                continue
+            for lang in self.languages:
+                state = RefreshState(feed, lang, interval)
+                self._states[(name, lang)] = state
+                cache.background_refresh_keys.add((feed.url(lang), lang))
+                self._tasks.append(asyncio.create_task(self._run(state)))
+
+    async def stop(self) -> None:
+        """Cancel the refresh tasks and hand the keys back to on-demand fetching."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for state in self._states.values():
+            cache.background_refresh_keys.discard((state.feed.url(state.lang), state.lang))
+
+    async def refresh(self, state: RefreshState) -> bool:
+        """Refresh one feed variant now and record the outcome.
+
+        Returns:
+            True if a fresh snapshot was stored in the cache.
+        """
+        state.last_attempt = datetime.now()
+        # Keep entries fresh until the next refresh is due so requests never expire them.
+        # A version another worker stored within the interval counts as this refresh.
+        ttl = max(state.feed.ttl, state.interval + RETRY_INTERVAL)
+        try:
+            result = await cache.refresh_feed(
+                state.feed, state.lang, fetch_json, ttl=ttl, max_age=state.interval
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            result = cache.FeedResult({"error": repr(e)}, datetime.now(), False)
+        if result.is_error:
+            state.last_error = result.data["error"]
+            state.consecutive_failures += 1
+            logger.warning(
+                "Refresh of %s (%s) failed: %s", state.feed.name, state.lang, state.last_error
+            )
+            return False
+        state.last_success = result.fetched_at
+        state.last_error = None
+        state.consecutive_failures = 0
+        state.refreshes += 1
+        return True
+
+    async def _run(self, state: RefreshState) -> None:
+        """Refresh a feed variant forever, retrying sooner after a failure."""
+        while True:
+            ok = await self.refresh(state)
+            await asyncio.sleep(state.interval if ok else min(state.interval, RETRY_INTERVAL))
+
+    def status(self) -> Dict:
+        """Return the scheduler state and upstream circuit breakers for monitoring."""
+        return {
+            "running": self.running,
+            "feeds": [state.as_dict() for state in self._states.values()],
+            "circuits": circuit_states(),
+        }
+
+
+refresh_scheduler = RefreshScheduler()
+
+
+def register(mcp):
+    """Registers the refresh status resource with the FastMCP server."""
+
+    @mcp.resource(
+        "hkhealth://status/refresh",
+        description="Background refresh state of the Hospital Authority feeds",
+        mime_type="application/json",
+    )
+    def get_refresh_status() -> Dict:
+        return refresh_scheduler.status()
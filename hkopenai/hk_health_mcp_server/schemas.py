@@ -0,0 +1,329 @@
+"""
+Module describing the rows of the Hospital Authority feeds as typed schemas.
+Rows are checked and converted once when a feed is ingested: rows lacking a key field
+or holding something other than a number in a numeric field are quarantined, numbers
+published where text is expected are turned into text, and the numeric fields are
+parsed into arrays without guessing which columns hold numbers.
+Each ingested version also gets a fingerprint of its field names and value types, so a
+change in the upstream layout is logged and counted as drift, and a version whose rows
+mostly fail validation is rejected in favour of the last good one.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from . import metrics
+from .columnar import _to_number
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_QUARANTINE_RATIO = 0.5
+QUARANTINE_SAMPLES = 20  # Quarantined rows kept per feed for inspection.
+FINGERPRINT_HISTORY = 10  # Earlier fingerprints kept per feed.
+
+_JSON_TYPES = {
+    str: "string",
+    int: "number",
+    float: "number",
+    bool: "boolean",
+    type(None): "null",
+    dict: "object",
+    list: "array",
+}
+
+
+def _json_type(value: Any) -> str:
+    """Return the JSON type name of a decoded value."""
+    return _JSON_TYPES.get(type(value), "other")
+
+
+def fingerprint(fields: Dict[str, Tuple[str, ...]]) -> str:
+    """Return a short digest of field names and the JSON types seen in each."""
+    text = json.dumps(sorted(fields.items()), separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass(frozen=True)
+class ValidationReport:
+    """The outcome of validating the rows of one ingested feed version.
+
+    Attributes:
+        rows: Number of rows published.
+        quarantined: Number of rows set aside as not matching the schema.
+        reasons: Quarantined rows by reason ('not_object', 'missing_field' or 'invalid_field').
+        samples: Up to QUARANTINE_SAMPLES quarantined rows with the reason of each.
+        fields: JSON types seen in each field of the published rows.
+        fingerprint: Digest of fields.
+    """
+
+    rows: int
+    quarantined: int
+    reasons: Dict[str, int] = field(default_factory=dict)
+    samples: Tuple[Dict[str, Any], ...] = ()
+    fields: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    fingerprint: str = ""
+
+    @property
+    def ratio(self) -> float:
+        """Return the share of rows quarantined."""
+        return self.quarantined / self.rows if self.rows else 0.0
+
+
+@dataclass(frozen=True)
+class RowSchema:
+    """The fields expected in the rows of one feed.
+
+    Fields not named here are kept as published.
+
+    Attributes:
+        required: Text fields every row must carry; rows without them are dropped.
+        text: Other text fields.
+        numbers: Fields holding numbers, published as JSON numbers or numeric strings;
+            rows with any other value in them are dropped.
+    """
+
+    required: Tuple[str, ...] = ()
+    text: Tuple[str, ...] = ()
+    numbers: Tuple[str, ...] = ()
+
+    def check(self, row: Any) -> Tuple[Optional[Dict[str, Any]], str]:
+        """Return the row with its text fields as strings, or None and why it is invalid."""
+        if not isinstance(row, dict):
+            return None, "not_object"
+        for name in self.numbers:
+            if name in row and _to_number(row[name]) is None:
+                return None, "invalid_field"
+        converted = row
+        for name in self.required + self.text:
+            if name not in row:
+                if name in self.required:
+                    return None, "missing_field"
+                continue
+            value = row[name]
+            if type(value) is str:  # pylint: disable=unidiomatic-typecheck
+                continue
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+            if not is_number and name in self.required:
+                return None, "invalid_field"
+            if converted is row:
+                converted = dict(row)
+            if is_number:
+                converted[name] = str(value)
+            else:  # A null or nested value where optional text is expected.
+                del converted[name]
+        return converted, ""
+
+    def inspect(self, rows: Iterable[Any]) -> Tuple[List[Dict[str, Any]], ValidationReport]:
+        """Return the converted valid rows and a report of quarantined rows and field types."""
+        result = []
+        reasons: Dict[str, int] = {}
+        samples: List[Dict[str, Any]] = []
+        types: Dict[str, set] = {}
+        count = 0
+        for row in rows:
+            count += 1
+            if isinstance(row, dict):
+                for name, value in row.items():
+                    seen = types.get(name)
+                    if seen is None:
+                        seen = types[name] = set()
+                    seen.add(_json_type(value))
+            converted, reason = self.check(row)
+            if converted is not None:
+                result.append(converted)
+                continue
+            reasons[reason] = reasons.get(reason, 0) + 1
+            if len(samples) < QUARANTINE_SAMPLES:
+                samples.append({"reason": reason, "row": row})
+        fields = {name: tuple(sorted(seen)) for name, seen in types.items()}
+        report = ValidationReport(
+            rows=count,
+            quarantined=count - len(result),
+            reasons=reasons,
+            samples=tuple(samples),
+            fields=fields,
+            fingerprint=fingerprint(fields),
+        )
+        return result, report
+
+
+AED_ROW = RowSchema(required=("hospName",), text=("topWait",))
+SPECIALIST_ROW = RowSchema(required=("cluster", "specialty"), text=("Category", "Value"))
+GOPC_ROW = RowSchema(required=("District", "Clinic"), text=("Session",), numbers=("AvgQuota",))
+
+
+@dataclass
+class _FeedSchemaState:
+    """What the monitor knows of one feed."""
+
+    fingerprint: str = ""
+    fields: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+    since: Optional[datetime] = None
+    drift_events: int = 0
+    rejected: int = 0
+    last: Optional[ValidationReport] = None
+    last_at: Optional[datetime] = None
+    history: Deque[Dict[str, Any]] = field(
+        default_factory=lambda: deque(maxlen=FINGERPRINT_HISTORY)
+    )
+    quarantine: Deque[Dict[str, Any]] = field(
+        default_factory=lambda: deque(maxlen=QUARANTINE_SAMPLES)
+    )
+
+
+def _diff(old: Dict[str, Tuple[str, ...]], new: Dict[str, Tuple[str, ...]]) -> Dict[str, List[str]]:
+    """Return the fields added, removed and retyped between two field type maps."""
+    return {
+        "added": sorted(set(new) - set(old)),
+        "removed": sorted(set(old) - set(new)),
+        "retyped": sorted(name for name in set(old) & set(new) if old[name] != new[name]),
+    }
+
+
+class SchemaMonitor:
+    """Tracks the validation reports of ingested feed versions.
+
+    Each feed's fingerprint is compared with the one of its previous version; a change
+    is logged and counted as drift. Quarantined rows are kept for inspection, and a
+    version with more than max_ratio of its rows quarantined is rejected.
+    """
+
+    def __init__(self, max_ratio: float = DEFAULT_MAX_QUARANTINE_RATIO):
+        self.max_ratio = max_ratio
+        self._lock = threading.Lock()
+        self._feeds: Dict[str, _FeedSchemaState] = {}
+
+    def clear(self) -> None:
+        """Forget every feed."""
+        with self._lock:
+            self._feeds.clear()
+
+    def observe(self, feed: str, report: ValidationReport) -> bool:
+        """Record the report of a newly ingested version of a feed.
+
+        Args:
+            feed: Name of the feed.
+            report: Validation report of the version.
+
+        Returns:
+            False if the version must be rejected because too many rows were quarantined.
+        """
+        now = datetime.now()
+        accepted = report.ratio <= self.max_ratio or not report.rows
+        with self._lock:
+            state = self._feeds.setdefault(feed, _FeedSchemaState())
+            state.last, state.last_at = report, now
+            for sample in report.samples:
+                state.quarantine.append({**sample, "at": now.isoformat()})
+            if not accepted:
+                state.rejected += 1
+            changed = None
+            if report.rows and report.fingerprint != state.fingerprint:
+                if state.fingerprint:
+                    changed = _diff(state.fields, report.fields)
+                    state.drift_events += 1
+                    state.history.append(
+                        {
+                            "fingerprint": state.fingerprint,
+                            "fields": state.fields,
+                            "since": state.since.isoformat() if state.since else None,
+                            "until": now.isoformat(),
+                        }
+                    )
+                state.fingerprint, state.fields = report.fingerprint, report.fields
+                state.since = now
+        if metrics.ENABLED:
+            metrics.QUARANTINE_RATIO.set(feed, value=report.ratio)
+            for reason, count in report.reasons.items():
+                metrics.ROWS_QUARANTINED.inc(feed, reason, amount=count)
+            if changed is not None:
+                metrics.SCHEMA_DRIFT.inc(feed)
+            if not accepted:
+                metrics.SNAPSHOTS_REJECTED.inc(feed)
+        if report.quarantined:
+            logger.warning(
+                "Quarantined %d of %d rows of feed %s not matching the schema: %s",
+                report.quarantined,
+                report.rows,
+                feed,
+                report.reasons,
+            )
+        if changed is not None:
+            logger.warning(
+                "Schema of feed %s changed to %s: added %s, removed %s, retyped %s",
+                feed,
+                report.fingerprint,
+                changed["added"],
+                changed["removed"],
+                changed["retyped"],
+            )
+        if not accepted:
+            logger.error(
+                "Rejected a version of feed %s: %d of %d rows failed validation",
+                feed,
+                report.quarantined,
+                report.rows,
+            )
+        return accepted
+
+    def status(self) -> Dict[str, Any]:
+        """Return the fingerprint, drift and quarantine state of every feed for monitoring."""
+        with self._lock:
+            return {
+                "max_quarantine_ratio": self.max_ratio,
+                "feeds": [
+                    {
+                        "feed": name,
+                        "fingerprint": state.fingerprint,
+                        "fields": state.fields,
+                        "since": state.since.isoformat() if state.since else None,
+                        "drift_events": state.drift_events,
+                        "rejected_versions": state.rejected,
+                        "last_ingest": (
+                            None
+                            if state.last is None
+                            else {
+                                "at": state.last_at.isoformat(),
+                                "rows": state.last.rows,
+                                "quarantined": state.last.quarantined,
+                                "reasons": state.last.reasons,
+                            }
+                        ),
+                        "previous_fingerprints": list(state.history),
+                        "quarantine": list(state.quarantine),
+                    }
+                    for name, state in self._feeds.items()
+                ],
+            }
+
+
+def max_ratio_from_env() -> float:
+    """Return the quarantined share rejecting a version, from HK_HEALTH_MAX_QUARANTINE_RATIO."""
+    try:
+        return float(
+            os.environ.get("HK_HEALTH_MAX_QUARANTINE_RATIO", DEFAULT_MAX_QUARANTINE_RATIO)
+        )
+    except ValueError:
+        return DEFAULT_MAX_QUARANTINE_RATIO
+
+
+schema_monitor = SchemaMonitor(max_ratio_from_env())
+
+
+def register(mcp):
+    """Registers the feed schema status resource with the FastMCP server."""
+
+    @mcp.resource(
+        "hkhealth://status/schemas",
+        description="Schema fingerprints, drift and quarantined rows of the Hospital Authority feeds",
+        mime_type="application/json",
+    )
+    def get_schema_status() -> Dict:
+        return schema_monitor.status()
@@ -0,0 +1,261 @@
+"""
+Module providing the JSON encoding and decoding used for feed bodies and tool responses.
+orjson or msgspec is used when installed and the standard library otherwise; the choice
+can be forced with HK_HEALTH_JSON. Payloads served from an unchanged snapshot are kept
+with their encoded JSON, so repeated calls splice the stored text into the response
+instead of serializing the same rows again, and tool results are handed to FastMCP
+already encoded.
+"""
+
+import functools
+import importlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("orjson", "msgspec", "json")
+DEFAULT_MEMO_SIZE = 64
+
+_settings: Dict[str, Any] = {
+    "backend": os.environ.get("HK_HEALTH_JSON", "auto").strip().lower() or "auto",
+    "encode_responses": True,
+}
+_codec: Optional[Tuple[str, Callable[[bytes], Any], Callable[[Any], str], Tuple]] = None
+
+# Called with the JSON text of every payload encoded for the first time.
+encoding_listeners: List[Callable[[str], None]] = []
+
+
+def _stdlib_codec():
+    """Return the standard library decoder and compact encoder."""
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+    return json.loads, encoder.encode, (ValueError,)
+
+
+def _orjson_codec():
+    """Return the orjson decoder and encoder."""
+    orjson = importlib.import_module("orjson")
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(value: Any) -> str:
+        return orjson.dumps(value, default=str, option=option).decode("utf-8")
+
+    return orjson.loads, dumps, (ValueError,)
+
+
+def _msgspec_codec():
+    """Return the msgspec decoder and encoder."""
+    msgspec = importlib.import_module("msgspec")
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder(enc_hook=str)
+
+    def dumps(value: Any) -> str:
+        return encoder.encode(value).decode("utf-8")
+
+    return decoder.decode, dumps, (msgspec.DecodeError, ValueError)
+
+
+_FACTORIES = {"orjson": _orjson_codec, "msgspec": _msgspec_codec, "json": _stdlib_codec}
+
+
+def _select() -> Tuple[str, Callable[[bytes], Any], Callable[[Any], str], Tuple]:
+    """Load the configured backend, or the fastest installed one for 'auto'."""
+    wanted = _settings["backend"]
+    if wanted == "auto":
+        candidates = [n for n in BACKENDS if importlib.util.find_spec(n) is not None]
+    elif wanted in _FACTORIES:
+        candidates = [wanted, "json"]
+    else:
+        logger.warning("Ignoring unknown HK_HEALTH_JSON backend %r", wanted)
+        candidates = ["json"]
+    for name in candidates:
+        try:
+            return (name, *_FACTORIES[name]())
+        except ImportError:
+            logger.warning("JSON backend %s is not installed; falling back", name)
+    return ("json", *_stdlib_codec())
+
+
+def _get_codec():
+    """Return the active codec, loading it on first use."""
+    global _codec  # pylint: disable=global-statement
+    if _codec is None:
+        _codec = _select()
+    return _codec
+
+
+def configure(backend: Optional[str] = None, encode_responses: Optional[bool] = None) -> None:
+    """Change the JSON backend or turn pre-encoded tool results on or off.
+
+    Args:
+        backend: 'auto', 'orjson', 'msgspec' or 'json'.
+        encode_responses: If False, tools return plain dictionaries and FastMCP
+            serializes them itself, as before this module existed.
+    """
+    global _codec  # pylint: disable=global-statement
+    if backend is not None:
+        _settings["backend"] = backend
+        _codec = None
+    if encode_responses is not None:
+        _settings["encode_responses"] = encode_responses
+
+
+def backend() -> str:
+    """Return the name of the JSON backend in use."""
+    return _get_codec()[0]
+
+
+def loads(content: bytes) -> Any:
+    """Decode a UTF-8 JSON document.
+
+    Raises:
+        ValueError: If content is not valid JSON.
+    """
+    _, decode, _, errors = _get_codec()
+    try:
+        return decode(content)
+    except errors as err:
+        if isinstance(err, ValueError):
+            raise
+        raise ValueError(str(err)) from err
+
+
+def dumps(value: Any) -> str:
+    """Encode a value as compact JSON, keeping non-ASCII characters as they are."""
+    return _get_codec()[2](value)
+
+
+class EncodedList(list):
+    """A list payload that keeps its JSON encoding once computed."""
+
+    __slots__ = ("encoded",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.encoded: Optional[str] = None
+
+
+class EncodedDict(dict):
+    """A dictionary payload that keeps its JSON encoding once computed."""
+
+    __slots__ = ("encoded",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encoded: Optional[str] = None
+
+
+def add_encoding_listener(listener: Callable[[str], None]) -> None:
+    """Call listener with the JSON text of every payload when it is first encoded."""
+    if listener not in encoding_listeners:
+        encoding_listeners.append(listener)
+
+
+def remove_encoding_listener(listener: Callable[[str], None]) -> None:
+    """Stop calling a listener registered with add_encoding_listener."""
+    if listener in encoding_listeners:
+        encoding_listeners.remove(listener)
+
+
+def encodable(value: Any) -> Any:
+    """Return a list or dictionary as one that keeps its encoding; other values unchanged."""
+    if isinstance(value, (EncodedList, EncodedDict)):
+        return value
+    if isinstance(value, list):
+        return EncodedList(value)
+    if isinstance(value, dict):
+        return EncodedDict(value)
+    return value
+
+
+def encode(value: Any) -> str:
+    """Encode a value, reusing and storing the encoding of an encodable payload."""
+    if isinstance(value, (EncodedList, EncodedDict)):
+        if value.encoded is None:
+            value.encoded = dumps(value)
+            for listener in encoding_listeners:
+                listener(value.encoded)
+        return value.encoded
+    return dumps(value)
+
+
+def dumps_response(response: Dict[str, Any]) -> str:
+    """Encode a tool response, splicing in the stored encoding of its payload values."""
+    return "{" + ",".join(dumps(str(k)) + ":" + encode(v) for k, v in response.items()) + "}"
+
+
+class ResponseMemo:
+    """Bounded map of the payloads built from one snapshot, by what selected them.
+
+    A memo is kept among the derived structures of a snapshot, so it is dropped with
+    the snapshot and never serves rows of an older version.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MEMO_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the payload stored under key, building and storing it on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+        value = encodable(build())
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+
+def memo_key(positions: Any, fields: Any) -> Tuple:
+    """Return the memo key of the rows at positions projected to fields."""
+    return (
+        None if positions is None else tuple(positions),
+        None if not fields else tuple(fields),
+    )
+
+
+def _tool_result(response: Dict[str, Any]) -> Any:
+    """Wrap an encoded response in the result type FastMCP passes through unchanged."""
+    try:
+        from fastmcp.tools import ToolResult  # pylint: disable=import-outside-toplevel
+    except ImportError:  # FastMCP 2.x
+        from fastmcp.tools.tool import ToolResult  # pylint: disable=import-outside-toplevel
+    from mcp.types import TextContent  # pylint: disable=import-outside-toplevel
+
+    content = [TextContent(type="text", text=dumps_response(response))]
+    construct = getattr(ToolResult, "model_construct", None)
+    if construct is None:
+        return ToolResult(content=content, structured_content=response)
+    # Responses hold JSON types only, so the conversion pass over them is skipped.
+    return construct(content=content, structured_content=response)
+
+
+def encode_result(fn):
+    """Decorator returning a tool's dictionary response to FastMCP already encoded.
+
+    Other return values, and every response while encode_responses is off, are passed
+    through for FastMCP to serialize.
+    """
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        response = await fn(*args, **kwargs)
+        if not _settings["encode_responses"] or type(response) is not dict:  # pylint: disable=unidiomatic-typecheck
+            return response
+        return _tool_result(response)
+
+    return wrapper
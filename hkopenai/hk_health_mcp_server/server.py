@@ -3,8 +3,76 @@ Module for creating and running the HK OpenAI Health MCP Server.
 This server provides tools for accessing health-related data in Hong Kong.
 """
 
+from contextlib import asynccontextmanager
+
 from fastmcp import FastMCP
-from .tools import aed_waiting, specialist_waiting_time_by_cluster, pas_gopc_avg_quota
+from . import (
+    cache,
+    changefeed,
+    history,
+    http_client,
+    metrics,
+    quota_history,
+    ratelimit,
+    scheduler,
+    schemas,
+    snapshot_store,
+    specialist_matrix,
+)
+from .tools import (
+    aed_waiting,
+    aed_waiting_stats,
+    aed_nearest,
+    specialist_waiting_time_by_cluster,
+    specialist_ranking,
+    pas_gopc_avg_quota,
+    gopc_quota_trend,
+    health_snapshot,
+    batch_health_query,
+)
+
+
+@asynccontextmanager
+async def lifespan(_mcp):
+    """Persist snapshots, record AED and GOPC quota history and feed changes, build the specialist matrix, and keep the feeds warm while the server runs."""
+    store = snapshot_store.open_from_env()
+    cache.set_snapshot_store(store, shared=snapshot_store.shared_from_env())
+    history_path = history.path_from_env()
+    if history_path is not None:
+        history.aed_history.retention_days = history.retention_from_env()
+        try:
+            history.aed_history.open(history_path)
+        except (OSError, ValueError):
+            pass
+    cache.add_version_listener(history.aed_history.record_version)
+    quota_path = quota_history.path_from_env()
+    if quota_path is not None:
+        quota_history.quota_history.retention_weeks = quota_history.retention_from_env()
+        try:
+            quota_history.quota_history.open(quota_path)
+        except (OSError, ValueError):
+            pass
+    cache.add_version_listener(quota_history.quota_history.record_version)
+    cache.add_version_listener(changefeed.change_feed.record_version)
+    cache.add_version_listener(specialist_matrix.build_on_ingest)
+    changefeed.change_feed.add_listener(changefeed.subscription_hub.on_change)
+    if scheduler.background_refresh_enabled():
+        scheduler.refresh_scheduler.start()
+    try:
+        yield {}
+    finally:
+        await scheduler.refresh_scheduler.stop()
+        await http_client.aclose()
+        changefeed.change_feed.remove_listener(changefeed.subscription_hub.on_change)
+        cache.remove_version_listener(specialist_matrix.build_on_ingest)
+        cache.remove_version_listener(changefeed.change_feed.record_version)
+        cache.remove_version_listener(quota_history.quota_history.record_version)
+        quota_history.quota_history.close()
+        cache.remove_version_listener(history.aed_history.record_version)
+        history.aed_history.close()
+        cache.set_snapshot_store(None)
+        if store is not None:
+            store.close()
 
 
 def server():
@@ -15,10 +83,21 @@ def server():
     Returns:
         FastMCP: Configured MCP server instance with health tools registered.
     """
-    mcp = FastMCP(name="HK OpenAI Health Server")
+    mcp = FastMCP(name="HK OpenAI Health Server", lifespan=lifespan)
 
     aed_waiting.register(mcp)
+    aed_waiting_stats.register(mcp)
+    aed_nearest.register(mcp)
     specialist_waiting_time_by_cluster.register(mcp)
+    specialist_ranking.register(mcp)
     pas_gopc_avg_quota.register(mcp)
+    gopc_quota_trend.register(mcp)
+    health_snapshot.register(mcp)
+    batch_health_query.register(mcp)
+    changefeed.register(mcp)
+    scheduler.register(mcp)
+    schemas.register(mcp)
+    metrics.register(mcp)
+    ratelimit.register(mcp)
 
     return mcp
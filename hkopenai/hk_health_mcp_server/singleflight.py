@@ -0,0 +1,82 @@
+"""
+Module providing request coalescing for upstream fetches.
+Concurrent callers asking for the same key share a single in-flight call and all
+receive its result, so a cache expiry does not turn into a burst of identical requests.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+
+class _Call:
+    """An in-flight call and the number of callers waiting for it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one execution.
+
+    The call runs in its own task, so a waiting caller being cancelled (for example
+    when its client disconnects) does not cancel the others; the call itself is only
+    cancelled once every caller waiting for it is gone.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Await fn for key unless a call for key is already in flight.
+
+        Args:
+            key: Identifier of the call, typically the upstream URL.
+            fn: Coroutine function performing the work.
+
+        Returns:
+            A tuple of the result and whether it was shared from another caller's call.
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every waiting caller.
+        """
+        stats = self._stats.setdefault(key, {"calls": 0, "coalesced": 0})
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            stats["coalesced"] += 1
+        else:
+            stats["calls"] += 1
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _task, c=call: self._forget(key, c))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _Call) -> None:
+        """Stop coalescing new callers into a call that is done or abandoned."""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def in_flight(self) -> int:
+        """Return the number of keys currently being fetched."""
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return per-key counts of executed calls and coalesced callers."""
+        return {key: dict(value) for key, value in self._stats.items()}
+
+    def reset(self) -> None:
+        """Clear the per-key statistics."""
+        self._stats.clear()
+
+
+upstream_flight = SingleFlight()
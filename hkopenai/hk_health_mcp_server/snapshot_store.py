@@ -0,0 +1,223 @@
+"""
+Module providing a persistent on-disk store of fetched feed snapshots.
+Each successfully fetched feed version is written to a local SQLite database with its
+fetch time, so a newly started server can answer from the last known data before
+(or without) reaching the Hospital Authority. Old versions are pruned on write.
+Several server processes can share one store: it also provides per-feed locks so
+that only one process at a time fetches a feed from the Hospital Authority.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: feed locks are not shared between processes.
+    fcntl = None
+
+DEFAULT_PATH = os.path.join("~", ".cache", "hkopenai", "hk_health_snapshots.sqlite3")
+DEFAULT_KEEP_VERSIONS = 48
+DEFAULT_MAX_AGE_DAYS = 7.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    digest TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_by_url ON snapshots (url, fetched_at);
+"""
+
+
+def path_from_env() -> Optional[str]:
+    """Return the snapshot database path from HK_HEALTH_SNAPSHOT_PATH.
+
+    An empty value, 'off' or 'false' disables the store.
+    """
+    path = os.environ.get("HK_HEALTH_SNAPSHOT_PATH", DEFAULT_PATH).strip()
+    if path.lower() in ("", "0", "off", "false", "no"):
+        return None
+    return os.path.expanduser(path)
+
+
+def retention_from_env() -> Tuple[int, float]:
+    """Return the (versions kept per feed variant, maximum age in days) settings."""
+    try:
+        keep = int(os.environ.get("HK_HEALTH_SNAPSHOT_KEEP", DEFAULT_KEEP_VERSIONS))
+    except ValueError:
+        keep = DEFAULT_KEEP_VERSIONS
+    try:
+        max_age_days = float(
+            os.environ.get("HK_HEALTH_SNAPSHOT_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)
+        )
+    except ValueError:
+        max_age_days = DEFAULT_MAX_AGE_DAYS
+    return max(keep, 1), max_age_days
+
+
+def shared_from_env() -> bool:
+    """Return True if HK_HEALTH_SHARED_CACHE says other server processes share the store."""
+    return os.environ.get("HK_HEALTH_SHARED_CACHE", "false").lower() in ("1", "true", "yes")
+
+
+class SnapshotStore:
+    """Feed versions persisted in SQLite, keyed by feed URL.
+
+    Payloads are stored as zlib-compressed JSON. A version identical to the latest
+    stored one only moves its fetch time forward. Pruning never removes the latest
+    version of a URL, so an offline server always has something to serve.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        keep_versions: int = DEFAULT_KEEP_VERSIONS,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+    ):
+        self.path = path
+        self.keep_versions = keep_versions
+        self.max_age_days = max_age_days
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            if path != ":memory:":
+                # Readers in other processes do not block a writer, nor the other way round.
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        self._lock_file = None
+        if fcntl is not None and path != ":memory:":
+            self._lock_file = open(path + ".lock", "a+b")  # pylint: disable=consider-using-with
+
+    def save(self, url: str, payload: Any, fetched_at: datetime) -> None:
+        """Persist a fetched payload of a URL and prune versions beyond the retention."""
+        encoded = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(encoded).hexdigest()
+        timestamp = fetched_at.timestamp()
+        with self._lock, self._conn:
+            latest = self._conn.execute(
+                "SELECT id, digest FROM snapshots WHERE url = ? ORDER BY fetched_at DESC LIMIT 1",
+                (url,),
+            ).fetchone()
+            if latest is not None and latest[1] == digest:
+                self._conn.execute(
+                    "UPDATE snapshots SET fetched_at = ? WHERE id = ?", (timestamp, latest[0])
+                )
+                return
+            self._conn.execute(
+                "INSERT INTO snapshots (url, fetched_at, digest, payload) VALUES (?, ?, ?, ?)",
+                (url, timestamp, digest, zlib.compress(encoded)),
+            )
+            self._prune(url)
+
+    def touch(self, url: str, fetched_at: datetime) -> None:
+        """Record that the latest stored version of a URL was confirmed unchanged."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE snapshots SET fetched_at = ? WHERE id = ("
+                "SELECT id FROM snapshots WHERE url = ? ORDER BY fetched_at DESC LIMIT 1)",
+                (fetched_at.timestamp(), url),
+            )
+
+    def _prune(self, url: str) -> None:
+        """Delete versions of a URL beyond the count and age limits, keeping the latest."""
+        self._conn.execute(
+            "DELETE FROM snapshots WHERE url = ? AND id NOT IN ("
+            "SELECT id FROM snapshots WHERE url = ? ORDER BY fetched_at DESC LIMIT ?)",
+            (url, url, self.keep_versions),
+        )
+        if self.max_age_days > 0:
+            self._conn.execute(
+                "DELETE FROM snapshots WHERE url = ? AND fetched_at < ? AND id != ("
+                "SELECT id FROM snapshots WHERE url = ? ORDER BY fetched_at DESC LIMIT 1)",
+                (url, time.time() - self.max_age_days * 86400, url),
+            )
+
+    def latest(self, url: str) -> Optional[Tuple[Any, datetime]]:
+        """Return the most recent stored payload of a URL and its fetch time, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, fetched_at FROM snapshots WHERE url = ? "
+                "ORDER BY fetched_at DESC LIMIT 1",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            payload = json.loads(zlib.decompress(row[0]).decode("utf-8"))
+        except (zlib.error, ValueError):
+            return None
+        return payload, datetime.fromtimestamp(row[1])
+
+    def latest_fetched_at(self, url: str) -> Optional[datetime]:
+        """Return the fetch time of the most recent stored version of a URL, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(fetched_at) FROM snapshots WHERE url = ?", (url,)
+            ).fetchone()
+        return None if row is None or row[0] is None else datetime.fromtimestamp(row[0])
+
+    def try_lock(self, url: str) -> bool:
+        """Take the cross-process lock of a URL without blocking; return whether it was taken.
+
+        The lock is a one-byte record lock of the store's lock file, so it is released
+        when the holding process exits. Without fcntl every attempt succeeds.
+        """
+        if self._lock_file is None:
+            return True
+        try:
+            fcntl.lockf(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, _lock_offset(url))
+        except OSError:
+            return False
+        return True
+
+    def unlock(self, url: str) -> None:
+        """Release the cross-process lock of a URL taken with try_lock."""
+        if self._lock_file is not None:
+            fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, _lock_offset(url))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the stored version count per URL."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, COUNT(*) FROM snapshots GROUP BY url ORDER BY url"
+            ).fetchall()
+        return {"path": self.path, "versions": dict(rows)}
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+            if self._lock_file is not None:
+                self._lock_file.close()
+
+
+def _lock_offset(url: str) -> int:
+    """Return the byte of the lock file that stands for a URL."""
+    return int.from_bytes(hashlib.sha1(url.encode("utf-8")).digest()[:4], "big") >> 1
+
+
+def open_from_env() -> Optional[SnapshotStore]:
+    """Open the snapshot store configured through the environment, if enabled.
+
+    A store that cannot be opened (e.g. a read-only path) disables persistence
+    rather than preventing the server from starting.
+    """
+    path = path_from_env()
+    if path is None:
+        return None
+    keep_versions, max_age_days = retention_from_env()
+    try:
+        return SnapshotStore(path, keep_versions, max_age_days)
+    except (OSError, sqlite3.Error):
+        return None
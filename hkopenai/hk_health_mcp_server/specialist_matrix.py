@@ -0,0 +1,202 @@
+"""
+Module holding the specialist outpatient waiting times of a snapshot as a dense matrix.
+Each published wait such as '12 weeks', '<1 week' or '37-40 weeks' is parsed into
+lower and upper bounds in weeks and stored in a numpy array indexed by triage
+category, specialty and cluster. The ranking of clusters, the median and the
+territory-wide bounds of every specialty and category are computed once per snapshot,
+so a comparison across clusters is answered without scanning the feed rows.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import warnings
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from .cache import CacheEntry
+from .columnar import MISSING, FeedTable
+from .feeds import SPECIALIST, Feed
+from .lazy import lazy_import
+from .reference import CATEGORIES, canonical_category, canonical_cluster, canonical_specialty
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_import("numpy")
+
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+_BELOW = re.compile(r"<|less than|under|within|少於|少于|不足", re.IGNORECASE)
+_ABOVE = re.compile(r">|over|more than|above|多於|多于|超過|超过|以上", re.IGNORECASE)
+_DAYS = re.compile(r"day|日|天", re.IGNORECASE)
+
+
+def parse_weeks(text: Any) -> Optional[Tuple[float, float]]:
+    """Convert a published wait into (lower, upper) bounds in weeks.
+
+    '<1 week' gives (0, 1), '37-40 weeks' gives (37, 40), '12 weeks' gives (12, 12)
+    and '>100 weeks' gives (100, inf). Waits given in days are converted to weeks.
+
+    Returns:
+        The bounds, or None if the text holds no number.
+    """
+    if isinstance(text, (int, float)) and not isinstance(text, bool):
+        return (float(text), float(text)) if math.isfinite(text) else None
+    if not isinstance(text, str):
+        return None
+    numbers = [float(n) for n in _NUMBER.findall(text.replace(",", ""))]
+    if not numbers:
+        return None
+    if _DAYS.search(text):
+        numbers = [n / 7 for n in numbers]
+    if _BELOW.search(text):
+        return 0.0, numbers[0]
+    if _ABOVE.search(text):
+        return numbers[0], math.inf
+    if len(numbers) > 1:
+        return min(numbers[:2]), max(numbers[:2])
+    return numbers[0], numbers[0]
+
+
+def _column(table: FeedTable, names: Sequence[str]) -> List[Any]:
+    """Return the first of the named columns the table has, or a column of MISSING."""
+    for name in names:
+        if name in table.names:
+            return table.column(name)
+    return [MISSING] * len(table)
+
+
+def _weeks(value: float) -> Optional[float]:
+    """Return a bound for a response: None when unknown or open-ended."""
+    return None if math.isnan(value) or math.isinf(value) else round(float(value), 2)
+
+
+class SpecialistMatrix:
+    """Specialist waiting times of one snapshot by category, specialty and cluster.
+
+    Attributes:
+        categories, specialties, clusters: Canonical keys along each axis.
+        bounds: Array of shape (categories, specialties, clusters, 2) holding the
+            lower and upper bound in weeks, NaN where no wait is published.
+        estimates: The wait used for ranking: the middle of the bounds, or the lower
+            bound of an open-ended wait.
+        ranks: Competition rank of each cluster within its category and specialty.
+        order: Clusters of each category and specialty from shortest to longest wait.
+    """
+
+    def __init__(
+        self,
+        categories: Sequence[str],
+        specialties: Sequence[str],
+        clusters: Sequence[str],
+        names: Dict[str, str],
+        texts: "np.ndarray",
+        bounds: "np.ndarray",
+    ):
+        self.categories = tuple(categories)
+        self.specialties = tuple(specialties)
+        self.clusters = tuple(clusters)
+        self.names = names
+        self.texts = texts
+        self.bounds = bounds
+        self._category_index = {key: i for i, key in enumerate(self.categories)}
+        self._specialty_index = {key: i for i, key in enumerate(self.specialties)}
+        low, high = bounds[..., 0], bounds[..., 1]
+        self.estimates = np.where(np.isinf(high), low, (low + high) / 2)
+        self.order = np.argsort(self.estimates, axis=2, kind="stable")
+        self.reporting = (~np.isnan(self.estimates)).sum(axis=2)
+        self.ranks = (self.estimates[..., None, :] < self.estimates[..., :, None]).sum(axis=-1) + 1
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # No cluster reports a wait.
+            self.medians = np.nanmedian(self.estimates, axis=2)
+            self.minimums = np.nanmin(low, axis=2)
+            self.maximums = np.nanmax(high, axis=2)
+
+    @classmethod
+    def from_table(cls, table: FeedTable) -> "SpecialistMatrix":
+        """Parse the rows of a specialist snapshot into a matrix.
+
+        Every known category has a row in the matrix, even if the feed has no wait
+        for it. Rows whose cluster, specialty or category is missing are left out;
+        where two rows give the same cell, the first one is kept.
+        """
+        columns = [
+            _column(table, names)
+            for names in (("Category", "category"), ("specialty",), ("cluster",), ("Value", "value"))
+        ]
+        keys = (canonical_category, canonical_specialty, canonical_cluster)
+        axes: Tuple[Dict[str, int], ...] = ({key: i for i, key in enumerate(CATEGORIES)}, {}, {})
+        names: Dict[str, str] = {}
+        cells: Dict[Tuple[int, int, int], Any] = {}
+        for category, specialty, cluster, value in zip(*columns):
+            raw = (category, specialty, cluster)
+            if any(not isinstance(text, str) for text in raw):
+                continue
+            cell = []
+            for axis, key_of, text in zip(axes, keys, raw):
+                key = key_of(text)
+                names.setdefault(key, text)
+                cell.append(axis.setdefault(key, len(axis)))
+            cells.setdefault(tuple(cell), value)
+        shape = tuple(len(axis) for axis in axes)
+        texts = np.full(shape, None, dtype=object)
+        bounds = np.full(shape + (2,), np.nan)
+        for cell, value in cells.items():
+            texts[cell] = None if value is MISSING else value
+            parsed = parse_weeks(value)
+            if parsed is not None:
+                bounds[cell] = parsed
+        return cls(*(list(axis) for axis in axes), names, texts, bounds)
+
+    def name(self, key: str) -> str:
+        """Return the name of a canonical key as published in the feed, or the key."""
+        if key in self.names:
+            return self.names[key]
+        return CATEGORIES[key][0] if key in CATEGORIES else key
+
+    def ranking(self, category: Optional[str], specialty: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the clusters ranked by wait for one category and specialty.
+
+        Args:
+            category: Canonical category key (see canonical_category).
+            specialty: Canonical specialty key (see canonical_specialty).
+
+        Returns:
+            The ranking and the territory-wide figures, or None if the feed has no such
+            category or specialty.
+        """
+        c = self._category_index.get(category)
+        s = self._specialty_index.get(specialty)
+        if c is None or s is None:
+            return None
+        entries = []
+        for k in self.order[c, s][: self.reporting[c, s]]:
+            key = self.clusters[k]
+            low, high = self.bounds[c, s, k]
+            entries.append(
+                {
+                    "rank": int(self.ranks[c, s, k]),
+                    "cluster": self.name(key),
+                    "cluster_code": key.upper(),
+                    "value": self.texts[c, s, k],
+                    "low_weeks": _weeks(low),
+                    "high_weeks": _weeks(high),
+                }
+            )
+        return {
+            "specialty": self.name(specialty),
+            "category": self.name(category),
+            "ranking": entries,
+            "clusters_reporting": int(self.reporting[c, s]),
+            "median_weeks": _weeks(self.medians[c, s]),
+            "territory_min_weeks": _weeks(self.minimums[c, s]),
+            "territory_max_weeks": _weeks(self.maximums[c, s]),
+            "territory_max_open_ended": bool(np.isinf(self.maximums[c, s])),
+        }
+
+
+def build_on_ingest(feed: Feed, _lang: str, entry: CacheEntry) -> None:
+    """Version listener building the matrix of every new specialist snapshot."""
+    if feed.name == SPECIALIST.name and isinstance(entry.data, FeedTable):
+        if "matrix" not in entry.derived:
+            entry.derived["matrix"] = SpecialistMatrix.from_table(entry.data)
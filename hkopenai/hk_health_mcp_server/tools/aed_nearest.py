@@ -0,0 +1,194 @@
+"""
+Module for ranking Accident and Emergency Departments in Hong Kong by how soon a patient
+could be seen from a given location: the current waiting time plus the travel time
+estimated from the straight-line distance.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import Field
+from typing_extensions import Annotated
+
+from .. import metrics, serialization
+from ..cache import get_feed_data
+from ..columnar import FeedTable
+from ..feeds import AED
+from ..geo import KDTree, in_hong_kong, project
+from ..history import parse_wait_minutes
+from ..http_client import fetch_json
+from ..reference import (
+    DISTRICT_CENTRES,
+    DISTRICTS,
+    HOSPITAL_COORDINATES,
+    canonical_district,
+    canonical_hospital,
+)
+
+DEFAULT_MINUTES_PER_KM = 2.0
+
+# Static index of the A&E hospitals, built once at import.
+_CODES: List[str] = list(HOSPITAL_COORDINATES)
+_TREE = KDTree([project(*HOSPITAL_COORDINATES[code]) for code in _CODES])
+
+# Hospital code -> (hospital name, published wait, wait in minutes) of one snapshot.
+Waits = Dict[str, Tuple[str, str, float]]
+
+
+def _build_waits(table: FeedTable) -> Tuple[Waits, float]:
+    """Join the AED rows with the hospital table and return them with the shortest wait."""
+    waits: Waits = {}
+    for row in table.rows(fields=["hospName", "topWait"]):
+        code = canonical_hospital(row.get("hospName"))
+        minutes = parse_wait_minutes(row.get("topWait"))
+        if code in HOSPITAL_COORDINATES and minutes is not None:
+            waits[code] = (row["hospName"], row["topWait"], minutes)
+    shortest = min((wait[2] for wait in waits.values()), default=0.0)
+    return waits, shortest
+
+
+def rank_hospitals(
+    waits: Waits,
+    shortest_wait: float,
+    origin: Tuple[float, float],
+    top_k: int,
+    minutes_per_km: float,
+) -> List[Tuple[float, float, str]]:
+    """Return (score, distance in km, hospital code) of the top_k hospitals by score.
+
+    The score is the wait plus minutes_per_km times the distance from origin, a
+    projected (x, y) position. Hospitals are visited nearest first and the search
+    stops once even the shortest wait could not beat the k-th best score.
+    """
+    best: List[Tuple[float, float, str]] = []  # Max-heap by score via negation.
+    for distance, index in _TREE.nearest(origin):
+        travel = distance * minutes_per_km
+        if len(best) == top_k and shortest_wait + travel >= -best[0][0]:
+            break
+        code = _CODES[index]
+        wait = waits.get(code)
+        if wait is None:
+            continue
+        item = (-(wait[2] + travel), -distance, code)
+        if len(best) < top_k:
+            heapq.heappush(best, item)
+        elif item > best[0]:
+            heapq.heapreplace(best, item)
+    return sorted((-score, -distance, code) for score, distance, code in best)
+
+
+def register(mcp):
+    """Registers the nearest A&E ranking tool with the FastMCP server."""
+
+    @mcp.tool(
+        description="Rank Accident and Emergency Departments in Hong Kong for a location (a district or latitude/longitude) by current waiting time plus estimated travel time, returning the best few"
+    )
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_nearest_aed_hospitals(
+        district: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: District of the patient in any language (e.g., 'Sha Tin' or '沙田'). Either a district or a latitude and longitude is required."
+            ),
+        ] = "",
+        latitude: Annotated[
+            Optional[float],
+            Field(description="Optional: Latitude of the patient (e.g., 22.3193)."),
+        ] = None,
+        longitude: Annotated[
+            Optional[float],
+            Field(description="Optional: Longitude of the patient (e.g., 114.1694)."),
+        ] = None,
+        top_k: Annotated[
+            Optional[int],
+            Field(description="Number of hospitals to return, between 1 and 18. Default 3."),
+        ] = 3,
+        minutes_per_km: Annotated[
+            Optional[float],
+            Field(
+                description="Travel minutes counted per kilometre of straight-line distance. Default 2 (about 30 km/h); use 0 to rank by waiting time only."
+            ),
+        ] = DEFAULT_MINUTES_PER_KM,
+        lang: Annotated[
+            Optional[str],
+            Field(
+                description="Language (en/tc/sc) English, Traditional Chinese, Simplified Chinese. Default English",
+                json_schema_extra={"enum": ["en", "tc", "sc"]},
+            ),
+        ] = "en",
+    ) -> Dict:
+        return await _get_nearest_aed_hospitals(
+            district, latitude, longitude, top_k, minutes_per_km, lang
+        )
+
+
+async def _get_nearest_aed_hospitals(
+    district: Optional[str] = "",
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    top_k: Optional[int] = 3,
+    minutes_per_km: Optional[float] = DEFAULT_MINUTES_PER_KM,
+    lang: Optional[str] = "en",
+) -> Dict:
+    """Rank AED hospitals by waiting time plus travel time from a location
+
+    Args:
+        district: Optional district of the patient in any language
+        latitude: Optional latitude of the patient
+        longitude: Optional longitude of the patient
+        top_k: Number of hospitals to return
+        minutes_per_km: Travel minutes per kilometre of straight-line distance
+        lang: Language code (en/tc/sc) for hospital names and waits
+    """
+    if latitude is not None and longitude is not None:
+        if not in_hong_kong(latitude, longitude):
+            return {"type": "Error", "error": f"Location {latitude}, {longitude} is outside Hong Kong"}
+        origin = {"latitude": latitude, "longitude": longitude}
+    elif district:
+        key = canonical_district(district)
+        if key not in DISTRICT_CENTRES:
+            return {"type": "Error", "error": f"Unknown district '{district}'"}
+        latitude, longitude = DISTRICT_CENTRES[key]
+        origin = {"district": DISTRICTS[key][0], "latitude": latitude, "longitude": longitude}
+    else:
+        return {"type": "Error", "error": "Give a district or both latitude and longitude"}
+    top_k = 3 if top_k is None else top_k
+    if not 1 <= top_k <= len(_CODES):
+        return {"type": "Error", "error": f"top_k must be between 1 and {len(_CODES)}"}
+    minutes_per_km = DEFAULT_MINUTES_PER_KM if minutes_per_km is None else minutes_per_km
+    if minutes_per_km < 0:
+        return {"type": "Error", "error": "minutes_per_km must not be negative"}
+
+    started = metrics.clock()
+    result = await get_feed_data(AED, lang, fetch_json)
+    metrics.observe("fetch", "aed", started)
+    if result.is_error:
+        return {"type": "Error", "error": result.data["error"]}
+    started = metrics.clock()
+    waits, shortest = result.derive("nearest", _build_waits)
+    ranked = rank_hospitals(
+        waits, shortest, project(latitude, longitude), top_k, minutes_per_km
+    )
+    data = []
+    for score, distance, code in ranked:
+        name, top_wait, minutes = waits[code]
+        data.append(
+            {
+                "hospCode": code,
+                "hospName": name,
+                "topWait": top_wait,
+                "waitMinutes": minutes,
+                "distanceKm": round(distance, 1),
+                "travelMinutes": round(distance * minutes_per_km, 1),
+                "score": round(score, 1),
+            }
+        )
+    metrics.observe("filter", "aed", started)
+    return {
+        "data": data,
+        "origin": origin,
+        "updateTime": result.data.extras.get("updateTime"),
+        **result.metadata(),
+        "message": f"Ranked {len(waits)} A&E departments by waiting time plus travel time",
+    }
@@ -4,13 +4,38 @@ from Hospital Authority in Hong Kong.
 """
 
 from typing import List, Dict, Optional
-from datetime import datetime
 from pydantic import Field
 from typing_extensions import Annotated
-from hkopenai_common.json_utils import fetch_json_data
+from .. import metrics, serialization
+from ..cache import get_feed_data
+from ..changefeed import select_changes
+from ..columnar import FeedTable
+from ..feeds import AED
+from ..http_client import fetch_json
+from ..indexes import FeedIndex
+from ..reference import (
+    canonical_cluster,
+    canonical_district,
+    canonical_hospital,
+    hospital_cluster,
+    hospital_district,
+)
 
 
+def _build_index(table: FeedTable) -> FeedIndex:
+    """Index the AED rows by hospital, district and cluster."""
 
+    def code(row):
+        return canonical_hospital(row.get("hospName"))
+
+    return FeedIndex(
+        table,
+        {
+            "hospital": code,
+            "district": lambda row: hospital_district(code(row)),
+            "cluster": lambda row: hospital_cluster(code(row)),
+        },
+    )
 
 
 def register(mcp):
@@ -19,7 +44,9 @@ def register(mcp):
     @mcp.tool(
         description="Get current Accident and Emergency Department waiting times by hospital in Hong Kong"
     )
-    def get_aed_waiting_times(
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_aed_waiting_times(
         lang: Annotated[
             Optional[str],
             Field(
@@ -27,22 +54,89 @@ def register(mcp):
                 json_schema_extra={"enum": ["en", "tc", "sc"]},
             ),
         ] = "en",
+        hospital: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Filter by hospital name in any language (e.g., 'Tuen Mun Hospital' or '屯門醫院')."
+            ),
+        ] = "",
+        district: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Filter by district name in any language (e.g., 'Tuen Mun' or '屯門')."
+            ),
+        ] = "",
+        cluster: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Filter by Hospital Authority cluster name or code (e.g., 'Kowloon Central Cluster' or 'KCC')."
+            ),
+        ] = "",
+        fields: Annotated[
+            Optional[List[str]],
+            Field(
+                description="Optional: Only return these fields of each hospital (e.g., ['hospName', 'topWait']). If not provided, all fields are returned."
+            ),
+        ] = None,
+        since: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Cursor from a previous response. Only hospitals added or changed since then are returned, and hospitals removed since then are listed under 'removed'."
+            ),
+        ] = "",
     ) -> Dict:
-        """Get current AED waiting times
-
-        Args:
-            lang: Language code (en/tc/sc) for data format
-        """
-        return _get_aed_waiting_times(lang)
+        return await _get_aed_waiting_times(
+            lang, hospital, district, cluster, fields, since
+        )
 
 
-def _get_aed_waiting_times(lang: Optional[str] = "en") -> Dict:
+async def _get_aed_waiting_times(
+    lang: Optional[str] = "en",
+    hospital: Optional[str] = "",
+    district: Optional[str] = "",
+    cluster: Optional[str] = "",
+    fields: Optional[List[str]] = None,
+    since: Optional[str] = "",
+) -> Dict:
     """Get current AED waiting times
 
     Args:
         lang: Language code (en/tc/sc) for data format
+        hospital: Optional filter by hospital name in any language
+        district: Optional filter by district name in any language
+        cluster: Optional filter by cluster name or code
+        fields: Optional list of hospital fields to return
+        since: Optional cursor from a previous response; only hospitals changed since then are returned
     """
-    url = f"https://www.ha.org.hk/opendata/aed/aedwtdata-{lang}.json"
-    data = fetch_json_data(url)
-    return {"data": data, "last_updated": datetime.now().isoformat()}
-    
+    started = metrics.clock()
+    result = await get_feed_data(AED, lang, fetch_json)
+    metrics.observe("fetch", "aed", started)
+    if result.is_error:
+        return {"data": result.data, **result.metadata()}
+    started = metrics.clock()
+    positions = None
+    criteria = {
+        field: canonical(value)
+        for field, canonical, value in (
+            ("hospital", canonical_hospital, hospital),
+            ("district", canonical_district, district),
+            ("cluster", canonical_cluster, cluster),
+        )
+        if value
+    }
+    if criteria:
+        positions = result.derive("index", _build_index).positions(**criteria)
+    positions, changes = select_changes(
+        AED,
+        lang,
+        result.data,
+        since,
+        positions,
+        lambda removed: _build_index(removed).positions(**criteria),
+    )
+    data = result.derive("responses", lambda _: serialization.ResponseMemo()).get(
+        serialization.memo_key(positions, fields),
+        lambda: result.data.to_payload(positions, fields or None),
+    )
+    metrics.observe("filter", "aed", started)
+    return {"data": data, **changes, **result.metadata()}
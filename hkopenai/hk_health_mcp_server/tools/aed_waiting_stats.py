@@ -0,0 +1,116 @@
+"""
+Module for querying statistics of historical Accident and Emergency Department (AED)
+waiting times recorded by the server, per hospital over a time window.
+"""
+
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from pydantic import Field
+from typing_extensions import Annotated
+from .. import metrics, serialization
+from ..history import HK_TIMEZONE, aed_history, parse_days, parse_hours
+from ..reference import AED_HOSPITALS, canonical_hospital
+
+
+def register(mcp):
+    """Registers the AED waiting time statistics tool with the FastMCP server."""
+
+    @mcp.tool(
+        description="Get statistics (min, max, mean and percentiles in minutes) of recorded Accident and Emergency Department waiting times per hospital in Hong Kong over a time window, optionally limited to days of the week and hours of the day"
+    )
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_aed_waiting_time_stats(
+        hospital: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Hospital name in any language (e.g., 'Queen Elizabeth Hospital' or '伊利沙伯醫院'). If not provided, all hospitals are returned."
+            ),
+        ] = "",
+        window_hours: Annotated[
+            Optional[float],
+            Field(description="Length of the window ending now, in hours. Default 168 (one week)."),
+        ] = 168,
+        days: Annotated[
+            Optional[List[str]],
+            Field(description="Optional: Only include these days of the week (e.g., ['Fri', 'Sat'])."),
+        ] = None,
+        hours: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Only include this range of hours of the day in Hong Kong time, end exclusive (e.g., '18-23' for evenings)."
+            ),
+        ] = "",
+        bucket_minutes: Annotated[
+            Optional[int],
+            Field(
+                description="Optional: Split the window into buckets of this many minutes and return statistics per bucket. Default 0 (one result per hospital)."
+            ),
+        ] = 0,
+        percentiles: Annotated[
+            Optional[List[float]],
+            Field(description="Percentiles to report. Default [50, 90]."),
+        ] = None,
+    ) -> Dict:
+        return await _get_aed_waiting_time_stats(
+            hospital, window_hours, days, hours, bucket_minutes, percentiles
+        )
+
+
+async def _get_aed_waiting_time_stats(
+    hospital: Optional[str] = "",
+    window_hours: Optional[float] = 168,
+    days: Optional[List[str]] = None,
+    hours: Optional[str] = "",
+    bucket_minutes: Optional[int] = 0,
+    percentiles: Optional[List[float]] = None,
+) -> Dict:
+    """Get statistics of the recorded AED waiting times per hospital
+
+    Args:
+        hospital: Optional hospital name in any language
+        window_hours: Length of the window ending now, in hours
+        days: Optional days of the week to include
+        hours: Optional range of hours of the day (HK time) to include
+        bucket_minutes: Optional bucket width in minutes for a time series
+        percentiles: Percentiles to report
+    """
+    hospitals = None
+    if hospital:
+        code = canonical_hospital(hospital)
+        if code not in AED_HOSPITALS:
+            return {"type": "Error", "error": f"Unknown hospital '{hospital}'"}
+        hospitals = [code]
+    percentiles = percentiles or [50, 90]
+    if any(not 0 <= q <= 100 for q in percentiles):
+        return {"type": "Error", "error": "Percentiles must be between 0 and 100"}
+    try:
+        day_numbers = parse_days(days)
+        hour_numbers = parse_hours(hours)
+    except ValueError as e:
+        return {"type": "Error", "error": str(e)}
+
+    end = time.time()
+    start = end - float(window_hours or 168) * 3600
+    data = aed_history.aggregate(
+        start,
+        end,
+        hospitals=hospitals,
+        days=day_numbers,
+        hours=hour_numbers,
+        bucket_seconds=max(bucket_minutes or 0, 0) * 60,
+        percentiles=percentiles,
+    )
+    data = [
+        {"hospCode": r["hospCode"], "hospName": AED_HOSPITALS[r["hospCode"]][0], **r}
+        for r in data
+    ]
+    return {
+        "data": data,
+        "unit": "minutes",
+        "from": datetime.fromtimestamp(start, HK_TIMEZONE).isoformat(),
+        "to": datetime.fromtimestamp(end, HK_TIMEZONE).isoformat(),
+        "message": f"Aggregated {sum(r['samples'] for r in data)} samples"
+        + (f" for {hospital}" if hospital else ""),
+    }
@@ -0,0 +1,142 @@
+"""
+Module for answering several health lookups in one MCP call.
+Sub-queries name one of the other health tools and its arguments; they run
+concurrently, identical sub-queries run once, and sub-queries reading the same feed
+share one cached snapshot and at most one upstream fetch.
+"""
+
+import asyncio
+import inspect
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+from typing_extensions import Annotated
+
+from .. import metrics, serialization
+from .aed_waiting import _get_aed_waiting_times
+from .aed_waiting_stats import _get_aed_waiting_time_stats
+from .health_snapshot import _get_health_snapshot
+from .pas_gopc_avg_quota import _get_pas_gopc_avg_quota
+from .specialist_waiting_time_by_cluster import _get_specialist_waiting_times
+
+MAX_QUERIES = 20
+
+# Tool name -> implementation called with the sub-query arguments.
+TOOLS: Dict[str, Callable[..., Awaitable[Dict]]] = {
+    "get_aed_waiting_times": _get_aed_waiting_times,
+    "get_aed_waiting_time_stats": _get_aed_waiting_time_stats,
+    "get_specialist_waiting_times": _get_specialist_waiting_times,
+    "get_pas_gopc_avg_quota": _get_pas_gopc_avg_quota,
+    "get_health_snapshot": _get_health_snapshot,
+}
+
+ToolName = Literal[
+    "get_aed_waiting_times",
+    "get_aed_waiting_time_stats",
+    "get_specialist_waiting_times",
+    "get_pas_gopc_avg_quota",
+    "get_health_snapshot",
+]
+
+
+class SubQuery(BaseModel):
+    """One lookup of a batch: a tool name and the arguments it would be called with."""
+
+    tool: Annotated[ToolName, Field(description="Name of the health tool to call")]
+    args: Annotated[
+        Dict[str, Any],
+        Field(
+            description="Arguments of the tool, as for a direct call (e.g., {'lang': 'tc', 'district': 'Tuen Mun'})"
+        ),
+    ] = {}
+    id: Annotated[
+        Optional[str],
+        Field(description="Optional: Label echoed in the result to match it to the query"),
+    ] = None
+
+
+def register(mcp):
+    """Registers the batch health query tool with the FastMCP server."""
+
+    @mcp.tool(
+        description="Answer several health lookups in one call: each query names one of get_aed_waiting_times, get_aed_waiting_time_stats, get_specialist_waiting_times, get_pas_gopc_avg_quota or get_health_snapshot with its arguments. Queries run concurrently and results are returned in query order"
+    )
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def batch_health_query(
+        queries: Annotated[
+            List[SubQuery],
+            Field(
+                description=f"Lookups to run, at most {MAX_QUERIES} (e.g., [{{'tool': 'get_aed_waiting_times', 'args': {{'district': 'Tuen Mun'}}}}, {{'tool': 'get_pas_gopc_avg_quota', 'args': {{'district': 'Tuen Mun'}}}}])"
+            ),
+        ],
+    ) -> Dict:
+        return await _batch_health_query([query.model_dump() for query in queries])
+
+
+def _failed(result: Dict[str, Any]) -> bool:
+    """Return True if a tool result is an error.
+
+    Tools report errors as {"type": "Error", ...}, except the AED waiting time tool,
+    which returns an upstream failure under 'data' next to the freshness fields.
+    """
+    if result.get("type") == "Error":
+        return True
+    data = result.get("data")
+    return isinstance(data, dict) and ("error" in data or data.get("type") == "Error")
+
+
+async def _run(tool: str, args: Dict[str, Any]) -> Dict:
+    """Call one tool implementation, turning invalid arguments and failures into errors."""
+    fn = TOOLS.get(tool)
+    if fn is None:
+        return {"type": "Error", "error": f"Unknown tool '{tool}'. Use one of {', '.join(TOOLS)}."}
+    try:
+        inspect.signature(fn).bind(**args)
+    except TypeError as e:
+        return {"type": "Error", "error": f"Invalid arguments for {tool}: {e}."}
+    try:
+        return await fn(**args)
+    except Exception as e:  # pylint: disable=broad-except
+        return {"type": "Error", "error": f"{tool} failed: {e!r}"}
+
+
+async def _batch_health_query(queries: List[Dict[str, Any]]) -> Dict:
+    """Run sub-queries concurrently and return their results in query order
+
+    Args:
+        queries: Sub-queries, each a dictionary with 'tool', optional 'args' and 'id'
+    """
+    if not queries:
+        return {"type": "Error", "error": "No queries given."}
+    if len(queries) > MAX_QUERIES:
+        return {
+            "type": "Error",
+            "error": f"Too many queries: {len(queries)}. At most {MAX_QUERIES} are allowed.",
+        }
+
+    # Identical sub-queries are answered by one call.
+    calls: Dict[str, "asyncio.Task[Dict]"] = {}
+    keys = []
+    for query in queries:
+        tool, args = query.get("tool"), query.get("args") or {}
+        key = json.dumps([tool, args], sort_keys=True, ensure_ascii=False, default=str)
+        if key not in calls:
+            calls[key] = asyncio.ensure_future(_run(tool, args))
+        keys.append(key)
+    await asyncio.gather(*calls.values())
+
+    results = []
+    for query, key in zip(queries, keys):
+        result: Dict[str, Any] = {"tool": query.get("tool")}
+        if query.get("id") is not None:
+            result["id"] = query["id"]
+        result["result"] = calls[key].result()
+        results.append(result)
+    errors = sum(1 for r in results if _failed(r["result"]))
+    return {
+        "results": results,
+        "message": f"Answered {len(results) - errors} of {len(results)} queries"
+        + (f"; {errors} failed" if errors else ""),
+    }
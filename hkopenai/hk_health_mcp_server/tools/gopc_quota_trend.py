@@ -0,0 +1,145 @@
+"""
+Module for querying the weekly trend of general outpatient clinic (GOPC) quotas recorded
+by the server, with week-over-week changes, district totals and a forecast of next week.
+"""
+
+from typing import Any, Dict, List, Optional
+from pydantic import Field
+from typing_extensions import Annotated
+from .. import metrics, serialization
+from ..quota_history import (
+    METHODS,
+    changes,
+    forecast,
+    quota_history,
+    rounded_columns,
+    week_label,
+)
+from ..reference import canonical_district
+
+MAX_WEEKS = 520
+
+
+def _trends(values, method: str) -> List[Dict[str, Any]]:
+    """Return the weekly values, latest change and forecast of each column of a window."""
+    latest, change, percent = changes(values)
+    summaries = rounded_columns([latest, change, percent, forecast(values, method)])
+    return [
+        {"quota": quota, "latest": last, "change": delta, "change_pct": pct, "forecast": next_}
+        for quota, (last, delta, pct, next_) in zip(rounded_columns(values), summaries)
+    ]
+
+
+def register(mcp):
+    """Registers the general outpatient clinic quota trend tool with the FastMCP server."""
+
+    @mcp.tool(
+        description="Get the weekly trend of general outpatient clinic quotas recorded by the server, per district and optionally per clinic, with week-over-week changes and a forecast of next week"
+    )
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_gopc_quota_trend(
+        district: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: District name in any language (e.g., 'Kwun Tong' or '觀塘'). If not provided, all districts are returned."
+            ),
+        ] = "",
+        clinic: Annotated[
+            Optional[str],
+            Field(description="Optional: Only include clinics whose name contains this text."),
+        ] = "",
+        weeks: Annotated[
+            Optional[int],
+            Field(description="Number of weeks up to the last recorded one. Default 8."),
+        ] = 8,
+        method: Annotated[
+            Optional[str],
+            Field(
+                description="Forecast method: 'ewma' (exponentially weighted average) or 'linear' (least-squares trend). Default 'ewma'.",
+                json_schema_extra={"enum": list(METHODS)},
+            ),
+        ] = "ewma",
+        per_clinic: Annotated[
+            Optional[bool],
+            Field(description="Also return the trend of each clinic. Default false."),
+        ] = False,
+        lang: Annotated[
+            Optional[str],
+            Field(
+                description="Language (en/tc/sc) English, Traditional Chinese, Simplified Chinese. Default English",
+                json_schema_extra={"enum": ["en", "tc", "sc"]},
+            ),
+        ] = "en",
+    ) -> Dict:
+        return await _get_gopc_quota_trend(district, clinic, weeks, method, per_clinic, lang)
+
+
+async def _get_gopc_quota_trend(
+    district: Optional[str] = "",
+    clinic: Optional[str] = "",
+    weeks: Optional[int] = 8,
+    method: Optional[str] = "ewma",
+    per_clinic: Optional[bool] = False,
+    lang: Optional[str] = "en",
+) -> Dict:
+    """Get the weekly GOPC quota trend per district and clinic from the recorded history
+
+    Args:
+        district: Optional district name in any language
+        clinic: Optional part of the clinic name
+        weeks: Number of weeks up to the last recorded one
+        method: Forecast method, 'ewma' or 'linear'
+        per_clinic: Whether to return the trend of each clinic
+        lang: Language code (en/tc/sc) of the recorded feed
+    """
+    method = (method or "ewma").lower()
+    if method not in METHODS:
+        return {"type": "Error", "error": f"Unknown forecast method '{method}'. Use one of: {', '.join(METHODS)}"}
+    weeks = min(max(weeks or 8, 2), MAX_WEEKS)
+    week_numbers, columns, values = quota_history.window(
+        weeks, lang or "en", canonical_district(district), clinic
+    )
+    if not columns:
+        return {
+            "weeks": [],
+            "districts": [],
+            "method": method,
+            "message": "No GOPC quotas recorded"
+            + (f" for {district}" if district else "")
+            + (f" and clinics matching '{clinic}'" if clinic else ""),
+        }
+
+    started = metrics.clock()
+    representatives, counts, totals = quota_history.rollup(columns, values)
+    districts = [
+        {
+            "district": quota_history.district(column)[1],
+            "district_key": quota_history.district(column)[0],
+            "clinics": count,
+            **trend,
+        }
+        for column, count, trend in zip(representatives, counts, _trends(totals, method))
+    ]
+    answer: Dict[str, Any] = {
+        "weeks": [week_label(week) for week in week_numbers],
+        "next_week": week_label(week_numbers[-1] + 1),
+        "method": method,
+        "districts": districts,
+    }
+    if per_clinic:
+        answer["clinics"] = [
+            {
+                "district": quota_history.district(column)[1],
+                "clinic": quota_history.key(column)[2],
+                "session": quota_history.key(column)[3],
+                **trend,
+            }
+            for column, trend in zip(columns, _trends(values, method))
+        ]
+    metrics.observe("filter", "gopc_trend", started)
+    answer["message"] = (
+        f"Weekly quotas of {len(columns)} clinics in {len(districts)} districts "
+        f"from {answer['weeks'][0]} to {answer['weeks'][-1]}"
+    )
+    return answer
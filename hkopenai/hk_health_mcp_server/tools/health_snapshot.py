@@ -0,0 +1,113 @@
+"""
+Module for fetching a Hospital Authority feed in English, Traditional Chinese and
+Simplified Chinese at once and merging the three variants into one record per entity.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Tuple
+from pydantic import Field
+from typing_extensions import Annotated
+from .. import metrics, serialization
+from ..cache import get_feed_data
+from ..feeds import AED, GOPC, LANGUAGES, SPECIALIST, Feed
+from ..http_client import fetch_json
+from ..reference import canonical_cluster, canonical_district, canonical_hospital
+
+
+# Feed name -> (feed, key field name, function giving the row's group key).
+# Rows of the language variants are aligned by group key and their ordinal in the group,
+# since HA publishes the variants of a feed in the same order.
+_ALIGNMENT: Dict[str, Tuple[Feed, str, Callable[[Dict], Any]]] = {
+    "aed": (AED, "hospCode", lambda row: canonical_hospital(row.get("hospName"))),
+    "specialist": (SPECIALIST, "cluster_key", lambda row: canonical_cluster(row.get("cluster"))),
+    "gopc": (GOPC, "district_key", lambda row: canonical_district(row.get("District"))),
+}
+
+
+def _merge_values(values: Dict[str, Any]) -> Any:
+    """Collapse per-language values to one value when every language agrees."""
+    distinct = {repr(value) for value in values.values()}
+    return next(iter(values.values())) if len(distinct) == 1 else values
+
+
+def _merge_rows(
+    rows_by_lang: Dict[str, List[Dict]], key_field: str, group_of: Callable[[Dict], Any]
+) -> List[Dict]:
+    """Align the rows of each language by group key and ordinal and merge them."""
+    aligned: Dict[Tuple[Any, int], Dict[str, Dict]] = {}
+    for lang, rows in rows_by_lang.items():
+        ordinals: Dict[Any, int] = {}
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            group = group_of(row)
+            ordinal = ordinals[group] = ordinals.get(group, -1) + 1
+            aligned.setdefault((group, ordinal), {})[lang] = row
+
+    merged = []
+    for (group, _), variants in aligned.items():
+        record: Dict[str, Any] = {key_field: group}
+        fields = dict.fromkeys(f for row in variants.values() for f in row)
+        for field in fields:
+            record[field] = _merge_values(
+                {lang: row[field] for lang, row in variants.items() if field in row}
+            )
+        merged.append(record)
+    return merged
+
+
+def register(mcp):
+    """Registers the multi-language health snapshot tool with the FastMCP server."""
+
+    @mcp.tool(
+        description="Get a Hospital Authority feed (A&E waiting times, specialist outpatient waiting times or general outpatient clinic quotas) in English, Traditional Chinese and Simplified Chinese in one call, with one merged record per hospital, cluster entry or clinic"
+    )
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_health_snapshot(
+        feed: Annotated[
+            str,
+            Field(
+                description="Feed to fetch: 'aed' (A&E waiting times), 'specialist' (specialist outpatient waiting times) or 'gopc' (general outpatient clinic quotas)",
+                json_schema_extra={"enum": ["aed", "specialist", "gopc"]},
+            ),
+        ] = "aed",
+    ) -> Dict:
+        return await _get_health_snapshot(feed)
+
+
+async def _get_health_snapshot(feed: str = "aed") -> Dict:
+    """Fetch all language variants of a feed concurrently and merge them per entity
+
+    Args:
+        feed: Feed name (aed/specialist/gopc)
+    """
+    if feed not in _ALIGNMENT:
+        return {"type": "Error", "error": f"Unknown feed '{feed}'. Use aed, specialist or gopc."}
+    source, key_field, group_of = _ALIGNMENT[feed]
+    results = await asyncio.gather(
+        *(get_feed_data(source, lang, fetch_json) for lang in LANGUAGES)
+    )
+    ok = {lang: result for lang, result in zip(LANGUAGES, results) if not result.is_error}
+    errors = {
+        lang: result.data["error"]
+        for lang, result in zip(LANGUAGES, results)
+        if result.is_error
+    }
+    if not ok:
+        return {"type": "Error", "error": errors}
+
+    response: Dict[str, Any] = {
+        "feed": feed,
+        "data": _merge_rows(
+            {lang: result.data.rows() for lang, result in ok.items()}, key_field, group_of
+        ),
+        "languages": {lang: result.metadata() for lang, result in ok.items()},
+    }
+    if feed == "aed":
+        response["updateTime"] = _merge_values(
+            {lang: result.data.extras.get("updateTime") for lang, result in ok.items()}
+        )
+    if errors:
+        response["errors"] = errors
+    return response
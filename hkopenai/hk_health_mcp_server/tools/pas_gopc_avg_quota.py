@@ -3,14 +3,50 @@ Module for fetching average number of general outpatient clinic quotas
 for the preceding 4 weeks across districts in Hong Kong from Hospital Authority.
 """
 
-from datetime import datetime
-from typing import Dict, List, Optional
+import math
+from typing import Any, Dict, List, Optional, Sequence
 from pydantic import Field
 from typing_extensions import Annotated
-from hkopenai_common.json_utils import fetch_json_data
+from .. import metrics, serialization
+from ..cache import get_feed_data
+from ..changefeed import select_changes
+from ..columnar import FeedTable
+from ..feeds import GOPC
+from ..http_client import fetch_json
+from ..indexes import FeedIndex
+from ..pagination import paginate, query_digest
+from ..reference import canonical_district
 
 
+def _build_index(table: FeedTable) -> FeedIndex:
+    """Index the clinic rows by district."""
+    return FeedIndex(
+        table,
+        {"district": lambda row: canonical_district(row.get("District"))},
+    )
+
 
+def _summarize(table: FeedTable, positions: Sequence[int]) -> Dict[str, Any]:
+    """Count the selected clinics and total their average quotas, overall and by district."""
+    districts = table.column("District") if "District" in table.names else None
+    quotas = table.numeric.get("AvgQuota")
+    by_district: Dict[str, Dict[str, Any]] = {}
+    total = 0.0
+    for position in positions:
+        name = districts[position] if districts is not None else None
+        group = by_district.setdefault(name, {"clinics": 0, "avg_quota_total": 0.0})
+        group["clinics"] += 1
+        quota = quotas[position] if quotas is not None else math.nan
+        if not math.isnan(quota):
+            group["avg_quota_total"] += quota
+            total += quota
+    for group in by_district.values():
+        group["avg_quota_total"] = round(group["avg_quota_total"], 1)
+    return {
+        "clinics": len(positions),
+        "avg_quota_total": round(total, 1),
+        "districts": by_district,
+    }
 
 
 def register(mcp):
@@ -19,7 +55,9 @@ def register(mcp):
     @mcp.tool(
         description="Get average number of general outpatient clinic quotas for the preceding 4 weeks across 18 districts in Hong Kong"
     )
-    def get_pas_gopc_avg_quota(
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_pas_gopc_avg_quota(
         lang: Annotated[
             Optional[str],
             Field(
@@ -30,35 +68,109 @@ def register(mcp):
         district: Annotated[
             Optional[str],
             Field(
-                description="Optional: Filter by district name (e.g., 'Tuen Mun'). If not provided, data for all districts will be returned."
+                description="Optional: Filter by district name in any language (e.g., 'Tuen Mun' or '屯門'). If not provided, data for all districts will be returned."
             ),
         ] = "",
+        fields: Annotated[
+            Optional[List[str]],
+            Field(
+                description="Optional: Only return these fields of each clinic (e.g., ['District', 'Clinic']). If not provided, all fields are returned."
+            ),
+        ] = None,
+        since: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Cursor from a previous response. Only clinics added or changed since then are returned, and clinics removed since then are listed under 'removed'."
+            ),
+        ] = "",
+        page: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: The 'next_page' token of a previous response, to get the following page of clinics. Use the same other arguments."
+            ),
+        ] = "",
+        max_items: Annotated[
+            Optional[int],
+            Field(
+                description="Optional: Return at most this many clinics per page. A 'summary' of all matching clinics is included."
+            ),
+        ] = None,
+        max_bytes: Annotated[
+            Optional[int],
+            Field(
+                description="Optional: Return only as many clinics per page as fit in about this many bytes of JSON."
+            ),
+        ] = None,
     ) -> Dict:
-        return _get_pas_gopc_avg_quota(lang, district)
+        return await _get_pas_gopc_avg_quota(
+            lang, district, fields, since, page, max_items, max_bytes
+        )
 
 
-def _get_pas_gopc_avg_quota(
-    lang: Optional[str] = "en", district: Optional[str] = ""
+async def _get_pas_gopc_avg_quota(
+    lang: Optional[str] = "en",
+    district: Optional[str] = "",
+    fields: Optional[List[str]] = None,
+    since: Optional[str] = "",
+    page: Optional[str] = "",
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
 ) -> Dict:
     """Get average number of general outpatient clinic quotas for the preceding 4 weeks
 
     Args:
         lang: Language code (en/tc/sc) for data format
-        district: Optional filter by district name (e.g., 'Tuen Mun'). If not provided, data for all districts will be returned.
+        district: Optional filter by district name in any language (e.g., 'Tuen Mun' or '屯門'). If not provided, data for all districts will be returned.
+        fields: Optional list of clinic fields to return
+        since: Optional cursor from a previous response; only clinics changed since then are returned
+        page: Optional 'next_page' token of a previous response
+        max_items: Optional maximum number of clinics per page
+        max_bytes: Optional budget of encoded bytes for the clinics of a page
     """
-    url = (
-        f"https://www.ha.org.hk/pas_gopc/pas_gopc_avg_quota_pdf/g0_9uo7a_p-{lang}.json"
-    )
-    data = fetch_json_data(url)
-    if "error" in data:
-        return {"type": "Error", "error": data["error"]}
+    started = metrics.clock()
+    result = await get_feed_data(GOPC, lang, fetch_json)
+    metrics.observe("fetch", "gopc", started)
+    if result.is_error:
+        return {"type": "Error", "error": result.data["error"]}
+    started = metrics.clock()
+    positions = None
+    key = canonical_district(district)
     if district:
-        data = [
-            entry for entry in data if entry["District"].lower() == district.lower()
-        ]
+        positions = result.derive("index", _build_index).positions(district=key)
+    positions, changes = select_changes(
+        GOPC,
+        lang,
+        result.data,
+        since,
+        positions,
+        lambda removed: _build_index(removed).positions(district=key),
+    )
+    try:
+        positions, paging = paginate(
+            result,
+            changes["cursor"],
+            positions,
+            fields or None,
+            page,
+            max_items,
+            max_bytes,
+            query_digest(lang, key, fields, since),
+            _summarize,
+        )
+    except ValueError as err:
+        return {"type": "Error", "error": str(err)}
+    data = result.derive("responses", lambda _: serialization.ResponseMemo()).get(
+        serialization.memo_key(positions, fields),
+        lambda: result.data.to_payload(positions, fields or None),
+    )
+    metrics.observe("filter", "gopc", started)
     return {
         "data": data,
-        "last_updated": datetime.now().isoformat(),
-        "message": f"Retrieved data for {len(data)} clinics"
+        **paging,
+        **changes,
+        **result.metadata(),
+        "message": f"Retrieved data for {len(data)}"
+        + (" changed" if "removed" in changes else "")
+        + " clinics"
         + (f" in {district}" if district else ""),
     }
@@ -0,0 +1,89 @@
+"""
+Module for ranking Hospital Authority clusters by the waiting time for new case bookings
+of a specialist outpatient specialty and triage category in Hong Kong.
+"""
+
+from typing import Dict, Optional
+from pydantic import Field
+from typing_extensions import Annotated
+from .. import metrics, serialization
+from ..cache import get_feed_data
+from ..feeds import SPECIALIST
+from ..http_client import fetch_json
+from ..reference import canonical_category, canonical_cluster, canonical_specialty
+from ..specialist_matrix import SpecialistMatrix
+
+
+def register(mcp):
+    """Registers the specialist waiting time ranking tool with the FastMCP server."""
+
+    @mcp.tool(
+        description="Rank Hospital Authority clusters by the current waiting time for new case bookings of a specialist outpatient specialty, with the territory-wide median, shortest and longest waits"
+    )
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_specialist_wait_ranking(
+        specialty: Annotated[
+            str,
+            Field(
+                description="Specialty name in any language (e.g., 'Orthopaedics & Traumatology', 'ENT' or '眼科')."
+            ),
+        ],
+        category: Annotated[
+            Optional[str],
+            Field(
+                description="Triage category in any language: 'Urgent', 'Semi-urgent' or 'Stable'. Default 'Stable'.",
+            ),
+        ] = "Stable",
+        cluster: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Cluster name or code in any language (e.g., 'KEC') whose entry is returned under 'cluster'."
+            ),
+        ] = "",
+        lang: Annotated[
+            Optional[str],
+            Field(
+                description="Language (en/tc/sc) English, Traditional Chinese, Simplified Chinese. Default English",
+                json_schema_extra={"enum": ["en", "tc", "sc"]},
+            ),
+        ] = "en",
+    ) -> Dict:
+        return await _get_specialist_wait_ranking(specialty, category, cluster, lang)
+
+
+async def _get_specialist_wait_ranking(
+    specialty: str,
+    category: Optional[str] = "Stable",
+    cluster: Optional[str] = "",
+    lang: Optional[str] = "en",
+) -> Dict:
+    """Rank the clusters by the waiting time of one specialty and triage category
+
+    Args:
+        specialty: Specialty name in any language
+        category: Triage category in any language (Urgent, Semi-urgent or Stable)
+        cluster: Optional cluster name or code whose entry is returned separately
+        lang: Language code (en/tc/sc) for data format
+    """
+    started = metrics.clock()
+    result = await get_feed_data(SPECIALIST, lang, fetch_json)
+    metrics.observe("fetch", "specialist", started)
+    if result.is_error:
+        return {"type": "Error", "error": result.data["error"]}
+    started = metrics.clock()
+    matrix = result.derive("matrix", SpecialistMatrix.from_table)
+    answer = matrix.ranking(canonical_category(category or "Stable"), canonical_specialty(specialty))
+    if answer is None:
+        known = ", ".join(matrix.name(key) for key in matrix.specialties)
+        return {
+            "type": "Error",
+            "error": f"No waiting times for specialty {specialty!r} and category {category!r}. Specialties: {known}",
+        }
+    if cluster:
+        code = (canonical_cluster(cluster) or "").upper()
+        answer["cluster"] = next(
+            (entry for entry in answer["ranking"] if entry["cluster_code"] == code), None
+        )
+    metrics.observe("filter", "specialist", started)
+    return {**answer, **result.metadata()}
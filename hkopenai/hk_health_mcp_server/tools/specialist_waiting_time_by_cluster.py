@@ -3,15 +3,54 @@ Module for fetching waiting times for new case bookings for specialist outpatien
 by specialty and cluster in Hong Kong from Hospital Authority.
 """
 
-from typing import Dict, List, Optional
-import datetime
+from typing import Any, Dict, List, Optional, Sequence
 from pydantic import Field
 from typing_extensions import Annotated
-from hkopenai_common.json_utils import fetch_json_data
+from .. import metrics, serialization
+from ..cache import get_feed_data
+from ..changefeed import select_changes
+from ..columnar import FeedTable
+from ..feeds import SPECIALIST
+from ..http_client import fetch_json
+from ..indexes import FeedIndex
+from ..pagination import paginate, query_digest
+from ..reference import canonical_cluster, canonical_specialty
 
 
+def _build_index(table: FeedTable) -> FeedIndex:
+    """Index the specialist rows by cluster and specialty."""
+    return FeedIndex(
+        table,
+        {
+            "cluster": lambda row: canonical_cluster(row.get("cluster")),
+            "specialty": lambda row: canonical_specialty(row.get("specialty")),
+        },
+    )
+
+
+def _count(table: FeedTable, names: Sequence[str], positions: Sequence[int]) -> Dict[str, int]:
+    """Count the selected rows by the value of the first of names the table has."""
+    name = next((n for n in names if n in table.names), None)
+    if name is None:
+        return {}
+    column = table.column(name)
+    counts: Dict[str, int] = {}
+    for position in positions:
+        value = column[position]
+        if isinstance(value, str):
+            counts[value] = counts.get(value, 0) + 1
+    return counts
 
 
+def _summarize(table: FeedTable, positions: Sequence[int]) -> Dict[str, Any]:
+    """Count the selected entries by cluster and category, and their specialties."""
+    return {
+        "entries": len(positions),
+        "specialties": len(_count(table, ("specialty",), positions)),
+        "clusters": _count(table, ("cluster",), positions),
+        "categories": _count(table, ("Category", "category"), positions),
+    }
+
 
 def register(mcp):
     """Registers the specialist waiting times tool with the FastMCP server."""
@@ -19,7 +58,9 @@ def register(mcp):
     @mcp.tool(
         description="Get current waiting times for new case bookings for specialist outpatient services by specialty and cluster in Hong Kong"
     )
-    def get_specialist_waiting_times(
+    @serialization.encode_result
+    @metrics.instrument_tool
+    async def get_specialist_waiting_times(
         lang: Annotated[
             Optional[str],
             Field(
@@ -27,18 +68,118 @@ def register(mcp):
                 json_schema_extra={"enum": ["en", "tc", "sc"]},
             ),
         ] = "en",
+        cluster: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Filter by Hospital Authority cluster name or code in any language (e.g., 'Hong Kong East Cluster' or 'HKEC')."
+            ),
+        ] = "",
+        specialty: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Filter by specialty name in any language (e.g., 'Medicine' or '內科')."
+            ),
+        ] = "",
+        fields: Annotated[
+            Optional[List[str]],
+            Field(
+                description="Optional: Only return these fields of each entry (e.g., ['specialty', 'category', 'value']). If not provided, all fields are returned."
+            ),
+        ] = None,
+        since: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: Cursor from a previous response. Only entries added or changed since then are returned, and entries removed since then are listed under 'removed'."
+            ),
+        ] = "",
+        page: Annotated[
+            Optional[str],
+            Field(
+                description="Optional: The 'next_page' token of a previous response, to get the following page of entries. Use the same other arguments."
+            ),
+        ] = "",
+        max_items: Annotated[
+            Optional[int],
+            Field(
+                description="Optional: Return at most this many entries per page. A 'summary' of all matching entries is included."
+            ),
+        ] = None,
+        max_bytes: Annotated[
+            Optional[int],
+            Field(
+                description="Optional: Return only as many entries per page as fit in about this many bytes of JSON."
+            ),
+        ] = None,
     ) -> Dict:
-        return _get_specialist_waiting_times(lang)
+        return await _get_specialist_waiting_times(
+            lang, cluster, specialty, fields, since, page, max_items, max_bytes
+        )
 
 
-def _get_specialist_waiting_times(lang: Optional[str] = "en") -> Dict:
+async def _get_specialist_waiting_times(
+    lang: Optional[str] = "en",
+    cluster: Optional[str] = "",
+    specialty: Optional[str] = "",
+    fields: Optional[List[str]] = None,
+    since: Optional[str] = "",
+    page: Optional[str] = "",
+    max_items: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> Dict:
     """Get current waiting times for new case bookings for specialist outpatient services
 
     Args:
         lang: Language code (en/tc/sc) for data format
+        cluster: Optional filter by cluster name or code in any language
+        specialty: Optional filter by specialty name in any language
+        fields: Optional list of entry fields to return
+        since: Optional cursor from a previous response; only entries changed since then are returned
+        page: Optional 'next_page' token of a previous response
+        max_items: Optional maximum number of entries per page
+        max_bytes: Optional budget of encoded bytes for the entries of a page
     """
-    url = f"https://www.ha.org.hk/opendata/sop/sop-waiting-time-{lang}.json"
-    data = fetch_json_data(url)
-    if "error" in data:
-        return {"type": "Error", "error": data["error"]}
-    return {"data": data, "last_updated": datetime.datetime.now().isoformat()}
+    started = metrics.clock()
+    result = await get_feed_data(SPECIALIST, lang, fetch_json)
+    metrics.observe("fetch", "specialist", started)
+    if result.is_error:
+        return {"type": "Error", "error": result.data["error"]}
+    started = metrics.clock()
+    positions = None
+    criteria = {
+        field: canonical(value)
+        for field, canonical, value in (
+            ("cluster", canonical_cluster, cluster),
+            ("specialty", canonical_specialty, specialty),
+        )
+        if value
+    }
+    if criteria:
+        positions = result.derive("index", _build_index).positions(**criteria)
+    positions, changes = select_changes(
+        SPECIALIST,
+        lang,
+        result.data,
+        since,
+        positions,
+        lambda removed: _build_index(removed).positions(**criteria),
+    )
+    try:
+        positions, paging = paginate(
+            result,
+            changes["cursor"],
+            positions,
+            fields or None,
+            page,
+            max_items,
+            max_bytes,
+            query_digest(lang, criteria, fields, since),
+            _summarize,
+        )
+    except ValueError as err:
+        return {"type": "Error", "error": str(err)}
+    data = result.derive("responses", lambda _: serialization.ResponseMemo()).get(
+        serialization.memo_key(positions, fields),
+        lambda: result.data.to_payload(positions, fields or None),
+    )
+    metrics.observe("filter", "specialist", started)
+    return {"data": data, **paging, **changes, **result.metadata()}
@@ -0,0 +1,96 @@
+"""
+Module for running the HTTP transport, in several worker processes behind one socket.
+Each worker is a full server process with its own event loop, so the calls of
+different clients can be encoded and decoded on different cores. Workers share the snapshot store: a feed is fetched from the
+Hospital Authority by one worker and read from the store by the others, and the
+background refresh of each feed is likewise done by whichever worker gets to it first.
+With one worker the HTTP transport is served in-process as usual. In both modes the
+HTTP responses are compressed (see compression).
+"""
+
+import logging
+import os
+from typing import Optional
+
+from . import compression
+from .server import server
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 1
+APP_FACTORY = "hkopenai.hk_health_mcp_server.workers:http_app"
+
+
+def workers_from_env() -> int:
+    """Return the number of HTTP worker processes from HK_HEALTH_WORKERS.
+
+    'auto' uses one worker per CPU core; invalid values fall back to one worker.
+    """
+    value = os.environ.get("HK_HEALTH_WORKERS", str(DEFAULT_WORKERS)).strip().lower()
+    if value == "auto":
+        return os.cpu_count() or DEFAULT_WORKERS
+    try:
+        return max(int(value), 1)
+    except ValueError:
+        logger.warning("Ignoring invalid HK_HEALTH_WORKERS %r", value)
+        return DEFAULT_WORKERS
+
+
+def http_app():
+    """Create the ASGI app served by each worker.
+
+    Requests of one client may reach different workers, so the app is stateless:
+    every request carries what the server needs and no session is kept per worker.
+    The 'since' cursors and page tokens a worker returns name the snapshot by its
+    content (see changefeed.snapshot_version), so the other workers accept them.
+    """
+    return server().http_app(stateless_http=True, middleware=compression.http_middleware())
+
+
+def run_workers(
+    workers: int,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    app: str = APP_FACTORY,
+) -> None:
+    """Serve the HTTP transport from several worker processes sharing one listening socket.
+
+    Args:
+        workers: Number of worker processes.
+        host: Address to bind.
+        port: Port to bind.
+        app: Import string of a function returning the ASGI app of a worker.
+    """
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    os.environ["HK_HEALTH_SHARED_CACHE"] = "true"
+    uvicorn.run(app, factory=True, host=host, port=port, workers=workers, lifespan="on")
+
+
+class MultiWorkerServer:
+    """Stand-in for the server handed to the command line runner.
+
+    With more than one worker, the HTTP transports are served by worker processes;
+    stdio has one client per process, so it runs a single server as usual.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+
+    def run(
+        self,
+        transport: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+    ) -> None:
+        """Run the server on a transport, as FastMCP.run does."""
+        if transport in (None, "stdio"):
+            if self.workers > 1:
+                logger.warning("Ignoring %d workers: stdio serves one client", self.workers)
+            server().run()
+        elif self.workers > 1:
+            run_workers(self.workers, host, port)
+        else:
+            server().run(
+                transport=transport, host=host, port=port, middleware=compression.http_middleware()
+            )
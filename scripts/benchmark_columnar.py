@@ -0,0 +1,83 @@
+"""
+Module for benchmarking the memory and serialization cost of feed snapshots held as
+raw decoded JSON versus the columnar FeedTable form, with and without projection.
+Run with: python scripts/benchmark_columnar.py [number_of_clinics]
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+
+from hkopenai.hk_health_mcp_server.feeds import GOPC
+
+DISTRICTS = [
+    "Central & Western", "Eastern", "Southern", "Wan Chai", "Kowloon City",
+    "Kwun Tong", "Sham Shui Po", "Wong Tai Sin", "Yau Tsim Mong", "Islands",
+    "Kwai Tsing", "North", "Sai Kung", "Sha Tin", "Tai Po", "Tsuen Wan",
+    "Tuen Mun", "Yuen Long",
+]
+
+
+def synthetic_payload(clinics):
+    """Return the encoded body of a GOPC-shaped feed with the given number of clinics."""
+    rows = [
+        {
+            "District": DISTRICTS[i % len(DISTRICTS)],
+            "Clinic": f"Clinic {i}",
+            "Address": f"{i} Example Road",
+            "Session": ["Morning", "Afternoon", "Evening"][i % 3],
+            "AvgQuota": str(50 + i % 150),
+            "Week": "2025-07-07 to 2025-07-13",
+        }
+        for i in range(clinics)
+    ]
+    return json.dumps(rows).encode("utf-8")
+
+
+def measure_memory(build):
+    """Return the bytes still allocated by the object that build() returns."""
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return current
+
+
+def measure_time(fn, repeat=50):
+    """Return the mean wall time of fn() in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main(clinics=5000):
+    """Print memory and serialization figures for a synthetic GOPC snapshot."""
+    body = synthetic_payload(clinics)
+    raw = json.loads(body)
+    table = GOPC.ingest(json.loads(body))
+    fields = ["District", "Clinic", "AvgQuota"]
+
+    raw_bytes = measure_memory(lambda: json.loads(body))
+    table_bytes = measure_memory(lambda: GOPC.ingest(json.loads(body)))
+    print(f"clinics: {clinics}")
+    print(f"held snapshot, raw rows:        {raw_bytes / 1024:10.1f} KiB")
+    print(f"held snapshot, columnar table:  {table_bytes / 1024:10.1f} KiB")
+
+    cases = [
+        ("raw rows, full", lambda: json.dumps(raw, ensure_ascii=False)),
+        ("table, full", lambda: json.dumps(table.to_payload(), ensure_ascii=False)),
+        (
+            "table, projected",
+            lambda: json.dumps(table.to_payload(fields=fields), ensure_ascii=False),
+        ),
+    ]
+    for label, fn in cases:
+        size = len(fn().encode("utf-8"))
+        print(f"serialize {label:17s} {measure_time(fn):8.2f} ms  {size / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
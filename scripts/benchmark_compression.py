@@ -0,0 +1,151 @@
+"""
+Module for benchmarking the compression of tool responses on the HTTP transport.
+
+The server is started in-process on a local port with the Hospital Authority feeds
+served from generated payloads, and the JSON-RPC body of each scenario's tool call is
+captured. Each body is then compressed as a generic compression middleware does
+(the whole body on every call) and as the server does (the snapshot rows compressed
+once and spliced in), reporting bytes on the wire and compression CPU per call. A
+final call with an unchanged 'since' cursor shows the size of a delta response.
+
+Run with: python scripts/benchmark_compression.py [--clinics-per-district 100] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402  pylint: disable=wrong-import-position
+
+from benchmark_tools import SCENARIOS, generate_payloads  # noqa: E402  pylint: disable=wrong-import-position
+from hkopenai.hk_health_mcp_server import compression, http_client  # noqa: E402  pylint: disable=wrong-import-position
+
+HEADERS = {
+    "Accept": "application/json, text/event-stream",
+    "Content-Type": "application/json",
+    "Accept-Encoding": "identity",
+}
+PORT = 8766
+
+
+def _call(request_id: int, tool: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the JSON-RPC request of a tool call."""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "method": "tools/call",
+        "params": {"name": tool, "arguments": arguments},
+    }
+
+
+async def capture_bodies(clinics_per_district: int, scenarios: List[str]) -> Dict[str, bytes]:
+    """Run the HTTP server in-process and return the response body of each scenario."""
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    from hkopenai.hk_health_mcp_server.server import server  # pylint: disable=import-outside-toplevel
+
+    payloads = generate_payloads(clinics_per_district)
+    http_client.configure(
+        transport=httpx.MockTransport(lambda r: httpx.Response(200, json=payloads[r.url.path]))
+    )
+    app = server().http_app(middleware=compression.http_middleware(), json_response=True)
+    uvicorn_server = uvicorn.Server(uvicorn.Config(app, port=PORT, log_level="warning"))
+    task = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.05)
+    bodies = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=60) as client:
+            headers = dict(HEADERS)
+            init = await client.post(
+                "/mcp",
+                headers=headers,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 0,
+                    "method": "initialize",
+                    "params": {
+                        "protocolVersion": "2025-06-18",
+                        "capabilities": {},
+                        "clientInfo": {"name": "benchmark", "version": "1"},
+                    },
+                },
+            )
+            headers["mcp-session-id"] = init.headers.get("mcp-session-id", "")
+            await client.post(
+                "/mcp", headers=headers, json={"jsonrpc": "2.0", "method": "notifications/initialized"}
+            )
+            for i, scenario in enumerate(scenarios, start=1):
+                tool, arguments = SCENARIOS[scenario]
+                response = await client.post("/mcp", headers=headers, json=_call(i, tool, arguments))
+                bodies[scenario] = response.content
+                if scenario in ("specialist", "gopc"):
+                    cursor = response.json()["result"]["structuredContent"]["cursor"]
+                    delta = await client.post(
+                        "/mcp",
+                        headers=headers,
+                        json=_call(100 + i, tool, {**arguments, "since": cursor}),
+                    )
+                    bodies[f"{scenario} since cursor"] = delta.content
+    finally:
+        uvicorn_server.should_exit = True
+        await task
+    return bodies
+
+
+def _whole_body(body: bytes, encoding: str) -> bytes:
+    """Compress a whole body on every call, as a generic middleware does."""
+    if encoding == "gzip":
+        deflate = zlib.compressobj(compression.DEFAULT_GZIP_LEVEL, zlib.DEFLATED, 31)
+        return deflate.compress(body) + deflate.flush()
+    return compression.compress(body, encoding)
+
+
+def measure(fn, repeat: int) -> float:
+    """Return the best of three mean CPU times of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.process_time()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.process_time() - started) * 1000 / repeat)
+    return best
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse the command line and print bytes and CPU per call of each mode."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clinics-per-district", type=int, default=100,
+                        help="GOPC clinics generated per district")
+    parser.add_argument("--repeat", type=int, default=200, help="Runs per timing")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("HK_HEALTH_BACKGROUND_REFRESH", "false")
+    os.environ.setdefault("HK_HEALTH_SNAPSHOT_PATH", "off")
+    os.environ.setdefault("HK_HEALTH_AED_HISTORY_PATH", "off")
+    os.environ.setdefault("HK_HEALTH_COMPRESSION", "auto")
+    bodies = asyncio.run(
+        capture_bodies(args.clinics_per_district, ["aed", "specialist", "gopc", "gopc_district"])
+    )
+    print(f"encodings: {', '.join(compression.available_encodings())}")
+    print(f"{'response':26s} {'mode':14s} {'bytes':>9s} {'cpu ms':>8s}")
+    for label, body in bodies.items():
+        print(f"{label:26s} {'identity':14s} {len(body):9d} {0.0:8.3f}")
+        for encoding in compression.available_encodings():
+            for mode, fn in (
+                ("whole body", lambda b=body, e=encoding: _whole_body(b, e)),
+                ("spliced", lambda b=body, e=encoding: compression.compress(
+                    b, e, compression.segment_cache)),
+            ):
+                size = len(fn())
+                print(f"{label:26s} {encoding + ' ' + mode:14s} {size:9d} {measure(fn, args.repeat):8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Module for microbenchmarking the JSON path of the server: decoding feed bodies,
+ingesting them into snapshots and encoding tool responses.
+
+Each step is timed on the path used before the serialization layer (the standard
+library decoder, columns guessed at ingest, FastMCP serializing the returned
+dictionary) and on the current one (the fastest installed JSON backend, typed row
+schemas, responses encoded once per snapshot and handed to FastMCP pre-encoded).
+
+Run with: python scripts/benchmark_json.py [--clinics-per-district 100] [--repeat 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Callable, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402  pylint: disable=wrong-import-position
+
+from benchmark_tools import SCENARIOS, _path, generate_payloads  # noqa: E402  pylint: disable=wrong-import-position
+from hkopenai.hk_health_mcp_server import (  # noqa: E402  pylint: disable=wrong-import-position
+    http_client,
+    serialization,
+)
+from hkopenai.hk_health_mcp_server.cache import response_cache  # noqa: E402  pylint: disable=wrong-import-position
+from hkopenai.hk_health_mcp_server.columnar import FeedTable  # noqa: E402  pylint: disable=wrong-import-position
+from hkopenai.hk_health_mcp_server.feeds import FEEDS  # noqa: E402  pylint: disable=wrong-import-position
+
+
+def measure_time(fn: Callable[[], object], repeat: int) -> float:
+    """Return the best of three mean wall times of fn() in milliseconds."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - started) * 1000 / repeat)
+    return best
+
+
+def report(label: str, before: float, after: float) -> None:
+    """Print one benchmark line with the speed-up of the current path."""
+    print(f"{label:34s} {before:9.3f} {after:9.3f} {before / max(after, 1e-9):8.2f}x")
+
+
+def _bodies(clinics_per_district: int):
+    """Return the encoded English body of every feed, keyed by feed name."""
+    payloads = generate_payloads(clinics_per_district)
+    return {
+        name: json.dumps(payloads[_path(feed.url("en"))], ensure_ascii=False).encode("utf-8")
+        for name, feed in FEEDS.items()
+    }
+
+
+def bench_decode_and_ingest(bodies, repeat: int) -> None:
+    """Time decoding and ingesting each feed body on both paths."""
+    for name, body in bodies.items():
+        feed = FEEDS[name]
+        report(
+            f"decode {name} ({len(body) // 1024} KiB)",
+            measure_time(lambda body=body: json.loads(body.decode("utf-8")), repeat),
+            measure_time(lambda body=body: serialization.loads(body), repeat),
+        )
+        payload = json.loads(body)
+        report(
+            f"ingest {name}",
+            measure_time(lambda p=payload, f=feed: FeedTable.from_payload(p, f.rows_key), repeat),
+            measure_time(lambda p=payload, f=feed: f.ingest(p), repeat),
+        )
+
+
+async def _call_tool_ms(bodies, scenario: str, repeat: int) -> float:
+    """Return the mean milliseconds of one in-process call of a scenario's tool."""
+    from fastmcp import Client  # pylint: disable=import-outside-toplevel
+
+    from hkopenai.hk_health_mcp_server.server import server  # pylint: disable=import-outside-toplevel
+
+    by_path = {_path(FEEDS[name].url("en")): body for name, body in bodies.items()}
+    http_client.configure(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=by_path[request.url.path])
+        )
+    )
+    response_cache.clear()
+    tool, arguments = SCENARIOS[scenario]
+    async with Client(server()) as client:
+        await client.call_tool(tool, arguments)
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            for _ in range(repeat):
+                await client.call_tool(tool, arguments)
+            best = min(best, (time.perf_counter() - started) * 1000 / repeat)
+    return best
+
+
+def bench_responses(bodies, repeat: int) -> None:
+    """Time whole tool calls with FastMCP serializing and with pre-encoded responses."""
+    for scenario in ("aed", "specialist", "gopc", "gopc_district"):
+        serialization.configure(backend="json", encode_responses=False)
+        before = asyncio.run(_call_tool_ms(bodies, scenario, repeat))
+        serialization.configure(backend="auto", encode_responses=True)
+        after = asyncio.run(_call_tool_ms(bodies, scenario, repeat))
+        report(f"tool call {scenario}", before, after)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse the command line and print the timings of both paths."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clinics-per-district", type=int, default=100,
+                        help="GOPC clinics generated per district")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per timing")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("HK_HEALTH_BACKGROUND_REFRESH", "false")
+    os.environ.setdefault("HK_HEALTH_SNAPSHOT_PATH", "off")
+    os.environ.setdefault("HK_HEALTH_AED_HISTORY_PATH", "off")
+    serialization.configure(backend="auto")
+    print(f"JSON backend: {serialization.backend()}")
+    print(f"{'step':34s} {'before ms':>9s} {'after ms':>9s} {'speed-up':>9s}")
+    bodies = _bodies(args.clinics_per_district)
+    bench_decode_and_ingest(bodies, args.repeat)
+    bench_responses(bodies, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+Module for benchmarking the MCP tools offline against a local stand-in for the
+Hospital Authority open data site.
+
+The stand-in is a local HTTP server replaying AED, specialist and GOPC payloads
+(generated from the reference tables, or recorded ones from a directory) with a
+configurable latency and jitter. The real server() instance is driven through the
+MCP client at a configurable concurrency, and latency percentiles, calls per second,
+response sizes and process RSS are reported per scenario and saved as JSON.
+
+Run with: python scripts/benchmark_tools.py --calls 200 --concurrency 16 --output out.json
+Compare with an earlier run using --compare baseline.json.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.feeds import FEEDS, LANGUAGES
+from hkopenai.hk_health_mcp_server.reference import (
+    AED_HOSPITALS,
+    CLUSTERS,
+    DISTRICTS,
+    SPECIALTIES,
+)
+
+# Scenario label -> (tool name, arguments)
+SCENARIOS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "aed": ("get_aed_waiting_times", {"lang": "en"}),
+    "aed_cluster": ("get_aed_waiting_times", {"lang": "tc", "cluster": "KCC"}),
+    "specialist": ("get_specialist_waiting_times", {"lang": "en"}),
+    "specialist_projected": (
+        "get_specialist_waiting_times",
+        {"lang": "en", "specialty": "Medicine", "fields": ["cluster", "category", "value"]},
+    ),
+    "gopc": ("get_pas_gopc_avg_quota", {"lang": "en"}),
+    "gopc_district": ("get_pas_gopc_avg_quota", {"lang": "en", "district": "Tuen Mun"}),
+    "snapshot_aed": ("get_health_snapshot", {"feed": "aed"}),
+    "aed_stats": ("get_aed_waiting_time_stats", {"window_hours": 24}),
+}
+
+_CATEGORIES = ("Urgent", "Semi-urgent", "Stable")
+_WAITS = {"en": "Over {} hours", "tc": "超過{}小時", "sc": "超过{}小时"}
+
+
+def generate_payloads(clinics_per_district: int = 4) -> Dict[str, Any]:
+    """Return realistic feed payloads keyed by URL path, built from the reference tables."""
+    rng = random.Random(0)
+    now = datetime.now(timezone(timedelta(hours=8)))
+    payloads = {}
+    for index, lang in enumerate(LANGUAGES):
+        payloads[_path(FEEDS["aed"].url(lang))] = {
+            "waitTime": [
+                {"hospName": names[index], "topWait": _WAITS[lang].format(rng.randint(1, 6))}
+                for names in AED_HOSPITALS.values()
+            ],
+            "updateTime": f"{now.day}/{now.month}/{now.year} {now.strftime('%I:%M%p').lower()}",
+        }
+        payloads[_path(FEEDS["specialist"].url(lang))] = [
+            {
+                "cluster": cluster[index],
+                "specialty": specialty[index],
+                "category": category,
+                "description": "Median waiting time (weeks)",
+                "value": str(rng.randint(1, 120)),
+            }
+            for cluster in CLUSTERS.values()
+            for specialty in SPECIALTIES.values()
+            for category in _CATEGORIES
+        ]
+        payloads[_path(FEEDS["gopc"].url(lang))] = [
+            {
+                "District": district[index],
+                "Clinic": f"{district[0]} Clinic {n + 1}",
+                "Session": ("Morning", "Afternoon", "Evening")[n % 3],
+                "AvgQuota": str(rng.randint(20, 200)),
+            }
+            for district in DISTRICTS.values()
+            for n in range(clinics_per_district)
+        ]
+    return payloads
+
+
+def load_payloads(directory: str) -> Dict[str, Any]:
+    """Load recorded payloads saved as '<feed>-<lang>.json' files in a directory."""
+    payloads = {}
+    for name, feed in FEEDS.items():
+        for lang in LANGUAGES:
+            with open(os.path.join(directory, f"{name}-{lang}.json"), encoding="utf-8-sig") as f:
+                payloads[_path(feed.url(lang))] = json.load(f)
+    return payloads
+
+
+def record_payloads(directory: str) -> None:
+    """Fetch the live feeds and save them as '<feed>-<lang>.json' files for replaying."""
+    os.makedirs(directory, exist_ok=True)
+    with httpx.Client(timeout=30) as client:
+        for name, feed in FEEDS.items():
+            for lang in LANGUAGES:
+                response = client.get(feed.url(lang))
+                response.raise_for_status()
+                with open(os.path.join(directory, f"{name}-{lang}.json"), "wb") as f:
+                    f.write(response.content)
+
+
+def _path(url: str) -> str:
+    """Return the path of a feed URL, which the stand-in serves it under."""
+    return httpx.URL(url).path
+
+
+class StandIn:
+    """A local HTTP server replaying feed payloads with latency, jitter and ETags."""
+
+    def __init__(self, payloads: Dict[str, Any], latency: float = 0.05, jitter: float = 0.02):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.bytes_sent = 0
+        self._counter_lock = threading.Lock()
+        self._bodies = {}
+        for path, payload in payloads.items():
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self._bodies[path] = (body, '"%s"' % hashlib.sha1(body).hexdigest())
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """Return the base URL the stand-in listens on."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, sent: int, request: bool = True) -> None:
+        """Add to the request and byte counters from a handler thread."""
+        with self._counter_lock:
+            self.requests += request
+            self.bytes_sent += sent
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Serve a replayed payload after the configured delay."""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Reply with the payload for the path, or 304 when the ETag matches."""
+                delay = stand_in.latency + random.uniform(-stand_in.jitter, stand_in.jitter)
+                time.sleep(max(delay, 0))
+                stand_in.count(0)
+                if self.path not in stand_in._bodies:  # pylint: disable=protected-access
+                    self.send_error(404)
+                    return
+                body, etag = stand_in._bodies[self.path]  # pylint: disable=protected-access
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+                stand_in.count(len(body), request=False)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                """Keep the benchmark output quiet."""
+
+        return Handler
+
+    def start(self) -> "StandIn":
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class RedirectTransport(httpx.AsyncBaseTransport):
+    """Send every request to the stand-in while keeping the original path."""
+
+    def __init__(self, base_url: str):
+        self._base = httpx.URL(base_url)
+        self._inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(
+            scheme=self._base.scheme, host=self._base.host, port=self._base.port
+        )
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def rss_mb() -> float:
+    """Return the current resident set size of the process in MiB."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def summarize(latencies: List[float], sizes: List[int], errors: int, elapsed: float) -> Dict:
+    """Return latency percentiles, throughput and response sizes of one scenario."""
+    ms = np.array(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "errors": errors,
+        "latency_ms": {
+            "p50": round(float(np.percentile(ms, 50)), 3),
+            "p95": round(float(np.percentile(ms, 95)), 3),
+            "p99": round(float(np.percentile(ms, 99)), 3),
+            "mean": round(float(ms.mean()), 3),
+            "max": round(float(ms.max()), 3),
+        },
+        "calls_per_second": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "response_bytes": {"mean": int(np.mean(sizes)), "max": int(np.max(sizes))},
+    }
+
+
+async def run_scenario(client, tool: str, arguments: Dict, calls: int, concurrency: int, cold: bool):
+    """Call one tool calls times from concurrency workers and summarize the results."""
+    latencies: List[float] = []
+    sizes: List[int] = []
+    errors = 0
+    remaining = iter(range(calls))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            if cold:
+                response_cache.clear()
+            started = time.perf_counter()
+            result = await client.call_tool(tool, arguments, raise_on_error=False)
+            latencies.append(time.perf_counter() - started)
+            sizes.append(sum(len(getattr(c, "text", "").encode("utf-8")) for c in result.content))
+            errors += bool(result.is_error)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, sizes, errors, time.perf_counter() - started)
+
+
+async def run_benchmark(
+    scenarios: Optional[List[str]] = None,
+    calls: int = 200,
+    concurrency: int = 16,
+    latency: float = 0.05,
+    jitter: float = 0.02,
+    cold: bool = False,
+    payloads: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run the selected scenarios against a stand-in and return the report."""
+    from fastmcp import Client  # pylint: disable=import-outside-toplevel
+    from hkopenai.hk_health_mcp_server.server import server  # pylint: disable=import-outside-toplevel
+
+    # Unless set by the caller, run without background refresh or files on disk.
+    defaults = {
+        "HK_HEALTH_BACKGROUND_REFRESH": "false",
+        "HK_HEALTH_SNAPSHOT_PATH": "off",
+        "HK_HEALTH_AED_HISTORY_PATH": "off",
+    }
+    defaults = {name: value for name, value in defaults.items() if name not in os.environ}
+    os.environ.update(defaults)
+
+    stand_in = StandIn(payloads or generate_payloads(), latency, jitter).start()
+    http_client.configure(transport=RedirectTransport(stand_in.base_url))
+    response_cache.clear()
+    results = {}
+    try:
+        async with Client(server()) as client:
+            for label in scenarios or list(SCENARIOS):
+                tool, arguments = SCENARIOS[label]
+                await client.call_tool(tool, arguments, raise_on_error=False)  # warm up
+                upstream_before = stand_in.requests
+                summary = await run_scenario(client, tool, arguments, calls, concurrency, cold)
+                summary.update(
+                    tool=tool,
+                    arguments=arguments,
+                    upstream_requests=stand_in.requests - upstream_before,
+                    rss_mb=round(rss_mb(), 1),
+                )
+                results[label] = summary
+    finally:
+        stand_in.stop()
+        http_client.configure()
+        response_cache.clear()
+        for name in defaults:
+            os.environ.pop(name, None)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "version": _version(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "calls": calls,
+            "concurrency": concurrency,
+            "latency_s": latency,
+            "jitter_s": jitter,
+            "cold": cold,
+            "upstream_bytes": stand_in.bytes_sent,
+        },
+        "scenarios": results,
+    }
+
+
+def _version() -> str:
+    """Return the package version and, in a git checkout, the commit it was run at."""
+    try:
+        from importlib.metadata import version  # pylint: disable=import-outside-toplevel
+
+        package = version("hkopenai.hk_health_mcp_server")
+    except Exception:  # pylint: disable=broad-except
+        package = "unknown"
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return package
+    return f"{package}+{commit}"
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Print one line per scenario, with ratios to a baseline report if given."""
+    print(f"{'scenario':22s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+          f"{'calls/s':>9s} {'bytes':>9s} {'rss MiB':>8s}")
+    for label, result in report["scenarios"].items():
+        latency = result["latency_ms"]
+        line = (f"{label:22s} {latency['p50']:9.2f} {latency['p95']:9.2f} {latency['p99']:9.2f} "
+                f"{result['calls_per_second']:9.1f} {result['response_bytes']['mean']:9d} "
+                f"{result['rss_mb']:8.1f}")
+        previous = (baseline or {}).get("scenarios", {}).get(label)
+        if previous:
+            line += "  p95 x{:.2f}  calls/s x{:.2f}".format(
+                latency["p95"] / max(previous["latency_ms"]["p95"], 1e-9),
+                result["calls_per_second"] / max(previous["calls_per_second"], 1e-9),
+            )
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse the command line, run the benchmark and save the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", help="Comma-separated scenarios: " + ",".join(SCENARIOS))
+    parser.add_argument("--calls", type=int, default=200, help="Calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent MCP calls")
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Upstream jitter (s)")
+    parser.add_argument("--cold", action="store_true", help="Clear the cache before each call")
+    parser.add_argument("--payloads", help="Directory of recorded '<feed>-<lang>.json' files")
+    parser.add_argument("--record", help="Fetch the live feeds into this directory and exit")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        record_payloads(args.record)
+        return
+    report = asyncio.run(
+        run_benchmark(
+            scenarios=args.scenarios.split(",") if args.scenarios else None,
+            calls=args.calls,
+            concurrency=args.concurrency,
+            latency=args.latency,
+            jitter=args.jitter,
+            cold=args.cold,
+            payloads=load_payloads(args.payloads) if args.payloads else None,
+        )
+    )
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Module for benchmarking the multi-worker HTTP mode offline.
+
+For each worker count the server is started with that many worker processes behind
+one port, every worker fetching from the local Hospital Authority stand-in of
+scripts/benchmark_tools.py. Several client processes then call a tool over
+streamable HTTP, and calls per second, latency percentiles and the number of
+upstream requests are reported per worker count, so the throughput of each count on
+this host and the sharing of upstream fetches between workers can be read off one
+table. Run it with at least as many cores as the largest worker count; on fewer
+cores the workers compete for the same CPU.
+
+Run with: python scripts/benchmark_workers.py --workers 1,2,4 --calls 2000 --clients 4
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_tools import (  # noqa: E402  pylint: disable=wrong-import-position
+    SCENARIOS,
+    RedirectTransport,
+    StandIn,
+    generate_payloads,
+    summarize,
+)
+
+UPSTREAM_ENV = "HK_HEALTH_BENCHMARK_UPSTREAM"
+
+
+def worker_app():
+    """Create the app of one worker, fetching from the stand-in named in the environment."""
+    from hkopenai.hk_health_mcp_server import http_client  # pylint: disable=import-outside-toplevel
+    from hkopenai.hk_health_mcp_server.workers import http_app  # pylint: disable=import-outside-toplevel
+
+    http_client.configure(transport=RedirectTransport(os.environ[UPSTREAM_ENV]))
+    return http_app()
+
+
+def _serve(workers: int, port: int) -> None:
+    """Run the multi-worker server; the entry point of the server subprocess."""
+    from hkopenai.hk_health_mcp_server.workers import run_workers  # pylint: disable=import-outside-toplevel
+
+    run_workers(workers, "127.0.0.1", port, app="benchmark_workers:worker_app")
+
+
+def _free_port() -> int:
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_ready(url: str, timeout: float = 60.0) -> None:
+    """Wait until the server at url answers an MCP request."""
+    from fastmcp import Client  # pylint: disable=import-outside-toplevel
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            async with Client(url) as client:
+                await client.list_tools()
+                return
+        except Exception:  # pylint: disable=broad-except
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.25)
+
+
+async def _drive(url: str, tool: str, arguments: Dict, calls: int, concurrency: int) -> Dict:
+    """Call a tool calls times over concurrency connections and return the raw timings."""
+    from fastmcp import Client  # pylint: disable=import-outside-toplevel
+
+    latencies: List[float] = []
+    sizes: List[int] = []
+    errors = 0
+    remaining = iter(range(calls))
+
+    async def connection():
+        nonlocal errors
+        async with Client(url) as client:
+            for _ in remaining:
+                started = time.perf_counter()
+                try:
+                    result = await client.call_tool(tool, arguments, raise_on_error=False)
+                except Exception:  # pylint: disable=broad-except
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                sizes.append(sum(len(getattr(c, "text", "").encode("utf-8")) for c in result.content))
+                errors += bool(result.is_error)
+
+    await asyncio.gather(*(connection() for _ in range(concurrency)))
+    return {"latencies": latencies, "sizes": sizes, "errors": errors}
+
+
+def _client_process(args) -> Dict:
+    """Run one load generating process."""
+    return asyncio.run(_drive(*args))
+
+
+def run_point(
+    workers: int,
+    stand_in: StandIn,
+    scenario: str,
+    calls: int,
+    clients: int,
+    concurrency: int,
+    store_dir: str,
+) -> Dict[str, Any]:
+    """Start the server with a number of workers, load it and return the summary."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/mcp"
+    env = dict(
+        os.environ,
+        HK_HEALTH_BACKGROUND_REFRESH="false",
+        HK_HEALTH_AED_HISTORY_PATH="off",
+        HK_HEALTH_SNAPSHOT_PATH=os.path.join(store_dir, f"snapshots-{workers}.sqlite3"),
+        **{UPSTREAM_ENV: stand_in.base_url},
+    )
+    code = f"import benchmark_workers; benchmark_workers._serve({workers}, {port})"
+    server = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        asyncio.run(_wait_ready(url))
+        tool, arguments = SCENARIOS[scenario]
+        upstream_before = stand_in.requests
+        per_client = [calls // clients + (i < calls % clients) for i in range(clients)]
+        started = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(clients) as pool:
+            parts = pool.map(
+                _client_process, [(url, tool, arguments, n, concurrency) for n in per_client]
+            )
+        elapsed = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait(30)
+    summary = summarize(
+        [t for part in parts for t in part["latencies"]],
+        [s for part in parts for s in part["sizes"]],
+        sum(part["errors"] for part in parts),
+        elapsed,
+    )
+    summary.update(workers=workers, upstream_requests=stand_in.requests - upstream_before)
+    return summary
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    """Print one line per worker count with the speed-up over the first one."""
+    print(f"{'workers':>7s} {'calls/s':>9s} {'speed-up':>9s} {'p50 ms':>9s} "
+          f"{'p95 ms':>9s} {'errors':>7s} {'upstream':>9s}")
+    points = report["points"]
+    base = points[0]["calls_per_second"] if points else 0
+    for point in points:
+        print(f"{point['workers']:7d} {point['calls_per_second']:9.1f} "
+              f"{point['calls_per_second'] / max(base, 1e-9):9.2f} "
+              f"{point['latency_ms']['p50']:9.2f} {point['latency_ms']['p95']:9.2f} "
+              f"{point['errors']:7d} {point['upstream_requests']:9d}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Parse the command line, run every worker count and save the report."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--scenario", default="aed", help="Scenario: " + ",".join(SCENARIOS))
+    parser.add_argument("--calls", type=int, default=2000, help="Calls per worker count")
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1,
+                        help="Load generating processes")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Concurrent connections per client process")
+    parser.add_argument("--latency", type=float, default=0.05, help="Upstream latency (s)")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args(argv)
+
+    stand_in = StandIn(generate_payloads(), args.latency, 0.0).start()
+    points = []
+    try:
+        with tempfile.TemporaryDirectory() as store_dir:
+            for workers in (int(n) for n in args.workers.split(",")):
+                points.append(
+                    run_point(workers, stand_in, args.scenario, args.calls, args.clients,
+                              args.concurrency, store_dir)
+                )
+    finally:
+        stand_in.stop()
+    report = {
+        "meta": {"cpus": os.cpu_count(), "scenario": args.scenario, "calls": args.calls,
+                 "clients": args.clients, "concurrency": args.concurrency},
+        "points": points,
+    }
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Module for testing the offline benchmark harness in scripts/benchmark_tools.py.
+This module runs the harness at a tiny scale to keep it working as tools change.
+"""
+
+import importlib.util
+import os
+import unittest
+
+import httpx
+
+_PATH = os.path.join(os.path.dirname(__file__), "..", "scripts", "benchmark_tools.py")
+_SPEC = importlib.util.spec_from_file_location("benchmark_tools", _PATH)
+benchmark_tools = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(benchmark_tools)
+
+
+class TestBenchmarkHarness(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the stand-in server and the benchmark report.
+    """
+
+    async def test_stand_in_serves_payloads_with_etags(self):
+        """
+        Test that the stand-in replays payloads under the feed paths and honours ETags.
+        """
+        stand_in = benchmark_tools.StandIn({"/feed.json": [{"x": 1}]}, latency=0, jitter=0)
+        stand_in.start()
+        try:
+            async with httpx.AsyncClient(
+                transport=benchmark_tools.RedirectTransport(stand_in.base_url)
+            ) as client:
+                response = await client.get("https://www.ha.org.hk/feed.json")
+                self.assertEqual(response.json(), [{"x": 1}])
+                etag = response.headers["ETag"]
+                again = await client.get(
+                    "https://www.ha.org.hk/feed.json", headers={"If-None-Match": etag}
+                )
+                self.assertEqual(again.status_code, 304)
+                missing = await client.get("https://www.ha.org.hk/other.json")
+                self.assertEqual(missing.status_code, 404)
+        finally:
+            stand_in.stop()
+
+    async def test_report_covers_every_scenario(self):
+        """
+        Test that every default scenario runs without errors and is summarized.
+        """
+        report = await benchmark_tools.run_benchmark(
+            calls=4, concurrency=2, latency=0, jitter=0
+        )
+        self.assertEqual(set(report["scenarios"]), set(benchmark_tools.SCENARIOS))
+        for label, result in report["scenarios"].items():
+            self.assertEqual(result["errors"], 0, label)
+            self.assertEqual(result["calls"], 4)
+            self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["p99"])
+            self.assertGreater(result["response_bytes"]["mean"], 0)
+        self.assertGreater(report["meta"]["upstream_bytes"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Module for testing the shared feed response cache.
+This module contains unit tests for TTL expiry, LRU eviction and the memory cap.
+"""
+
+import unittest
+from unittest.mock import patch, AsyncMock
+
+from hkopenai.hk_health_mcp_server.cache import (
+    ResponseCache,
+    background_refresh_keys,
+    get_feed_data,
+    response_cache,
+)
+from hkopenai.hk_health_mcp_server.feeds import Feed
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Test class for verifying the ResponseCache behaviour.
+    """
+
+    def test_get_returns_stored_entry(self):
+        """
+        Test that a stored payload is returned and counted as a hit.
+        """
+        cache = ResponseCache()
+        cache.put(("url", "en"), {"a": 1}, ttl=60)
+        entry = cache.get(("url", "en"))
+        self.assertEqual(entry.data, {"a": 1})
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    @patch("hkopenai.hk_health_mcp_server.cache.time.monotonic")
+    def test_entry_expires_after_ttl(self, mock_monotonic):
+        """
+        Test that an entry is treated as a miss once its TTL has elapsed.
+        """
+        mock_monotonic.return_value = 1000.0
+        cache = ResponseCache()
+        cache.put(("url", "en"), [1, 2], ttl=60)
+        mock_monotonic.return_value = 1059.0
+        self.assertIsNotNone(cache.get(("url", "en")))
+        mock_monotonic.return_value = 1060.0
+        self.assertIsNone(cache.get(("url", "en")))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction_by_entry_count(self):
+        """
+        Test that the least recently used entry is evicted when the entry cap is exceeded.
+        """
+        cache = ResponseCache(max_entries=2)
+        cache.put(("a", "en"), 1, ttl=60)
+        cache.put(("b", "en"), 2, ttl=60)
+        cache.get(("a", "en"))
+        cache.put(("c", "en"), 3, ttl=60)
+        self.assertIsNotNone(cache.get(("a", "en")))
+        self.assertIsNone(cache.get(("b", "en")))
+        self.assertIsNotNone(cache.get(("c", "en")))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_eviction_by_memory_cap(self):
+        """
+        Test that entries are evicted when the total payload size exceeds the byte cap.
+        """
+        cache = ResponseCache(max_bytes=100)
+        cache.put(("a", "en"), "x" * 60, ttl=60)
+        cache.put(("b", "en"), "y" * 60, ttl=60)
+        self.assertIsNone(cache.get(("a", "en")))
+        self.assertIsNotNone(cache.get(("b", "en")))
+        self.assertLessEqual(cache.stats()["bytes"], 100)
+
+
+class TestGetFeedData(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying get_feed_data keys and TTLs.
+    """
+
+    FEED = Feed(name="test", url_template="https://example.com/feed-{lang}.json", ttl=60)
+
+    def setUp(self):
+        """Start each test with an empty response cache."""
+        response_cache.clear()
+
+    async def test_fetches_once_within_ttl(self):
+        """
+        Test that the fetcher is called once and later calls are cache hits.
+        """
+        fetch = AsyncMock(return_value=[{"x": 1}])
+        first = await get_feed_data(self.FEED, "en", fetch)
+        self.assertFalse(first.cache_hit)
+        second = await get_feed_data(self.FEED, "en", fetch)
+        self.assertTrue(second.cache_hit)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first.fetched_at, second.fetched_at)
+        fetch.assert_called_once_with("https://example.com/feed-en.json", self.FEED.ingest)
+
+    async def test_errors_are_not_cached(self):
+        """
+        Test that error payloads are returned but not stored.
+        """
+        fetch = AsyncMock(return_value={"error": "boom"})
+        await get_feed_data(self.FEED, "en", fetch)
+        await get_feed_data(self.FEED, "en", fetch)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(response_cache.stats()["entries"], 0)
+
+    @patch("hkopenai.hk_health_mcp_server.cache.time.monotonic")
+    async def test_stale_copy_served_when_refresh_fails(self, mock_monotonic):
+        """
+        Test that the last good payload is served and marked stale when a refresh fails.
+        """
+        mock_monotonic.return_value = 1000.0
+        fetch = AsyncMock(side_effect=[[{"x": 1}], {"error": "HA down"}])
+        await get_feed_data(self.FEED, "en", fetch)
+        mock_monotonic.return_value = 2000.0
+        result = await get_feed_data(self.FEED, "en", fetch)
+        self.assertEqual(fetch.call_count, 2)
+        self.assertEqual(result.data, [{"x": 1}])
+        self.assertTrue(result.stale)
+        self.assertTrue(result.metadata()["stale"])
+        self.assertGreaterEqual(result.metadata()["snapshot_age_seconds"], 0)
+
+    @patch("hkopenai.hk_health_mcp_server.cache.time.monotonic")
+    async def test_background_refreshed_key_never_fetches_on_request(self, mock_monotonic):
+        """
+        Test that an expired key kept warm by the scheduler is served without a fetch.
+        """
+        mock_monotonic.return_value = 1000.0
+        fetch = AsyncMock(return_value=[{"x": 1}])
+        await get_feed_data(self.FEED, "en", fetch)
+        mock_monotonic.return_value = 2000.0
+        background_refresh_keys.add((self.FEED.url("en"), "en"))
+        try:
+            result = await get_feed_data(self.FEED, "en", fetch)
+        finally:
+            background_refresh_keys.clear()
+        fetch.assert_called_once()
+        self.assertTrue(result.stale)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,349 @@
+"""
+Module for testing the feed change tracking and change subscriptions.
+This module contains unit tests for row diffs, cursors, the 'since' tool parameter
+and resource update notifications.
+"""
+
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+from fastmcp import Client
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import refresh_feed, response_cache
+from hkopenai.hk_health_mcp_server.changefeed import ChangeFeed, FeedChanges, change_feed
+from hkopenai.hk_health_mcp_server.columnar import FeedTable
+from hkopenai.hk_health_mcp_server.feeds import AED, GOPC, SPECIALIST
+from hkopenai.hk_health_mcp_server.server import server
+from hkopenai.hk_health_mcp_server.tools.aed_waiting import _get_aed_waiting_times
+from hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota import _get_pas_gopc_avg_quota
+
+HOSPITALS = [
+    "Alice Ho Miu Ling Nethersole Hospital",
+    "Caritas Medical Centre",
+    "Kwong Wah Hospital",
+    "North District Hospital",
+    "North Lantau Hospital",
+    "Princess Margaret Hospital",
+    "Pok Oi Hospital",
+    "Prince of Wales Hospital",
+    "Pamela Youde Nethersole Eastern Hospital",
+    "Queen Elizabeth Hospital",
+    "Queen Mary Hospital",
+    "Ruttonjee Hospital",
+    "St John Hospital",
+    "Tseung Kwan O Hospital",
+    "Tuen Mun Hospital",
+    "Tin Shui Wai Hospital",
+    "United Christian Hospital",
+    "Yan Chai Hospital",
+]
+
+
+def aed_payload(waits, update_time="10/6/2025 9:45pm"):
+    """Return an AED feed payload with the given top wait per hospital."""
+    return {
+        "waitTime": [{"hospName": name, "topWait": wait} for name, wait in waits.items()],
+        "updateTime": update_time,
+    }
+
+
+class TestFeedChanges(unittest.TestCase):
+    """
+    Test class for verifying row diffs and the change log of one feed variant.
+    """
+
+    def table(self, rows):
+        """Return a GOPC-shaped table of rows."""
+        return FeedTable.from_rows(rows)
+
+    def test_added_changed_and_removed_rows(self):
+        """
+        Test that rows are matched by key and classified as changed or removed.
+        """
+        changes = FeedChanges(("District", "Clinic"))
+        self.assertFalse(
+            changes.update(
+                self.table(
+                    [
+                        {"District": "Eastern", "Clinic": "A", "AvgQuota": "80"},
+                        {"District": "Eastern", "Clinic": "B", "AvgQuota": "90"},
+                        {"District": "Islands", "Clinic": "C", "AvgQuota": "20"},
+                    ]
+                )
+            )
+        )
+        first = changes.version
+        self.assertTrue(
+            changes.update(
+                self.table(
+                    [
+                        {"District": "Islands", "Clinic": "C", "AvgQuota": "20"},
+                        {"District": "Eastern", "Clinic": "A", "AvgQuota": "85"},
+                        {"District": "Wan Chai", "Clinic": "D", "AvgQuota": "60"},
+                    ]
+                )
+            )
+        )
+        positions, removed = changes.since(first)
+        self.assertEqual(positions, [1, 2])
+        self.assertEqual(removed, [{"District": "Eastern", "Clinic": "B", "AvgQuota": "90"}])
+        self.assertEqual(changes.previous, first)
+        self.assertEqual(changes.since(changes.version), ([], []))
+
+    def test_reordered_or_identical_rows_are_not_a_change(self):
+        """
+        Test that a new snapshot with the same rows in another order records no version.
+        """
+        changes = FeedChanges(("District", "Clinic"))
+        rows = [{"District": "Eastern", "Clinic": c, "AvgQuota": "1"} for c in "ABC"]
+        changes.update(self.table(rows))
+        version = changes.version
+        self.assertFalse(changes.update(self.table(rows[::-1])))
+        self.assertEqual(changes.version, version)
+        self.assertIsNone(changes.previous)
+
+    def test_changes_merge_across_versions(self):
+        """
+        Test that a row removed and then added again is reported as changed, not removed.
+        """
+        changes = FeedChanges(("Clinic",))
+        versions = []
+        for rows in (
+            [{"Clinic": "A", "q": 1}, {"Clinic": "B", "q": 1}],
+            [{"Clinic": "A", "q": 1}],
+            [{"Clinic": "A", "q": 2}, {"Clinic": "B", "q": 3}],
+        ):
+            changes.update(self.table(rows))
+            versions.append(changes.version)
+        positions, removed = changes.since(versions[0])
+        self.assertEqual(positions, [0, 1])
+        self.assertEqual(removed, [])
+        self.assertEqual(changes.since(versions[1]), ([0, 1], []))
+
+    def test_log_is_bounded(self):
+        """
+        Test that versions older than the log are unknown.
+        """
+        changes = FeedChanges(("Clinic",), history=2)
+        versions = []
+        for quota in range(5):
+            changes.update(self.table([{"Clinic": "A", "q": quota}]))
+            versions.append(changes.version)
+        self.assertEqual(len(set(versions)), 5)
+        self.assertIsNone(changes.since(versions[1]))
+        self.assertEqual(changes.since(versions[2]), ([0], []))
+        self.assertIsNone(changes.since("0000"))
+
+    def test_specialist_rows_keyed_by_canonical_category(self):
+        """
+        Test that lowercase specialist rows are keyed by category, so removing one shifts no other.
+        """
+        changes = ChangeFeed().changes(SPECIALIST, "en")
+        rows = [
+            {"cluster": "HKEC", "specialty": "Medicine", "category": category, "value": value}
+            for category, value in (("Urgent", "1"), ("Semi-urgent", "10"), ("Stable", "50"))
+        ]
+        changes.update(self.table(rows))
+        first = changes.version
+        changes.update(self.table([rows[0], rows[2]]))
+        positions, removed = changes.since(first)
+        self.assertEqual(positions, [])
+        self.assertEqual(
+            removed,
+            [{"cluster": "HKEC", "specialty": "Medicine", "category": "Semi-urgent", "value": "10"}],
+        )
+
+
+class TestChangeFeed(unittest.TestCase):
+    """
+    Test class for verifying cursors and change listeners across feed variants.
+    """
+
+    def test_cursors_and_listeners(self):
+        """
+        Test that listeners hear each change and unknown cursors reset.
+        """
+        feed = ChangeFeed()
+        heard = []
+        feed.add_listener(lambda *args: heard.append(args))
+        first = FeedTable.from_payload(aed_payload({"Queen Mary Hospital": "Around 1 hour"}), "waitTime")
+        cursor = feed.track(AED, "en", first)
+        self.assertEqual(feed.track(AED, "en", first), cursor)
+        second = FeedTable.from_payload(aed_payload({"Queen Mary Hospital": "Over 2 hours"}), "waitTime")
+        delta = feed.since(AED, "en", second, cursor)
+        self.assertFalse(delta.reset)
+        self.assertEqual(list(delta.positions), [0])
+        self.assertEqual(heard, [("aed", "en", delta.cursor)])
+        for stale in ("0000.1", "garbage", ""):
+            self.assertTrue(feed.since(AED, "en", second, stale).reset)
+
+        resource = feed.resource("aed", "en")
+        self.assertEqual(resource["cursor"], delta.cursor)
+        self.assertEqual(resource["previous_cursor"], cursor)
+        self.assertEqual(resource["changed"], [{"hospName": "Queen Mary Hospital", "topWait": "Over 2 hours"}])
+        self.assertEqual(resource["updateTime"], "10/6/2025 9:45pm")
+        self.assertEqual(feed.resource("gopc", "tc")["changed"], [])
+        self.assertEqual(feed.resource("weather", "en")["type"], "Error")
+
+
+class TestSinceParameter(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that tools return only the rows changed since a cursor.
+    """
+
+    def setUp(self):
+        """Serve self.payload from a stub transport and start with an empty cache."""
+        response_cache.clear()
+        change_feed.clear()
+        self.payload = None
+        http_client.configure(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=json.dumps(self.payload).encode())
+            )
+        )
+
+    def tearDown(self):
+        """Restore the network transport."""
+        http_client.configure()
+
+    async def publish(self, feed, payload):
+        """Make payload the latest version of a feed."""
+        self.payload = payload
+        await refresh_feed(feed, "en", http_client.fetch_json)
+
+    async def test_aed_changes_since_cursor(self):
+        """
+        Test that an AED query with a cursor returns the changed hospitals only.
+        """
+        waits = {name: "Around 1 hour" for name in HOSPITALS}
+        await self.publish(AED, aed_payload(waits))
+        full = await _get_aed_waiting_times()
+        self.assertEqual(len(full["data"]["waitTime"]), 18)
+
+        waits["Tuen Mun Hospital"] = "Over 3 hours"
+        del waits["Pok Oi Hospital"]
+        await self.publish(AED, aed_payload(waits, "10/6/2025 10:00pm"))
+        delta = await _get_aed_waiting_times(since=full["cursor"])
+        self.assertEqual(
+            delta["data"],
+            {
+                "waitTime": [{"hospName": "Tuen Mun Hospital", "topWait": "Over 3 hours"}],
+                "updateTime": "10/6/2025 10:00pm",
+            },
+        )
+        self.assertEqual(delta["removed"], [{"hospName": "Pok Oi Hospital"}])
+        self.assertNotEqual(delta["cursor"], full["cursor"])
+
+        unchanged = await _get_aed_waiting_times(since=delta["cursor"])
+        self.assertEqual(unchanged["data"]["waitTime"], [])
+        self.assertEqual(unchanged["removed"], [])
+
+        # Filters apply to changed and removed hospitals alike.
+        kowloon = await _get_aed_waiting_times(since=full["cursor"], cluster="KWC")
+        self.assertEqual(kowloon["data"]["waitTime"], [])
+        self.assertEqual(kowloon["removed"], [])
+        west = await _get_aed_waiting_times(since=full["cursor"], cluster="NTWC")
+        self.assertEqual(len(west["data"]["waitTime"]), 1)
+        self.assertEqual(west["removed"], [{"hospName": "Pok Oi Hospital"}])
+
+    async def test_delta_cuts_response_size(self):
+        """
+        Test that polling with a cursor sends a fraction of the full table.
+        """
+
+        def size(result):
+            return len(json.dumps({"data": result["data"], "removed": result.get("removed")}))
+
+        waits = {name: "Around 1 hour" for name in HOSPITALS}
+        await self.publish(AED, aed_payload(waits))
+        full = await _get_aed_waiting_times()
+        unchanged = await _get_aed_waiting_times(since=full["cursor"])
+        self.assertLess(size(unchanged) * 10, size(full))
+        waits["Queen Mary Hospital"] = "Over 2 hours"
+        await self.publish(AED, aed_payload(waits, "10/6/2025 10:00pm"))
+        changed = await _get_aed_waiting_times(since=full["cursor"])
+        self.assertLess(size(changed) * 5, size(full))
+
+    async def test_unknown_cursor_returns_everything(self):
+        """
+        Test that a cursor from before a restart returns the full table marked as reset.
+        """
+        await self.publish(GOPC, [{"District": "Eastern", "Clinic": "A", "AvgQuota": "80"}])
+        result = await _get_pas_gopc_avg_quota(since="deadbeef.3")
+        self.assertTrue(result["reset"])
+        self.assertEqual(len(result["data"]), 1)
+        self.assertEqual(result["message"], "Retrieved data for 1 clinics")
+
+        await self.publish(
+            GOPC,
+            [
+                {"District": "Eastern", "Clinic": "A", "AvgQuota": "80"},
+                {"District": "Eastern", "Clinic": "B", "AvgQuota": "40"},
+            ],
+        )
+        changed = await _get_pas_gopc_avg_quota(district="Eastern", since=result["cursor"])
+        self.assertEqual(changed["data"], [{"District": "Eastern", "Clinic": "B", "AvgQuota": "40"}])
+        self.assertEqual(changed["message"], "Retrieved data for 1 changed clinics in Eastern")
+
+
+class TestSubscriptions(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying change resources and update notifications through a client.
+    """
+
+    async def test_subscriber_notified_of_feed_change(self):
+        """
+        Test that a subscribed client is notified when a fetched feed version changes.
+        """
+        response_cache.clear()
+        change_feed.clear()
+        payloads = [
+            aed_payload({"Queen Mary Hospital": "Around 1 hour"}),
+            aed_payload({"Queen Mary Hospital": "Over 2 hours"}, "10/6/2025 10:00pm"),
+        ]
+        http_client.configure(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=json.dumps(payloads[0]).encode())
+            )
+        )
+        uri = "hkhealth://changes/aed/en"
+        notified = []
+
+        async def on_message(message):
+            uri_of = getattr(getattr(message, "params", None), "uri", None)
+            if uri_of is not None:
+                notified.append(str(uri_of))
+
+        try:
+            with patch.dict(
+                "os.environ",
+                {
+                    "HK_HEALTH_BACKGROUND_REFRESH": "false",
+                    "HK_HEALTH_SNAPSHOT_PATH": "off",
+                    "HK_HEALTH_AED_HISTORY_PATH": "off",
+                    "HK_HEALTH_GOPC_HISTORY_PATH": "off",
+                },
+            ):
+                async with Client(server(), message_handler=on_message, mode="legacy") as client:
+                    await client.call_tool("get_aed_waiting_times", {})
+                    await client.session.subscribe_resource(uri)
+                    payloads.pop(0)
+                    await refresh_feed(AED, "en", http_client.fetch_json)
+                    for _ in range(100):
+                        if notified:
+                            break
+                        await client.ping()
+                    contents = await client.read_resource(uri)
+        finally:
+            http_client.configure()
+        self.assertEqual(notified, [uri])
+        changes = json.loads(contents[0].text)
+        self.assertEqual(changes["changed"], [{"hospName": "Queen Mary Hospital", "topWait": "Over 2 hours"}])
+        self.assertEqual(changes["updateTime"], "10/6/2025 10:00pm")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,266 @@
+"""
+Module for testing retries and the per-host circuit breaker around upstream requests.
+This module contains unit tests for CircuitBreaker and tests against a local stub
+server that injects errors, dropped connections and slow replies.
+"""
+
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client, metrics
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+)
+from hkopenai.hk_health_mcp_server.feeds import GOPC
+from hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota import _get_pas_gopc_avg_quota
+
+HOST = "www.ha.org.hk"
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """
+    Test class for verifying the breaker state machine.
+    """
+
+    @patch("hkopenai.hk_health_mcp_server.circuit_breaker.time.monotonic")
+    def test_open_probe_and_close(self, mock_monotonic):
+        """
+        Test that failures open the circuit, one probe is let through and success closes it.
+        """
+        mock_monotonic.return_value = 100.0
+        states = []
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, on_change=states.append)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.retry_after(), 10)
+
+        mock_monotonic.return_value = 110.0
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(states, [OPEN, HALF_OPEN, CLOSED])
+
+    @patch("hkopenai.hk_health_mcp_server.circuit_breaker.time.monotonic")
+    def test_failed_probe_doubles_open_period(self, mock_monotonic):
+        """
+        Test that a failed probe re-opens the circuit for longer, up to the maximum.
+        """
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, max_reset_timeout=25)
+        breaker.record_failure()
+        for now, open_for in ((10.0, 20), (30.0, 25), (55.0, 25)):
+            mock_monotonic.return_value = now
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+            self.assertEqual((breaker.state, breaker.open_for), (OPEN, open_for))
+
+    @patch("hkopenai.hk_health_mcp_server.circuit_breaker.time.monotonic")
+    def test_lost_probe_is_given_up(self, mock_monotonic):
+        """
+        Test that a probe which never reports back does not keep the circuit half-open.
+        """
+        mock_monotonic.return_value = 0.0
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record_failure()
+        mock_monotonic.return_value = 10.0
+        self.assertTrue(breaker.allow())
+        mock_monotonic.return_value = 15.0
+        self.assertFalse(breaker.allow())
+        mock_monotonic.return_value = 20.0
+        self.assertTrue(breaker.allow())
+
+
+class _FaultyHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the HA site replying according to a script of faults.
+
+    Each request takes the next entry of 'script', then 'default' once it runs out:
+    'ok' serves the feed, a number replies with that status, 'drop' closes the
+    connection without a reply and 'slow' waits past the client's read timeout.
+    """
+
+    body = json.dumps(
+        [{"District": "Tuen Mun", "Clinic": "Tuen Mun Clinic", "AvgQuota": "150"}]
+    ).encode("utf-8")
+    script = []
+    default = "ok"
+    paths = []
+    lock = threading.Lock()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the next scripted reply."""
+        with self.lock:
+            self.paths.append(self.path)
+            fault = self.script.pop(0) if self.script else self.default
+        if fault == "drop":
+            self.close_connection = True
+            self.connection.close()
+            return
+        if fault == "slow":
+            time.sleep(0.5)
+            fault = "ok"
+        if fault == "ok":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(self.body)))
+            self.end_headers()
+            self.wfile.write(self.body)
+            return
+        self.send_response(int(fault))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence request logging."""
+
+
+class _StubTransport(httpx.AsyncBaseTransport):
+    """Send requests for the HA site to the local stand-in, keeping host-based state."""
+
+    def __init__(self, port: int):
+        self._port = port
+        self._inner = httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port=self._port)
+        return await self._inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class TestFaultInjection(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying retries, fail-fast and stale fallback against a faulty server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the local stand-in server."""
+        cls.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _FaultyHandler)
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the local stand-in server."""
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+
+    def setUp(self):
+        """Route the HA site to the stand-in with quick retries and a small breaker."""
+        response_cache.clear()
+        http_client.reset_conditional_get()
+        _FaultyHandler.script = []
+        _FaultyHandler.default = "ok"
+        _FaultyHandler.paths = []
+        http_client.configure(
+            transport=_StubTransport(self.httpd.server_address[1]),
+            read_timeout=0.2,
+            retry_attempts=3,
+            retry_base_delay=0.01,
+            retry_max_delay=0.02,
+            breaker_failures=3,
+            breaker_reset=0.3,
+        )
+        metrics.configure(enabled=True)
+        metrics.reset()
+
+    async def asyncTearDown(self):
+        """Close the client and restore the default settings."""
+        await http_client.aclose()
+        metrics.configure(enabled=False)
+        metrics.reset()
+        http_client.configure(
+            read_timeout=http_client.DEFAULT_READ_TIMEOUT,
+            retry_attempts=http_client.DEFAULT_RETRY_ATTEMPTS,
+            retry_base_delay=http_client.DEFAULT_RETRY_BASE_DELAY,
+            retry_max_delay=http_client.DEFAULT_RETRY_MAX_DELAY,
+            breaker_failures=http_client.DEFAULT_BREAKER_FAILURES,
+            breaker_reset=http_client.DEFAULT_BREAKER_RESET,
+        )
+
+    async def test_transient_failures_are_retried(self):
+        """
+        Test that a 503, a dropped connection and a slow reply are retried until one succeeds.
+        """
+        for script in (["503", "ok"], ["drop", "ok"], ["slow", "502", "ok"]):
+            _FaultyHandler.script = list(script)
+            _FaultyHandler.paths = []
+            data = await http_client.fetch_json(GOPC.url("en"))
+            self.assertEqual(data[0]["District"], "Tuen Mun", script)
+            self.assertEqual(len(_FaultyHandler.paths), len(script), script)
+        self.assertEqual(metrics.UPSTREAM_RETRIES.value(HOST), 4)
+        self.assertEqual(http_client.circuit_states()[HOST]["state"], CLOSED)
+
+    async def test_client_errors_are_not_retried(self):
+        """
+        Test that a 404 is returned at once and does not count against the host.
+        """
+        _FaultyHandler.default = "404"
+        result = await http_client.fetch_json(GOPC.url("en"))
+        self.assertIn("Status code: 404", result["error"])
+        self.assertEqual(len(_FaultyHandler.paths), 1)
+        self.assertEqual(http_client.circuit_states()[HOST]["consecutive_failures"], 0)
+
+    async def test_open_circuit_fails_fast_and_recovers(self):
+        """
+        Test that a failing host opens the circuit, calls then fail fast, and a probe closes it.
+        """
+        _FaultyHandler.default = "503"
+        result = await http_client.fetch_json(GOPC.url("en"))
+        self.assertIn("Status code: 503", result["error"])
+        self.assertEqual(len(_FaultyHandler.paths), 3)
+        self.assertEqual(http_client.circuit_states()[HOST]["state"], OPEN)
+        self.assertEqual(metrics.CIRCUIT_STATE.value(HOST), 2)
+
+        started = time.perf_counter()
+        result = await http_client.fetch_json(GOPC.url("tc"))
+        self.assertLess(time.perf_counter() - started, 0.05)
+        self.assertIn("requests are paused", result["error"])
+        self.assertEqual(len(_FaultyHandler.paths), 3)
+        self.assertEqual(metrics.UPSTREAM_RESPONSES.value(HOST, "circuit_open"), 1)
+
+        _FaultyHandler.default = "ok"
+        time.sleep(0.3)
+        data = await http_client.fetch_json(GOPC.url("en"))
+        self.assertEqual(data[0]["Clinic"], "Tuen Mun Clinic")
+        self.assertEqual(http_client.circuit_states()[HOST]["state"], CLOSED)
+        self.assertEqual(metrics.CIRCUIT_STATE.value(HOST), 0)
+
+    async def test_tool_serves_last_good_snapshot_while_open(self):
+        """
+        Test that a tool keeps answering from its last good snapshot during an outage.
+        """
+        fresh = await _get_pas_gopc_avg_quota(lang="en")
+        self.assertFalse(fresh["stale"])
+        response_cache.peek((GOPC.url("en"), "en")).expires_at = 0
+
+        _FaultyHandler.default = "drop"
+        _FaultyHandler.paths = []
+        for _ in range(3):
+            result = await _get_pas_gopc_avg_quota(lang="en", district="Tuen Mun")
+            self.assertTrue(result["stale"])
+            self.assertEqual(result["data"], fresh["data"])
+        self.assertEqual(len(_FaultyHandler.paths), 3)
+        self.assertEqual(http_client.circuit_states()[HOST]["state"], OPEN)
+
+        result = await _get_pas_gopc_avg_quota(lang="tc")
+        self.assertEqual(result["type"], "Error")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Module for testing the columnar feed snapshot representation.
+This module contains unit tests for FeedTable construction, projection and sizing.
+"""
+
+import json
+import math
+import unittest
+
+from hkopenai.hk_health_mcp_server.cache import _estimate_size
+from hkopenai.hk_health_mcp_server.columnar import FeedTable
+from hkopenai.hk_health_mcp_server.feeds import AED, GOPC
+
+
+class TestFeedTable(unittest.TestCase):
+    """
+    Test class for verifying that feed payloads round-trip through FeedTable.
+    """
+
+    ROWS = [
+        {"District": "Tuen Mun", "Clinic": "Tuen Mun Clinic", "AvgQuota": "150"},
+        {"District": "Tuen Mun", "Clinic": "Siu Lam Clinic", "AvgQuota": "50"},
+        {"District": "Eastern", "Clinic": "Chai Wan Clinic"},
+    ]
+
+    def test_list_payload_round_trip(self):
+        """
+        Test that a list payload is rebuilt unchanged, including absent fields.
+        """
+        table = GOPC.ingest(self.ROWS)
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.to_payload(), self.ROWS)
+        self.assertEqual(table[2], self.ROWS[2])
+        self.assertEqual(table[-1], self.ROWS[2])
+        self.assertEqual(list(table), self.ROWS)
+
+    def test_object_payload_keeps_extras(self):
+        """
+        Test that fields outside the row list are kept and restored.
+        """
+        payload = {"waitTime": [{"hospName": "A", "topWait": "Over 1 hour"}], "updateTime": "now"}
+        table = AED.ingest(payload)
+        self.assertEqual(table.extras, {"updateTime": "now"})
+        self.assertEqual(table.to_payload(), payload)
+
+    def test_projection_and_positions(self):
+        """
+        Test that rows can be selected by position and projected to fields.
+        """
+        table = FeedTable.from_rows(self.ROWS)
+        self.assertEqual(
+            table.to_payload([1, 2], ["Clinic"]),
+            [{"Clinic": "Siu Lam Clinic"}, {"Clinic": "Chai Wan Clinic"}],
+        )
+        self.assertEqual(table.rows(fields=["Missing"]), [{}, {}, {}])
+
+    def test_strings_are_shared(self):
+        """
+        Test that repeated values are held as one string object.
+        """
+        rows = json.loads(json.dumps(self.ROWS))
+        table = FeedTable.from_rows(rows)
+        district = table.column("District")
+        self.assertIs(district[0], district[1])
+
+    def test_numeric_columns_parsed_once(self):
+        """
+        Test that columns of numeric strings are parsed into float arrays.
+        """
+        table = FeedTable.from_rows(self.ROWS)
+        quota = table.numeric["AvgQuota"]
+        self.assertEqual(quota[:2].tolist(), [150.0, 50.0])
+        self.assertTrue(math.isnan(quota[2]))
+        self.assertNotIn("District", table.numeric)
+
+    def test_invalid_payloads(self):
+        """
+        Test that unexpected payload shapes give an empty table.
+        """
+        self.assertEqual(len(FeedTable.from_payload("oops")), 0)
+        self.assertEqual(len(FeedTable.from_rows([1, None, {"a": 1}])), 1)
+        self.assertEqual(AED.ingest({"waitTime": None}).to_payload(), {"waitTime": []})
+
+    def test_size_estimate_uses_table(self):
+        """
+        Test that the cache sizes a table by its own estimate.
+        """
+        table = FeedTable.from_rows(self.ROWS * 100)
+        self.assertEqual(_estimate_size(table), table.nbytes())
+        self.assertGreater(table.nbytes(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
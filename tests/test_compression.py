@@ -0,0 +1,214 @@
+"""
+Module for testing the compression of HTTP responses.
+This module contains unit tests for encoding negotiation, splicing precompressed
+payloads into compressed bodies and the ASGI middleware for JSON and event streams.
+"""
+
+import gzip
+import importlib.util
+import os
+import unittest
+import zlib
+from unittest.mock import patch
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import compression, serialization
+from hkopenai.hk_health_mcp_server.compression import (
+    CompressionMiddleware,
+    SegmentCache,
+    negotiate,
+)
+
+HAS_ZSTD = importlib.util.find_spec("zstandard") is not None
+ROWS = [{"District": "Tuen Mun", "Clinic": f"Clinic {i}", "AvgQuota": str(i)} for i in range(200)]
+
+
+def _segments():
+    """Return a segment cache holding the encoding of ROWS."""
+    segments = SegmentCache(min_size=64)
+    segments.remember(serialization.dumps(ROWS))
+    return segments
+
+
+def _body(request_id=1):
+    """Return a response body carrying ROWS twice, as a tool result does."""
+    text = serialization.dumps({"data": ROWS, "cache_hit": True})
+    return serialization.dumps(
+        {"id": request_id, "result": {"content": [{"text": text}], "structuredContent": {"data": ROWS}}}
+    ).encode("utf-8")
+
+
+class TestNegotiation(unittest.TestCase):
+    """
+    Test class for verifying the choice of encoding.
+    """
+
+    def test_negotiate(self):
+        """
+        Test preference order, quality values, wildcards and refusals.
+        """
+        both = ("zstd", "gzip")
+        self.assertEqual(negotiate("gzip, deflate, br, zstd", both), "zstd")
+        self.assertEqual(negotiate("gzip;q=1.0, zstd;q=0.5", both), "gzip")
+        self.assertEqual(negotiate("gzip", both), "gzip")
+        self.assertEqual(negotiate("*", ("gzip",)), "gzip")
+        self.assertIsNone(negotiate("gzip;q=0", both))
+        self.assertIsNone(negotiate("identity", both))
+        self.assertIsNone(negotiate("br", ("gzip",)))
+
+    def test_encodings_from_env(self):
+        """
+        Test the HK_HEALTH_COMPRESSION values.
+        """
+        available = compression.available_encodings()
+        for value, expected in (("off", ()), ("auto", available), ("gzip", ("gzip",)), ("lz4", ())):
+            with patch.dict(os.environ, {"HK_HEALTH_COMPRESSION": value}):
+                self.assertEqual(compression.encodings_from_env(), expected)
+
+
+class TestSplicing(unittest.TestCase):
+    """
+    Test class for verifying bodies compressed with precompressed segments.
+    """
+
+    def test_segments_found_in_both_forms(self):
+        """
+        Test that a payload is found as JSON and escaped inside the text content.
+        """
+        body = _body()
+        found = _segments().find(body)
+        self.assertEqual(len(found), 2)
+        for start, segment in found:
+            self.assertEqual(body[start:start + len(segment.data)], segment.data)
+
+    def test_gzip_round_trip(self):
+        """
+        Test that spliced gzip bodies decode to the original body.
+        """
+        segments = _segments()
+        rows = serialization.dumps(ROWS).encode("utf-8")
+        for body in (_body(), _body(7), rows, rows + b"," + rows, b"x" * 10):
+            with self.subTest(size=len(body)):
+                self.assertEqual(gzip.decompress(compression.compress(body, "gzip", segments)), body)
+        self.assertEqual(gzip.decompress(compression.compress(_body(), "gzip")), _body())
+
+    def test_segment_compressed_once(self):
+        """
+        Test that the compressed form of a segment is reused by later bodies.
+        """
+        segments = _segments()
+        compression.compress(_body(1), "gzip", segments)
+        with patch.object(compression.zlib, "compressobj", wraps=zlib.compressobj) as compressobj:
+            compression.compress(_body(2), "gzip", segments)
+        self.assertEqual(compressobj.call_count, 1)
+
+    @unittest.skipUnless(HAS_ZSTD, "zstandard is not installed")
+    def test_zstd_round_trip(self):
+        """
+        Test that spliced zstd bodies of several frames decode to the original body.
+        """
+        import zstandard  # pylint: disable=import-outside-toplevel
+
+        body = _body()
+        encoded = compression.compress(body, "zstd", _segments())
+        self.assertEqual(zstandard.ZstdDecompressor().decompressobj().decompress(encoded), body)
+
+    def test_remembered_on_encoding(self):
+        """
+        Test that payloads encoded by the serialization layer are remembered when large.
+        """
+        segments = SegmentCache(min_size=64)
+        serialization.add_encoding_listener(segments.remember)
+        try:
+            serialization.encode(serialization.encodable([{"a": 1}]))
+            self.assertEqual(len(segments), 0)
+            serialization.encode(serialization.encodable(list(ROWS)))
+            self.assertEqual(len(segments), 2)
+        finally:
+            serialization.remove_encoding_listener(segments.remember)
+
+
+def _app(chunks, content_type=b"application/json"):
+    """Return an ASGI app sending a response body in chunks."""
+
+    async def app(scope, receive, send):
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", content_type),
+                    (b"content-length", str(sum(map(len, chunks))).encode()),
+                ],
+            }
+        )
+        for i, chunk in enumerate(chunks):
+            await send(
+                {"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1}
+            )
+
+    return app
+
+
+class TestMiddleware(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the compression middleware.
+    """
+
+    async def _get(self, app, accept="gzip"):
+        """Send one request through the middleware and return the response."""
+        middleware = CompressionMiddleware(app, ("gzip",), _segments(), min_size=100)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/mcp", headers={"Accept-Encoding": accept})
+
+    async def test_json_compressed(self):
+        """
+        Test that a large JSON body is compressed and a small one is not.
+        """
+        response = await self._get(_app([_body()]))
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(response.content, _body())
+        self.assertLess(response.num_bytes_downloaded, len(_body()) // 5)
+        small = await self._get(_app([b'{"a":1}']))
+        self.assertNotIn("content-encoding", small.headers)
+        self.assertEqual(small.content, b'{"a":1}')
+
+    async def test_not_accepted_or_not_json(self):
+        """
+        Test that bodies are sent as they are without Accept-Encoding or for other types.
+        """
+        plain = await self._get(_app([_body()]), accept="identity")
+        self.assertNotIn("content-encoding", plain.headers)
+        self.assertEqual(plain.content, _body())
+        html = await self._get(_app([_body()], content_type=b"text/html"))
+        self.assertNotIn("content-encoding", html.headers)
+
+    async def test_event_stream_flushed_per_event(self):
+        """
+        Test that every event of a stream can be decoded as soon as it arrives.
+        """
+        events = [b"event: message\ndata: " + _body(i) + b"\n\n" for i in range(3)]
+        middleware = CompressionMiddleware(
+            _app(events, b"text/event-stream"), ("gzip",), _segments(), min_size=100
+        )
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        await middleware(scope, None, send)
+        headers = dict(sent[0]["headers"])
+        self.assertEqual(headers[b"content-encoding"], b"gzip")
+        self.assertNotIn(b"content-length", headers)
+        decoder = zlib.decompressobj(31)
+        for event, message in zip(events, sent[1:]):
+            self.assertEqual(decoder.decompress(message["body"]), event)
+        self.assertTrue(decoder.eof)
+
+
+if __name__ == "__main__":
+    unittest.main()
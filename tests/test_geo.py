@@ -0,0 +1,67 @@
+"""
+Module for testing the spatial index of Hong Kong locations.
+This module contains unit tests for the projection and nearest-first KD-tree traversal.
+"""
+
+import math
+import random
+import unittest
+
+from hkopenai.hk_health_mcp_server.geo import KDTree, in_hong_kong, project
+from hkopenai.hk_health_mcp_server.reference import DISTRICT_CENTRES, HOSPITAL_COORDINATES
+
+
+class TestGeo(unittest.TestCase):
+    """
+    Test class for verifying the projection and the KD-tree.
+    """
+
+    def test_projection_distance(self):
+        """
+        Test that planar distances match the great-circle distance across Hong Kong.
+        """
+        tmh, pyn = HOSPITAL_COORDINATES["TMH"], HOSPITAL_COORDINATES["PYN"]
+        (x1, y1), (x2, y2) = project(*tmh), project(*pyn)
+        lat1, lon1, lat2, lon2 = map(math.radians, (*tmh, *pyn))
+        haversine = 2 * 6371.0 * math.asin(
+            math.sqrt(
+                math.sin((lat2 - lat1) / 2) ** 2
+                + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+            )
+        )
+        self.assertAlmostEqual(math.hypot(x2 - x1, y2 - y1), haversine, delta=haversine * 0.005)
+
+    def test_reference_locations_in_hong_kong(self):
+        """
+        Test that every hospital and district centre lies within the bounding box.
+        """
+        for latitude, longitude in [*HOSPITAL_COORDINATES.values(), *DISTRICT_CENTRES.values()]:
+            self.assertTrue(in_hong_kong(latitude, longitude))
+        self.assertFalse(in_hong_kong(22.54, 114.05 + 1))
+
+    def test_nearest_yields_every_point_in_distance_order(self):
+        """
+        Test that traversal order matches a brute-force sort for random points.
+        """
+        rng = random.Random(7)
+        points = [(rng.uniform(0, 50), rng.uniform(0, 50)) for _ in range(200)]
+        tree = KDTree(points)
+        for _ in range(20):
+            query = (rng.uniform(-5, 55), rng.uniform(-5, 55))
+            expected = sorted(
+                math.hypot(x - query[0], y - query[1]) for x, y in points
+            )
+            got = [distance for distance, _ in tree.nearest(query)]
+            self.assertEqual(len(got), len(points))
+            for a, b in zip(got, expected):
+                self.assertAlmostEqual(a, b)
+
+    def test_empty_tree(self):
+        """
+        Test that an empty tree yields nothing.
+        """
+        self.assertEqual(list(KDTree([]).nearest((0.0, 0.0))), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
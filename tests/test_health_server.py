@@ -6,6 +6,7 @@ This module contains unit tests to verify the behavior of the server setup.
 import unittest
 from unittest.mock import patch, Mock
 from hkopenai.hk_health_mcp_server import server
+from hkopenai.hk_health_mcp_server.server import lifespan
 
 
 class TestApp(unittest.TestCase):
@@ -16,14 +17,36 @@ class TestApp(unittest.TestCase):
 
     @patch("hkopenai.hk_health_mcp_server.server.FastMCP")
     @patch("hkopenai.hk_health_mcp_server.tools.aed_waiting.register")
+    @patch("hkopenai.hk_health_mcp_server.tools.aed_waiting_stats.register")
+    @patch("hkopenai.hk_health_mcp_server.tools.aed_nearest.register")
     @patch(
         "hkopenai.hk_health_mcp_server.tools.specialist_waiting_time_by_cluster.register"
     )
+    @patch("hkopenai.hk_health_mcp_server.tools.specialist_ranking.register")
     @patch("hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota.register")
+    @patch("hkopenai.hk_health_mcp_server.tools.gopc_quota_trend.register")
+    @patch("hkopenai.hk_health_mcp_server.tools.health_snapshot.register")
+    @patch("hkopenai.hk_health_mcp_server.tools.batch_health_query.register")
+    @patch("hkopenai.hk_health_mcp_server.changefeed.register")
+    @patch("hkopenai.hk_health_mcp_server.scheduler.register")
+    @patch("hkopenai.hk_health_mcp_server.schemas.register")
+    @patch("hkopenai.hk_health_mcp_server.metrics.register")
+    @patch("hkopenai.hk_health_mcp_server.ratelimit.register")
     def test_create_mcp_server(
         self,
+        mock_ratelimit_register,
+        mock_metrics_register,
+        mock_schemas_register,
+        mock_scheduler_register,
+        mock_changefeed_register,
+        mock_tool_batch_health_query,
+        mock_tool_health_snapshot,
+        mock_tool_gopc_quota_trend,
         mock_tool_pas_gopc_avg_quota,
+        mock_tool_specialist_ranking,
         mock_tool_specialist_waiting_time_by_cluster,
+        mock_tool_aed_nearest,
+        mock_tool_aed_waiting_stats,
         mock_tool_aed_waiting,
         mock_fastmcp,
     ):
@@ -43,14 +66,27 @@ class TestApp(unittest.TestCase):
         mcp_instance = server()
 
         # Verify server creation
-        mock_fastmcp.assert_called_once_with(name="HK OpenAI Health Server")
+        mock_fastmcp.assert_called_once_with(
+            name="HK OpenAI Health Server", lifespan=lifespan
+        )
         self.assertEqual(mcp_instance, mock_server)
 
         mock_tool_aed_waiting.assert_called_once_with(mock_server)
+        mock_tool_aed_waiting_stats.assert_called_once_with(mock_server)
+        mock_tool_aed_nearest.assert_called_once_with(mock_server)
         mock_tool_specialist_waiting_time_by_cluster.assert_called_once_with(
             mock_server
         )
+        mock_tool_specialist_ranking.assert_called_once_with(mock_server)
         mock_tool_pas_gopc_avg_quota.assert_called_once_with(mock_server)
+        mock_tool_gopc_quota_trend.assert_called_once_with(mock_server)
+        mock_tool_health_snapshot.assert_called_once_with(mock_server)
+        mock_tool_batch_health_query.assert_called_once_with(mock_server)
+        mock_changefeed_register.assert_called_once_with(mock_server)
+        mock_scheduler_register.assert_called_once_with(mock_server)
+        mock_schemas_register.assert_called_once_with(mock_server)
+        mock_metrics_register.assert_called_once_with(mock_server)
+        mock_ratelimit_register.assert_called_once_with(mock_server)
 
 
 if __name__ == "__main__":
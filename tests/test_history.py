@@ -0,0 +1,257 @@
+"""
+Module for testing the AED waiting time history and its statistics tool.
+This module contains unit tests for AedHistory recording, persistence and aggregation.
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from hkopenai.hk_health_mcp_server import cache
+from hkopenai.hk_health_mcp_server.cache import refresh_feed, response_cache
+from hkopenai.hk_health_mcp_server.feeds import AED
+from hkopenai.hk_health_mcp_server.history import (
+    HK_TIMEZONE,
+    SAMPLE_DTYPE,
+    AedHistory,
+    aed_history,
+    parse_days,
+    parse_hours,
+    parse_update_time,
+    parse_wait_minutes,
+)
+from hkopenai.hk_health_mcp_server.tools.aed_waiting_stats import (
+    _get_aed_waiting_time_stats,
+)
+
+
+def _hk(*args) -> float:
+    """Return the epoch seconds of a Hong Kong local time."""
+    return datetime(*args, tzinfo=HK_TIMEZONE).timestamp()
+
+
+class TestParsing(unittest.TestCase):
+    """
+    Test class for verifying the parsing of published waits, times and filters.
+    """
+
+    def test_wait_minutes(self):
+        """
+        Test that waits in English and Chinese are converted to minutes.
+        """
+        self.assertEqual(parse_wait_minutes("Over 4 hours"), 240)
+        self.assertEqual(parse_wait_minutes("Around 1 hour"), 60)
+        self.assertEqual(parse_wait_minutes("超過2小時"), 120)
+        self.assertEqual(parse_wait_minutes("约30分钟"), 30)
+        self.assertIsNone(parse_wait_minutes("Unknown"))
+        self.assertIsNone(parse_wait_minutes(None))
+
+    def test_update_time(self):
+        """
+        Test that the AED updateTime is read as Hong Kong time.
+        """
+        self.assertEqual(parse_update_time("10/6/2025 9:45pm"), _hk(2025, 6, 10, 21, 45))
+        self.assertIsNone(parse_update_time("yesterday"))
+
+    def test_days_and_hours(self):
+        """
+        Test that day names and hour ranges, including ranges past midnight, are parsed.
+        """
+        self.assertEqual(parse_days(["Fri", "saturday"]), [4, 5])
+        self.assertIsNone(parse_days(None))
+        self.assertEqual(parse_hours("18-21"), [18, 19, 20])
+        self.assertEqual(parse_hours("22-2"), [22, 23, 0, 1])
+        with self.assertRaises(ValueError):
+            parse_days(["Funday"])
+        with self.assertRaises(ValueError):
+            parse_hours("evening")
+
+
+class TestAedHistory(unittest.TestCase):
+    """
+    Test class for verifying recording and vectorized aggregation of AED waits.
+    """
+
+    def setUp(self):
+        """Start with an empty history."""
+        self.history = AedHistory()
+
+    def test_record_skips_repeated_publications(self):
+        """
+        Test that each publication is recorded once and unknown rows are skipped.
+        """
+        rows = [
+            {"hospName": "Queen Elizabeth Hospital", "topWait": "Over 3 hours"},
+            {"hospName": "屯門醫院", "topWait": "超過3小時"},
+            {"hospName": "Nowhere Hospital", "topWait": "Over 1 hour"},
+        ]
+        self.assertEqual(self.history.record(rows[:1], 1000.0), 1)
+        self.assertEqual(self.history.record(rows[1:], 999.0), 0)
+        self.assertEqual(self.history.record(rows, 2000.0), 2)
+        self.assertEqual(len(self.history), 3)
+
+    def test_aggregate_matches_numpy(self):
+        """
+        Test min, max, mean and percentiles per hospital against numpy.
+        """
+        waits = [60, 120, 240, 30, 90]
+        for i, wait in enumerate(waits):
+            self.history.record(
+                [
+                    {"hospName": "Queen Elizabeth Hospital", "topWait": f"{wait} minutes"},
+                    {"hospName": "Tuen Mun Hospital", "topWait": "1 hour"},
+                ],
+                1000.0 + i,
+            )
+        result = self.history.aggregate(0, 2000, percentiles=[50, 90])
+        qeh = next(r for r in result if r["hospCode"] == "QEH")
+        self.assertEqual(qeh["samples"], 5)
+        self.assertEqual(qeh["min"], 30)
+        self.assertEqual(qeh["max"], 240)
+        self.assertEqual(qeh["mean"], round(float(np.mean(waits)), 1))
+        self.assertEqual(qeh["p50"], np.percentile(waits, 50))
+        self.assertEqual(qeh["p90"], round(float(np.percentile(waits, 90)), 1))
+        self.assertEqual(self.history.aggregate(0, 2000, hospitals=["TMH"])[0]["p90"], 60)
+
+    def test_day_hour_and_bucket_filters(self):
+        """
+        Test that weekday and hour filters use Hong Kong time and buckets split the window.
+        """
+        friday_evening = _hk(2025, 7, 11, 19, 0)
+        friday_morning = _hk(2025, 7, 11, 9, 0)
+        saturday_evening = _hk(2025, 7, 12, 19, 0)
+        for ts, wait in ((friday_morning, 1), (friday_evening, 3), (saturday_evening, 5)):
+            self.history.record(
+                [{"hospName": "Queen Elizabeth Hospital", "topWait": f"{wait} hours"}], ts
+            )
+        start, end = _hk(2025, 7, 11), _hk(2025, 7, 13)
+        result = self.history.aggregate(start, end, days=[4], hours=parse_hours("18-23"))
+        self.assertEqual([(r["samples"], r["mean"]) for r in result], [(1, 180.0)])
+        buckets = self.history.aggregate(start, end, bucket_seconds=86400)
+        self.assertEqual([(r["from"][:10], r["samples"]) for r in buckets],
+                         [("2025-07-11", 2), ("2025-07-12", 1)])
+        self.assertEqual(self.history.aggregate(end, end + 1), [])
+
+    def test_month_of_samples_is_fast(self):
+        """
+        Test that a month of 15-minute samples for 18 hospitals aggregates in milliseconds.
+        """
+        codes = ["AHN", "CMC", "KWH", "NDH", "NLT", "PYN", "POH", "PWH", "PMH",
+                 "QEH", "QMH", "RH", "SJH", "TSH", "TKO", "TMH", "UCH", "YCH"]
+        steps = 30 * 24 * 4
+        records = np.empty(steps * len(codes), dtype=SAMPLE_DTYPE)
+        records["ts"] = np.repeat(time.time() - np.arange(steps) * 900.0, len(codes))
+        records["hosp"] = np.tile(np.array(codes, dtype="S4"), steps)
+        records["wait"] = np.random.default_rng(0).integers(1, 9, len(records)) * 30
+        self.history._append(records)  # pylint: disable=protected-access
+
+        started = time.perf_counter()
+        result = self.history.aggregate(
+            time.time() - 31 * 86400, time.time() + 1, days=[4], hours=list(range(18, 23)),
+            percentiles=[50, 90, 99],
+        )
+        elapsed = time.perf_counter() - started
+        self.assertEqual(len(result), 18)
+        self.assertLess(elapsed, 0.25)
+
+    def test_persisted_samples_reload(self):
+        """
+        Test that samples appended to the file are loaded again and expired ones dropped.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "aed.bin")
+            self.history.open(path)
+            row = [{"hospName": "Tuen Mun Hospital", "topWait": "Over 2 hours"}]
+            self.history.record(row, time.time() - 100 * 86400)
+            self.history.record(row, time.time() - 60)
+            self.history.close()
+
+            reloaded = AedHistory(retention_days=90)
+            reloaded.open(path)
+            self.assertEqual(len(reloaded), 1)
+            self.assertEqual(os.path.getsize(path), SAMPLE_DTYPE.itemsize)
+            self.assertEqual(reloaded.record(row, time.time() - 120), 0)
+
+    @unittest.skipIf(fcntl is None, "file locks are not available")
+    def test_compaction_waits_for_file_lock(self):
+        """
+        Test that loading and compacting the file waits while another process appends to it.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "aed.bin")
+            row = [{"hospName": "Tuen Mun Hospital", "topWait": "Over 2 hours"}]
+            self.history.open(path)
+            self.history.record(row, time.time() - 100 * 86400)
+            self.history.close()
+            reloaded = AedHistory(retention_days=90)
+            with open(path, "a+b") as writer:
+                fcntl.flock(writer, fcntl.LOCK_EX)
+                opener = threading.Thread(target=reloaded.open, args=(path,))
+                opener.start()
+                opener.join(0.2)
+                self.assertTrue(opener.is_alive())
+                writer.write(np.array([(time.time(), b"TMH", 120.0)], dtype=SAMPLE_DTYPE).tobytes())
+                writer.flush()
+                fcntl.flock(writer, fcntl.LOCK_UN)
+            opener.join()
+            self.assertEqual(len(reloaded), 1)
+            self.assertEqual(os.path.getsize(path), SAMPLE_DTYPE.itemsize)
+
+
+class TestAedWaitingTimeStatsTool(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that fetched AED snapshots feed the statistics tool.
+    """
+
+    def setUp(self):
+        """Record new AED versions into an empty history."""
+        response_cache.clear()
+        aed_history.clear()
+        cache.add_version_listener(aed_history.record_version)
+
+    def tearDown(self):
+        """Stop recording."""
+        cache.remove_version_listener(aed_history.record_version)
+        aed_history.clear()
+
+    async def test_snapshot_recorded_and_aggregated(self):
+        """
+        Test that a refreshed AED snapshot is recorded and returned by the tool.
+        """
+        now = datetime.now(HK_TIMEZONE)
+        payload = {
+            "waitTime": [{"hospName": "Queen Elizabeth Hospital", "topWait": "Over 2 hours"}],
+            "updateTime": f"{now.day}/{now.month}/{now.year} {now.strftime('%I:%M%p')}",
+        }
+
+        async def fetch(url, parse):
+            return parse(payload)
+
+        await refresh_feed(AED, "en", fetch)
+        result = await _get_aed_waiting_time_stats(hospital="伊利沙伯醫院", window_hours=1)
+        self.assertEqual(result["unit"], "minutes")
+        self.assertEqual(len(result["data"]), 1)
+        self.assertEqual(result["data"][0]["hospName"], "Queen Elizabeth Hospital")
+        self.assertEqual(result["data"][0]["p50"], 120)
+
+    async def test_invalid_arguments(self):
+        """
+        Test that unknown hospitals, days and percentiles return errors.
+        """
+        for kwargs in ({"hospital": "Atlantis"}, {"days": ["Funday"]}, {"percentiles": [150]}):
+            result = await _get_aed_waiting_time_stats(**kwargs)
+            self.assertEqual(result["type"], "Error")
+
+
+if __name__ == "__main__":
+    unittest.main()
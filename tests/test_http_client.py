@@ -0,0 +1,195 @@
+"""
+Module for testing the shared asynchronous HTTP client.
+This module contains unit tests for response decoding, error handling and per-host limits.
+"""
+
+import asyncio
+import threading
+import unittest
+import unittest.mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+
+
+class TestHttpClient(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying fetch_json against a stub transport.
+    """
+
+    def tearDown(self):
+        """Restore the default client settings."""
+        http_client.configure(
+            connect_timeout=http_client.DEFAULT_CONNECT_TIMEOUT,
+            read_timeout=http_client.DEFAULT_READ_TIMEOUT,
+            max_connections_per_host=http_client.DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        )
+
+    async def test_fetch_json_strips_bom(self):
+        """
+        Test that a UTF-8 body with a byte order mark is decoded.
+        """
+        http_client.configure(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content='\ufeff{"a": "屯門"}'.encode("utf-8"))
+            )
+        )
+        self.assertEqual(await http_client.fetch_json("https://example.com/x.json"), {"a": "屯門"})
+
+    async def test_fetch_json_http_error(self):
+        """
+        Test that an HTTP error status is reported as an error dictionary.
+        """
+        http_client.configure(
+            transport=httpx.MockTransport(lambda request: httpx.Response(500))
+        )
+        result = await http_client.fetch_json("https://example.com/x.json")
+        self.assertIn("Status code: 500", result["error"])
+
+    async def test_fetch_json_invalid_json(self):
+        """
+        Test that a non-JSON body is reported as an error dictionary.
+        """
+        http_client.configure(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"<html>"))
+        )
+        result = await http_client.fetch_json("https://example.com/x.json")
+        self.assertIn("Failed to parse JSON", result["error"])
+
+    async def test_fetch_json_timeout(self):
+        """
+        Test that a timeout is reported as an error dictionary.
+        """
+
+        def handler(request):
+            raise httpx.ReadTimeout("slow", request=request)
+
+        http_client.configure(transport=httpx.MockTransport(handler))
+        result = await http_client.fetch_json("https://example.com/x.json")
+        self.assertIn("timed out", result["error"])
+
+    async def test_concurrency_bounded_per_host(self):
+        """
+        Test that no more than the configured number of requests run against one host.
+        """
+        active = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return httpx.Response(200, json=[])
+
+        http_client.configure(
+            max_connections_per_host=3, transport=httpx.MockTransport(handler)
+        )
+        await asyncio.gather(
+            *(http_client.fetch_json(f"https://example.com/{i}.json") for i in range(12))
+        )
+        self.assertEqual(peak, 3)
+
+    async def test_client_is_shared(self):
+        """
+        Test that repeated calls on the same loop reuse one pooled client.
+        """
+        http_client.configure(read_timeout=3.0, connect_timeout=1.0)
+        client = http_client.get_client()
+        self.assertIs(http_client.get_client(), client)
+        self.assertEqual(client.timeout.read, 3.0)
+        self.assertEqual(client.timeout.connect, 1.0)
+        await http_client.aclose()
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    """Local stand-in for an HA feed that honours conditional requests."""
+
+    body = b'[{"District": "Tuen Mun", "Clinic": "Tuen Mun Clinic", "AvgQuota": "150"}]'
+    etag = '"v1"'
+    last_modified = "Mon, 14 Jul 2025 10:00:00 GMT"
+    statuses = []
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the feed, answering 304 when the client's validators match."""
+        if self.headers.get("If-None-Match") == self.etag:
+            self.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", self.last_modified)
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence request logging."""
+
+
+class TestConditionalGet(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying ETag / Last-Modified revalidation against a local HTTP server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """Start the local stand-in server."""
+        cls.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _FeedHandler)
+        cls.url = f"http://127.0.0.1:{cls.httpd.server_address[1]}/g0_9uo7a_p-en.json"
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Stop the local stand-in server."""
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+
+    def setUp(self):
+        """Use the real network transport with no stored validators."""
+        http_client.configure()
+        http_client.reset_conditional_get()
+        _FeedHandler.statuses = []
+        _FeedHandler.etag = '"v1"'
+
+    async def asyncTearDown(self):
+        """Close the pooled client."""
+        await http_client.aclose()
+
+    async def test_not_modified_reuses_parsed_payload(self):
+        """
+        Test that a 304 reply returns the same parsed object without decoding again.
+        """
+        first = await http_client.fetch_json(self.url)
+        with unittest.mock.patch(
+            "hkopenai.hk_health_mcp_server.http_client.decode_json"
+        ) as mock_decode:
+            second = await http_client.fetch_json(self.url)
+            mock_decode.assert_not_called()
+        self.assertIs(second, first)
+        self.assertEqual(_FeedHandler.statuses, [200, 304])
+        stats = http_client.conditional_get_stats()
+        self.assertEqual(stats["responses_200"], 1)
+        self.assertEqual(stats["responses_304"], 1)
+        self.assertEqual(stats["bytes_saved"], len(_FeedHandler.body))
+
+    async def test_changed_feed_is_downloaded_again(self):
+        """
+        Test that a new ETag upstream results in a full download.
+        """
+        await http_client.fetch_json(self.url)
+        _FeedHandler.etag = '"v2"'
+        data = await http_client.fetch_json(self.url)
+        self.assertEqual(data[0]["District"], "Tuen Mun")
+        self.assertEqual(_FeedHandler.statuses, [200, 200])
+        self.assertEqual(http_client.conditional_get_stats()["responses_304"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Module for testing feed snapshot indexes and cross-language name resolution.
+This module contains unit tests for FeedIndex and the reference name tables.
+"""
+
+import unittest
+
+from hkopenai.hk_health_mcp_server.indexes import FeedIndex
+from hkopenai.hk_health_mcp_server.reference import (
+    canonical_cluster,
+    canonical_district,
+    canonical_hospital,
+    canonical_specialty,
+    hospital_cluster,
+    hospital_district,
+)
+
+
+class TestReference(unittest.TestCase):
+    """
+    Test class for verifying that names in every language resolve to one key.
+    """
+
+    def test_district_names_in_all_languages(self):
+        """
+        Test that English, Traditional and Simplified Chinese district names match.
+        """
+        keys = {
+            canonical_district(name)
+            for name in ("Tuen Mun", "tuen  mun", "Tuen Mun District", "屯門", "屯門區", "屯门区")
+        }
+        self.assertEqual(keys, {"tuen mun"})
+        self.assertEqual(canonical_district("Central and Western"), "central & western")
+        self.assertEqual(canonical_district("東區"), "eastern")
+
+    def test_cluster_names_and_codes(self):
+        """
+        Test that cluster codes and names in all languages match.
+        """
+        for name in ("KCC", "Kowloon Central Cluster", "Kowloon Central", "九龍中聯網", "九龙中联网"):
+            self.assertEqual(canonical_cluster(name), "kcc")
+
+    def test_hospital_lookup(self):
+        """
+        Test that hospital names resolve to codes with their cluster and district.
+        """
+        self.assertEqual(canonical_hospital("Queen Elizabeth Hospital"), "QEH")
+        self.assertEqual(canonical_hospital("伊利沙伯医院"), "QEH")
+        self.assertEqual(canonical_hospital("St. John Hospital"), "SJH")
+        self.assertEqual(hospital_cluster("QEH"), "kcc")
+        self.assertEqual(hospital_district("QEH"), "yau tsim mong")
+
+    def test_unknown_and_empty_names(self):
+        """
+        Test that unknown names fall back to their normalized text and empty names to None.
+        """
+        self.assertEqual(canonical_specialty("  Clinical Oncology "), "clinical oncology")
+        self.assertIsNone(canonical_district(""))
+        self.assertIsNone(canonical_district(None))
+
+
+class TestFeedIndex(unittest.TestCase):
+    """
+    Test class for verifying FeedIndex lookups.
+    """
+
+    ROWS = [
+        {"cluster": "HKEC", "specialty": "Medicine"},
+        {"cluster": "KCC", "specialty": "Medicine"},
+        {"cluster": "HKEC", "specialty": "Surgery"},
+        {"specialty": "Surgery"},
+        "not a row",
+    ]
+
+    def setUp(self):
+        """Build an index over the sample rows."""
+        self.index = FeedIndex(
+            self.ROWS,
+            {
+                "cluster": lambda row: canonical_cluster(row.get("cluster")),
+                "specialty": lambda row: canonical_specialty(row.get("specialty")),
+            },
+        )
+
+    def test_single_field_lookup_keeps_feed_order(self):
+        """
+        Test that rows for one value are returned in feed order.
+        """
+        self.assertEqual(self.index.lookup(cluster="hkec"), [self.ROWS[0], self.ROWS[2]])
+
+    def test_multi_field_lookup_intersects(self):
+        """
+        Test that several criteria are combined.
+        """
+        self.assertEqual(
+            self.index.lookup(cluster="hkec", specialty="sur"), [self.ROWS[2]]
+        )
+        self.assertEqual(self.index.lookup(cluster="kcc", specialty="sur"), [])
+
+    def test_no_criteria_return_all_rows(self):
+        """
+        Test that without criteria every row is returned.
+        """
+        self.assertEqual(self.index.lookup(), self.ROWS)
+        self.assertEqual(set(self.index.keys("cluster")), {"hkec", "kcc"})
+
+    def test_blank_criteria_match_nothing(self):
+        """
+        Test that a criterion given as a blank name matches no row rather than every row.
+        """
+        self.assertEqual(self.index.lookup(cluster=canonical_cluster("  ")), [])
+        self.assertEqual(self.index.lookup(cluster="", specialty="medicine"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,200 @@
+"""
+Module for testing the instrumentation of the health tools and upstream fetches.
+This module contains unit tests for the metrics registry, the Prometheus endpoint
+and the cost of the hooks when instrumentation is disabled.
+"""
+
+import json
+import os
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+import httpx
+from fastmcp import Client
+
+from hkopenai.hk_health_mcp_server import http_client, metrics
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.server import server
+
+GOPC_JSON = json.dumps(
+    [
+        {"District": "Tuen Mun", "Clinic": "Tuen Mun Clinic", "AvgQuota": "150"},
+        {"District": "Eastern", "Clinic": "Chai Wan Clinic", "AvgQuota": "80"},
+    ]
+).encode("utf-8")
+
+SERVER_ENV = {
+    "HK_HEALTH_BACKGROUND_REFRESH": "false",
+    "HK_HEALTH_SNAPSHOT_PATH": "off",
+    "HK_HEALTH_AED_HISTORY_PATH": "off",
+    "HK_HEALTH_GOPC_HISTORY_PATH": "off",
+}
+
+
+class TestRegistry(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the Prometheus exposition of the registry.
+    """
+
+    def test_histogram_and_counter_exposition(self):
+        """
+        Test that histograms render cumulative buckets, sum and count.
+        """
+        histogram = metrics.Histogram("t_seconds", "Test.", ("phase",), buckets=(0.1, 1))
+        histogram.observe(0.05, "decode")
+        histogram.observe(0.5, "decode")
+        histogram.observe(5, "decode")
+        lines = histogram.samples()
+        self.assertIn('t_seconds_bucket{phase="decode",le="0.1"} 1', lines)
+        self.assertIn('t_seconds_bucket{phase="decode",le="1"} 2', lines)
+        self.assertIn('t_seconds_bucket{phase="decode",le="+Inf"} 3', lines)
+        self.assertIn('t_seconds_count{phase="decode"} 3', lines)
+
+        counter = metrics.Counter("t_total", "Test.", ("status",))
+        counter.inc('say "hi"')
+        self.assertEqual(counter.samples(), ['t_total{status="say \\"hi\\""} 1'])
+
+    async def test_upstream_trace_events(self):
+        """
+        Test that httpcore trace events become connect, tls, wait and download phases.
+        """
+        metrics.reset()
+        trace = metrics.UpstreamTrace("www.ha.org.hk")
+        for event in (
+            "connection.connect_tcp.started",
+            "connection.connect_tcp.complete",
+            "connection.start_tls.started",
+            "connection.start_tls.complete",
+            "http11.send_request_headers.started",
+            "http11.send_request_headers.complete",
+            "http11.receive_response_headers.started",
+            "http11.receive_response_headers.complete",
+            "http2.receive_response_body.started",
+            "http2.receive_response_body.complete",
+        ):
+            await trace(event, {})
+        for phase in ("connect", "tls", "wait", "download"):
+            self.assertEqual(metrics.PHASE_SECONDS.count(phase, "www.ha.org.hk"), 1, phase)
+        metrics.reset()
+
+
+class TestDisabled(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that disabled instrumentation costs close to nothing.
+    """
+
+    def setUp(self):
+        """Disable instrumentation and serve requests from a stub transport."""
+        metrics.configure(enabled=False)
+        metrics.reset()
+        response_cache.clear()
+        self.extensions = []
+
+        def handler(request):
+            self.extensions.append(dict(request.extensions))
+            return httpx.Response(200, content=GOPC_JSON)
+
+        http_client.configure(transport=httpx.MockTransport(handler))
+
+    def tearDown(self):
+        """Restore the network transport."""
+        http_client.configure()
+
+    async def test_nothing_installed_or_recorded(self):
+        """
+        Test that no wrapper, middleware, route or trace hook is installed and no values kept.
+        """
+
+        async def tool():
+            return {}
+
+        self.assertIs(metrics.instrument_tool(tool), tool)
+        mcp = Mock()
+        metrics.register(mcp)
+        mcp.add_middleware.assert_not_called()
+        mcp.custom_route.assert_not_called()
+
+        await http_client.fetch_json("https://www.ha.org.hk/feed.json")
+        self.assertNotIn("trace", self.extensions[0])
+        self.assertTrue(all(not metric.samples() for metric in metrics.METRICS))
+
+    def test_disabled_hooks_are_cheap(self):
+        """
+        Test that a clock()/observe() pair costs well under a microsecond when disabled.
+        """
+        rounds = 200_000
+        started = time.perf_counter()
+        for _ in range(rounds):
+            metrics.observe("filter", "gopc", metrics.clock())
+        per_call = (time.perf_counter() - started) / rounds
+        self.assertLess(per_call, 2e-6)
+
+
+class TestEnabled(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the metrics recorded for a tool call end to end.
+    """
+
+    def setUp(self):
+        """Enable instrumentation and serve requests from a stub transport."""
+        metrics.configure(enabled=True)
+        metrics.reset()
+        response_cache.clear()
+        http_client.reset_conditional_get()
+        http_client.configure(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, content=GOPC_JSON))
+        )
+        self.env = patch.dict(os.environ, SERVER_ENV)
+        self.env.start()
+
+    def tearDown(self):
+        """Disable instrumentation and restore the network transport."""
+        self.env.stop()
+        metrics.configure(enabled=False)
+        metrics.reset()
+        http_client.configure()
+
+    async def test_tool_call_phases(self):
+        """
+        Test that a tool call records every phase, the upstream status and bytes.
+        """
+        async with Client(server()) as client:
+            await client.call_tool("get_pas_gopc_avg_quota", {"district": "Tuen Mun"})
+            await client.call_tool("get_pas_gopc_avg_quota", {"district": "Eastern"})
+
+        tool = "get_pas_gopc_avg_quota"
+        for phase, source, count in (
+            ("total", tool, 2),
+            ("handler", tool, 2),
+            ("serialize", tool, 2),
+            ("fetch", "gopc", 2),
+            ("filter", "gopc", 2),
+            ("decode", "g0_9uo7a_p-en.json", 1),
+            ("ingest", "g0_9uo7a_p-en.json", 1),
+        ):
+            self.assertEqual(metrics.PHASE_SECONDS.count(phase, source), count, phase)
+        self.assertEqual(metrics.UPSTREAM_RESPONSES.value("www.ha.org.hk", "200"), 1)
+        self.assertEqual(metrics.UPSTREAM_BYTES.value("www.ha.org.hk"), len(GOPC_JSON))
+        self.assertEqual(metrics.TOOL_CALLS.value(tool, "ok"), 2)
+        self.assertEqual(metrics.IN_FLIGHT.value("tool"), 0)
+        self.assertEqual(metrics.IN_FLIGHT.value("upstream"), 0)
+
+    async def test_prometheus_endpoint(self):
+        """
+        Test that the HTTP app serves the metrics in the Prometheus text format.
+        """
+        app = server().http_app()
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn("# TYPE hk_health_phase_seconds histogram", response.text)
+        self.assertIn("hk_health_cache_hit_ratio", response.text)
+        self.assertIn("hk_health_upstream_not_modified_total", response.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
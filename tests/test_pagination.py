@@ -0,0 +1,148 @@
+"""
+Module for testing paged tool responses.
+This module contains unit tests for page tokens, item and byte budgets, the summary
+header and restarting when the feed changes between pages.
+"""
+
+import json
+import unittest
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.changefeed import change_feed
+from hkopenai.hk_health_mcp_server.pagination import page_token, parse_page_token
+from hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota import _get_pas_gopc_avg_quota
+from hkopenai.hk_health_mcp_server.tools.specialist_waiting_time_by_cluster import (
+    _get_specialist_waiting_times,
+)
+
+DISTRICTS = ("Tuen Mun", "Eastern", "Sha Tin")
+CLINICS = [
+    {"District": DISTRICTS[i % 3], "Clinic": f"Clinic {i}", "AvgQuota": str(10 * (i + 1))}
+    for i in range(10)
+]
+SPECIALIST = [
+    {"cluster": cluster, "specialty": specialty, "Category": category, "Value": "8 Weeks"}
+    for cluster in ("Hong Kong East Cluster", "New Territories West Cluster")
+    for specialty in ("Surgery", "Medicine")
+    for category in ("Urgent", "Stable")
+]
+
+
+class TestPagination(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying pages sliced from one snapshot.
+    """
+
+    def setUp(self):
+        """Serve the clinic and specialist lists from a stub transport."""
+        response_cache.clear()
+        change_feed.clear()
+        self.clinics = CLINICS
+
+        def handler(request):
+            rows = self.clinics if "gopc" in request.url.path else SPECIALIST
+            return httpx.Response(200, json=rows)
+
+        http_client.configure(transport=httpx.MockTransport(handler))
+
+    def tearDown(self):
+        """Drop cached snapshots and restore the default client."""
+        response_cache.clear()
+        change_feed.clear()
+        http_client.configure()
+
+    async def test_pages_cover_selection(self):
+        """
+        Test that following next_page returns every clinic once, in feed order.
+        """
+        rows, page, pages = [], "", 0
+        while True:
+            result = await _get_pas_gopc_avg_quota(max_items=4, page=page)
+            rows += result["data"]
+            pages += 1
+            page = result["page"]["next_page"]
+            if page is None:
+                break
+        self.assertEqual(rows, CLINICS)
+        self.assertEqual(pages, 3)
+        self.assertEqual(result["page"], {"total": 10, "offset": 8, "returned": 2, "next_page": None})
+
+    async def test_summary_covers_all_pages(self):
+        """
+        Test that the summary counts and totals the whole selection, not the page.
+        """
+        result = await _get_pas_gopc_avg_quota(district="Tuen Mun", max_items=1)
+        self.assertEqual(len(result["data"]), 1)
+        self.assertEqual(
+            result["summary"],
+            {
+                "clinics": 4,
+                "avg_quota_total": 220.0,
+                "districts": {"Tuen Mun": {"clinics": 4, "avg_quota_total": 220.0}},
+            },
+        )
+        specialist = await _get_specialist_waiting_times(max_items=2)
+        self.assertEqual(
+            specialist["summary"],
+            {
+                "entries": 8,
+                "specialties": 2,
+                "clusters": {"Hong Kong East Cluster": 4, "New Territories West Cluster": 4},
+                "categories": {"Urgent": 4, "Stable": 4},
+            },
+        )
+
+    async def test_byte_budget(self):
+        """
+        Test that a page holds only the rows fitting the byte budget, and at least one.
+        """
+        one_row = len(json.dumps(CLINICS[0], separators=(",", ":")))
+        result = await _get_pas_gopc_avg_quota(max_bytes=3 * one_row + 5)
+        self.assertEqual(result["page"]["returned"], 3)
+        self.assertLessEqual(len(json.dumps(result["data"], separators=(",", ":"))), 3 * one_row + 7)
+        result = await _get_pas_gopc_avg_quota(max_bytes=1)
+        self.assertEqual(result["page"]["returned"], 1)
+
+    async def test_unpaged_response_unchanged(self):
+        """
+        Test that without a token or budget the full selection is returned without page fields.
+        """
+        result = await _get_pas_gopc_avg_quota()
+        self.assertEqual(result["data"], CLINICS)
+        self.assertNotIn("page", result)
+        self.assertNotIn("summary", result)
+
+    async def test_invalid_requests(self):
+        """
+        Test that bad budgets, foreign tokens and malformed tokens give error responses.
+        """
+        self.assertEqual((await _get_pas_gopc_avg_quota(max_items=0))["type"], "Error")
+        first = await _get_pas_gopc_avg_quota(max_items=4)
+        other = await _get_pas_gopc_avg_quota(district="Eastern", page=first["page"]["next_page"])
+        self.assertIn("different arguments", other["error"])
+        self.assertIn("Invalid page token", (await _get_pas_gopc_avg_quota(page="x"))["error"])
+
+    async def test_restart_when_feed_changes(self):
+        """
+        Test that a token from an older snapshot version starts over on the new one.
+        """
+        first = await _get_pas_gopc_avg_quota(max_items=4)
+        response_cache.clear()
+        self.clinics = [dict(CLINICS[0], AvgQuota="999")] + CLINICS[1:]
+        second = await _get_pas_gopc_avg_quota(max_items=4, page=first["page"]["next_page"])
+        self.assertTrue(second["page"]["restarted"])
+        self.assertEqual(second["page"]["offset"], 0)
+        self.assertEqual(second["data"], self.clinics[:4])
+
+    def test_token_round_trip(self):
+        """
+        Test that a page token splits back into its version, offset and query.
+        """
+        self.assertEqual(parse_page_token(page_token("ab12.3", 40, "q1")), ("ab12.3", 40, "q1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,272 @@
+"""
+Module for testing the weekly GOPC quota history and its trend tool.
+This module contains unit tests for QuotaHistory recording, persistence, rollups and forecasts.
+"""
+
+import fcntl
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from hkopenai.hk_health_mcp_server import cache
+from hkopenai.hk_health_mcp_server.cache import refresh_feed, response_cache
+from hkopenai.hk_health_mcp_server.feeds import GOPC
+from hkopenai.hk_health_mcp_server.history import HK_TIMEZONE
+from hkopenai.hk_health_mcp_server.quota_history import (
+    RECORD_DTYPE,
+    QuotaHistory,
+    changes,
+    forecast,
+    quota_history,
+    week_label,
+    week_of,
+)
+from hkopenai.hk_health_mcp_server.tools.gopc_quota_trend import _get_gopc_quota_trend
+
+WEEK = 7 * 86400
+
+
+def _hk(*args) -> float:
+    """Return the epoch seconds of a Hong Kong local time."""
+    return datetime(*args, tzinfo=HK_TIMEZONE).timestamp()
+
+
+def _row(district: str, clinic: str, quota, session: str = "Morning") -> dict:
+    """Return one GOPC feed row."""
+    return {"District": district, "Clinic": clinic, "Session": session, "AvgQuota": quota}
+
+
+class TestWeeksAndForecasts(unittest.TestCase):
+    """
+    Test class for verifying week numbering and the vectorized forecasts.
+    """
+
+    def test_weeks_start_on_monday_hong_kong_time(self):
+        """
+        Test that a week runs from Monday 00:00 to Sunday 24:00 in Hong Kong time.
+        """
+        monday = week_of(_hk(2025, 10, 6, 0, 0))
+        self.assertEqual(week_of(_hk(2025, 10, 12, 23, 59)), monday)
+        self.assertEqual(week_of(_hk(2025, 10, 5, 23, 59)), monday - 1)
+        self.assertEqual(week_label(monday), "2025-W41")
+
+    def test_ewma_and_linear_forecasts(self):
+        """
+        Test that both forecasts skip missing weeks and match hand-computed values.
+        """
+        values = np.array([[10.0, 1.0, np.nan], [20.0, np.nan, np.nan], [30.0, 3.0, np.nan]])
+        linear = forecast(values, "linear")
+        self.assertAlmostEqual(linear[0], 40.0)
+        self.assertAlmostEqual(linear[1], 4.0)
+        self.assertTrue(np.isnan(linear[2]))
+        ewma = forecast(values, "ewma", alpha=0.5)
+        self.assertAlmostEqual(ewma[0], (0.125 * 10 + 0.25 * 20 + 0.5 * 30) / 0.875)
+        self.assertAlmostEqual(ewma[1], (0.125 * 1 + 0.5 * 3) / 0.625)
+
+    def test_week_over_week_changes(self):
+        """
+        Test that the change and percentage compare the last two weeks.
+        """
+        latest, change, percent = changes(np.array([[50.0, 0.0], [60.0, 5.0]]))
+        self.assertEqual(latest.tolist(), [60.0, 5.0])
+        self.assertEqual(change.tolist(), [10.0, 5.0])
+        self.assertAlmostEqual(percent[0], 20.0)
+        self.assertTrue(np.isnan(percent[1]))
+
+
+class TestQuotaHistory(unittest.TestCase):
+    """
+    Test class for verifying weekly recording, rollups and persistence of GOPC quotas.
+    """
+
+    def setUp(self):
+        """Start with an empty history."""
+        self.history = QuotaHistory()
+
+    def test_later_snapshot_replaces_its_week(self):
+        """
+        Test that one value is kept per clinic and week, gaps staying missing.
+        """
+        start = _hk(2025, 9, 1, 10, 0)
+        self.history.record("en", [_row("Kwun Tong", "A Clinic", "100")], start)
+        self.history.record("en", [_row("Kwun Tong", "A Clinic", "110")], start + 3600)
+        self.history.record("en", [_row("Kwun Tong", "A Clinic", "1,200")], start + 2 * WEEK)
+        self.assertEqual(len(self.history), 3)
+        weeks, columns, values = self.history.window(8, "en")
+        self.assertEqual(len(weeks), 3)
+        self.assertEqual(len(columns), 1)
+        self.assertEqual(values[0, 0], 110)
+        self.assertTrue(np.isnan(values[1, 0]))
+        self.assertEqual(values[2, 0], 1200)
+
+    def test_rollup_by_canonical_district(self):
+        """
+        Test that clinics are totalled per district whatever the language of its name.
+        """
+        now = time.time()
+        self.history.record(
+            "en",
+            [
+                _row("Kwun Tong", "A Clinic", 100),
+                _row("Kwun Tong", "A Clinic", 40, session="Evening"),
+                _row("Sha Tin", "B Clinic", 80),
+                _row("Sha Tin", "C Clinic", "n/a"),
+            ],
+            now,
+        )
+        self.history.record("tc", [_row("觀塘", "甲診所", 90)], now)
+        _, columns, values = self.history.window(4, "en")
+        self.assertEqual(len(columns), 3)
+        representatives, counts, totals = self.history.rollup(columns, values)
+        names = [self.history.district(column)[1] for column in representatives]
+        self.assertEqual(names, ["Kwun Tong", "Sha Tin"])
+        self.assertEqual(counts, [2, 1])
+        self.assertEqual(totals[-1].tolist(), [140, 80])
+        _, columns, _ = self.history.window(4, "en", district=self.history.district(columns[0])[0])
+        self.assertEqual(len(columns), 2)
+
+    def test_persisted_weeks_reload(self):
+        """
+        Test that recorded snapshots are loaded again and repeated ones not appended twice.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gopc.bin")
+            self.history.open(path)
+            rows = [_row("Kwun Tong", "A Clinic", 100), _row("Sha Tin", "B Clinic", 80)]
+            start = time.time() - 3 * WEEK
+            self.history.record("en", rows, start)
+            self.history.record("en", rows, start)
+            self.history.record("en", [_row("Kwun Tong", "A Clinic", 120)], start + WEEK)
+            self.history.close()
+            self.assertEqual(os.path.getsize(path), 3 * RECORD_DTYPE.itemsize)
+
+            reloaded = QuotaHistory()
+            reloaded.open(path)
+            _, columns, values = reloaded.window(8, "en")
+            self.assertEqual(len(reloaded), 2)
+            self.assertEqual(len(columns), 2)
+            self.assertEqual(values[:, 0].tolist(), [100, 120])
+
+    def test_compaction_waits_for_file_lock(self):
+        """
+        Test that loading drops old and replaced values while waiting for another writer.
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gopc.bin")
+            now = time.time()
+            self.history.open(path)
+            self.history.record("en", [_row("Kwun Tong", "A Clinic", 100)], now - 30 * WEEK)
+            self.history.record("en", [_row("Kwun Tong", "A Clinic", 90)], now)
+            self.history.record("en", [_row("Kwun Tong", "A Clinic", 95)], now)
+            self.history.close()
+            self.assertEqual(os.path.getsize(path), 3 * RECORD_DTYPE.itemsize)
+            reloaded = QuotaHistory(retention_weeks=26)
+            with open(path, "a+b") as writer:
+                fcntl.flock(writer, fcntl.LOCK_EX)
+                opener = threading.Thread(target=reloaded.open, args=(path,))
+                opener.start()
+                opener.join(0.2)
+                self.assertTrue(opener.is_alive())
+                writer.write(
+                    np.array(
+                        [(week_of(now), b"en", b"Sha Tin", b"B Clinic", b"Morning", 80.0)],
+                        dtype=RECORD_DTYPE,
+                    ).tobytes()
+                )
+                writer.flush()
+                fcntl.flock(writer, fcntl.LOCK_UN)
+            opener.join()
+            self.assertEqual(os.path.getsize(path), 2 * RECORD_DTYPE.itemsize)
+            weeks, columns, values = reloaded.window(8, "en")
+            self.assertEqual(len(weeks), 1)
+            self.assertEqual(len(columns), 2)
+            self.assertEqual(sorted(values[0].tolist()), [80.0, 95.0])
+
+    def test_years_of_weekly_history_is_fast(self):
+        """
+        Test that five years of weekly quotas for 2,000 clinics are queried in milliseconds.
+        """
+        clinics = 2000
+        rng = np.random.default_rng(0)
+        rows = [_row(f"District {n % 18}", f"Clinic {n}", 0) for n in range(clinics)]
+        self.history.record("en", rows, time.time() - 260 * WEEK)
+        for week in range(1, 260):
+            self.history._store(  # pylint: disable=protected-access
+                week_of(time.time() - 260 * WEEK) + week,
+                np.arange(clinics),
+                rng.integers(20, 200, clinics).astype(np.float32),
+            )
+
+        started = time.perf_counter()
+        _, columns, values = self.history.window(260, "en")
+        _, _, totals = self.history.rollup(columns, values)
+        forecast(values, "linear")
+        forecast(totals, "ewma")
+        elapsed = time.perf_counter() - started
+        self.assertEqual(values.shape, (260, clinics))
+        self.assertLess(elapsed, 0.25)
+
+
+class TestGopcQuotaTrendTool(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that fetched GOPC snapshots feed the quota trend tool.
+    """
+
+    def setUp(self):
+        """Record new GOPC versions into an empty history."""
+        response_cache.clear()
+        quota_history.clear()
+        cache.add_version_listener(quota_history.record_version)
+
+    def tearDown(self):
+        """Stop recording."""
+        cache.remove_version_listener(quota_history.record_version)
+        quota_history.clear()
+
+    async def test_snapshot_recorded_and_trended(self):
+        """
+        Test that a refreshed GOPC snapshot is recorded and returned with a forecast.
+        """
+        quota_history.record("en", [_row("Kwun Tong", "A Clinic", 80)], time.time() - WEEK)
+        payload = [_row("Kwun Tong", "A Clinic", "100"), _row("Sha Tin", "B Clinic", "50")]
+
+        async def fetch(url, parse):
+            return parse(payload)
+
+        await refresh_feed(GOPC, "en", fetch)
+        result = await _get_gopc_quota_trend(district="觀塘", method="linear", per_clinic=True)
+        self.assertEqual(len(result["weeks"]), 2)
+        self.assertEqual(len(result["districts"]), 1)
+        district = result["districts"][0]
+        self.assertEqual(district["district"], "Kwun Tong")
+        self.assertEqual(district["quota"], [80.0, 100.0])
+        self.assertEqual(district["change"], 20.0)
+        self.assertEqual(district["change_pct"], 25.0)
+        self.assertEqual(district["forecast"], 120.0)
+        self.assertEqual(result["clinics"][0]["clinic"], "A Clinic")
+
+        result = await _get_gopc_quota_trend()
+        self.assertEqual(len(result["districts"]), 2)
+        self.assertNotIn("clinics", result)
+
+    async def test_empty_history_and_invalid_arguments(self):
+        """
+        Test that an empty selection returns no data and an unknown method an error.
+        """
+        result = await _get_gopc_quota_trend()
+        self.assertEqual(result["districts"], [])
+        self.assertIn("No GOPC quotas", result["message"])
+        quota_history.record("en", [_row("Kwun Tong", "A Clinic", 80)], time.time())
+        result = await _get_gopc_quota_trend(district="Atlantis")
+        self.assertEqual(result["districts"], [])
+        result = await _get_gopc_quota_trend(method="arima")
+        self.assertEqual(result["type"], "Error")
+
+
+if __name__ == "__main__":
+    unittest.main()
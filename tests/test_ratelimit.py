@@ -0,0 +1,274 @@
+"""
+Module for testing rate limiting and fair scheduling of tool calls.
+This module contains unit tests for the token buckets, the weighted fair queue, the
+tool middleware and the limit on upstream requests.
+"""
+
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+from fastmcp import Client, FastMCP
+from fastmcp.exceptions import ToolError
+
+from hkopenai.hk_health_mcp_server import http_client, ratelimit
+from hkopenai.hk_health_mcp_server.ratelimit import (
+    FairQueue,
+    RateLimited,
+    RateLimiter,
+    TokenBucket,
+)
+
+
+class TestTokenBucket(unittest.TestCase):
+    """
+    Test class for verifying token reservations.
+    """
+
+    def test_reserve(self):
+        """
+        Test that the burst is free, later tokens wait and long waits are refused.
+        """
+        bucket = TokenBucket(rate=2.0, burst=2.0)
+        now = bucket.updated
+        self.assertEqual(bucket.reserve(1.0, now), 0.0)
+        self.assertEqual(bucket.reserve(1.0, now), 0.0)
+        self.assertEqual(bucket.reserve(1.0, now), 0.5)
+        self.assertEqual(bucket.reserve(1.0, now), 1.0)
+        self.assertIsNone(bucket.reserve(1.0, now))
+        self.assertEqual(bucket.reserve(1.0, now + 1.0), 0.5)
+        bucket.refund()
+        self.assertEqual(bucket.tokens, 0.0)
+
+    def test_limits_from_env(self):
+        """
+        Test parsing of the limits and weights settings.
+        """
+        env = {
+            "HK_HEALTH_RATE_LIMITS": "client=5/10, tool=20,upstream=0.5/2,bad=x,zero=0",
+            "HK_HEALTH_CLIENT_WEIGHTS": "a=2,b=0,c=x",
+        }
+        with patch.dict(os.environ, env):
+            self.assertEqual(
+                ratelimit.limits_from_env(),
+                {"client": (5.0, 10.0), "tool": (20.0, 20.0), "upstream": (0.5, 2.0)},
+            )
+            self.assertEqual(ratelimit.weights_from_env(), {"a": 2.0})
+
+
+class TestFairQueue(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the order in which waiting calls get a slot.
+    """
+
+    async def _run(self, queue, calls):
+        """Queue calls (client, weight) behind a held slot and return the grant order."""
+        self.assertTrue(queue.try_acquire())
+        order = []
+
+        async def call(client, weight):
+            await queue.acquire(client, weight)
+            order.append(client)
+            await asyncio.sleep(0)
+            queue.release()
+
+        tasks = [asyncio.create_task(call(c, w)) for c, w in calls]
+        await asyncio.sleep(0)
+        self.assertEqual(queue.depth, len(calls))
+        queue.release()
+        await asyncio.gather(*tasks)
+        self.assertEqual((queue.active, queue.depth), (0, 0))
+        return order
+
+    async def test_interleaves_clients(self):
+        """
+        Test that a client queueing many calls does not delay another client's calls.
+        """
+        order = await self._run(FairQueue(1), [("a", 1.0)] * 4 + [("b", 1.0)] * 2)
+        self.assertEqual(order, ["a", "b", "a", "b", "a", "a"])
+
+    async def test_weights(self):
+        """
+        Test that a client with twice the weight gets twice the slots while both wait.
+        """
+        order = await self._run(FairQueue(1), [("a", 2.0)] * 4 + [("b", 1.0)] * 4)
+        self.assertEqual(order[:6], ["a", "a", "b", "a", "a", "b"])
+
+    async def test_timeout(self):
+        """
+        Test that a call not given a slot in time leaves the queue.
+        """
+        queue = FairQueue(1)
+        self.assertTrue(await queue.acquire("a"))
+        self.assertFalse(await queue.acquire("b", timeout=0.01))
+        self.assertEqual(queue.depth, 0)
+        queue.release()
+        self.assertTrue(queue.try_acquire())
+
+
+class TestRateLimiter(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying admission of tool calls and upstream requests.
+    """
+
+    def tearDown(self):
+        """Switch limits off and restore the default client."""
+        ratelimit.limiter.configure()
+        http_client.configure()
+
+    async def test_client_and_tool_limits(self):
+        """
+        Test that clients have separate buckets and a tool limit overrides the default.
+        """
+        limiter = RateLimiter({"client": (1.0, 2.0), "slow_tool": (1.0, 1.0)}, max_wait=0.0)
+        self.assertTrue(limiter.enabled)
+        for _ in range(2):
+            await limiter.admit("a", "tool")
+        with self.assertRaises(RateLimited) as raised:
+            await limiter.admit("a", "tool")
+        self.assertEqual(raised.exception.scope, "client")
+        self.assertGreater(raised.exception.retry_after, 0.9)
+        await limiter.admit("b", "slow_tool")
+        with self.assertRaises(RateLimited):
+            await limiter.admit("c", "slow_tool")
+        # The refused call took no token from the client bucket of 'c'.
+        await limiter.admit("c", "tool")
+        await limiter.admit("c", "tool")
+        self.assertEqual(limiter.status()["rejected"], {"client": 1, "tool": 1})
+
+    async def test_waits_for_token(self):
+        """
+        Test that a call within max_wait waits for its token instead of failing.
+        """
+        limiter = RateLimiter({"tool": (50.0, 1.0)}, max_wait=1.0)
+        await limiter.admit("a", "tool")
+        self.assertGreater(await limiter.admit("a", "tool"), 0.01)
+
+    async def test_queue_rejects_after_max_wait(self):
+        """
+        Test that a call waiting longer than max_wait for a slot is rejected.
+        """
+        limiter = RateLimiter(max_concurrent=1, max_wait=0.01)
+        await limiter.admit("a", "tool")
+        with self.assertRaises(RateLimited) as raised:
+            await limiter.admit("b", "tool")
+        self.assertEqual(raised.exception.scope, "queue")
+        limiter.release()
+        await limiter.admit("b", "tool")
+        self.assertEqual(limiter.status()["active"], 1)
+
+    async def test_rejected_or_cancelled_calls_refund_tokens(self):
+        """
+        Test that calls rejected by the queue or cancelled while waiting keep their tokens.
+        """
+        limiter = RateLimiter({"client": (0.01, 2.0)}, max_concurrent=1, max_wait=0.05)
+        await limiter.admit("a", "tool")
+        with self.assertRaises(RateLimited) as raised:
+            await limiter.admit("a", "tool")
+        self.assertEqual(raised.exception.scope, "queue")
+        waiting = asyncio.create_task(limiter.admit("a", "tool"))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        limiter.release()
+        await limiter.admit("a", "tool")
+        self.assertEqual(limiter.status()["rejected"], {"queue": 1})
+
+    async def test_upstream_limit(self):
+        """
+        Test that requests to the upstream host over the limit return an error.
+        """
+        http_client.configure(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+        )
+        ratelimit.limiter.configure({"upstream": (0.1, 1.0)}, max_wait=0.0)
+        self.assertFalse(ratelimit.limiter.enabled)
+        self.assertEqual(await http_client.fetch_json("https://www.ha.org.hk/a.json"), [])
+        result = await http_client.fetch_json("https://www.ha.org.hk/b.json")
+        self.assertIn("www.ha.org.hk are rate limited", result["error"])
+
+    async def test_batch_charged_per_sub_query(self):
+        """
+        Test that a batch query takes a client token per sub-query and the tokens of the
+        tools it runs.
+        """
+        queries = [{"tool": "get_aed_waiting_times"}] * 3 + [{"tool": "get_health_snapshot"}]
+        cost, tools = ratelimit.call_charges("batch_health_query", {"queries": queries})
+        self.assertEqual(cost, 4.0)
+        self.assertEqual(
+            tools,
+            {"batch_health_query": 1.0, "get_aed_waiting_times": 3.0, "get_health_snapshot": 1.0},
+        )
+        self.assertEqual(ratelimit.call_charges("ping", {}), (1.0, {"ping": 1.0}))
+
+        limiter = RateLimiter(
+            {"client": (0.01, 5.0), "get_aed_waiting_times": (0.01, 2.0)}, max_wait=0.0
+        )
+        with self.assertRaises(RateLimited) as raised:
+            await limiter.admit("a", "batch_health_query", cost=cost, tools=tools)
+        self.assertEqual(raised.exception.scope, "tool")
+        await limiter.admit("a", "batch_health_query", cost=4.0, tools={"batch_health_query": 1.0})
+        with self.assertRaises(RateLimited) as raised:
+            await limiter.admit("a", "ping", cost=2.0)
+        self.assertEqual(raised.exception.scope, "client")
+
+    def test_client_key_ignores_client_id(self):
+        """
+        Test that calls are keyed by principal, remote address or session, never client id.
+        """
+        context = SimpleNamespace(client_id="rotating-id", session_id="session-1")
+        self.assertEqual(ratelimit.client_key(context), "session:session-1")
+        request = SimpleNamespace(client=SimpleNamespace(host="10.0.0.7"))
+        with patch("fastmcp.server.dependencies.get_http_request", return_value=request), patch(
+            "fastmcp.server.dependencies.get_access_token", return_value=None
+        ):
+            self.assertEqual(ratelimit.client_key(context), "address:10.0.0.7")
+        token = SimpleNamespace(client_id="reporting")
+        with patch("fastmcp.server.dependencies.get_access_token", return_value=token):
+            self.assertEqual(ratelimit.client_key(context), "principal:reporting")
+        self.assertEqual(ratelimit.client_key(None), "anonymous")
+
+    async def test_spoofed_client_id_gets_no_weight(self):
+        """
+        Test that a client sending a weighted client id still queues with weight 1.
+        """
+        limiter = RateLimiter(
+            {}, max_concurrent=1, weights={"reporting": 4.0, "principal:reporting": 4.0}
+        )
+        await limiter.admit("principal:reporting", "ping")
+        spoofed = SimpleNamespace(client_id="reporting", session_id="session-1")
+        weights = []
+
+        async def acquire(client, weight, timeout):
+            weights.append(weight)
+            return True
+
+        with patch.object(limiter.queue, "acquire", acquire):
+            await limiter.admit(ratelimit.client_key(spoofed), "ping")
+            await limiter.admit("principal:reporting", "ping")
+        self.assertEqual(weights, [1.0, 4.0])
+
+    async def test_middleware(self):
+        """
+        Test that the middleware rejects tool calls over the limit with a tool error.
+        """
+        ratelimit.limiter.configure({"tool": (0.1, 1.0)}, max_wait=0.0)
+        mcp = FastMCP("test")
+
+        @mcp.tool()
+        def ping() -> str:
+            return "pong"
+
+        ratelimit.register(mcp)
+        async with Client(mcp) as client:
+            self.assertEqual((await client.call_tool("ping")).data, "pong")
+            with self.assertRaises(ToolError):
+                await client.call_tool("ping")
+
+
+if __name__ == "__main__":
+    unittest.main()
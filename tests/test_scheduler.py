@@ -0,0 +1,127 @@
+"""
+Module for testing the background refresh scheduler.
+This module contains unit tests for prefetching, stale fallback and refresh status.
+"""
+
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import cache, http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.feeds import AED
+from hkopenai.hk_health_mcp_server.scheduler import (
+    RefreshScheduler,
+    RefreshState,
+    intervals_from_env,
+)
+from hkopenai.hk_health_mcp_server.tools.aed_waiting import _get_aed_waiting_times
+
+
+class TestRefreshScheduler(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the RefreshScheduler against a stub transport.
+    """
+
+    PAYLOAD = {"waitTime": [{"hospName": "Kwong Wah Hospital", "topWait": "Around 1 hour"}]}
+
+    def setUp(self):
+        """Serve requests from a stub transport that can be switched to failing."""
+        response_cache.clear()
+        self.requests = []
+        self.failing = False
+
+        def handler(request):
+            self.requests.append(str(request.url))
+            if self.failing:
+                return httpx.Response(503)
+            return httpx.Response(200, content=json.dumps(self.PAYLOAD).encode("utf-8"))
+
+        # One attempt per fetch, so a single injected failure reaches the caller.
+        http_client.configure(transport=httpx.MockTransport(handler), retry_attempts=1)
+
+    def tearDown(self):
+        """Restore the network transport and retries."""
+        http_client.configure(retry_attempts=http_client.DEFAULT_RETRY_ATTEMPTS)
+
+    async def test_start_prefetches_every_language(self):
+        """
+        Test that starting the scheduler fetches each configured feed in all languages.
+        """
+        scheduler = RefreshScheduler(intervals={"aed": 60})
+        scheduler.start()
+        try:
+            for _ in range(100):
+                if len(self.requests) == 3:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await scheduler.stop()
+        self.assertEqual(sorted(self.requests), sorted(AED.url(l) for l in ("en", "tc", "sc")))
+        self.assertEqual(cache.background_refresh_keys, set())
+
+    async def test_tool_served_from_snapshot(self):
+        """
+        Test that a tool call after a refresh is a cache hit with no upstream request.
+        """
+        scheduler = RefreshScheduler(intervals={"aed": 60}, languages=("en",))
+        self.assertTrue(await scheduler.refresh(RefreshState(AED, "en", 60)))
+        self.requests.clear()
+        result = await _get_aed_waiting_times(lang="en")
+        self.assertEqual(self.requests, [])
+        self.assertTrue(result["cache_hit"])
+        self.assertFalse(result["stale"])
+
+    @patch("hkopenai.hk_health_mcp_server.cache.time.monotonic")
+    async def test_failed_refresh_keeps_last_good_snapshot(self, mock_monotonic):
+        """
+        Test that after a failed refresh the tool serves the last good data marked stale.
+        """
+        mock_monotonic.return_value = 1000.0
+        scheduler = RefreshScheduler(intervals={"aed": 60}, languages=("en",))
+        state = RefreshState(AED, "en", 60)
+        await scheduler.refresh(state)
+        self.failing = True
+        mock_monotonic.return_value = 5000.0
+        self.assertFalse(await scheduler.refresh(state))
+        cache.background_refresh_keys.add((AED.url("en"), "en"))
+        try:
+            self.requests.clear()
+            result = await _get_aed_waiting_times(lang="en")
+        finally:
+            cache.background_refresh_keys.clear()
+        self.assertEqual(self.requests, [])
+        self.assertEqual(result["data"], self.PAYLOAD)
+        self.assertTrue(result["stale"])
+        self.assertIn("snapshot_age_seconds", result)
+        status = state.as_dict()
+        self.assertEqual(status["consecutive_failures"], 1)
+        self.assertIn("503", status["last_error"])
+        self.assertIsNotNone(status["last_success"])
+
+
+class TestIntervalsFromEnv(unittest.TestCase):
+    """
+    Test class for verifying refresh interval configuration.
+    """
+
+    def test_env_overrides_defaults(self):
+        """
+        Test that HK_HEALTH_REFRESH_INTERVALS overrides known feeds and ignores others.
+        """
+        with patch.dict(
+            os.environ, {"HK_HEALTH_REFRESH_INTERVALS": "aed=30, gopc=0,unknown=5,specialist=x"}
+        ):
+            intervals = intervals_from_env()
+        self.assertEqual(intervals["aed"], 30)
+        self.assertEqual(intervals["gopc"], 0)
+        self.assertEqual(intervals["specialist"], 3600)
+        self.assertNotIn("unknown", intervals)
+
+
+if __name__ == "__main__":
+    unittest.main()
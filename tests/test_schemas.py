@@ -0,0 +1,202 @@
+"""
+Module for testing the typed row schemas of the Hospital Authority feeds.
+This module contains unit tests for row validation and conversion at ingest.
+"""
+
+import math
+import unittest
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client, metrics
+from hkopenai.hk_health_mcp_server.cache import get_feed_data, refresh_feed, response_cache
+from hkopenai.hk_health_mcp_server.feeds import AED, GOPC
+from hkopenai.hk_health_mcp_server.http_client import fetch_json
+from hkopenai.hk_health_mcp_server.schemas import GOPC_ROW, RowSchema, SchemaMonitor, schema_monitor
+
+
+class TestRowSchema(unittest.TestCase):
+    """
+    Test class for verifying that rows are validated and converted once.
+    """
+
+    def test_check(self):
+        """
+        Test that text fields become strings and invalid rows are rejected with a reason.
+        """
+        schema = RowSchema(required=("name",), text=("note",))
+        row = {"name": "A", "note": "x"}
+        self.assertIs(schema.check(row)[0], row)
+        self.assertEqual(
+            schema.check({"name": 12, "note": 1.5}), ({"name": "12", "note": "1.5"}, "")
+        )
+        self.assertEqual(
+            schema.check({"name": "A", "note": None, "extra": [1]})[0], {"name": "A", "extra": [1]}
+        )
+        self.assertEqual(schema.check({"note": "x"}), (None, "missing_field"))
+        self.assertEqual(schema.check({"name": None}), (None, "invalid_field"))
+        self.assertEqual(schema.check({"name": True}), (None, "invalid_field"))
+        self.assertEqual(schema.check(["A"]), (None, "not_object"))
+
+    def test_ingest_logs_quarantined_rows(self):
+        """
+        Test that rows quarantined while ingesting a feed are logged.
+        """
+        with self.assertLogs("hkopenai.hk_health_mcp_server.schemas", "WARNING") as logs:
+            table = GOPC.ingest(
+                [
+                    {"District": "Eastern", "Clinic": "A"},
+                    {"District": "Eastern", "Clinic": "B"},
+                    {"District": "Eastern", "Clinic": "C"},
+                    {"Clinic": "D"},
+                ]
+            )
+        self.assertEqual([row["Clinic"] for row in table], ["A", "B", "C"])
+        self.assertIn("Quarantined 1 of 4 rows of feed gopc", logs.output[0])
+
+    def test_ingest_uses_schema(self):
+        """
+        Test that feeds parse only their declared numeric fields and drop invalid rows.
+        """
+        table = GOPC.ingest(
+            [
+                {"District": "Eastern", "Clinic": "A", "AvgQuota": "1,200", "Code": "7"},
+                {"District": "Eastern", "Clinic": "B", "Code": "8"},
+                {"District": "Eastern", "AvgQuota": "5"},
+            ]
+        )
+        self.assertEqual(len(table), 2)
+        self.assertEqual(list(table.numeric), ["AvgQuota"])
+        self.assertEqual(table.numeric["AvgQuota"][0], 1200.0)
+        self.assertTrue(math.isnan(table.numeric["AvgQuota"][1]))
+        aed = AED.ingest({"waitTime": [{"hospName": "A", "topWait": 3}], "updateTime": "now"})
+        self.assertEqual(
+            aed.to_payload(),
+            {"waitTime": [{"hospName": "A", "topWait": "3"}], "updateTime": "now"},
+        )
+
+    def test_malformed_quota_quarantined(self):
+        """
+        Test that a quota that is not a number or numeric string quarantines its row.
+        """
+        rows = [
+            {"District": "Eastern", "Clinic": "A", "AvgQuota": 80},
+            {"District": "Eastern", "Clinic": "B", "AvgQuota": "1,200"},
+            {"District": "Eastern", "Clinic": "C"},
+        ]
+        malformed = [
+            {"District": "Eastern", "Clinic": "D", "AvgQuota": value}
+            for value in ("abc", None, {"value": 5}, True, "nan")
+        ]
+        kept, report = GOPC_ROW.inspect(rows + malformed)
+        self.assertEqual(kept, rows)
+        self.assertEqual(report.reasons, {"invalid_field": 5})
+        self.assertEqual([sample["row"] for sample in report.samples], malformed)
+
+    def test_inspect_reports_quarantined_rows_and_fingerprint(self):
+        """
+        Test that the report counts rows by reason and fingerprints the published layout.
+        """
+        rows = [
+            {"District": "Eastern", "Clinic": "A", "AvgQuota": 5},
+            {"Clinic": "B"},
+            {"District": [], "Clinic": "C"},
+            "D",
+        ]
+        kept, report = GOPC_ROW.inspect(rows)
+        self.assertEqual(len(kept), 1)
+        self.assertEqual((report.rows, report.quarantined), (4, 3))
+        self.assertEqual(report.reasons, {"missing_field": 1, "invalid_field": 1, "not_object": 1})
+        self.assertEqual(report.samples[0], {"reason": "missing_field", "row": {"Clinic": "B"}})
+        self.assertEqual(report.fields["District"], ("array", "string"))
+        self.assertEqual(report.fields["AvgQuota"], ("number",))
+        _, same = GOPC_ROW.inspect(list(reversed(rows)))
+        self.assertEqual(same.fingerprint, report.fingerprint)
+        _, renamed = GOPC_ROW.inspect([{"District": "Eastern", "ClinicName": "A"}])
+        self.assertNotEqual(renamed.fingerprint, report.fingerprint)
+
+
+class TestSchemaMonitor(unittest.TestCase):
+    """
+    Test class for verifying drift detection and rejection of malformed feed versions.
+    """
+
+    def setUp(self):
+        """Count metrics."""
+        metrics.configure(enabled=True)
+
+    def tearDown(self):
+        """Stop counting metrics."""
+        metrics.configure(enabled=False)
+
+    def test_drift_counted_once_per_change(self):
+        """
+        Test that a changed layout is counted as drift and its fields listed in the status.
+        """
+        monitor = SchemaMonitor()
+        _, first = GOPC_ROW.inspect([{"District": "Eastern", "Clinic": "A", "AvgQuota": "5"}])
+        _, second = GOPC_ROW.inspect([{"District": "Eastern", "Clinic": "A", "AvgQuota": 5}])
+        with self.assertLogs("hkopenai.hk_health_mcp_server.schemas", "WARNING") as logs:
+            self.assertTrue(monitor.observe("drift-test", first))
+            self.assertTrue(monitor.observe("drift-test", first))
+            self.assertTrue(monitor.observe("drift-test", second))
+        self.assertIn("retyped ['AvgQuota']", logs.output[0])
+        self.assertEqual(metrics.SCHEMA_DRIFT.value("drift-test"), 1)
+        status = monitor.status()["feeds"][0]
+        self.assertEqual(status["fingerprint"], second.fingerprint)
+        self.assertEqual(status["drift_events"], 1)
+        self.assertEqual(status["previous_fingerprints"][0]["fingerprint"], first.fingerprint)
+
+    def test_mostly_invalid_version_rejected(self):
+        """
+        Test that a version with more quarantined rows than allowed is rejected.
+        """
+        monitor = SchemaMonitor(max_ratio=0.5)
+        _, report = GOPC_ROW.inspect(
+            [{"District": "Eastern"}, {"Clinic": "A"}, {"District": "Eastern", "Clinic": "B"}]
+        )
+        with self.assertLogs("hkopenai.hk_health_mcp_server.schemas", "WARNING"):
+            self.assertFalse(monitor.observe("reject-test", report))
+        self.assertEqual(metrics.ROWS_QUARANTINED.value("reject-test", "missing_field"), 2)
+        self.assertEqual(metrics.SNAPSHOTS_REJECTED.value("reject-test"), 1)
+        status = monitor.status()["feeds"][0]
+        self.assertEqual(status["rejected_versions"], 1)
+        self.assertEqual(len(status["quarantine"]), 2)
+        _, empty = GOPC_ROW.inspect([])
+        self.assertTrue(monitor.observe("reject-test", empty))
+
+
+class TestIngestRejection(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that a malformed upstream version does not replace a good one.
+    """
+
+    def setUp(self):
+        """Serve the GOPC feed from a mutable payload."""
+        response_cache.clear()
+        self.payload = [{"District": "Eastern", "Clinic": "A", "AvgQuota": "5"}]
+        http_client.configure(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=self.payload))
+        )
+
+    def tearDown(self):
+        """Restore the default client and forget the feed."""
+        http_client.configure()
+        response_cache.clear()
+
+    async def test_last_good_version_served(self):
+        """
+        Test that a version whose rows lost their key fields is rejected and the last good one served.
+        """
+        await refresh_feed(GOPC, "en", fetch_json, ttl=0)
+        self.payload = [{"district": "Eastern", "clinic": "A", "AvgQuota": "5"}]
+        with self.assertLogs("hkopenai.hk_health_mcp_server.schemas", "WARNING") as logs:
+            result = await get_feed_data(GOPC, "en", fetch_json)
+        self.assertTrue(any("Rejected a version of feed gopc" in line for line in logs.output))
+        self.assertTrue(result.stale)
+        self.assertEqual(result.data[0]["Clinic"], "A")
+        self.assertEqual(schema_monitor.status()["max_quarantine_ratio"], 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Module for testing the JSON serialization layer.
+This module contains unit tests for backend selection, decoding feed bodies, reusing
+the encoding of snapshot payloads and the pre-encoded tool results.
+"""
+
+import importlib.util
+import json
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client, serialization
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.tools.aed_waiting import _get_aed_waiting_times
+
+INSTALLED = [name for name in serialization.BACKENDS if importlib.util.find_spec(name)]
+
+
+class TestBackends(unittest.TestCase):
+    """
+    Test class for verifying every installed JSON backend behaves the same.
+    """
+
+    def tearDown(self):
+        """Restore automatic backend selection."""
+        serialization.configure(backend="auto", encode_responses=True)
+
+    def test_selection(self):
+        """
+        Test that a named backend is used and unknown or missing ones fall back.
+        """
+        serialization.configure(backend="json")
+        self.assertEqual(serialization.backend(), "json")
+        serialization.configure(backend="auto")
+        self.assertEqual(serialization.backend(), INSTALLED[0])
+        serialization.configure(backend="yaml")
+        self.assertEqual(serialization.backend(), "json")
+        with patch.dict(serialization._FACTORIES, {"orjson": _missing}):  # pylint: disable=protected-access
+            serialization.configure(backend="orjson")
+            self.assertEqual(serialization.backend(), "json")
+
+    def test_round_trip(self):
+        """
+        Test that each backend decodes bytes and encodes compact JSON keeping Chinese text.
+        """
+        for name in INSTALLED:
+            with self.subTest(backend=name):
+                serialization.configure(backend=name)
+                value = serialization.loads('{"hospName": "屯門醫院", "n": [1, 2.5]}'.encode())
+                self.assertEqual(value, {"hospName": "屯門醫院", "n": [1, 2.5]})
+                self.assertEqual(serialization.dumps(value), '{"hospName":"屯門醫院","n":[1,2.5]}')
+                with self.assertRaises(ValueError):
+                    serialization.loads(b"<html>")
+
+    def test_decode_json_errors(self):
+        """
+        Test that feed bodies with a BOM decode and invalid bodies give error dictionaries.
+        """
+        for name in INSTALLED:
+            with self.subTest(backend=name):
+                serialization.configure(backend=name)
+                self.assertEqual(
+                    http_client.decode_json('\ufeff{"a": "屯門"}'.encode("utf-8")), {"a": "屯門"}
+                )
+                self.assertEqual(
+                    http_client.decode_json('{"a": "屯門"}'.encode("big5"), "big5"), {"a": "屯門"}
+                )
+                self.assertIn("UnicodeDecodeError", http_client.decode_json(b'{"a": "\xff"}')["error"])
+                self.assertIn("Failed to parse JSON", http_client.decode_json(b"")["error"])
+
+
+def _missing():
+    """Stand in for a backend that is not installed."""
+    raise ImportError("not installed")
+
+
+class TestEncodedPayloads(unittest.TestCase):
+    """
+    Test class for verifying that payload encodings are stored and spliced.
+    """
+
+    def test_payload_encoded_once(self):
+        """
+        Test that an encodable payload is serialized on first use only.
+        """
+        data = serialization.encodable([{"Clinic": "A"}])
+        with patch.object(serialization, "dumps", wraps=serialization.dumps) as dumps:
+            first = serialization.dumps_response({"data": data, "cache_hit": True})
+            second = serialization.dumps_response({"data": data, "cache_hit": False})
+        self.assertEqual(json.loads(first), {"data": [{"Clinic": "A"}], "cache_hit": True})
+        self.assertEqual(json.loads(second)["cache_hit"], False)
+        encoded_payloads = [c for c in dumps.call_args_list if c.args[0] is data]
+        self.assertEqual(len(encoded_payloads), 1)
+
+    def test_memo_is_bounded(self):
+        """
+        Test that the memo returns the stored payload per key and drops the oldest.
+        """
+        memo = serialization.ResponseMemo(max_entries=2)
+        first = memo.get(("a",), lambda: {"x": 1})
+        self.assertIsInstance(first, serialization.EncodedDict)
+        self.assertIs(memo.get(("a",), lambda: {"x": 2}), first)
+        memo.get(("b",), list)
+        memo.get(("c",), list)
+        self.assertEqual(len(memo), 2)
+        self.assertEqual(memo.get(("a",), lambda: {"x": 3}), {"x": 3})
+        self.assertEqual(serialization.memo_key(range(2), []), ((0, 1), None))
+
+
+class TestToolResults(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the pre-encoded tool results.
+    """
+
+    def setUp(self):
+        """Serve a fixed AED payload."""
+        response_cache.clear()
+        payload = {"waitTime": [{"hospName": "Tuen Mun Hospital", "topWait": "Over 3 hours"}],
+                   "updateTime": "10/6/2025 9:45pm"}
+        http_client.configure(
+            transport=httpx.MockTransport(lambda request: httpx.Response(200, json=payload))
+        )
+
+    def tearDown(self):
+        """Drop the cached payload and restore the settings."""
+        response_cache.clear()
+        http_client.configure()
+        serialization.configure(encode_responses=True)
+
+    async def test_encode_result(self):
+        """
+        Test that dictionaries are returned encoded and other values are passed through.
+        """
+
+        @serialization.encode_result
+        async def tool(value):
+            return value
+
+        result = await tool({"data": [1], "stale": False})
+        self.assertEqual(json.loads(result.content[0].text), result.structured_content)
+        self.assertEqual(await tool("text"), "text")
+        serialization.configure(encode_responses=False)
+        self.assertEqual(await tool({"data": [1]}), {"data": [1]})
+
+    async def test_payload_reused_while_snapshot_unchanged(self):
+        """
+        Test that repeated calls on one snapshot share the payload and its encoding.
+        """
+        first = await _get_aed_waiting_times(lang="en")
+        second = await _get_aed_waiting_times(lang="en")
+        self.assertIs(first["data"], second["data"])
+        self.assertIsNot(
+            (await _get_aed_waiting_times(lang="en", fields=["hospName"]))["data"], first["data"]
+        )
+        response_cache.clear()
+        third = await _get_aed_waiting_times(lang="en")
+        self.assertIsNot(third["data"], first["data"])
+        self.assertEqual(third["data"], first["data"])
+
+
+if __name__ == "__main__":
+    unittest.main()
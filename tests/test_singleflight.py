@@ -0,0 +1,156 @@
+"""
+Module for testing request coalescing of concurrent upstream fetches.
+This module contains unit tests for the SingleFlight helper and its use by the cache.
+"""
+
+import asyncio
+import unittest
+
+from hkopenai.hk_health_mcp_server.cache import get_feed_data, response_cache
+from hkopenai.hk_health_mcp_server.feeds import Feed
+from hkopenai.hk_health_mcp_server.singleflight import SingleFlight, upstream_flight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that concurrent calls are coalesced.
+    """
+
+    async def test_concurrent_calls_share_one_execution(self):
+        """
+        Test that callers arriving while a call is in flight receive its result.
+        """
+        flight = SingleFlight()
+        release = asyncio.Event()
+        executions = []
+
+        async def work():
+            executions.append(1)
+            await release.wait()
+            return "payload"
+
+        tasks = [asyncio.create_task(flight.do("k", work)) for _ in range(10)]
+        await asyncio.sleep(0)
+        self.assertEqual(flight.in_flight(), 1)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        self.assertEqual(len(executions), 1)
+        self.assertEqual(results[0], ("payload", False))
+        self.assertTrue(all(r == ("payload", True) for r in results[1:]))
+        self.assertEqual(flight.stats()["k"], {"calls": 1, "coalesced": 9})
+        self.assertEqual(flight.in_flight(), 0)
+
+    async def test_error_is_raised_in_all_callers(self):
+        """
+        Test that an exception from the shared call reaches every waiting caller.
+        """
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            raise RuntimeError("upstream down")
+
+        tasks = [asyncio.create_task(flight.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    async def test_sequential_calls_are_not_coalesced(self):
+        """
+        Test that a call started after the previous one finished runs again.
+        """
+        flight = SingleFlight()
+
+        async def one():
+            return 1
+
+        async def two():
+            return 2
+
+        self.assertEqual(await flight.do("k", one), (1, False))
+        self.assertEqual(await flight.do("k", two), (2, False))
+        self.assertEqual(flight.stats()["k"], {"calls": 2, "coalesced": 0})
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        """
+        Test that followers still get the result when the caller that started the call is cancelled.
+        """
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "payload"
+
+        leader = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        self.assertTrue(leader.cancelled())
+        release.set()
+        self.assertEqual(await follower, ("payload", True))
+        self.assertEqual(flight.in_flight(), 0)
+
+    async def test_call_cancelled_when_every_caller_is_gone(self):
+        """
+        Test that the shared call is cancelled once no caller waits for it any more.
+        """
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        tasks = [asyncio.create_task(flight.do("k", work)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        self.assertEqual(flight.in_flight(), 0)
+
+
+class TestCacheCoalescing(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that concurrent cache misses share one upstream fetch.
+    """
+
+    FEED = Feed(name="test", url_template="https://example.com/feed-{lang}.json", ttl=60)
+
+    def setUp(self):
+        """Start each test with an empty cache and fresh coalescing statistics."""
+        response_cache.clear()
+        upstream_flight.reset()
+
+    async def test_concurrent_misses_fetch_once(self):
+        """
+        Test that 50 concurrent callers after an expiry result in a single fetch.
+        """
+        calls = []
+
+        async def fetch(url, parse):
+            calls.append(url)
+            await asyncio.sleep(0.01)
+            return parse([{"hospName": "A"}])
+
+        results = await asyncio.gather(
+            *(get_feed_data(self.FEED, "en", fetch) for _ in range(50))
+        )
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r.data.to_payload() == [{"hospName": "A"}] for r in results))
+        stats = upstream_flight.stats()["https://example.com/feed-en.json"]
+        self.assertEqual(stats, {"calls": 1, "coalesced": 49})
+
+
+if __name__ == "__main__":
+    unittest.main()
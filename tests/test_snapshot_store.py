@@ -0,0 +1,158 @@
+"""
+Module for testing the persistent snapshot store and warm starts from it.
+This module contains unit tests for SnapshotStore and its use by the feed cache.
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from hkopenai.hk_health_mcp_server import cache, snapshot_store
+from hkopenai.hk_health_mcp_server.cache import get_feed_data, response_cache
+from hkopenai.hk_health_mcp_server.feeds import Feed
+from hkopenai.hk_health_mcp_server.server import lifespan
+from hkopenai.hk_health_mcp_server.snapshot_store import SnapshotStore
+
+URL = "https://example.com/feed-en.json"
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """
+    Test class for verifying storage, deduplication and retention of snapshots.
+    """
+
+    def setUp(self):
+        """Open a store in a temporary directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "sub", "snapshots.sqlite3")
+        self.store = SnapshotStore(self.path, keep_versions=3, max_age_days=1)
+
+    def tearDown(self):
+        """Close the store and remove its directory."""
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_latest_version_survives_reopen(self):
+        """
+        Test that the latest payload and its fetch time are read back after reopening.
+        """
+        fetched_at = datetime(2025, 7, 14, 10, 0, 0)
+        self.store.save(URL, [{"District": "屯門"}], fetched_at - timedelta(hours=1))
+        self.store.save(URL, [{"District": "Tuen Mun"}], fetched_at)
+        self.store.close()
+        self.store = SnapshotStore(self.path)
+        self.assertEqual(self.store.latest(URL), ([{"District": "Tuen Mun"}], fetched_at))
+        self.assertIsNone(self.store.latest("https://example.com/other.json"))
+
+    def test_identical_versions_are_stored_once(self):
+        """
+        Test that saving an unchanged payload only moves its fetch time forward.
+        """
+        now = datetime.now()
+        self.store.save(URL, [{"x": 1}], now - timedelta(minutes=5))
+        self.store.save(URL, [{"x": 1}], now)
+        self.assertEqual(self.store.stats()["versions"], {URL: 1})
+        self.assertEqual(self.store.latest(URL)[1], now)
+
+    def test_retention_by_count_and_age(self):
+        """
+        Test that old versions are pruned but the latest one is always kept.
+        """
+        now = datetime.now()
+        for i in range(5):
+            self.store.save(URL, [{"x": i}], now - timedelta(minutes=5 - i))
+        self.assertEqual(self.store.stats()["versions"], {URL: 3})
+
+        other = "https://example.com/old.json"
+        self.store.save(other, [{"x": 0}], now - timedelta(days=5))
+        self.store.save(other, [{"x": 1}], now - timedelta(days=3))
+        self.assertEqual(self.store.stats()["versions"][other], 1)
+        self.assertEqual(self.store.latest(other)[0], [{"x": 1}])
+
+    def test_disabled_through_environment(self):
+        """
+        Test that an empty or 'off' path disables the store.
+        """
+        for value in ("", "off"):
+            with patch.dict(os.environ, {"HK_HEALTH_SNAPSHOT_PATH": value}):
+                self.assertIsNone(snapshot_store.open_from_env())
+        with patch.dict(os.environ, {"HK_HEALTH_SNAPSHOT_KEEP": "x"}):
+            self.assertEqual(snapshot_store.retention_from_env()[0], 48)
+
+
+class TestWarmStart(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying that the cache persists and restores snapshots.
+    """
+
+    FEED = Feed(name="test", url_template="https://example.com/feed-{lang}.json", ttl=60)
+
+    def setUp(self):
+        """Attach a store in a temporary directory to an empty cache."""
+        response_cache.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(os.path.join(self.tmp.name, "snapshots.sqlite3"))
+        cache.set_snapshot_store(self.store)
+
+    def tearDown(self):
+        """Detach and close the store."""
+        cache.set_snapshot_store(None)
+        self.store.close()
+        self.tmp.cleanup()
+        response_cache.clear()
+
+    async def test_fetched_versions_are_persisted(self):
+        """
+        Test that a successful fetch is written to the store.
+        """
+        fetch = AsyncMock(side_effect=lambda url, parse: parse([{"x": 1}]))
+        await get_feed_data(self.FEED, "en", fetch)
+        self.assertEqual(self.store.latest(URL)[0], [{"x": 1}])
+
+    async def test_fresh_snapshot_served_without_fetch(self):
+        """
+        Test that a restarted process answers from a recent stored version.
+        """
+        self.store.save(URL, [{"x": 1}], datetime.now() - timedelta(seconds=10))
+        fetch = AsyncMock()
+        result = await get_feed_data(self.FEED, "en", fetch)
+        fetch.assert_not_called()
+        self.assertEqual(result.data.to_payload(), [{"x": 1}])
+        self.assertFalse(result.stale)
+
+    async def test_old_snapshot_served_stale_when_upstream_down(self):
+        """
+        Test that an expired stored version is served when the upstream is unreachable.
+        """
+        fetched_at = datetime.now() - timedelta(hours=2)
+        self.store.save(URL, [{"x": 1}], fetched_at)
+        fetch = AsyncMock(return_value={"error": "Connection error"})
+        result = await get_feed_data(self.FEED, "en", fetch)
+        fetch.assert_called_once()
+        self.assertTrue(result.stale)
+        self.assertEqual(result.data.to_payload(), [{"x": 1}])
+        self.assertGreaterEqual(result.metadata()["snapshot_age_seconds"], 7000)
+
+    async def test_lifespan_attaches_configured_store(self):
+        """
+        Test that the server lifespan opens the configured store and closes it on exit.
+        """
+        cache.set_snapshot_store(None)
+        path = os.path.join(self.tmp.name, "server.sqlite3")
+        env = {
+            "HK_HEALTH_SNAPSHOT_PATH": path,
+            "HK_HEALTH_AED_HISTORY_PATH": "off",
+            "HK_HEALTH_GOPC_HISTORY_PATH": "off",
+            "HK_HEALTH_BACKGROUND_REFRESH": "false",
+        }
+        with patch.dict(os.environ, env):
+            async with lifespan(None):
+                self.assertEqual(cache.snapshot_store.path, path)
+        self.assertIsNone(cache.snapshot_store)
+        self.assertTrue(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Module for testing the specialist waiting time matrix.
+This module contains unit tests for parsing published waits into weeks and for the
+rankings, medians and territory-wide bounds computed per snapshot.
+"""
+
+import math
+import unittest
+
+from hkopenai.hk_health_mcp_server.cache import CacheEntry
+from hkopenai.hk_health_mcp_server.feeds import GOPC, SPECIALIST
+from hkopenai.hk_health_mcp_server.specialist_matrix import (
+    SpecialistMatrix,
+    build_on_ingest,
+    parse_weeks,
+)
+
+
+def _row(cluster, value, specialty="Surgery", category="Stable"):
+    """Return one specialist feed row."""
+    return {"cluster": cluster, "specialty": specialty, "Category": category, "Value": value}
+
+
+class TestParseWeeks(unittest.TestCase):
+    """
+    Test class for verifying that published waits become bounds in weeks.
+    """
+
+    def test_parse(self):
+        """
+        Test single values, ranges, open-ended waits, days and Chinese text.
+        """
+        cases = {
+            "12 Weeks": (12.0, 12.0),
+            "37-40 weeks": (37.0, 40.0),
+            "<1 week": (0.0, 1.0),
+            "Less than 1 week": (0.0, 1.0),
+            ">100 weeks": (100.0, math.inf),
+            "少於1星期": (0.0, 1.0),
+            "100星期以上": (100.0, math.inf),
+            "14 days": (2.0, 2.0),
+            7: (7.0, 7.0),
+        }
+        for text, bounds in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_weeks(text), bounds)
+        for text in ("N/A", "", None, float("nan"), True):
+            with self.subTest(text=text):
+                self.assertIsNone(parse_weeks(text))
+
+
+class TestSpecialistMatrix(unittest.TestCase):
+    """
+    Test class for verifying the rankings and statistics of the matrix.
+    """
+
+    def setUp(self):
+        """Build a matrix of surgery waits across five clusters."""
+        self.table = SPECIALIST.ingest(
+            [
+                _row("Kowloon East Cluster", "30 weeks"),
+                _row("Hong Kong East Cluster", "<1 week"),
+                _row("Kowloon West Cluster", ">100 weeks"),
+                _row("New Territories West Cluster", "30 weeks"),
+                _row("Hong Kong West Cluster", "N/A"),
+                _row("Kowloon East Cluster", "1 week", category="Urgent"),
+                _row("Kowloon East Cluster", "99 weeks"),
+            ]
+        )
+        self.matrix = SpecialistMatrix.from_table(self.table)
+
+    def test_ranking(self):
+        """
+        Test that clusters are ranked by wait with ties sharing a rank.
+        """
+        answer = self.matrix.ranking("stable", "sur")
+        self.assertEqual(answer["specialty"], "Surgery")
+        self.assertEqual(answer["category"], "Stable")
+        self.assertEqual(
+            [(e["rank"], e["cluster_code"], e["value"]) for e in answer["ranking"]],
+            [(1, "HKEC", "<1 week"), (2, "KEC", "30 weeks"), (2, "NTWC", "30 weeks"),
+             (4, "KWC", ">100 weeks")],
+        )
+        self.assertEqual(answer["ranking"][0]["low_weeks"], 0.0)
+        self.assertIsNone(answer["ranking"][-1]["high_weeks"])
+        self.assertEqual(answer["clusters_reporting"], 4)
+
+    def test_statistics(self):
+        """
+        Test the median and the territory-wide shortest and longest waits.
+        """
+        answer = self.matrix.ranking("stable", "sur")
+        self.assertEqual(answer["median_weeks"], 30.0)
+        self.assertEqual(answer["territory_min_weeks"], 0.0)
+        self.assertIsNone(answer["territory_max_weeks"])
+        self.assertTrue(answer["territory_max_open_ended"])
+        urgent = self.matrix.ranking("urgent", "sur")
+        self.assertEqual(urgent["territory_max_weeks"], 1.0)
+        self.assertFalse(urgent["territory_max_open_ended"])
+
+    def test_missing_cells(self):
+        """
+        Test categories without waits and unknown specialties.
+        """
+        empty = self.matrix.ranking("semi-urgent", "sur")
+        self.assertEqual(empty["category"], "Semi-urgent")
+        self.assertEqual(empty["ranking"], [])
+        self.assertIsNone(empty["median_weeks"])
+        self.assertIsNone(self.matrix.ranking("stable", "med"))
+        self.assertIsNone(self.matrix.ranking(None, "sur"))
+
+    def test_build_on_ingest(self):
+        """
+        Test that the version listener builds the matrix of specialist snapshots only.
+        """
+        entry = CacheEntry(self.table, None, 0.0, 0)
+        build_on_ingest(SPECIALIST, "en", entry)
+        self.assertIsInstance(entry.derived["matrix"], SpecialistMatrix)
+        other = CacheEntry(GOPC.ingest([]), None, 0.0, 0)
+        build_on_ingest(GOPC, "en", other)
+        self.assertNotIn("matrix", other.derived)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Module for testing the cold start cost of the server.
+This module contains the import-time budget of creating the server and checks that
+heavy dependencies are only loaded once a tool runs.
+"""
+
+import json
+import subprocess
+import sys
+import textwrap
+import unittest
+
+from hkopenai.hk_health_mcp_server.lazy import LazyModule, lazy_import
+
+# Seconds allowed for importing the package and creating the server, on top of
+# importing FastMCP itself. The measured cost is well under a tenth of a second.
+STARTUP_BUDGET = 0.3
+
+# Modules the server must not load before a tool is called.
+DEFERRED_MODULES = ("numpy", "httpx", "griffe")
+
+_PROFILE = textwrap.dedent(
+    """
+    import json, sys, time
+    import fastmcp.server.server  # Baseline: the MCP framework itself.
+    started = time.perf_counter()
+    from hkopenai.hk_health_mcp_server.server import server
+    server()
+    elapsed = time.perf_counter() - started
+    loaded = [name for name in {deferred!r} if name in sys.modules]
+    if {call_tool!r}:
+        import asyncio
+        from hkopenai.hk_health_mcp_server import http_client
+        from hkopenai.hk_health_mcp_server.tools.aed_waiting_stats import _get_aed_waiting_time_stats
+        http_client.configure(transport=http_client.httpx.MockTransport(
+            lambda request: http_client.httpx.Response(200, json={{"waitTime": []}})))
+        asyncio.run(_get_aed_waiting_time_stats())
+    print(json.dumps({{"elapsed": elapsed, "loaded": loaded,
+                      "after_call": [n for n in {deferred!r} if n in sys.modules]}}))
+    """
+)
+
+
+def _profile(call_tool: bool = False) -> dict:
+    """Create the server in a fresh interpreter and report its cost and loaded modules."""
+    code = _PROFILE.format(deferred=DEFERRED_MODULES, call_tool=call_tool)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, timeout=60
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Test class for verifying the import-time budget of the server.
+    """
+
+    def test_startup_within_budget(self):
+        """
+        Test that importing the package and declaring every tool stays within budget.
+        """
+        elapsed = min(_profile()["elapsed"] for _ in range(3))
+        self.assertLess(elapsed, STARTUP_BUDGET)
+
+    def test_heavy_dependencies_load_on_first_call(self):
+        """
+        Test that numpy and httpx are loaded by the first tool call, not by startup.
+        """
+        profile = _profile(call_tool=True)
+        self.assertEqual(profile["loaded"], [])
+        self.assertIn("numpy", profile["after_call"])
+        self.assertIn("httpx", profile["after_call"])
+
+
+class TestLazyModule(unittest.TestCase):
+    """
+    Test class for verifying the deferred module stand-in.
+    """
+
+    def test_attributes_resolve_to_the_module(self):
+        """
+        Test that the stand-in imports the module and exposes its attributes.
+        """
+        module = lazy_import("colorsys")
+        self.assertIsInstance(module, LazyModule)
+        self.assertEqual(module.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertIn("hls_to_rgb", vars(module))
+        with self.assertRaises(AttributeError):
+            module.not_a_function  # pylint: disable=pointless-statement
+
+
+if __name__ == "__main__":
+    unittest.main()
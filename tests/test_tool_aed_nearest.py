@@ -0,0 +1,155 @@
+"""
+Module for testing the nearest A&E ranking tool.
+This module contains unit tests for the score, the pruned nearest-first search and latency.
+"""
+
+import json
+import math
+import random
+import time
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.geo import project
+from hkopenai.hk_health_mcp_server.reference import HOSPITAL_COORDINATES
+from hkopenai.hk_health_mcp_server.tools.aed_nearest import (
+    _get_nearest_aed_hospitals,
+    rank_hospitals,
+    register,
+)
+
+
+class TestNearestAedHospitals(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the ranking against a stub AED feed.
+    """
+
+    PAYLOAD = {
+        "waitTime": [
+            {"hospName": "Prince of Wales Hospital", "topWait": "Over 4 hours"},
+            {"hospName": "Alice Ho Miu Ling Nethersole Hospital", "topWait": "Around 1 hour"},
+            {"hospName": "Queen Elizabeth Hospital", "topWait": "Over 2 hours"},
+            {"hospName": "Tuen Mun Hospital", "topWait": "Around 1 hour"},
+            {"hospName": "North Lantau Hospital", "topWait": "Around 30 minutes"},
+            {"hospName": "Nowhere Hospital", "topWait": "Around 5 minutes"},
+        ],
+        "updateTime": "10/6/2025 9:45pm",
+    }
+
+    def setUp(self):
+        """Serve the AED feed from a stub transport and start with an empty cache."""
+        response_cache.clear()
+        http_client.configure(
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, content=json.dumps(self.PAYLOAD).encode())
+            )
+        )
+
+    def tearDown(self):
+        """Restore the network transport."""
+        http_client.configure()
+
+    async def test_shorter_wait_outranks_nearer_hospital(self):
+        """
+        Test that a short wait a little farther away beats a long wait next door.
+        """
+        result = await _get_nearest_aed_hospitals(district="沙田", top_k=2)
+        self.assertEqual([row["hospCode"] for row in result["data"]], ["AHN", "NLT"])
+        ahn = result["data"][0]
+        self.assertEqual(ahn["hospName"], "Alice Ho Miu Ling Nethersole Hospital")
+        self.assertEqual(ahn["waitMinutes"], 60)
+        self.assertAlmostEqual(ahn["score"], 60 + ahn["travelMinutes"], delta=0.11)
+        self.assertEqual(result["origin"]["district"], "Sha Tin")
+        self.assertEqual(result["updateTime"], "10/6/2025 9:45pm")
+        self.assertIn("cache_hit", result)
+
+    async def test_distance_only_and_wait_only(self):
+        """
+        Test that the travel weight moves the ranking between nearest and shortest wait.
+        """
+        latitude, longitude = HOSPITAL_COORDINATES["PWH"]
+        nearest = await _get_nearest_aed_hospitals(
+            latitude=latitude, longitude=longitude, top_k=1, minutes_per_km=1000
+        )
+        self.assertEqual(nearest["data"][0]["hospCode"], "PWH")
+        self.assertEqual(nearest["data"][0]["distanceKm"], 0)
+        shortest = await _get_nearest_aed_hospitals(
+            latitude=latitude, longitude=longitude, top_k=5, minutes_per_km=0
+        )
+        self.assertEqual(shortest["data"][0]["hospCode"], "NLT")
+        self.assertEqual(len(shortest["data"]), 5)
+        self.assertEqual(shortest["message"], "Ranked 5 A&E departments by waiting time plus travel time")
+
+    async def test_invalid_locations(self):
+        """
+        Test that missing, unknown and out-of-territory locations return errors.
+        """
+        for kwargs in (
+            {},
+            {"district": "Atlantis"},
+            {"latitude": 35.68, "longitude": 139.69},
+            {"district": "Wan Chai", "top_k": 0},
+            {"district": "Wan Chai", "minutes_per_km": -1},
+        ):
+            self.assertEqual((await _get_nearest_aed_hospitals(**kwargs))["type"], "Error")
+
+    def test_pruned_search_matches_brute_force(self):
+        """
+        Test that stopping the nearest-first search early never changes the top k.
+        """
+        rng = random.Random(3)
+        codes = list(HOSPITAL_COORDINATES)
+        for _ in range(200):
+            waits = {
+                code: (code, "", float(rng.choice([15, 30, 60, 120, 240, 360])))
+                for code in rng.sample(codes, rng.randint(1, len(codes)))
+            }
+            origin = project(rng.uniform(22.2, 22.5), rng.uniform(113.9, 114.3))
+            minutes_per_km = rng.choice([0.0, 1.0, 2.0, 10.0])
+            top_k = rng.randint(1, 5)
+            ranked = rank_hospitals(
+                waits, min(w[2] for w in waits.values()), origin, top_k, minutes_per_km
+            )
+            expected = sorted(
+                waits[code][2] + minutes_per_km * math.dist(origin, project(*HOSPITAL_COORDINATES[code]))
+                for code in waits
+            )[:top_k]
+            self.assertEqual(len(ranked), len(expected))
+            for (score, _, _), want in zip(ranked, expected):
+                self.assertAlmostEqual(score, want)
+
+    async def test_warm_query_under_a_millisecond(self):
+        """
+        Test that a ranking served from the cached snapshot takes well under a millisecond.
+        """
+        await _get_nearest_aed_hospitals(district="Kwun Tong")
+        rounds = 2000
+        started = time.perf_counter()
+        for i in range(rounds):
+            await _get_nearest_aed_hospitals(latitude=22.30 + i % 20 * 0.01, longitude=114.17)
+        per_call = (time.perf_counter() - started) / rounds
+        self.assertLess(per_call, 0.001)
+
+    async def test_register_tool(self):
+        """
+        Test the registration of the get_nearest_aed_hospitals tool.
+        """
+        mock_mcp = MagicMock()
+        register(mock_mcp)
+        mock_mcp.tool.assert_called_once()
+        decorated_function = mock_mcp.tool.return_value.call_args[0][0]
+        self.assertEqual(decorated_function.__name__, "get_nearest_aed_hospitals")
+        with patch(
+            "hkopenai.hk_health_mcp_server.tools.aed_nearest._get_nearest_aed_hospitals",
+            new_callable=AsyncMock,
+        ) as mock_get:
+            await decorated_function(district="Sha Tin", top_k=2)
+            mock_get.assert_called_once_with("Sha Tin", None, None, 2, 2.0, "en")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,15 +7,19 @@ from datetime import datetime
 import json
 
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
 from hkopenai.hk_health_mcp_server.tools.aed_waiting import (
     _get_aed_waiting_times,
     register,
 )
 
 
-class TestAEDWaitingTimes(unittest.TestCase):
+class TestAEDWaitingTimes(unittest.IsolatedAsyncioTestCase):
     """
     Test class for verifying AED waiting times data fetching.
     This class contains tests to ensure the data retrieval functions correctly.
@@ -39,32 +43,109 @@ class TestAEDWaitingTimes(unittest.TestCase):
     "updateTime": "10/6/2025 9:45pm"
   }"""
 
-    
+    def setUp(self):
+        """Serve requests from a stub transport and start with an empty cache."""
+        response_cache.clear()
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(str(request.url))
+            return httpx.Response(200, content=self.JSON_DATA.encode("utf-8"))
 
-    
+        http_client.configure(transport=httpx.MockTransport(handler))
 
-    @patch("hkopenai.hk_health_mcp_server.tools.aed_waiting.fetch_json_data")
-    def test_get_aed_waiting_times(self, mock_fetch_json_data):
+    def tearDown(self):
+        """Restore the network transport."""
+        http_client.configure()
+
+    async def test_get_aed_waiting_times(self):
         """
         Test the retrieval of AED waiting times.
         Verifies that the function calls the data fetcher and returns the data with a timestamp.
         """
-        mock_fetch_json_data.return_value = json.loads(self.JSON_DATA)
         with patch(
-            "hkopenai.hk_health_mcp_server.tools.aed_waiting.datetime"
+            "hkopenai.hk_health_mcp_server.cache.datetime"
         ) as mock_datetime:
             mock_datetime.now.return_value = datetime(2025, 7, 14, 10, 0, 0)
             mock_datetime.isoformat.return_value = "2025-07-14T10:00:00"
-            result = _get_aed_waiting_times(lang="en")
-            mock_fetch_json_data.assert_called_once_with(
-                "https://www.ha.org.hk/opendata/aed/aedwtdata-en.json"
+            result = await _get_aed_waiting_times(lang="en")
+            self.assertEqual(
+                self.requests, ["https://www.ha.org.hk/opendata/aed/aedwtdata-en.json"]
             )
             self.assertIn("data", result)
             self.assertIn("last_updated", result)
             self.assertEqual(result["data"], json.loads(self.JSON_DATA))
             self.assertEqual(result["last_updated"], "2025-07-14T10:00:00")
+            self.assertFalse(result["cache_hit"])
+
+    async def test_get_aed_waiting_times_served_from_cache(self):
+        """
+        Test that a repeated call within the feed TTL is served from the cache.
+        Verifies that the upstream is fetched once and the original fetch time is reported.
+        """
+        first = await _get_aed_waiting_times(lang="en")
+        second = await _get_aed_waiting_times(lang="en")
+        self.assertEqual(len(self.requests), 1)
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual(second["last_updated"], first["last_updated"])
+        self.assertEqual(second["data"], first["data"])
+
+    async def test_get_aed_waiting_times_cached_per_language(self):
+        """
+        Test that each language variant is cached under its own key.
+        """
+        await _get_aed_waiting_times(lang="en")
+        result = await _get_aed_waiting_times(lang="tc")
+        self.assertFalse(result["cache_hit"])
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_filter_by_cluster(self):
+        """
+        Test filtering AED waiting times by cluster code.
+        """
+        result = await _get_aed_waiting_times(lang="en", cluster="KWC")
+        names = [row["hospName"] for row in result["data"]["waitTime"]]
+        self.assertEqual(names, ["Caritas Medical Centre"])
+        self.assertEqual(result["data"]["updateTime"], "10/6/2025 9:45pm")
+
+    async def test_filter_by_hospital_across_languages(self):
+        """
+        Test that a hospital name in Chinese matches the English feed row.
+        """
+        result = await _get_aed_waiting_times(lang="en", hospital="廣華醫院")
+        self.assertEqual(
+            result["data"]["waitTime"],
+            [{"hospName": "Kwong Wah Hospital", "topWait": "Around 1 hour"}],
+        )
+
+    async def test_projected_fields(self):
+        """
+        Test that only the requested hospital fields are returned, keeping updateTime.
+        """
+        result = await _get_aed_waiting_times(lang="en", fields=["hospName"])
+        self.assertEqual(
+            result["data"]["waitTime"][0], {"hospName": "Alice Ho Miu Ling Nethersole Hospital"}
+        )
+        self.assertEqual(result["data"]["updateTime"], "10/6/2025 9:45pm")
+
+    async def test_filter_by_district_without_match(self):
+        """
+        Test that a district with no A&E rows in the feed returns an empty list.
+        """
+        result = await _get_aed_waiting_times(lang="en", district="Tuen Mun")
+        self.assertEqual(result["data"]["waitTime"], [])
+
+    async def test_blank_filter_matches_nothing(self):
+        """
+        Test that a filter of only whitespace returns no hospitals rather than all of them.
+        """
+        result = await _get_aed_waiting_times(lang="en", district="  ")
+        self.assertEqual(result["data"]["waitTime"], [])
+        result = await _get_aed_waiting_times(lang="en", hospital=" ", cluster="KWC")
+        self.assertEqual(result["data"]["waitTime"], [])
 
-    def test_register_tool(self):
+    async def test_register_tool(self):
         """
         Test the registration of the get_aed_waiting_times tool.
 
@@ -96,10 +177,11 @@ class TestAEDWaitingTimes(unittest.TestCase):
 
         # Call the decorated function and verify it calls _get_aed_waiting_times
         with patch(
-            "hkopenai.hk_health_mcp_server.tools.aed_waiting._get_aed_waiting_times"
+            "hkopenai.hk_health_mcp_server.tools.aed_waiting._get_aed_waiting_times",
+            new_callable=AsyncMock,
         ) as mock_get_aed_waiting_times:
-            decorated_function(lang="en")
-            mock_get_aed_waiting_times.assert_called_once_with("en")
+            await decorated_function(lang="en", district="Tuen Mun")
+            mock_get_aed_waiting_times.assert_called_once_with("en", "", "Tuen Mun", "", None, "")
 
 
 if __name__ == "__main__":
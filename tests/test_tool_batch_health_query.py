@@ -0,0 +1,198 @@
+"""
+Module for testing the batch health query tool.
+This module contains unit tests for concurrent sub-queries, shared fetches and errors.
+"""
+
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import httpx
+from fastmcp import Client
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.server import server
+from hkopenai.hk_health_mcp_server.tools.batch_health_query import (
+    MAX_QUERIES,
+    _batch_health_query,
+    register,
+)
+
+
+class TestBatchHealthQuery(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the batch health query tool against a stub transport.
+    """
+
+    AED = {
+        "waitTime": [
+            {"hospName": "Tuen Mun Hospital", "topWait": "Over 3 hours"},
+            {"hospName": "Queen Mary Hospital", "topWait": "Around 1 hour"},
+        ],
+        "updateTime": "10/6/2025 9:45pm",
+    }
+    GOPC = [
+        {"District": "Tuen Mun", "Clinic": "Tuen Mun Clinic", "AvgQuota": "150"},
+        {"District": "Eastern", "Clinic": "Chai Wan Clinic", "AvgQuota": "80"},
+    ]
+    SPECIALIST = [
+        {"cluster": "New Territories West Cluster", "specialty": "Surgery", "Category": "Stable",
+         "Value": "60 Weeks"},
+    ]
+
+    def setUp(self):
+        """Serve every feed from a stub transport with a fixed delay."""
+        response_cache.clear()
+        self.requests = []
+
+        async def handler(request):
+            self.requests.append(str(request.url))
+            await asyncio.sleep(0.2)
+            url = str(request.url)
+            if "aedwtdata" in url:
+                payload = self.AED
+            elif "pas_gopc" in url:
+                payload = self.GOPC
+            else:
+                payload = self.SPECIALIST
+            return httpx.Response(200, content=json.dumps(payload).encode("utf-8"))
+
+        http_client.configure(transport=httpx.MockTransport(handler))
+
+    def tearDown(self):
+        """Restore the network transport."""
+        http_client.configure()
+
+    async def test_queries_run_concurrently_with_shared_fetches(self):
+        """
+        Test that queries on three feeds take about one fetch and share fetches per feed.
+        """
+        started = time.perf_counter()
+        result = await _batch_health_query(
+            [
+                {"tool": "get_aed_waiting_times", "args": {"district": "Tuen Mun"}, "id": "aed"},
+                {"tool": "get_aed_waiting_times", "args": {"hospital": "Queen Mary Hospital"}},
+                {"tool": "get_pas_gopc_avg_quota", "args": {"district": "Tuen Mun"}},
+                {"tool": "get_specialist_waiting_times", "args": {"cluster": "NTWC"}},
+            ]
+        )
+        elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 0.4)
+        self.assertEqual(len(self.requests), 3)
+
+        aed, qmh, gopc, specialist = result["results"]
+        self.assertEqual(aed["id"], "aed")
+        self.assertEqual(aed["result"]["data"]["waitTime"][0]["hospName"], "Tuen Mun Hospital")
+        self.assertEqual(qmh["result"]["data"]["waitTime"][0]["topWait"], "Around 1 hour")
+        self.assertNotIn("id", qmh)
+        self.assertEqual(gopc["result"]["data"], self.GOPC[:1])
+        self.assertEqual(specialist["tool"], "get_specialist_waiting_times")
+        self.assertEqual(len(specialist["result"]["data"]), 1)
+        self.assertEqual(result["message"], "Answered 4 of 4 queries")
+
+    async def test_identical_queries_run_once(self):
+        """
+        Test that repeated sub-queries share one call and one result.
+        """
+        query = {"tool": "get_pas_gopc_avg_quota", "args": {"lang": "en", "district": "Eastern"}}
+        with patch(
+            "hkopenai.hk_health_mcp_server.tools.batch_health_query.TOOLS",
+            {"get_pas_gopc_avg_quota": AsyncMock(return_value={"data": []})},
+        ) as tools:
+            result = await _batch_health_query([query, dict(query, id="again")])
+        tools["get_pas_gopc_avg_quota"].assert_awaited_once_with(lang="en", district="Eastern")
+        self.assertEqual(len(result["results"]), 2)
+        self.assertEqual(result["results"][1]["id"], "again")
+
+    async def test_failed_queries_reported_individually(self):
+        """
+        Test that unknown tools and invalid arguments fail only their own sub-query.
+        """
+        result = await _batch_health_query(
+            [
+                {"tool": "get_weather", "args": {}},
+                {"tool": "get_pas_gopc_avg_quota", "args": {"postcode": "999077"}},
+                {"tool": "get_health_snapshot", "args": {"feed": "gopc"}},
+            ]
+        )
+        unknown, invalid, snapshot = (r["result"] for r in result["results"])
+        self.assertIn("Unknown tool", unknown["error"])
+        self.assertIn("Invalid arguments", invalid["error"])
+        self.assertEqual(snapshot["feed"], "gopc")
+        self.assertEqual(result["message"], "Answered 1 of 3 queries; 2 failed")
+
+    async def test_failed_feed_fetches_counted(self):
+        """
+        Test that sub-queries whose feed cannot be fetched are counted as failed, AED included.
+        """
+        http_client.configure(
+            transport=httpx.MockTransport(lambda request: httpx.Response(404))
+        )
+        result = await _batch_health_query(
+            [
+                {"tool": "get_aed_waiting_times", "args": {}},
+                {"tool": "get_pas_gopc_avg_quota", "args": {}},
+            ]
+        )
+        aed, gopc = (r["result"] for r in result["results"])
+        self.assertIn("error", aed["data"])
+        self.assertEqual(gopc["type"], "Error")
+        self.assertEqual(result["message"], "Answered 0 of 2 queries; 2 failed")
+
+    async def test_query_count_limits(self):
+        """
+        Test that an empty batch and a batch over the limit are rejected.
+        """
+        self.assertEqual((await _batch_health_query([]))["type"], "Error")
+        too_many = [{"tool": "get_health_snapshot"}] * (MAX_QUERIES + 1)
+        self.assertIn("Too many queries", (await _batch_health_query(too_many))["error"])
+
+    async def test_call_through_server(self):
+        """
+        Test that the tool validates sub-queries and answers through an MCP client.
+        """
+        with patch.dict(
+            "os.environ",
+            {
+                "HK_HEALTH_BACKGROUND_REFRESH": "false",
+                "HK_HEALTH_SNAPSHOT_PATH": "off",
+                "HK_HEALTH_AED_HISTORY_PATH": "off",
+                "HK_HEALTH_GOPC_HISTORY_PATH": "off",
+            },
+        ):
+            async with Client(server()) as client:
+                result = await client.call_tool(
+                    "batch_health_query",
+                    {"queries": [{"tool": "get_pas_gopc_avg_quota", "args": {"district": "Eastern"}}]},
+                )
+                invalid = await client.call_tool(
+                    "batch_health_query",
+                    {"queries": [{"tool": "get_weather"}]},
+                    raise_on_error=False,
+                )
+        payload = json.loads(result.content[0].text)
+        self.assertEqual(payload["results"][0]["result"]["data"], self.GOPC[1:])
+        self.assertTrue(invalid.is_error)
+
+    async def test_register_tool(self):
+        """
+        Test the registration of the batch_health_query tool.
+        """
+        mock_mcp = MagicMock()
+        register(mock_mcp)
+        mock_mcp.tool.assert_called_once()
+        decorated_function = mock_mcp.tool.return_value.call_args[0][0]
+        self.assertEqual(decorated_function.__name__, "batch_health_query")
+        with patch(
+            "hkopenai.hk_health_mcp_server.tools.batch_health_query._batch_health_query",
+            new_callable=AsyncMock,
+        ) as mock_batch_health_query:
+            await decorated_function(queries=[])
+            mock_batch_health_query.assert_called_once_with([])
+
+
+if __name__ == "__main__":
+    unittest.main()
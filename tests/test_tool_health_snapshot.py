@@ -0,0 +1,149 @@
+"""
+Module for testing the multi-language health snapshot tool.
+This module contains unit tests for concurrent fan-out and cross-language row merging.
+"""
+
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.tools.health_snapshot import (
+    _get_health_snapshot,
+    register,
+)
+
+
+class TestHealthSnapshot(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the merged multi-language snapshot.
+    """
+
+    AED = {
+        "en": {
+            "waitTime": [
+                {"hospName": "Tuen Mun Hospital", "topWait": "Over 3 hours"},
+                {"hospName": "Queen Mary Hospital", "topWait": "Around 1 hour"},
+            ],
+            "updateTime": "10/6/2025 9:45pm",
+        },
+        "tc": {
+            "waitTime": [
+                {"hospName": "瑪麗醫院", "topWait": "約1小時"},
+                {"hospName": "屯門醫院", "topWait": "超過3小時"},
+            ],
+            "updateTime": "10/6/2025 9:45pm",
+        },
+        "sc": {
+            "waitTime": [
+                {"hospName": "屯门医院", "topWait": "超过3小时"},
+                {"hospName": "玛丽医院", "topWait": "约1小时"},
+            ],
+            "updateTime": "10/6/2025 9:45pm",
+        },
+    }
+
+    GOPC = {
+        "en": [
+            {"District": "Tuen Mun", "Clinic": "Tuen Mun Clinic", "AvgQuota": "150"},
+            {"District": "Tuen Mun", "Clinic": "Siu Lam Clinic", "AvgQuota": "50"},
+        ],
+        "tc": [
+            {"District": "屯門", "Clinic": "屯門診所", "AvgQuota": "150"},
+            {"District": "屯門", "Clinic": "小欖診所", "AvgQuota": "50"},
+        ],
+    }
+
+    def setUp(self):
+        """Serve each language variant from a stub transport with a fixed delay."""
+        response_cache.clear()
+        self.delay = 0.0
+        self.requests = []
+
+        async def handler(request):
+            self.requests.append(str(request.url))
+            await asyncio.sleep(self.delay)
+            lang = str(request.url).rsplit("-", 1)[1].split(".")[0]
+            payloads = self.AED if "aedwtdata" in str(request.url) else self.GOPC
+            if lang not in payloads:
+                return httpx.Response(404)
+            return httpx.Response(200, content=json.dumps(payloads[lang]).encode("utf-8"))
+
+        http_client.configure(transport=httpx.MockTransport(handler))
+
+    def tearDown(self):
+        """Restore the network transport."""
+        http_client.configure()
+
+    async def test_aed_rows_merged_by_hospital(self):
+        """
+        Test that rows listed in different orders are merged by hospital code.
+        """
+        result = await _get_health_snapshot("aed")
+        by_code = {row["hospCode"]: row for row in result["data"]}
+        self.assertEqual(
+            by_code["TMH"]["hospName"],
+            {"en": "Tuen Mun Hospital", "tc": "屯門醫院", "sc": "屯门医院"},
+        )
+        self.assertEqual(by_code["QMH"]["topWait"]["tc"], "約1小時")
+        self.assertEqual(result["updateTime"], "10/6/2025 9:45pm")
+        self.assertEqual(set(result["languages"]), {"en", "tc", "sc"})
+
+    async def test_fetches_run_concurrently(self):
+        """
+        Test that total time is close to one fetch rather than the sum of three.
+        """
+        self.delay = 0.2
+        start = time.perf_counter()
+        await _get_health_snapshot("aed")
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(self.requests), 3)
+        self.assertLess(elapsed, 0.4)
+
+    async def test_missing_language_reported(self):
+        """
+        Test that a failed language variant is reported while others are merged.
+        """
+        result = await _get_health_snapshot("gopc")
+        self.assertEqual(list(result["errors"]), ["sc"])
+        self.assertEqual(
+            result["data"][1],
+            {
+                "district_key": "tuen mun",
+                "District": {"en": "Tuen Mun", "tc": "屯門"},
+                "Clinic": {"en": "Siu Lam Clinic", "tc": "小欖診所"},
+                "AvgQuota": "50",
+            },
+        )
+
+    async def test_unknown_feed(self):
+        """
+        Test that an unknown feed name returns an error.
+        """
+        result = await _get_health_snapshot("weather")
+        self.assertEqual(result["type"], "Error")
+
+    async def test_register_tool(self):
+        """
+        Test the registration of the get_health_snapshot tool.
+        """
+        mock_mcp = MagicMock()
+        register(mock_mcp)
+        mock_mcp.tool.assert_called_once()
+        decorated_function = mock_mcp.tool.return_value.call_args[0][0]
+        self.assertEqual(decorated_function.__name__, "get_health_snapshot")
+        with patch(
+            "hkopenai.hk_health_mcp_server.tools.health_snapshot._get_health_snapshot",
+            new_callable=AsyncMock,
+        ) as mock_get_health_snapshot:
+            await decorated_function(feed="gopc")
+            mock_get_health_snapshot.assert_called_once_with("gopc")
+
+
+if __name__ == "__main__":
+    unittest.main()
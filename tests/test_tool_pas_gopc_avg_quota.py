@@ -4,17 +4,22 @@ This module contains unit tests to verify the behavior of the quota data retriev
 """
 
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from datetime import datetime
 import json
 
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
 from hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota import (
+    _build_index,
     _get_pas_gopc_avg_quota,
     register,
 )
 
 
-class TestPasGopcAvgQuotaTool(unittest.TestCase):
+class TestPasGopcAvgQuotaTool(unittest.IsolatedAsyncioTestCase):
     """
     Test class for verifying general outpatient clinic quota data fetching.
     This class contains tests to ensure the data retrieval functions correctly.
@@ -38,44 +43,57 @@ class TestPasGopcAvgQuotaTool(unittest.TestCase):
         }
     ]"""
 
-    @patch("hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota.fetch_json_data")
-    def test_get_pas_gopc_avg_quota_all_districts(self, mock_fetch_json_data):
+    URL = "https://www.ha.org.hk/pas_gopc/pas_gopc_avg_quota_pdf/g0_9uo7a_p-en.json"
+
+    def setUp(self):
+        """Serve requests from a stub transport and start with an empty cache."""
+        response_cache.clear()
+        self.requests = []
+        self.responses = []
+
+        def handler(request):
+            self.requests.append(str(request.url))
+            if self.responses:
+                return self.responses.pop(0)
+            return httpx.Response(200, content=self.JSON_DATA.encode("utf-8"))
+
+        # One attempt per fetch, so a single injected failure reaches the caller.
+        http_client.configure(transport=httpx.MockTransport(handler), retry_attempts=1)
+
+    def tearDown(self):
+        """Restore the network transport and retries."""
+        http_client.configure(retry_attempts=http_client.DEFAULT_RETRY_ATTEMPTS)
+
+    async def test_get_pas_gopc_avg_quota_all_districts(self):
         """
         Test retrieval of general outpatient clinic quota data for all districts.
         Verifies that data for all districts is returned correctly.
         """
-        mock_fetch_json_data.return_value = json.loads(self.JSON_DATA)
         with patch(
-            "hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota.datetime"
+            "hkopenai.hk_health_mcp_server.cache.datetime"
         ) as mock_datetime:
             mock_datetime.now.return_value = datetime(2025, 7, 14, 10, 0, 0)
             mock_datetime.isoformat.return_value = "2025-07-14T10:00:00"
-            result = _get_pas_gopc_avg_quota(lang="en")
-            mock_fetch_json_data.assert_called_once_with(
-                "https://www.ha.org.hk/pas_gopc/pas_gopc_avg_quota_pdf/g0_9uo7a_p-en.json"
-            )
+            result = await _get_pas_gopc_avg_quota(lang="en")
+            self.assertEqual(self.requests, [self.URL])
             self.assertIn("data", result)
             self.assertIn("last_updated", result)
             self.assertEqual(len(result["data"]), 3)
             self.assertEqual(result["last_updated"], "2025-07-14T10:00:00")
             self.assertEqual(result["message"], "Retrieved data for 3 clinics")
 
-    @patch("hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota.fetch_json_data")
-    def test_get_pas_gopc_avg_quota_filtered_by_district(self, mock_fetch_json_data):
+    async def test_get_pas_gopc_avg_quota_filtered_by_district(self):
         """
         Test retrieval of general outpatient clinic quota data filtered by district.
         Verifies that only data for the specified district is returned.
         """
-        mock_fetch_json_data.return_value = json.loads(self.JSON_DATA)
         with patch(
-            "hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota.datetime"
+            "hkopenai.hk_health_mcp_server.cache.datetime"
         ) as mock_datetime:
             mock_datetime.now.return_value = datetime(2025, 7, 14, 10, 0, 0)
             mock_datetime.isoformat.return_value = "2025-07-14T10:00:00"
-            result = _get_pas_gopc_avg_quota(lang="en", district="Tuen Mun")
-            mock_fetch_json_data.assert_called_once_with(
-                "https://www.ha.org.hk/pas_gopc/pas_gopc_avg_quota_pdf/g0_9uo7a_p-en.json"
-            )
+            result = await _get_pas_gopc_avg_quota(lang="en", district="Tuen Mun")
+            self.assertEqual(self.requests, [self.URL])
             self.assertIn("data", result)
             self.assertIn("last_updated", result)
             self.assertEqual(len(result["data"]), 2)
@@ -84,17 +102,67 @@ class TestPasGopcAvgQuotaTool(unittest.TestCase):
             self.assertEqual(result["last_updated"], "2025-07-14T10:00:00")
             self.assertEqual(result["message"], "Retrieved data for 2 clinics in Tuen Mun")
 
-    @patch("hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota.fetch_json_data")
-    def test_get_pas_gopc_avg_quota_error_handling(self, mock_fetch_json_data):
+    async def test_get_pas_gopc_avg_quota_filtered_by_chinese_district(self):
+        """
+        Test that a district name in Traditional Chinese matches English feed rows.
+        """
+        result = await _get_pas_gopc_avg_quota(lang="en", district="屯門區")
+        self.assertEqual(
+            [entry["Clinic"] for entry in result["data"]],
+            ["Tuen Mun Clinic", "Siu Lam Clinic"],
+        )
+        self.assertEqual(result["message"], "Retrieved data for 2 clinics in 屯門區")
+
+    async def test_get_pas_gopc_avg_quota_projected_fields(self):
+        """
+        Test that only the requested fields are returned for each clinic.
+        """
+        result = await _get_pas_gopc_avg_quota(
+            lang="en", district="Tuen Mun", fields=["Clinic", "AvgQuota"]
+        )
+        self.assertEqual(
+            result["data"],
+            [
+                {"Clinic": "Tuen Mun Clinic", "AvgQuota": "150"},
+                {"Clinic": "Siu Lam Clinic", "AvgQuota": "50"},
+            ],
+        )
+
+    async def test_get_pas_gopc_avg_quota_index_built_once(self):
+        """
+        Test that the district index is built once per snapshot and reused.
+        """
+        with patch(
+            "hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota._build_index",
+            wraps=_build_index,
+        ) as mock_build_index:
+            await _get_pas_gopc_avg_quota(lang="en", district="Tuen Mun")
+            await _get_pas_gopc_avg_quota(lang="en", district="tuen mun")
+            await _get_pas_gopc_avg_quota(lang="en", district="Central and Western")
+            mock_build_index.assert_called_once()
+
+    async def test_get_pas_gopc_avg_quota_error_handling(self):
         """
         Test error handling when fetching data.
         Verifies that an error message is returned when data fetching fails.
         """
-        mock_fetch_json_data.return_value = {"error": "Network error"}
-        result = _get_pas_gopc_avg_quota(lang="en")
-        self.assertEqual(result, {"type": "Error", "error": "Network error"})
+        self.responses.append(httpx.Response(503))
+        result = await _get_pas_gopc_avg_quota(lang="en")
+        self.assertEqual(result["type"], "Error")
+        self.assertIn("Status code: 503", result["error"])
 
-    def test_register_tool(self):
+    async def test_get_pas_gopc_avg_quota_error_not_cached(self):
+        """
+        Test that a failed fetch is not cached and the next call retries upstream.
+        """
+        self.responses.append(httpx.Response(503))
+        await _get_pas_gopc_avg_quota(lang="en")
+        result = await _get_pas_gopc_avg_quota(lang="en")
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(len(result["data"]), 3)
+        self.assertFalse(result["cache_hit"])
+
+    async def test_register_tool(self):
         """
         Test the registration of the get_pas_gopc_avg_quota tool.
 
@@ -126,10 +194,11 @@ class TestPasGopcAvgQuotaTool(unittest.TestCase):
 
         # Call the decorated function and verify it calls _get_pas_gopc_avg_quota
         with patch(
-            "hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota._get_pas_gopc_avg_quota"
+            "hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota._get_pas_gopc_avg_quota",
+            new_callable=AsyncMock,
         ) as mock_get_pas_gopc_avg_quota:
-            decorated_function(lang="en", district="Tuen Mun")
-            mock_get_pas_gopc_avg_quota.assert_called_once_with("en", "Tuen Mun")
+            await decorated_function(lang="en", district="Tuen Mun")
+            mock_get_pas_gopc_avg_quota.assert_called_once_with("en", "Tuen Mun", None, "", "", None, None)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,108 @@
+"""
+Module for testing the specialist waiting time ranking tool.
+This module contains unit tests for ranking clusters of one specialty and category.
+"""
+
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
+from hkopenai.hk_health_mcp_server.tools.specialist_ranking import (
+    _get_specialist_wait_ranking,
+    register,
+)
+
+ROWS = {
+    "en": [
+        {"cluster": "Kowloon East Cluster", "specialty": "Ophthalmology", "Category": "Stable", "Value": "60 weeks"},
+        {"cluster": "Hong Kong West Cluster", "specialty": "Ophthalmology", "Category": "Stable", "Value": "20-24 weeks"},
+        {"cluster": "New Territories East Cluster", "specialty": "Ophthalmology", "Category": "Stable", "Value": ">100 weeks"},
+        {"cluster": "Kowloon East Cluster", "specialty": "Ophthalmology", "Category": "Urgent", "Value": "<1 week"},
+    ],
+    "tc": [
+        {"cluster": "九龍東聯網", "specialty": "眼科", "Category": "穩定", "Value": "60星期"},
+        {"cluster": "港島西聯網", "specialty": "眼科", "Category": "穩定", "Value": "20-24星期"},
+    ],
+}
+
+
+class TestSpecialistWaitRanking(unittest.IsolatedAsyncioTestCase):
+    """
+    Test class for verifying the cluster ranking of specialist waiting times.
+    """
+
+    def setUp(self):
+        """Serve the specialist feed in English and Traditional Chinese."""
+        response_cache.clear()
+
+        def handler(request):
+            lang = "tc" if request.url.path.endswith("-tc.json") else "en"
+            return httpx.Response(200, json=ROWS[lang])
+
+        http_client.configure(transport=httpx.MockTransport(handler))
+
+    def tearDown(self):
+        """Drop cached snapshots and restore the default client."""
+        response_cache.clear()
+        http_client.configure()
+
+    async def test_ranking(self):
+        """
+        Test that clusters are ranked from the shortest stable wait with territory figures.
+        """
+        result = await _get_specialist_wait_ranking("Ophthalmology")
+        self.assertEqual([e["cluster_code"] for e in result["ranking"]], ["HKWC", "KEC", "NTEC"])
+        self.assertEqual(result["ranking"][0]["low_weeks"], 20.0)
+        self.assertEqual(result["ranking"][0]["high_weeks"], 24.0)
+        self.assertEqual(result["median_weeks"], 60.0)
+        self.assertTrue(result["territory_max_open_ended"])
+        self.assertIn("last_updated", result)
+        self.assertNotIn("cluster", result)
+
+    async def test_cluster_and_category(self):
+        """
+        Test returning one cluster's entry and choosing the category in any language.
+        """
+        result = await _get_specialist_wait_ranking("眼科", category="緊急", cluster="KEC")
+        self.assertEqual(result["category"], "Urgent")
+        self.assertEqual(result["cluster"]["value"], "<1 week")
+        result = await _get_specialist_wait_ranking("Ophthalmology", cluster="Hong Kong East Cluster")
+        self.assertIsNone(result["cluster"])
+
+    async def test_traditional_chinese(self):
+        """
+        Test that names are returned in the language of the feed.
+        """
+        result = await _get_specialist_wait_ranking("Ophthalmology", lang="tc")
+        self.assertEqual(result["specialty"], "眼科")
+        self.assertEqual(result["ranking"][0]["cluster"], "港島西聯網")
+
+    async def test_unknown_specialty(self):
+        """
+        Test that an unknown specialty returns an error listing the known ones.
+        """
+        result = await _get_specialist_wait_ranking("Dentistry")
+        self.assertEqual(result["type"], "Error")
+        self.assertIn("Ophthalmology", result["error"])
+
+    async def test_register_tool(self):
+        """
+        Test that the registered tool calls _get_specialist_wait_ranking.
+        """
+        mock_mcp = MagicMock()
+        register(mock_mcp)
+        decorated_function = mock_mcp.tool.return_value.call_args[0][0]
+        self.assertEqual(decorated_function.__name__, "get_specialist_wait_ranking")
+        with patch(
+            "hkopenai.hk_health_mcp_server.tools.specialist_ranking._get_specialist_wait_ranking",
+            new_callable=AsyncMock,
+        ) as mock_get:
+            await decorated_function(specialty="Surgery", cluster="KEC")
+            mock_get.assert_called_once_with("Surgery", "Stable", "KEC", "en")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,17 +7,19 @@ from datetime import datetime
 import json
 
 import unittest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, AsyncMock, MagicMock
 
+import httpx
+
+from hkopenai.hk_health_mcp_server import http_client
+from hkopenai.hk_health_mcp_server.cache import response_cache
 from hkopenai.hk_health_mcp_server.tools.specialist_waiting_time_by_cluster import (
     _get_specialist_waiting_times,
     register,
 )
 
-from hkopenai_common.json_utils import fetch_json_data
-
 
-class TestSpecialistWaitingTimes(unittest.TestCase):
+class TestSpecialistWaitingTimes(unittest.IsolatedAsyncioTestCase):
     """
     Test class for verifying specialist outpatient waiting times data fetching.
     This class contains tests to ensure the data retrieval functions correctly.
@@ -40,33 +42,75 @@ class TestSpecialistWaitingTimes(unittest.TestCase):
     }
 ]"""
 
-    
+    def setUp(self):
+        """Serve requests from a stub transport and start with an empty cache."""
+        response_cache.clear()
+        self.requests = []
+
+        def handler(request):
+            self.requests.append(str(request.url))
+            return httpx.Response(200, content=self.JSON_DATA.encode("utf-8"))
+
+        http_client.configure(transport=httpx.MockTransport(handler))
 
-    
+    def tearDown(self):
+        """Restore the network transport."""
+        http_client.configure()
 
-    @patch("hkopenai.hk_health_mcp_server.tools.specialist_waiting_time_by_cluster.fetch_json_data")
-    def test_get_specialist_waiting_times(self, mock_fetch_json_data):
+    async def test_get_specialist_waiting_times(self):
         """
         Test the retrieval of specialist waiting times.
         Verifies that the function calls the data fetcher and returns the data with a timestamp.
         """
-        mock_fetch_json_data.return_value = json.loads(self.JSON_DATA)
         with patch(
-            "hkopenai.hk_health_mcp_server.tools.specialist_waiting_time_by_cluster.datetime.datetime"
+            "hkopenai.hk_health_mcp_server.cache.datetime"
         ) as mock_dt_class:
             mock_dt_instance = MagicMock()
             mock_dt_instance.isoformat.return_value = "2025-07-14T10:00:00"
             mock_dt_class.now.return_value = mock_dt_instance
-            result = _get_specialist_waiting_times(lang="en")
-            mock_fetch_json_data.assert_called_once_with(
-                "https://www.ha.org.hk/opendata/sop/sop-waiting-time-en.json"
+            result = await _get_specialist_waiting_times(lang="en")
+            self.assertEqual(
+                self.requests,
+                ["https://www.ha.org.hk/opendata/sop/sop-waiting-time-en.json"],
             )
             self.assertIn("data", result)
             self.assertIn("last_updated", result)
             self.assertEqual(result["data"], json.loads(self.JSON_DATA))
             self.assertEqual(result["last_updated"], "2025-07-14T10:00:00")
 
-    def test_register_tool(self):
+    async def test_filter_by_cluster_and_specialty(self):
+        """
+        Test filtering specialist waiting times by cluster code and Chinese specialty name.
+        """
+        result = await _get_specialist_waiting_times(
+            lang="en", cluster="HKEC", specialty="外科"
+        )
+        self.assertEqual(len(result["data"]), 1)
+        self.assertEqual(result["data"][0]["specialty"], "Surgery")
+
+    async def test_projected_fields(self):
+        """
+        Test that only the requested fields are returned for each entry.
+        """
+        result = await _get_specialist_waiting_times(
+            lang="en", fields=["specialty", "value"]
+        )
+        self.assertEqual(
+            result["data"],
+            [
+                {"specialty": "Medicine", "value": "10"},
+                {"specialty": "Surgery", "value": "2"},
+            ],
+        )
+
+    async def test_filter_by_unknown_cluster(self):
+        """
+        Test that an unknown cluster returns no rows.
+        """
+        result = await _get_specialist_waiting_times(lang="en", cluster="Atlantis")
+        self.assertEqual(result["data"], [])
+
+    async def test_register_tool(self):
         """
         Test the registration of the get_specialist_waiting_times tool.
 
@@ -98,10 +142,11 @@ class TestSpecialistWaitingTimes(unittest.TestCase):
 
         # Call the decorated function and verify it calls _get_specialist_waiting_times
         with patch(
-            "hkopenai.hk_health_mcp_server.tools.specialist_waiting_time_by_cluster._get_specialist_waiting_times"
+            "hkopenai.hk_health_mcp_server.tools.specialist_waiting_time_by_cluster._get_specialist_waiting_times",
+            new_callable=AsyncMock,
         ) as mock_get_specialist_waiting_times:
-            decorated_function(lang="en")
-            mock_get_specialist_waiting_times.assert_called_once_with("en")
+            await decorated_function(lang="en", specialty="Surgery")
+            mock_get_specialist_waiting_times.assert_called_once_with("en", "", "Surgery", None, "", "", None, None)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,265 @@
+"""
+Module for testing the multi-worker HTTP mode and the cache shared between workers.
+This module contains unit tests for the worker settings and command line, and
+cross-process tests showing that workers share upstream fetches and history.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from hkopenai.hk_health_mcp_server import __main__ as entry_point
+from hkopenai.hk_health_mcp_server.history import SAMPLE_DTYPE, AedHistory
+from hkopenai.hk_health_mcp_server.snapshot_store import SnapshotStore
+from hkopenai.hk_health_mcp_server.workers import MultiWorkerServer, workers_from_env
+
+_REFRESH = textwrap.dedent(
+    """
+    import asyncio, json, sys
+    import httpx
+    from hkopenai.hk_health_mcp_server import cache, http_client
+    from hkopenai.hk_health_mcp_server.feeds import GOPC
+    from hkopenai.hk_health_mcp_server.snapshot_store import SnapshotStore
+
+    class Redirect(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self.inner = httpx.AsyncHTTPTransport()
+        async def handle_async_request(self, request):
+            request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port={port})
+            return await self.inner.handle_async_request(request)
+
+    async def main():
+        http_client.configure(transport=Redirect(), retry_attempts=1)
+        cache.set_snapshot_store(SnapshotStore({path!r}), shared=True)
+        result = await cache.refresh_feed(GOPC, "en", http_client.fetch_json)
+        print(json.dumps({{"rows": len(result.data), "cache_hit": result.cache_hit}}))
+
+    asyncio.run(main())
+    """
+)
+
+_QUERY = textwrap.dedent(
+    """
+    import asyncio, json, sys
+    import httpx
+    from hkopenai.hk_health_mcp_server import cache, http_client, serialization
+    from hkopenai.hk_health_mcp_server.snapshot_store import SnapshotStore
+    from hkopenai.hk_health_mcp_server.tools.pas_gopc_avg_quota import _get_pas_gopc_avg_quota
+
+    class Redirect(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self.inner = httpx.AsyncHTTPTransport()
+        async def handle_async_request(self, request):
+            request.url = request.url.copy_with(scheme="http", host="127.0.0.1", port={port})
+            return await self.inner.handle_async_request(request)
+
+    async def main():
+        http_client.configure(transport=Redirect(), retry_attempts=1)
+        cache.set_snapshot_store(SnapshotStore({path!r}), shared=True)
+        arguments = json.loads(sys.argv[1])
+        print(serialization.dumps_response(await _get_pas_gopc_avg_quota(**arguments)))
+
+    asyncio.run(main())
+    """
+)
+
+
+class _SlowFeed(BaseHTTPRequestHandler):
+    """Serve a small GOPC payload slowly and count the requests."""
+
+    requests = 0
+    lock = threading.Lock()
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Reply with two clinics after a delay."""
+        with self.lock:
+            type(self).requests += 1
+        time.sleep(1.0)
+        body = json.dumps(
+            [{"District": "Eastern", "Clinic": c, "AvgQuota": "80"} for c in "AB"]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the test output quiet."""
+
+
+class TestSharedCache(unittest.TestCase):
+    """
+    Test class for verifying that worker processes share fetches through the store.
+    """
+
+    def setUp(self):
+        """Start the slow upstream stand-in and a temporary store directory."""
+        _SlowFeed.requests = 0
+        self.upstream = ThreadingHTTPServer(("127.0.0.1", 0), _SlowFeed)
+        threading.Thread(target=self.upstream.serve_forever, daemon=True).start()
+        self.directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+
+    def tearDown(self):
+        """Stop the stand-in and remove the store."""
+        self.upstream.shutdown()
+        self.upstream.server_close()
+        self.directory.cleanup()
+
+    def test_concurrent_workers_fetch_once(self):
+        """
+        Test that processes refreshing the same feed make one upstream request between them.
+        """
+        code = _REFRESH.format(
+            port=self.upstream.server_address[1],
+            path=os.path.join(self.directory.name, "snapshots.sqlite3"),
+        )
+        processes = [
+            subprocess.Popen(  # pylint: disable=consider-using-with
+                [sys.executable, "-c", code], stdout=subprocess.PIPE, text=True
+            )
+            for _ in range(3)
+        ]
+        results = [json.loads(p.communicate(timeout=60)[0]) for p in processes]
+        self.assertEqual(_SlowFeed.requests, 1)
+        self.assertEqual([r["rows"] for r in results], [2, 2, 2])
+        self.assertEqual(sorted(r["cache_hit"] for r in results), [False, True, True])
+
+    def test_pages_and_cursors_continue_on_another_worker(self):
+        """
+        Test that a page token or cursor from one process is understood by another serving
+        the same stored snapshot.
+        """
+        code = _QUERY.format(
+            port=self.upstream.server_address[1],
+            path=os.path.join(self.directory.name, "snapshots.sqlite3"),
+        )
+
+        def query(**arguments):
+            output = subprocess.run(
+                [sys.executable, "-c", code, json.dumps(arguments)],
+                capture_output=True,
+                text=True,
+                timeout=60,
+                check=True,
+            ).stdout
+            return json.loads(output)
+
+        first = query(max_items=1)
+        self.assertEqual([row["Clinic"] for row in first["data"]], ["A"])
+        second = query(max_items=1, page=first["page"]["next_page"])
+        self.assertNotIn("restarted", second["page"])
+        self.assertEqual([row["Clinic"] for row in second["data"]], ["B"])
+        self.assertEqual(second["page"]["next_page"], None)
+        polled = query(since=first["cursor"])
+        self.assertNotIn("reset", polled)
+        self.assertEqual(polled["data"], [])
+        self.assertEqual(polled["cursor"], first["cursor"])
+        self.assertEqual(_SlowFeed.requests, 1)
+
+    def test_lock_is_exclusive_between_processes(self):
+        """
+        Test that a feed lock held by another process cannot be taken until released.
+        """
+        path = os.path.join(self.directory.name, "snapshots.sqlite3")
+        holder = subprocess.Popen(  # pylint: disable=consider-using-with
+            [
+                sys.executable,
+                "-c",
+                "import sys, time\n"
+                "from hkopenai.hk_health_mcp_server.snapshot_store import SnapshotStore\n"
+                f"store = SnapshotStore({path!r}); store.try_lock('u'); print('locked', flush=True)\n"
+                "sys.stdin.readline()\n",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            self.assertEqual(holder.stdout.readline().strip(), "locked")
+            store = SnapshotStore(path)
+            self.assertFalse(store.try_lock("u"))
+            self.assertTrue(store.try_lock("other"))
+            holder.communicate("\n", timeout=30)
+            self.assertTrue(store.try_lock("u"))
+            store.close()
+        finally:
+            if holder.poll() is None:
+                holder.kill()
+
+    def test_history_file_written_once_per_snapshot(self):
+        """
+        Test that workers recording the same AED snapshot append it to the file once.
+        """
+        path = os.path.join(self.directory.name, "history.bin")
+        rows = [{"hospName": "Queen Mary Hospital", "topWait": "Around 1 hour"}]
+        workers = [AedHistory(), AedHistory()]
+        for history in workers:
+            history.open(path)
+        for history in workers:
+            self.assertEqual(history.record(rows, 1000.0), 1)
+        workers[1].record(rows, 2000.0)
+        self.assertEqual(os.path.getsize(path), 2 * SAMPLE_DTYPE.itemsize)
+        self.assertEqual(len(workers[0]), 1)
+
+
+class TestWorkerMode(unittest.TestCase):
+    """
+    Test class for verifying the worker settings and the command line entry point.
+    """
+
+    def test_workers_from_env(self):
+        """
+        Test the HK_HEALTH_WORKERS values.
+        """
+        for value, expected in (("4", 4), ("0", 1), ("many", 1), ("auto", os.cpu_count() or 1)):
+            with patch.dict("os.environ", {"HK_HEALTH_WORKERS": value}):
+                self.assertEqual(workers_from_env(), expected)
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertEqual(workers_from_env(), 1)
+
+    def test_http_transport_runs_workers(self):
+        """
+        Test that the HTTP transport starts worker processes and stdio or one worker runs one server.
+        """
+        with patch("hkopenai.hk_health_mcp_server.workers.run_workers") as run_workers, patch(
+            "hkopenai.hk_health_mcp_server.workers.server"
+        ) as server:
+            MultiWorkerServer(4).run(transport="streamable-http", host="0.0.0.0", port=9000)
+            run_workers.assert_called_once_with(4, "0.0.0.0", 9000)
+            MultiWorkerServer(4).run()
+            server.return_value.run.assert_called_once_with()
+            with patch(
+                "hkopenai.hk_health_mcp_server.workers.compression.http_middleware",
+                return_value=["gzip"],
+            ):
+                MultiWorkerServer(1).run(transport="streamable-http", port=9000)
+            server.return_value.run.assert_called_with(
+                transport="streamable-http", host="127.0.0.1", port=9000, middleware=["gzip"]
+            )
+            run_workers.assert_called_once()
+
+    def test_command_line(self):
+        """
+        Test that --workers sets the number of workers and other options pass through.
+        """
+        with patch.object(entry_point, "cli_main") as cli_main:
+            entry_point.main(["--sse", "--workers", "3", "--port", "9000"])
+            factory, _, rest = cli_main.call_args[0]
+            self.assertEqual(rest, ["--sse", "--port", "9000"])
+            self.assertEqual(factory().workers, 3)
+            with patch.dict("os.environ", {"HK_HEALTH_WORKERS": "1"}):
+                entry_point.main(["--sse"])
+            self.assertEqual(cli_main.call_args[0][0]().workers, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()